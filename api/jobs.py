@@ -0,0 +1,180 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_WORKERS = 2
+MAX_PENDING = 8      # Wartende und laufende Jobs, darüber wird abgelehnt
+MAX_HISTORY = 100    # Abgeschlossene Jobs, die abfragbar bleiben
+
+# Jobarten, die nicht gleichzeitig laufen dürfen; Wiederherstellen legt
+# selbst ein Backup an und überschreibt, was ein Backup gerade liest
+JOB_CONFLICTS = {
+    "backup": ("backup", "restore"),
+    "restore": ("backup", "restore"),
+    "update": ("update",),
+}
+
+
+class JobRejected(Exception):
+    """Job wird nicht angenommen; ``job`` ist ggf. der laufende, mit dem er kollidiert"""
+
+    def __init__(self, message: str, job: Optional["Job"] = None):
+        super().__init__(message)
+        self.job = job
+
+
+class Job:
+    """Zustand eines Hintergrundjobs (Backup, Update, ...)"""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"    # queued, running, succeeded, failed
+        self.progress = 0
+        self.message = ""
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobRunner:
+    """Führt blockierende Arbeit der API in einem begrenzten Threadpool aus.
+
+    Backups (tar+gzip) und Update-Downloads liefen bisher direkt in den
+    ``async``-Handlern und hielten die Event-Loop für alle anderen Anfragen
+    an. ``submit`` gibt sofort einen Job zurück; die Funktion bekommt als
+    erstes Argument ``report(progress, message)`` für den Fortschritt.
+    Höchstens ``workers`` Jobs laufen gleichzeitig, höchstens ``max_pending``
+    warten oder laufen; ``conflicts`` nennt die Arten, neben denen der Job
+    nicht starten darf.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_pending: int = MAX_PENDING,
+                 max_history: int = MAX_HISTORY):
+        self.max_pending = max_pending
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ApiJob")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args,
+               conflicts: Iterable[str] = (), **kwargs) -> Job:
+        """Reiht einen Job ein; JobRejected bei Konflikt oder voller Warteschlange"""
+        conflicts = set(conflicts)
+        with self._lock:
+            active = [job for job in self._jobs.values() if job.active]
+            running = next((job for job in active if job.kind in conflicts), None)
+            if running is not None:
+                raise JobRejected(f"{running.kind} läuft bereits", running)
+            if len(active) >= self.max_pending:
+                raise JobRejected(f"Zu viele laufende Jobs ({len(active)})")
+            job = Job(kind)
+            self._jobs[job.id] = job
+            self._trim()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs):
+        def report(progress: int, message: str = ""):
+            with self._lock:
+                job.progress = max(0, min(100, int(progress)))
+                if message:
+                    job.message = message
+
+        with self._lock:
+            job.status = "running"
+            job.started = time.time()
+        try:
+            result = fn(report, *args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                job.status = "failed"
+                job.error = str(e)
+        else:
+            with self._lock:
+                job.status = "succeeded"
+                job.progress = 100
+                job.result = result
+        finally:
+            with self._lock:
+                job.finished = time.time()
+
+    def _trim(self):
+        """Vergisst die ältesten abgeschlossenen Jobs über ``max_history``"""
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+# Jobfunktionen der API; hier statt in api.main, damit sie ohne Webserver laufen
+UPDATE_CONFIG_DIR = "/etc/innovate/update"
+
+
+def run_backup(report, name: str):
+    from system.backup.backup_manager import BackupManager
+    if not BackupManager().create_backup(name, progress_callback=report):
+        raise RuntimeError("Backup failed")
+    return {"name": name}
+
+
+def run_restore(report, backup_name: str):
+    from system.backup.backup_manager import BackupManager
+    report(0, f"Stelle {backup_name} wieder her")
+    if not BackupManager().restore_backup(backup_name):
+        raise RuntimeError("Restore failed")
+    return {"name": backup_name}
+
+
+def run_update(report):
+    from system.update.system_updater import SystemUpdater
+    updater = SystemUpdater(UPDATE_CONFIG_DIR)
+    report(0, "Suche nach Updates...")
+    update_info = updater.check_for_updates()
+    if not update_info:
+        raise RuntimeError("No updates available")
+
+    # Download bis 90 %, Installation danach
+    report(0, f"Lade Version {update_info.version} herunter...")
+    if not updater.download_update(update_info,
+                                   progress_callback=lambda progress: report(progress * 0.9)):
+        raise RuntimeError("Update download failed")
+
+    report(90, "Installiere Update...")
+    if not updater.install_update(update_info):
+        raise RuntimeError("Update failed")
+    return {"version": update_info.version, "requires_restart": update_info.requires_restart}
@@ -1,10 +1,15 @@
-from fastapi import FastAPI, HTTPException, Depends, Security
+from fastapi import FastAPI, HTTPException, Depends, Security, WebSocket, WebSocketDisconnect, Request, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
+import asyncio
+import os
 import jwt
 from datetime import datetime, timedelta
 from pydantic import BaseModel
+from api.jobs import (JOB_CONFLICTS, JobRejected, JobRunner, UPDATE_CONFIG_DIR,
+                      run_backup, run_restore, run_update)
 
 app = FastAPI(title="InnovateOS API")
 
@@ -40,6 +45,16 @@ class PrinterStatus(BaseModel):
     temperature: dict
     progress: Optional[float]
 
+class BatchCommand(BaseModel):
+    command: str
+    # Auswahl der Drucker; ohne Angaben alle Drucker
+    tag: Optional[str] = None
+    state: Optional[str] = None
+    pool: Optional[str] = None
+    printer_ids: Optional[List[str]] = None
+    max_concurrency: int = 16
+    timeout: float = 10.0
+
 @app.post("/token")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     # TODO: Implementiere echte Benutzerauthentifizierung
@@ -60,7 +75,7 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def verify_token(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -70,122 +85,286 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except jwt.JWTError:
         raise HTTPException(status_code=401)
 
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    return verify_token(token)
+
 # System-Endpunkte
 @app.get("/system/status", response_model=SystemStatus)
-async def get_system_status(_: str = Depends(get_current_user)):
-    from system.monitoring.system_monitor import SystemMonitor
-    monitor = SystemMonitor()
-    metrics = monitor.metrics
+async def get_system_status(request: Request, response: Response,
+                            _: str = Depends(get_current_user)):
+    # Gemessen wird im Hintergrund; die Anfrage liest nur den letzten Snapshot
+    from system.monitoring.system_monitor import SystemSampler
+    sampler = SystemSampler.shared()
+    snapshot = sampler.snapshot()
+    headers = {
+        "ETag": f'"{snapshot.etag}"',
+        "Cache-Control": f"private, max-age={sampler.max_age(snapshot)}"
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return SystemStatus(
-        cpu_usage=metrics['cpu_percent'],
-        memory_usage=metrics['memory_percent'],
-        disk_usage=metrics['disk_percent'],
-        temperature=metrics.get('temperature'),
-        uptime=int(metrics['uptime'])
+        cpu_usage=snapshot.cpu_percent,
+        memory_usage=snapshot.memory_percent,
+        disk_usage=snapshot.disk_percent,
+        temperature=snapshot.temperature,
+        uptime=int(snapshot.uptime)
     )
 
+# Gleichzeitige Log-Streams; jeder hält eine Datei und einen inotify-Deskriptor
+MAX_LOG_FOLLOWERS = int(os.environ.get("INNOVATE_MAX_LOG_FOLLOWERS", "8"))
+_log_followers = 0
+
 @app.get("/system/logs")
 async def get_system_logs(
+    request: Request,
     log_type: str,
     lines: int = 100,
+    level: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    follow: bool = False,
     _: str = Depends(get_current_user)
 ):
-    import os
-    log_files = {
-        'system': '/var/log/innovate_init.log',
-        'network': '/var/log/innovate_network.log',
-        'update': '/var/log/innovate_update.log'
-    }
+    """Letzte Zeilen eines Logs; mit ``follow`` als Server-Sent-Events-Stream"""
+    from starlette.concurrency import run_in_threadpool
+    from system.monitoring.log_reader import LOG_FILES, LogFilter, tail, follow_async
     
-    if log_type not in log_files:
+    if log_type not in LOG_FILES:
         raise HTTPException(status_code=400, detail="Invalid log type")
-        
     try:
-        with open(log_files[log_type], 'r') as f:
-            return {'logs': f.readlines()[-lines:]}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        log_filter = LogFilter(level, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    path = LOG_FILES[log_type]
+    
+    if not follow:
+        try:
+            return {'logs': await run_in_threadpool(tail, path, lines, log_filter)}
+        except OSError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"{path} not found")
+    if _log_followers >= MAX_LOG_FOLLOWERS:
+        raise HTTPException(status_code=429, detail="Too many log streams")
+    
+    async def events():
+        # Läuft in der Event-Loop; beim Trennen schließt follow_async sofort.
+        # Gezählt wird erst hier, sonst bliebe ein nie gestarteter Stream belegt
+        global _log_followers
+        if _log_followers >= MAX_LOG_FOLLOWERS:
+            yield "event: error\ndata: Too many log streams\n\n"
+            return
+        _log_followers += 1
+        stream = follow_async(path, log_filter, backlog=lines)
+        try:
+            async for line in stream:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n" if line is None else f"data: {line}\n\n"
+        finally:
+            _log_followers -= 1
+            await stream.aclose()
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # Drucker-Endpunkte
+# Der Kernel läuft als eigener Dienst; Anfragen gehen über den IPC-Client
+IPC_ERROR_STATUS = {"not_found": 404, "bad_request": 400, "timeout": 504}
+
+async def kernel_call(method: str, *args, **kwargs):
+    from starlette.concurrency import run_in_threadpool
+    from kernel.core.ipc import get_client, KernelIPCError
+    client = get_client()
+    try:
+        return await run_in_threadpool(getattr(client, method), *args, **kwargs)
+    except KernelIPCError as e:
+        raise HTTPException(status_code=IPC_ERROR_STATUS.get(e.kind, 500), detail=str(e))
+    except OSError as e:
+        raise HTTPException(status_code=503, detail=f"Kernel not reachable: {e}")
+
 @app.get("/printers", response_model=List[PrinterStatus])
 async def get_printers(_: str = Depends(get_current_user)):
-    from kernel.core.kernel import InnovateKernel
-    kernel = InnovateKernel()
+    printers = await kernel_call("list_printers")
     return [
         PrinterStatus(
-            id=printer.id,
-            name=printer.name,
-            status=printer.status,
-            temperature=printer.temperature,
-            progress=printer.progress if printer.status == "printing" else None
+            id=printer["id"],
+            name=printer["name"],
+            status=printer["status"],
+            temperature=printer["temperature"],
+            progress=printer["progress"] if printer["status"] == "printing" else None
         )
-        for printer in kernel.devices.values()
+        for printer in printers
     ]
 
+# Live-Status: ein Kernel-Abruf pro Takt für alle verbundenen Dashboards
+STATUS_INTERVAL = float(os.environ.get("INNOVATE_STATUS_INTERVAL", "0.25"))
+STATUS_MAX_RATE = float(os.environ.get("INNOVATE_STATUS_MAX_RATE", "4"))
+_status_hub = None
+
+def get_status_hub():
+    global _status_hub
+    if _status_hub is None:
+        from kernel.core.status_hub import StatusHub
+        from starlette.concurrency import run_in_threadpool
+        from kernel.core.ipc import get_client
+
+        async def fetch():
+            return await run_in_threadpool(get_client().list_printers)
+
+        _status_hub = StatusHub(fetch, interval=STATUS_INTERVAL)
+    return _status_hub
+
+async def _serve_hub(websocket: WebSocket, token: str, hub, key: str, max_rate: float):
+    """Erst ein Snapshot des Hubs, danach nur geänderte Felder je Eintrag
+
+    Nachrichten: ``{"type": "snapshot", key: {id: status}}`` und
+    ``{"type": "update", key: {id: {feld: wert}}}``; ein entfernter Eintrag
+    kommt als ``id: null``. Browser können beim WebSocket keinen Header
+    setzen, das Token kommt deshalb als Query-Parameter.
+    """
+    try:
+        verify_token(token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    subscription = hub.subscribe(
+        max_rate=min(max_rate, STATUS_MAX_RATE) if max_rate > 0 else STATUS_MAX_RATE
+    )
+
+    async def watch_disconnect():
+        # Ohne Lesen fiele ein getrennter Client erst beim nächsten Senden auf
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            subscription.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        snapshot = await subscription.snapshot()
+        if snapshot is None:
+            return
+        await websocket.send_json({"type": "snapshot", key: snapshot})
+        while True:
+            changes = await subscription.next()
+            if changes is None:
+                break
+            await websocket.send_json({"type": "update", key: changes})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.close()
+        watcher.cancel()
+
+@app.websocket("/ws/printers")
+async def printer_status_socket(websocket: WebSocket, token: str = "",
+                                max_rate: float = STATUS_MAX_RATE):
+    """Status aller Drucker über ``_serve_hub`` unter dem Schlüssel ``printers``"""
+    await _serve_hub(websocket, token, get_status_hub(), "printers", max_rate)
+
 @app.post("/printers/{printer_id}/command")
 async def send_printer_command(
     printer_id: str,
     command: str,
     _: str = Depends(get_current_user)
 ):
-    from kernel.core.kernel import InnovateKernel
-    kernel = InnovateKernel()
-    printer = kernel.get_device(printer_id)
-    if not printer:
-        raise HTTPException(status_code=404, detail="Printer not found")
-    
+    result = await kernel_call("send_command", printer_id, command)
+    return {"status": "success", "result": result}
+
+@app.post("/printers/command")
+async def send_batch_command(
+    batch: BatchCommand,
+    _: str = Depends(get_current_user)
+):
+    from kernel.core.ipc import MAX_BROADCAST_CONCURRENCY, MAX_COMMAND_TIMEOUT
+    results = await kernel_call(
+        "broadcast_command", batch.command,
+        max_concurrency=max(1, min(batch.max_concurrency, MAX_BROADCAST_CONCURRENCY)),
+        timeout=max(0.1, min(batch.timeout, MAX_COMMAND_TIMEOUT)),
+        tag=batch.tag, state=batch.state, pool=batch.pool, printer_ids=batch.printer_ids
+    )
+    return {"status": "success", "results": results}
+
+# Hintergrundjobs: Backups und Updates blockieren sonst die Event-Loop
+JOB_WORKERS = int(os.environ.get("INNOVATE_JOB_WORKERS", "2"))
+_job_runner = None
+_job_hub = None
+
+def get_job_runner():
+    global _job_runner
+    if _job_runner is None:
+        _job_runner = JobRunner(workers=JOB_WORKERS)
+    return _job_runner
+
+def get_job_hub():
+    global _job_hub
+    if _job_hub is None:
+        from kernel.core.status_hub import StatusHub
+
+        async def fetch():
+            return get_job_runner().list()
+
+        _job_hub = StatusHub(fetch, interval=0.5)
+    return _job_hub
+
+def submit_job(kind: str, fn, *args, **kwargs) -> JSONResponse:
+    """Startet einen Job; 202 mit Job-ID, 409 falls ein kollidierender Job läuft"""
     try:
-        result = printer.send_command(command)
-        return {"status": "success", "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        job = get_job_runner().submit(kind, fn, *args,
+                                      conflicts=JOB_CONFLICTS.get(kind, (kind,)), **kwargs)
+    except JobRejected as e:
+        if e.job is not None:
+            raise HTTPException(status_code=409, detail={"message": str(e), "job_id": e.job.id})
+        raise HTTPException(status_code=429, detail=str(e))
+    return JSONResponse(status_code=202, content={"job_id": job.id, "status_url": f"/jobs/{job.id}"})
+
+@app.get("/jobs")
+async def list_jobs(_: str = Depends(get_current_user)):
+    return get_job_runner().list()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, _: str = Depends(get_current_user)):
+    job = get_job_runner().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.websocket("/ws/jobs")
+async def job_status_socket(websocket: WebSocket, token: str = ""):
+    """Wie ``/ws/printers``, aber für Jobs unter dem Schlüssel ``jobs``"""
+    await _serve_hub(websocket, token, get_job_hub(), "jobs", STATUS_MAX_RATE)
 
 # Backup-Endpunkte
-@app.post("/backup/create")
+@app.post("/backup/create", status_code=202)
 async def create_backup(
     name: Optional[str] = None,
     _: str = Depends(get_current_user)
 ):
-    from system.backup.backup_manager import BackupManager
-    manager = BackupManager()
-    success = manager.create_backup(name)
-    if success:
-        return {"status": "success", "name": name}
-    raise HTTPException(status_code=500, detail="Backup failed")
-
-@app.post("/backup/restore/{backup_name}")
+    # Name schon hier festlegen, damit er im Job-Ergebnis steht
+    name = name or datetime.now().strftime("%Y%m%d_%H%M%S")
+    return submit_job("backup", run_backup, name)
+
+@app.post("/backup/restore/{backup_name}", status_code=202)
 async def restore_backup(
     backup_name: str,
     _: str = Depends(get_current_user)
 ):
-    from system.backup.backup_manager import BackupManager
-    manager = BackupManager()
-    success = manager.restore_backup(backup_name)
-    if success:
-        return {"status": "success"}
-    raise HTTPException(status_code=500, detail="Restore failed")
+    return submit_job("restore", run_restore, backup_name)
 
 # Update-Endpunkte
 @app.get("/updates/check")
 async def check_updates(_: str = Depends(get_current_user)):
+    from starlette.concurrency import run_in_threadpool
     from system.update.system_updater import SystemUpdater
-    updater = SystemUpdater()
-    update_info = updater.check_for_updates()
+    updater = SystemUpdater(UPDATE_CONFIG_DIR)
+    update_info = await run_in_threadpool(updater.check_for_updates)
     return {"updates_available": bool(update_info), "info": update_info}
 
-@app.post("/updates/apply")
+@app.post("/updates/apply", status_code=202)
 async def apply_update(_: str = Depends(get_current_user)):
-    from system.update.system_updater import SystemUpdater
-    updater = SystemUpdater()
-    update_info = updater.check_for_updates()
-    if not update_info:
-        raise HTTPException(status_code=404, detail="No updates available")
-        
-    package_path = updater.download_update(update_info)
-    if not package_path:
-        raise HTTPException(status_code=500, detail="Update download failed")
-        
-    success = updater.apply_update(package_path)
-    if success:
-        return {"status": "success"}
-    raise HTTPException(status_code=500, detail="Update failed")
+    return submit_job("update", run_update)
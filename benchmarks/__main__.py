@@ -0,0 +1,84 @@
+"""Benchmark-Suite von InnovateOS.
+
+Führt alle Benchmarks gegen simulierte Drucker aus und schreibt einen
+JSON-Bericht. Mit ``--baseline`` wird gegen den Bericht einer früheren
+Version verglichen; verschlechtert sich eine Kennzahl um mehr als
+``--tolerance``, endet der Lauf mit Exit-Code 1.
+
+    python -m benchmarks --quick -o build/bench.json
+    python -m benchmarks -o bench-1.3.json --baseline bench-1.2.json
+    python -m benchmarks --only streaming,parse
+"""
+import argparse
+import json
+import sys
+
+from benchmarks import bench_api_latency, bench_parse, bench_scheduler, bench_streaming
+from benchmarks import bench_thermal_runaway
+from benchmarks.common import compare, log, report, write_report
+
+# Parameter je Profil; "quick" ist für CI gedacht, "full" für Release-Messungen
+PROFILES = {
+    'quick': {
+        'streaming': dict(printers=2, lines=2000),
+        'scheduler': dict(printers=20, jobs=2000),
+        'scheduler_store': dict(printers=20, jobs=2000, store=True),
+        'parse': dict(sizes=(10_000, 100_000)),
+        'api_latency': dict(printers=2, requests=200),
+        'thermal_runaway': dict(printers=100, duration=60.0),
+    },
+    'full': {
+        'streaming': dict(printers=10, lines=10000),
+        'scheduler': dict(printers=100, jobs=20000),
+        'scheduler_store': dict(printers=100, jobs=20000, store=True),
+        'parse': dict(sizes=(10_000, 100_000, 1_000_000, 10_000_000)),
+        'api_latency': dict(printers=8, requests=2000),
+        'thermal_runaway': dict(printers=100, duration=600.0),
+    },
+}
+
+BENCHMARKS = {
+    'streaming': bench_streaming.run,
+    'scheduler': bench_scheduler.run,
+    'scheduler_store': bench_scheduler.run,
+    'parse': bench_parse.run,
+    'api_latency': bench_api_latency.run,
+    'thermal_runaway': bench_thermal_runaway.run,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help="kleine Messungen, z.B. für CI")
+    parser.add_argument('--only', default=None, help="Benchmarks, durch Komma getrennt")
+    parser.add_argument('--output', '-o', default="-", help="JSON-Datei (Standard: stdout)")
+    parser.add_argument('--baseline', default=None, help="früherer Bericht zum Vergleich")
+    parser.add_argument('--tolerance', type=float, default=0.20,
+                        help="erlaubte Verschlechterung (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    profile = PROFILES['quick' if args.quick else 'full']
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unbekannte Benchmarks: {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        log(f"== {name}")
+        results[name] = BENCHMARKS[name](**profile[name])
+    data = report(results)
+    data['profile'] = 'quick' if args.quick else 'full'
+    write_report(data, args.output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(data, json.load(f), args.tolerance)
+        for line in regressions:
+            log(f"Regression: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Benchmark der Befehlslatenz von der REST-API bis zum Drucker.
+
+Baut die Kette wie im Betrieb auf: ``api/main.py`` -> ``KernelClient`` ->
+Unix-Socket -> ``KernelIPCServer`` -> ``PrinterDevice`` -> virtueller
+Drucker. Gemessen wird jede Stufe einzeln (seriell, IPC, HTTP), sodass
+sich ablesen lässt, wo Latenz hinzukommt.
+
+    python -m benchmarks.bench_api_latency --printers 4 --requests 500
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.common import emit, log, percentiles
+from kernel.core.ipc import SOCKET_ENV, KernelClient, KernelIPCServer
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.hal.async_transport import SyncSerialFacade, TransportLoop
+from kernel.sim.virtual_printer import VirtualPrinterFarm
+
+
+class _FarmKernel:
+    """Nur die Teile des Kernels, die der IPC-Server für Abfragen braucht"""
+
+    def __init__(self, devices: List[PrinterDevice]):
+        self.devices = {device.id: device for device in devices}
+
+    def get_device(self, device_id: str) -> Optional[PrinterDevice]:
+        return self.devices.get(device_id)
+
+
+def _measure(call: Callable[[int], object], requests: int) -> Dict:
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        call(i)
+        samples.append(time.perf_counter() - started)
+    result = percentiles(samples)
+    result['requests_per_second'] = requests / sum(samples)
+    return result
+
+
+def _concurrent(call: Callable[[int], object], requests: int, clients: int) -> Dict:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(call, range(requests)))
+    return {'clients': clients, 'requests_per_second': requests / (time.perf_counter() - started)}
+
+
+def _api_client(socket: Path):
+    """TestClient für ``api.main`` ohne Anmeldung; None, wenn die API nicht importierbar ist"""
+    os.environ[SOCKET_ENV] = str(socket)
+    try:
+        from fastapi.testclient import TestClient
+        import api.main as api
+    except ImportError as e:
+        return None, str(e)
+    api.app.dependency_overrides[api.get_current_user] = lambda: "benchmark"
+    return TestClient(api.app), None
+
+
+def run(printers: int = 4, requests: int = 500, clients: int = 8,
+        baudrate: int = 250000) -> Dict:
+    transport_loop = TransportLoop()
+    farm = VirtualPrinterFarm(printers, baudrate=baudrate)
+    results: Dict[str, Dict] = {}
+    tmp = tempfile.TemporaryDirectory()
+    server = None
+    client = None
+    try:
+        farm.start()
+        devices = []
+        for i, port in enumerate(farm.ports):
+            device = PrinterDevice(f"virtual-{i}", port, checkpoint_dir=None)
+            device.connection = SyncSerialFacade.open(port, baudrate, timeout=1,
+                                                      transport_loop=transport_loop)
+            device.state = PrinterState.IDLE
+            devices.append(device)
+        ids = [device.id for device in devices]
+        # Jeder Drucker darf nur eine Anfrage gleichzeitig bearbeiten
+        locks = {device.id: threading.Lock() for device in devices}
+
+        def serial_call(i: int):
+            device = devices[i % printers]
+            with locks[device.id]:
+                return device.send_command("M105")
+
+        log("Latenz: seriell")
+        results['serial_m105'] = _measure(serial_call, requests)
+
+        socket = Path(tmp.name) / "kernel.sock"
+        server = KernelIPCServer(_FarmKernel(devices), socket)
+        server.start()
+        client = KernelClient(socket, pool_size=clients)
+        log("Latenz: IPC")
+        results['ipc_ping'] = _measure(lambda i: client.ping(), requests)
+        results['ipc_get_printer'] = _measure(lambda i: client.get_printer(ids[i % printers]),
+                                              requests)
+        results['ipc_m105'] = _measure(lambda i: client.send_command(ids[i % printers], "M105"),
+                                       requests)
+        results['ipc_get_printer_concurrent'] = _concurrent(
+            lambda i: client.get_printer(ids[i % printers]), requests, clients)
+
+        http, error = _api_client(socket)
+        if http is None:
+            results['api'] = {'skipped': f"api.main nicht importierbar: {error}"}
+        else:
+            log("Latenz: HTTP")
+            with http:
+                results['api_list_printers'] = _measure(
+                    lambda i: http.get("/printers").raise_for_status(), requests)
+                results['api_m105'] = _measure(
+                    lambda i: http.post(f"/printers/{ids[i % printers]}/command",
+                                        params={'command': "M105"}).raise_for_status(),
+                    requests)
+    finally:
+        if client:
+            client.close()
+        if server:
+            server.stop()
+        farm.stop()
+        transport_loop.stop()
+        tmp.cleanup()
+
+    results['printers'] = printers
+    results['requests'] = requests
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--printers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=500, help="Anfragen pro Messung")
+    parser.add_argument('--clients', type=int, default=8, help="parallele IPC-Clients")
+    parser.add_argument('--baudrate', type=int, default=250000)
+    parser.add_argument('--output', '-o', default="-", help="JSON-Datei (Standard: stdout)")
+    args = parser.parse_args()
+
+    emit('api_latency', run(args.printers, args.requests, args.clients, args.baudrate),
+         args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark des G-Code-Parsings für Dateien von 10k bis 10M Zeilen.
+
+Misst pro Dateigröße den mmap-Reader, das Kompilieren in den G-Code-Cache,
+das Lesen der kompilierten Datei, die Druckzeitschätzung und das
+Arc-Fitting (inkl. eingesparter Zeilen).
+
+    python -m benchmarks.bench_parse --sizes 10000,100000,1000000,10000000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+from benchmarks.common import emit, log, write_gcode
+from kernel.gcode.arc_fitter import ArcFitter
+from kernel.gcode.compiler import CompiledGCode, compile_gcode
+from kernel.gcode.estimator import PrintTimeEstimator
+from kernel.gcode.reader import GCodeFileReader
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def _timed(function: Callable[[], object], repeat: int):
+    """Bestes Ergebnis aus ``repeat`` Läufen, gegen Störungen durch andere Prozesse"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def _read(path: Path) -> int:
+    count = 0
+    with GCodeFileReader(str(path)) as reader:
+        for _ in reader:
+            count += 1
+    return count
+
+
+def _read_compiled(path: Path) -> int:
+    count = 0
+    with CompiledGCode(str(path)) as compiled:
+        for _ in compiled.commands():
+            count += 1
+    return count
+
+
+def run_size(lines: int, directory: Path, repeat: int = 3) -> Dict:
+    source = directory / f"bench-{lines}.gcode"
+    target = directory / f"bench-{lines}.igc"
+    size = write_gcode(source, lines)
+    estimator = PrintTimeEstimator(cache_dir=directory / "estimates")
+
+    commands, read_time = _timed(lambda: _read(source), repeat)
+    _, compile_time = _timed(lambda: compile_gcode(str(source), str(target)), repeat)
+    compiled, compiled_time = _timed(lambda: _read_compiled(target), repeat)
+    estimate, estimate_time = _timed(lambda: estimator.scan(str(source)), repeat)
+    arcs_file = directory / f"bench-{lines}.arcs.gcode"
+    (_, arc_lines), arc_time = _timed(
+        lambda: ArcFitter(cache_dir=None).process(str(source), str(arcs_file)), repeat)
+    megabytes = size / 1e6
+
+    for path in (source, target, arcs_file):
+        path.unlink()
+    return {
+        'lines': lines,
+        'commands': commands,
+        'megabytes': megabytes,
+        'read_lines_per_second': lines / read_time,
+        'read_mb_per_second': megabytes / read_time,
+        'compile_lines_per_second': lines / compile_time,
+        'compiled_read_lines_per_second': compiled / compiled_time,
+        'estimate_lines_per_second': lines / estimate_time,
+        'estimated_print_seconds': estimate.print_time,
+        'arc_fit_lines_per_second': lines / arc_time,
+        'arc_fit_lines': arc_lines,
+    }
+
+
+def run(sizes: Iterable[int] = DEFAULT_SIZES, directory: Optional[str] = None,
+        repeat: int = 3) -> Dict:
+    results = {}
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        for lines in sizes:
+            log(f"Parsing: {lines:,} Zeilen")
+            results[str(lines)] = run_size(lines, Path(tmp), repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Zeilenzahlen, durch Komma getrennt")
+    parser.add_argument('--dir', default=None, help="Verzeichnis für die Testdateien")
+    parser.add_argument('--repeat', type=int, default=3, help="Läufe pro Messung (bester zählt)")
+    parser.add_argument('--output', '-o', default="-", help="JSON-Datei (Standard: stdout)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    emit('parse', run(sizes, args.dir, args.repeat), args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark des PrintSchedulers: Jobs pro Sekunde.
+
+Misst das Einreihen (feste Drucker und Pool-Platzierung) sowie den
+Durchsatz des Dispatchers, wenn jeder Druck sofort fertig meldet. Mit
+``--store`` wird die Queue wie im Kernel in SQLite gespiegelt.
+
+    python -m benchmarks.bench_scheduler --printers 100 --jobs 20000 --store
+"""
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from benchmarks.common import emit, log, write_gcode
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.scheduler.job_store import JobStore
+from kernel.scheduler.print_scheduler import PrintScheduler
+
+MATERIALS = ("PLA", "PETG", "ABS")
+
+
+class _InstantScheduler(PrintScheduler):
+    """Beendet jeden gestarteten Druck sofort, damit nur der Scheduler zählt"""
+
+    def __init__(self, store: Optional[JobStore], expected: int):
+        super().__init__(store=store)
+        self.expected = expected
+        self.finished = 0
+        self.done = threading.Event()
+
+    def _start_print_job(self, job):
+        super()._start_print_job(job)
+        device = self.devices.get(job.device_id)
+        if device is not None:
+            device.finish_print()
+        self.complete_job(job.device_id)
+        self.finished += 1
+        if self.finished >= self.expected:
+            self.done.set()
+
+
+def _devices(count: int):
+    devices = []
+    for i in range(count):
+        device = PrinterDevice(f"printer-{i}", f"/dev/null{i}", pool="farm",
+                               material=MATERIALS[i % len(MATERIALS)], checkpoint_dir=None)
+        device.state = PrinterState.IDLE
+        devices.append(device)
+    return devices
+
+
+def run(printers: int = 50, jobs: int = 5000, store: bool = False, repeat: int = 3) -> Dict:
+    """Bestes Ergebnis je Kennzahl aus ``repeat`` Läufen"""
+    best: Dict = {}
+    for _ in range(repeat):
+        result = run_once(printers, jobs, store)
+        for key, value in result.items():
+            if key.endswith("_per_second"):
+                value = max(value, best.get(key, value))
+            elif key == 'completed':
+                value = value and best.get(key, True)
+            best[key] = value
+    return best
+
+
+def run_once(printers: int, jobs: int, store: bool) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        gcode_file = Path(tmp) / "job.gcode"
+        write_gcode(gcode_file, 100)
+        job_store = JobStore(Path(tmp) / "jobs.db") if store else None
+        scheduler = _InstantScheduler(job_store, jobs)
+        devices = _devices(printers)
+        for device in devices:
+            scheduler.register_device(device)
+
+        # Einreihen ohne laufenden Dispatcher
+        started = time.perf_counter()
+        for i in range(jobs):
+            scheduler.add_job(devices[i % printers].id, str(gcode_file))
+        enqueue_direct = time.perf_counter() - started
+
+        # Dispatcher: alle Jobs starten und abschließen
+        started = time.perf_counter()
+        scheduler.start()
+        completed = scheduler.done.wait(timeout=max(60.0, jobs / 100))
+        dispatch = time.perf_counter() - started
+        finished = scheduler.finished
+
+        # Pool-Platzierung bei laufendem Dispatcher, bis alles verteilt ist
+        scheduler.expected += jobs
+        scheduler.done.clear()
+        started = time.perf_counter()
+        for i in range(jobs):
+            scheduler.add_job(None, str(gcode_file), pool="farm")
+        enqueue_pool = time.perf_counter() - started
+        pool_completed = scheduler.done.wait(timeout=max(60.0, jobs / 100))
+        pool_total = time.perf_counter() - started
+        scheduler.stop()
+        if job_store:
+            job_store.close()
+
+    return {
+        'printers': printers,
+        'jobs': jobs,
+        'store': store,
+        'completed': completed and pool_completed,
+        'enqueue_jobs_per_second': jobs / enqueue_direct,
+        'dispatch_jobs_per_second': finished / dispatch,
+        'pool_enqueue_jobs_per_second': jobs / enqueue_pool,
+        'pool_jobs_per_second': (scheduler.finished - finished) / pool_total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--printers', type=int, default=50)
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--store', action='store_true', help="Queue in SQLite spiegeln")
+    parser.add_argument('--repeat', type=int, default=3, help="Läufe (bester zählt)")
+    parser.add_argument('--output', '-o', default="-", help="JSON-Datei (Standard: stdout)")
+    args = parser.parse_args()
+
+    log(f"Scheduler: {args.jobs} Jobs auf {args.printers} Druckern")
+    result = run(args.printers, args.jobs, args.store, args.repeat)
+    emit('scheduler', result, args.output)
+    raise SystemExit(0 if result['completed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
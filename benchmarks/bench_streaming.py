@@ -0,0 +1,100 @@
+"""Benchmark des G-Code-Streamings über den HAL gegen simulierte Drucker.
+
+Streamt synthetischen G-Code parallel an eine Farm virtueller Marlin-Drucker
+und misst Zeilen pro Sekunde, Planer-Starvation, Resends und RX-Überläufe.
+
+    python -m benchmarks.bench_streaming --printers 10 --lines 5000 --baudrate 250000
+"""
+import argparse
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks.common import emit, log, synthetic_gcode
+from kernel.hal.async_transport import SyncSerialFacade, TransportLoop
+from kernel.hal.hardware import HardwareAbstractionLayer
+from kernel.sim.virtual_printer import VirtualPrinterFarm
+
+
+def run(printers: int = 4, lines: int = 5000, baudrate: int = 250000,
+        time_scale: float = 0.05, resend_rate: float = 0.0,
+        rx_buffer_size: int = 128, seed: int = 1) -> Dict:
+    commands = list(synthetic_gcode(lines))
+    transport_loop = TransportLoop()
+    hal = HardwareAbstractionLayer(transport_loop=transport_loop)
+    farm = VirtualPrinterFarm(printers, baudrate=baudrate, time_scale=time_scale,
+                              resend_rate=resend_rate, rx_buffer_size=rx_buffer_size,
+                              seed=seed)
+    durations: List[float] = []
+    failures: List[str] = []
+    lock = threading.Lock()
+
+    def stream(port: str):
+        started = time.perf_counter()
+        ok = hal.stream_gcode(port, commands)
+        elapsed = time.perf_counter() - started
+        with lock:
+            durations.append(elapsed)
+            if not ok:
+                failures.append(port)
+
+    try:
+        farm.start()
+        for port in farm.ports:
+            hal.printer_configs[port] = {'baudrate': baudrate, 'rx_buffer_size': rx_buffer_size}
+            hal.connected_ports[port] = SyncSerialFacade.open(
+                port, baudrate, timeout=1, transport_loop=transport_loop)
+
+        threads = [threading.Thread(target=stream, args=(port,)) for port in farm.ports]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        stats = farm.stats()
+    finally:
+        hal.cleanup()
+        farm.stop()
+        transport_loop.stop()
+
+    total = len(commands) * printers
+    # Obergrenze der Leitung: mittlere Zeilenlänge inkl. N und Prüfsumme
+    line_bytes = sum(len(c) for c in commands) / len(commands) + 10
+    return {
+        'printers': printers,
+        'lines': len(commands),
+        'baudrate': baudrate,
+        'time_scale': time_scale,
+        'resend_rate': resend_rate,
+        'seconds': wall,
+        'lines_per_second': total / wall,
+        'printer_lines_per_second': len(commands) / (sum(durations) / len(durations)),
+        'wire_limit_lines': baudrate / 10.0 / line_bytes,
+        'failed_printers': len(failures),
+        'starvation_events': stats['starvation_events'],
+        'resends_requested': stats['resends_requested'],
+        'rx_overflows': stats['rx_overflows'],
+        'max_rx_used': stats['max_rx_used'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--printers', type=int, default=4)
+    parser.add_argument('--lines', type=int, default=5000, help="Zeilen pro Drucker")
+    parser.add_argument('--baudrate', type=int, default=250000)
+    parser.add_argument('--time-scale', type=float, default=0.05,
+                        help="Bewegungszeit der Simulation (1 = Echtzeit, 0 = sofort)")
+    parser.add_argument('--resend-rate', type=float, default=0.0)
+    parser.add_argument('--output', '-o', default="-", help="JSON-Datei (Standard: stdout)")
+    args = parser.parse_args()
+
+    log(f"Streaming: {args.printers} Drucker x {args.lines} Zeilen @ {args.baudrate} Baud")
+    result = run(args.printers, args.lines, args.baudrate, args.time_scale, args.resend_rate)
+    emit('streaming', result, args.output)
+    raise SystemExit(1 if result['failed_printers'] or result['rx_overflows'] else 0)
+
+
+if __name__ == '__main__':
+    main()
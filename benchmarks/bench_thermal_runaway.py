@@ -0,0 +1,91 @@
+"""Benchmark des Thermal-Runaway-Schutzes.
+
+Simuliert eine Druckerfarm, deren Firmware Temperaturen per Auto-Report
+liefert, und misst, ob die Prüfung auf einem Kern mithält.
+
+    python -m benchmarks.bench_thermal_runaway --printers 100 --rate 4
+"""
+import argparse
+import math
+import time
+from typing import Dict
+
+from benchmarks.common import emit
+from kernel.devices.printer_device import PrinterDevice
+from kernel.safety.thermal_runaway import ThermalRunawayDetector
+
+
+def simulate(printers: int, rate: float, duration: float, full_path: bool) -> dict:
+    detector = ThermalRunawayDetector(on_runaway=lambda device, heater, reason: None)
+    devices = [PrinterDevice(f"printer-{i}", f"/dev/null{i}") for i in range(printers)]
+    for device in devices:
+        device.set_temperature(210.0, 60.0)
+        detector.watch(device)
+
+    steps = int(duration * rate)
+    elapsed = 0.0
+    for step in range(steps):
+        now = step / rate
+        # Aufheizen, danach leichtes Rauschen um das Ziel
+        hotend = min(210.0, 25.0 + 3.0 * now) + 0.5 * math.sin(now)
+        bed = min(60.0, 25.0 + 0.5 * now) + 0.2 * math.cos(now)
+        started = time.perf_counter()
+        if full_path:
+            # Wie im Betrieb: Verlauf schreiben und Listener aufrufen
+            for device in devices:
+                device.update_temperature(hotend, bed)
+        else:
+            for device in devices:
+                temperature = device.temperature
+                temperature.hotend = hotend
+                temperature.bed = bed
+                detector.check(device, now)
+        elapsed += time.perf_counter() - started
+
+    samples = steps * printers
+    throughput = samples / elapsed
+    return {
+        'samples': samples,
+        'seconds': elapsed,
+        'samples_per_second': throughput,
+        'us_per_sample': elapsed / samples * 1e6,
+        # Anteil eines Kerns bei Echtzeitbetrieb
+        'cpu_share': printers * rate / throughput,
+        'tripped': len(detector.tripped),
+    }
+
+
+def run(printers: int = 100, rate: float = 4.0, duration: float = 600.0) -> Dict:
+    return {
+        'printers': printers,
+        'rate': rate,
+        'detector': simulate(printers, rate, duration, full_path=False),
+        'update_temperature': simulate(printers, rate, duration, full_path=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--printers', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=4.0, help="Messwerte pro Sekunde und Drucker")
+    parser.add_argument('--duration', type=float, default=600.0, help="simulierte Sekunden")
+    parser.add_argument('--output', '-o', default=None, help="zusätzlich als JSON ausgeben")
+    args = parser.parse_args()
+
+    required = args.printers * args.rate
+    results = run(args.printers, args.rate, args.duration)
+    ok = True
+    for label, key in (("Detektor", 'detector'), ("update_temperature", 'update_temperature')):
+        result = results[key]
+        ok = ok and result['cpu_share'] < 1.0 and result['tripped'] == 0
+        print(f"{label:20s} {result['samples_per_second']:>12,.0f} Werte/s  "
+              f"{result['us_per_sample']:6.2f} µs/Wert  "
+              f"{result['cpu_share'] * 100:6.2f}% eines Kerns bei {required:,.0f} Werte/s  "
+              f"ausgelöst: {result['tripped']}")
+    if args.output:
+        emit('thermal_runaway', results, args.output)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
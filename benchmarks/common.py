@@ -0,0 +1,162 @@
+"""Gemeinsame Hilfen der Benchmarks: Messung, Umgebung und JSON-Bericht.
+
+Jeder Benchmark liefert ein Dict mit Kennzahlen. Die Namen legen fest, wie
+der Vergleich mit einer früheren Version wertet:
+
+- ``*_per_second``: Durchsatz, größer ist besser
+- ``*_ms`` und ``*_us``: Latenz, kleiner ist besser
+- alles andere (Zähler, Parameter) wird nur mitgeschrieben
+"""
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+REPORT_VERSION = 1
+
+
+def percentiles(samples: Sequence[float], scale: float = 1000.0,
+                suffix: str = "ms") -> Dict[str, float]:
+    """Mittelwert, p50, p95, p99 und Maximum einer Latenzreihe (Sekunden)"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+
+    def pick(fraction: float) -> float:
+        return ordered[min(last, int(round(fraction * last)))] * scale
+
+    return {
+        f"mean_{suffix}": sum(ordered) / len(ordered) * scale,
+        f"p50_{suffix}": pick(0.50),
+        f"p95_{suffix}": pick(0.95),
+        f"p99_{suffix}": pick(0.99),
+        f"max_{suffix}": ordered[-1] * scale,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> Dict:
+    """Rahmendaten, ohne die Messungen verschiedener Rechner nicht vergleichbar sind"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'revision': git_revision(),
+    }
+
+
+def report(results: Dict[str, Dict]) -> Dict:
+    return {
+        'version': REPORT_VERSION,
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'environment': environment(),
+        'results': results,
+    }
+
+
+def write_report(data: Dict, output: Optional[str]):
+    """Schreibt den Bericht als JSON in eine Datei oder auf stdout (``-``)"""
+    text = json.dumps(data, indent=2, sort_keys=True)
+    if not output or output == "-":
+        print(text)
+        return
+    path = Path(output)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text + "\n")
+
+
+def _flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    values = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = float(value)
+    return values
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.10) -> List[str]:
+    """Kennzahlen, die sich gegenüber ``baseline`` um mehr als ``tolerance`` verschlechtert haben"""
+    now = _flatten(current['results'])
+    before = _flatten(baseline['results'])
+    regressions = []
+    for name, old in sorted(before.items()):
+        new = now.get(name)
+        if new is None or old <= 0:
+            continue
+        if name.endswith("_per_second"):
+            change = (old - new) / old
+        elif name.endswith(("_ms", "_us")):
+            change = (new - old) / old
+        else:
+            continue
+        if change > tolerance:
+            regressions.append(f"{name}: {old:,.3f} -> {new:,.3f} ({(new - old) / old * 100:+.1f}%)")
+    return regressions
+
+
+def emit(name: str, result: Dict, output: Optional[str]):
+    """Ausgabe eines einzelnen Benchmarks im selben Format wie die Suite"""
+    write_report(report({name: result}), output)
+
+
+def log(message: str):
+    # Fortschritt auf stderr, damit stdout reines JSON bleibt
+    print(message, file=sys.stderr, flush=True)
+
+
+def synthetic_gcode(lines: int, layer_height: float = 0.2,
+                    moves_per_layer: int = 2000) -> Iterator[str]:
+    """Slicer-ähnlicher G-Code: Layer aus kurzen Extrusionen auf Kreisbahnen"""
+    yield "G28"
+    yield "G90"
+    yield "M83"
+    emitted = 3
+    layer = 0
+    while emitted < lines:
+        z = (layer + 1) * layer_height
+        yield f";LAYER:{layer}"
+        yield f"G1 Z{z:.2f} F600"
+        emitted += 2
+        for step in range(moves_per_layer):
+            if emitted >= lines:
+                return
+            angle = step * 0.05
+            radius = 40.0 + 10.0 * math.sin(step * 0.01)
+            yield (f"G1 X{110 + radius * math.cos(angle):.3f} "
+                   f"Y{110 + radius * math.sin(angle):.3f} E0.04157 F2400")
+            emitted += 1
+        layer += 1
+
+
+def write_gcode(path: Path, lines: int) -> int:
+    """Schreibt eine synthetische G-Code-Datei und gibt ihre Größe zurück"""
+    with open(path, 'w') as f:
+        batch = []
+        for line in synthetic_gcode(lines):
+            batch.append(line)
+            if len(batch) >= 10000:
+                f.write("\n".join(batch) + "\n")
+                batch = []
+        if batch:
+            f.write("\n".join(batch) + "\n")
+    return path.stat().st_size
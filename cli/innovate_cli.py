@@ -51,18 +51,32 @@ def status():
 @system.command()
 @click.argument('log_type', type=click.Choice(['system', 'network', 'update']))
 @click.option('--lines', '-n', default=10, help='Anzahl der Zeilen')
-def logs(log_type, lines):
+@click.option('--level', '-l', type=click.Choice(['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                                                 case_sensitive=False),
+              help='Nur Einträge ab diesem Level')
+@click.option('--since', type=click.DateTime(), help='Nur Einträge ab diesem Zeitpunkt')
+@click.option('--until', type=click.DateTime(), help='Nur Einträge bis zu diesem Zeitpunkt')
+@click.option('--follow', '-f', is_flag=True, help='Neue Zeilen laufend ausgeben')
+def logs(log_type, lines, level, since, until, follow):
     """Zeigt Systemlogs an"""
-    log_files = {
-        'system': '/var/log/innovate_init.log',
-        'network': '/var/log/innovate_network.log',
-        'update': '/var/log/innovate_update.log'
-    }
+    from system.monitoring.log_reader import LOG_FILES, LogFilter, tail, follow as follow_log
+    log_filter = LogFilter(level, since, until)
+    path = LOG_FILES[log_type]
     
-    with open(log_files[log_type], 'r') as f:
-        click.echo(f"\nLetzte {lines} Zeilen von {log_type}:")
-        for line in f.readlines()[-lines:]:
-            click.echo(line.strip())
+    try:
+        if not follow:
+            click.echo(f"\nLetzte {lines} Zeilen von {log_type}:")
+            for line in tail(path, lines, log_filter):
+                click.echo(line)
+            return
+        for line in follow_log(path, log_filter, backlog=lines):
+            if line is not None:
+                click.echo(line)
+    except OSError as e:
+        click.echo(f"Fehler: {e}", err=True)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
 
 # Drucker-Befehle
 @cli.group()
@@ -73,17 +87,21 @@ def printer():
 @printer.command()
 def list():
     """Listet alle Drucker auf"""
-    from kernel.core.kernel import InnovateKernel
-    kernel = InnovateKernel()
+    from kernel.core.ipc import get_client, KernelIPCError
+    try:
+        devices = get_client().list_printers()
+    except (KernelIPCError, OSError) as e:
+        click.echo(f"Fehler: Kernel nicht erreichbar ({e})", err=True)
+        sys.exit(1)
     
     printers = []
-    for device in kernel.devices.values():
+    for device in devices:
         printers.append([
-            device.id,
-            device.name,
-            device.status,
-            f"{device.temperature.hotend}°C",
-            f"{device.progress:.1f}%" if device.status == "printing" else "N/A"
+            device['id'],
+            device['name'],
+            device['status'],
+            f"{device['temperature']['hotend']}°C",
+            f"{device['progress']:.1f}%" if device['status'] == "printing" else "N/A"
         ])
     
     click.echo(tabulate(printers,
@@ -95,20 +113,16 @@ def list():
 @click.argument('command')
 def send(printer_id, command):
     """Sendet einen Befehl an einen Drucker"""
-    from kernel.core.kernel import InnovateKernel
-    kernel = InnovateKernel()
-    
-    printer = kernel.get_device(printer_id)
-    if not printer:
-        click.echo(f"Fehler: Drucker {printer_id} nicht gefunden", err=True)
-        sys.exit(1)
-        
+    from kernel.core.ipc import get_client, KernelIPCError
     try:
-        result = printer.send_command(command)
+        result = get_client().send_command(printer_id, command)
         click.echo(f"Befehl gesendet. Antwort: {result}")
-    except Exception as e:
+    except KernelIPCError as e:
         click.echo(f"Fehler: {e}", err=True)
         sys.exit(1)
+    except OSError as e:
+        click.echo(f"Fehler: Kernel nicht erreichbar ({e})", err=True)
+        sys.exit(1)
 
 # Plugin-Befehle
 @cli.group()
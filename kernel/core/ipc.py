@@ -0,0 +1,290 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from kernel.devices.selector import DeviceSelector
+
+SOCKET_PATH = Path("/run/innovate/kernel.sock")
+# Abweichender Socket, z.B. für Benchmarks und Testinstanzen
+SOCKET_ENV = "INNOVATE_KERNEL_SOCKET"
+DEFAULT_TIMEOUT = 10.0
+MAX_REQUEST_SIZE = 1024 * 1024
+# Obergrenzen für Broadcasts von API und CLI
+MAX_BROADCAST_CONCURRENCY = 32
+MAX_COMMAND_TIMEOUT = 60.0
+
+
+class KernelIPCError(Exception):
+    """Fehlerantwort des Kernel-Dienstes; ``kind`` ist z.B. not_found oder timeout"""
+
+    def __init__(self, message: str, kind: str = "error"):
+        super().__init__(message)
+        self.kind = kind
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Bedient eine Verbindung: eine JSON-Anfrage pro Zeile, eine Antwort pro Zeile"""
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline(MAX_REQUEST_SIZE)
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+                response = {"id": request.get("id"), "result": self.server.dispatch(
+                    request["method"], request.get("params") or {}
+                )}
+            except KernelIPCError as e:
+                response = {"id": request.get("id"), "error": {"kind": e.kind, "message": str(e)}}
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                response = {"id": None, "error": {"kind": "bad_request", "message": str(e)}}
+            except Exception as e:
+                # Verbindung offen halten, der Client soll nicht erneut senden
+                response = {"id": None, "error": {"kind": "error", "message": str(e)}}
+            try:
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+                self.wfile.flush()
+            except OSError:
+                return
+
+
+class KernelIPCServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Lokaler IPC-Endpunkt des Kernels (Unix-Socket, JSON-Lines).
+
+    API und CLI halten Verbindungen offen und schicken beliebig viele
+    Anfragen hintereinander; pro Anfrage fällt damit nur ein Socket-Roundtrip
+    an statt des Aufbaus eines eigenen Kernels.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, kernel, path: Path = SOCKET_PATH):
+        self.kernel = kernel
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            # Reste eines abgestürzten Kernels entfernen
+            self.path.unlink()
+        super().__init__(str(self.path), _RequestHandler)
+        os.chmod(self.path, 0o660)
+        self.thread: Optional[threading.Thread] = None
+        self.methods = {
+            'ping': lambda: "pong",
+            'list_printers': self._list_printers,
+            'get_printer': self._get_printer,
+            'send_command': self._send_command,
+            'broadcast_command': self._broadcast_command,
+            'schedule_print': self._schedule_print,
+            'queue_status': self._queue_status,
+        }
+
+    def start(self):
+        """Startet den Server in einem Hintergrund-Thread"""
+        self.thread = threading.Thread(target=self.serve_forever, name="KernelIPC", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def dispatch(self, method: str, params: Dict[str, Any]) -> Any:
+        handler = self.methods.get(method)
+        if handler is None:
+            raise KernelIPCError(f"Unbekannte Methode: {method}", "bad_request")
+        return handler(**params)
+
+    def _device(self, printer_id: str):
+        device = self.kernel.get_device(printer_id)
+        if device is None:
+            raise KernelIPCError(f"Drucker {printer_id} nicht gefunden", "not_found")
+        return device
+
+    def _list_printers(self) -> List[Dict]:
+        return [device.status_dict() for device in list(self.kernel.devices.values())]
+
+    def _get_printer(self, printer_id: str) -> Dict:
+        return self._device(printer_id).status_dict()
+
+    def _send_command(self, printer_id: str, command: str,
+                      timeout: float = DEFAULT_TIMEOUT) -> Optional[str]:
+        device = self._device(printer_id)
+        try:
+            return device.send_command(command, timeout=timeout)
+        except TimeoutError as e:
+            raise KernelIPCError(str(e), "timeout")
+        except (RuntimeError, OSError) as e:
+            raise KernelIPCError(str(e))
+
+    def _broadcast_command(self, command: str, tag: Optional[str] = None,
+                           state: Optional[str] = None, pool: Optional[str] = None,
+                           printer_ids: Optional[List[str]] = None,
+                           max_concurrency: int = 16,
+                           timeout: float = DEFAULT_TIMEOUT) -> Dict[str, Dict]:
+        selector = DeviceSelector.create(tag, state, pool, printer_ids)
+        # Werte vom Client begrenzen, bevor Threads oder Wartezeiten entstehen
+        max_concurrency = max(1, min(int(max_concurrency), MAX_BROADCAST_CONCURRENCY))
+        timeout = max(0.1, min(float(timeout), MAX_COMMAND_TIMEOUT))
+        return self.kernel.broadcast_command(selector, command, max_concurrency=max_concurrency,
+                                             timeout=timeout)
+
+    def _schedule_print(self, printer_id: str, gcode_file: str) -> bool:
+        try:
+            self.kernel.schedule_print(printer_id, gcode_file)
+        except ValueError as e:
+            raise KernelIPCError(str(e), "not_found")
+        return True
+
+    def _queue_status(self) -> List[Dict]:
+        return [{
+            'job_id': job.job_id,
+            'device_id': job.device_id,
+            'gcode_file': job.gcode_file,
+            'priority': job.priority,
+            'pool': job.pool,
+            'estimated_duration': job.estimated_duration,
+            'created_at': job.created_at.isoformat(),
+        } for job in self.kernel.scheduler.get_queue_status()]
+
+
+class KernelClient:
+    """Client für den Kernel-Dienst mit einem Pool offener Verbindungen.
+
+    Thread-sicher: jeder Aufruf leiht sich eine Verbindung aus dem Pool.
+    Bricht eine wiederverwendete Verbindung ab (z.B. Kernel-Neustart), wird
+    der Aufruf einmal über eine neue Verbindung wiederholt.
+    """
+
+    def __init__(self, path: Path = SOCKET_PATH, pool_size: int = 8,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.path = Path(path)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle: List[Tuple[socket.socket, Any]] = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def _connect(self) -> Tuple[socket.socket, Any]:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(self.path))
+        except OSError:
+            sock.close()
+            raise
+        return sock, sock.makefile('rb')
+
+    def _acquire(self) -> Tuple[int, Tuple[socket.socket, Any], bool]:
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            if self._idle:
+                return request_id, self._idle.pop(), True
+        return request_id, self._connect(), False
+
+    def _release(self, connection: Tuple[socket.socket, Any]):
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        self._close(connection)
+
+    @staticmethod
+    def _close(connection: Tuple[socket.socket, Any]):
+        sock, reader = connection
+        reader.close()
+        sock.close()
+
+    def call(self, method: str, params: Optional[Dict[str, Any]] = None,
+             timeout: Optional[float] = None) -> Any:
+        """Ruft eine Methode des Kernels auf und gibt das Ergebnis zurück"""
+        request_id, connection, reused = self._acquire()
+        payload = json.dumps({"id": request_id, "method": method, "params": params or {}}).encode() + b"\n"
+        while True:
+            sock, reader = connection
+            try:
+                sock.settimeout(timeout or self.timeout)
+                sock.sendall(payload)
+                line = reader.readline()
+                if not line:
+                    raise ConnectionError("Kernel hat die Verbindung geschlossen")
+                break
+            except ConnectionError:
+                self._close(connection)
+                if not reused:
+                    raise
+                # Veraltete Verbindung aus dem Pool: einmal neu verbinden
+                connection, reused = self._connect(), False
+            except OSError:
+                # Timeout: Antwort könnte noch kommen, Verbindung nicht wiederverwenden
+                self._close(connection)
+                raise
+
+        response = json.loads(line)
+        self._release(connection)
+        if "error" in response:
+            error = response["error"]
+            raise KernelIPCError(error.get("message", ""), error.get("kind", "error"))
+        return response.get("result")
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._close(connection)
+
+    # Komfortmethoden
+    def ping(self) -> bool:
+        return self.call('ping') == "pong"
+
+    def list_printers(self) -> List[Dict]:
+        return self.call('list_printers')
+
+    def get_printer(self, printer_id: str) -> Dict:
+        return self.call('get_printer', {'printer_id': printer_id})
+
+    def send_command(self, printer_id: str, command: str,
+                     timeout: float = DEFAULT_TIMEOUT) -> Optional[str]:
+        # Antwortzeit des Druckers plus Reserve für den Roundtrip
+        return self.call('send_command', {
+            'printer_id': printer_id, 'command': command, 'timeout': timeout
+        }, timeout=timeout + 5.0)
+
+    def broadcast_command(self, command: str, max_concurrency: int = 16,
+                          timeout: float = DEFAULT_TIMEOUT, **selector) -> Dict[str, Dict]:
+        """``selector``: tag, state, pool und/oder printer_ids"""
+        params = {'command': command, 'max_concurrency': max_concurrency, 'timeout': timeout}
+        params.update(selector)
+        # Bei mehr Druckern als Parallelität laufen mehrere Runden nacheinander
+        return self.call('broadcast_command', params, timeout=3600.0)
+
+    def schedule_print(self, printer_id: str, gcode_file: str) -> bool:
+        return self.call('schedule_print', {'printer_id': printer_id, 'gcode_file': gcode_file})
+
+    def queue_status(self) -> List[Dict]:
+        return self.call('queue_status')
+
+
+def socket_path() -> Path:
+    """Pfad des Kernel-Sockets, überschreibbar über ``INNOVATE_KERNEL_SOCKET``"""
+    return Path(os.environ.get(SOCKET_ENV) or SOCKET_PATH)
+
+
+_default_client: Optional[KernelClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> KernelClient:
+    """Gemeinsamer Client eines Prozesses (API-Server, CLI)"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = KernelClient(socket_path())
+        return _default_client
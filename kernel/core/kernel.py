@@ -1,18 +1,74 @@
 import os
 import sys
 import logging
-from typing import Dict, Optional
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.core.ipc import MAX_BROADCAST_CONCURRENCY, MAX_COMMAND_TIMEOUT
+from kernel.devices.selector import DeviceSelector
+from kernel.gcode.arc_fitter import ArcFitter
+from kernel.gcode.compiler import GCodeCache
+from kernel.gcode.estimator import PrintTimeEstimator
+from kernel.gcode.layer_index import LayerIndex
+from kernel.hal.async_transport import TransportLoop
+from kernel.hal.hardware import HardwareAbstractionLayer
+from kernel.scheduler.print_scheduler import PrintJob, PrintScheduler
+from kernel.scheduler.placement import JobConstraints
+from kernel.scheduler.job_store import JobStore
+from kernel.safety.thermal_runaway import ThermalRunawayDetector
+
+# Dateien, die gleichzeitig für den Druck vorbereitet werden
+PREPROCESS_WORKERS = 2
+# Befehle, die beim Broadcast die Drucksteuerung statt der Firmware erreichen
+PRINT_CONTROL = {
+    "PAUSE": "pause_print", "M25": "pause_print",
+    "RESUME": "resume_print", "M24": "resume_print",
+    "CANCEL": "cancel_print", "M524": "cancel_print",
+}
 
 class InnovateKernel:
+    _instance: Optional['InnovateKernel'] = None
+    _instance_lock = threading.Lock()
+    
+    @classmethod
+    def instance(cls) -> 'InnovateKernel':
+        """Der eine Kernel dieses Prozesses
+        
+        API und CLI laufen in eigenen Prozessen und sprechen den Kernel über
+        ``kernel.core.ipc.KernelClient`` an, statt einen eigenen zu erzeugen.
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+        
     def __init__(self):
         self.devices: Dict[str, 'PrinterDevice'] = {}
-        self.scheduler = PrintScheduler()
-        self.hal = HardwareAbstractionLayer()
+        self.scheduler = PrintScheduler(store=JobStore())
+        self.hal = HardwareAbstractionLayer(transport_loop=TransportLoop.get_default())
+        self.gcode_cache = GCodeCache()
         self.logger = self._setup_logging()
+        printer_config = self._load_printer_config()
+        self.estimator = PrintTimeEstimator.from_printer_config(printer_config)
+        self.thermal_guard: Optional[ThermalRunawayDetector] = None
+        if printer_config.get('safety', {}).get('thermal_runaway', True):
+            self.thermal_guard = ThermalRunawayDetector.from_printer_config(printer_config)
+        self.arc_fitter: Optional[ArcFitter] = None
+        if printer_config.get('arc_fitting', {}).get('enabled', False):
+            self.arc_fitter = ArcFitter.from_printer_config(printer_config)
+        # Kompilieren, Arc-Fitting und Schätzung laufen nicht im IPC-Thread
+        self.preprocessor = ThreadPoolExecutor(max_workers=PREPROCESS_WORKERS,
+                                               thread_name_prefix="Preprocess")
         
     def _setup_logging(self):
         logger = logging.getLogger('InnovateOS')
         logger.setLevel(logging.INFO)
+        if logger.handlers:
+            # Handler nur einmal pro Prozess anlegen, sonst erscheint jede Meldung mehrfach
+            return logger
         handler = logging.StreamHandler(sys.stdout)
         handler.setFormatter(logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -23,19 +79,166 @@ class InnovateKernel:
     def register_device(self, device: 'PrinterDevice'):
         """Registriert einen neuen Drucker im System"""
         self.devices[device.id] = device
+        self.scheduler.register_device(device)
+        if self.thermal_guard:
+            self.thermal_guard.watch(device)
+        if self.arc_fitter and self._supports_arcs(device):
+            device.arc_fitter = self.arc_fitter
         self.logger.info(f"Neuer Drucker registriert: {device.id}")
         
+    def register_detected_printers(self) -> List['PrinterDevice']:
+        """Verbindet und registriert alle beim Port-Scan erkannten Drucker
+        
+        Die ID ist die USB-Seriennummer (stabil über Neustarts und
+        Port-Wechsel), sonst der Name des Ports.
+        """
+        known_ports = {device.port for device in self.devices.values()}
+        registered = []
+        for port, info in self.hal.detected_ports.items():
+            if port in known_ports:
+                continue
+            device = PrinterDevice(info.usb_serial or os.path.basename(port), port)
+            if not device.connect(self.hal):
+                self.logger.warning(f"Drucker an {port} ({info.firmware}) nicht verbunden")
+                continue
+            self.register_device(device)
+            registered.append(device)
+        return registered
+        
+    def _supports_arcs(self, device: 'PrinterDevice') -> bool:
+        """G2/G3 nur an Firmware senden, die sie beim Scan gemeldet hat"""
+        capabilities = self.hal.printer_configs.get(device.port, {}).get('capabilities') or {}
+        return bool(capabilities.get('ARCS'))
+        
     def get_device(self, device_id: str) -> Optional['PrinterDevice']:
         """Gibt ein Drucker-Objekt zurück"""
         return self.devices.get(device_id)
         
-    def schedule_print(self, device_id: str, gcode_file: str):
-        """Plant einen Druckauftrag ein"""
+    def broadcast_command(self, selector: Optional[DeviceSelector], command: str,
+                          max_concurrency: int = 16, timeout: float = 10.0) -> Dict[str, Dict]:
+        """Sendet einen Befehl gleichzeitig an alle passenden Drucker
+        
+        Höchstens ``max_concurrency`` Drucker werden parallel angesprochen,
+        ``timeout`` gilt je Drucker; beide sind nach oben begrenzt. Das
+        Ergebnis enthält für jeden Drucker Status (success, timeout, error,
+        rejected), Antwort bzw. Fehler und Dauer.
+        
+        Während eines Drucks gehört die serielle Leitung dem Streamer: pause,
+        resume und cancel (auch M25, M24, M524) gehen an die Drucksteuerung,
+        andere Befehle werden für druckende Drucker abgelehnt.
+        """
+        selector = selector or DeviceSelector()
+        devices = selector.select(list(self.devices.values()))
+        if not devices:
+            return {}
+        max_concurrency = max(1, min(max_concurrency, MAX_BROADCAST_CONCURRENCY))
+        timeout = max(0.1, min(timeout, MAX_COMMAND_TIMEOUT))
+        control = PRINT_CONTROL.get(command.split(";")[0].strip().upper())
+        
+        def send(device: PrinterDevice) -> Dict:
+            started = time.monotonic()
+            try:
+                if control is not None:
+                    getattr(device, control)()
+                    result = {"status": "success", "result": device.state.value}
+                elif device.state == PrinterState.PRINTING:
+                    result = {"status": "rejected",
+                              "error": f"Drucker {device.id} druckt, nur pause, resume und cancel möglich"}
+                else:
+                    result = {"status": "success", "result": device.send_command(command, timeout=timeout)}
+            except TimeoutError as e:
+                result = {"status": "timeout", "error": str(e)}
+            except (RuntimeError, OSError) as e:
+                result = {"status": "error", "error": str(e)}
+            result["duration"] = round(time.monotonic() - started, 3)
+            return result
+        
+        results: Dict[str, Dict] = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(devices))),
+                                thread_name_prefix="Broadcast") as executor:
+            futures = {executor.submit(send, device): device.id for device in devices}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        failed = sum(1 for result in results.values() if result["status"] != "success")
+        self.logger.info(f"{command} an {len(results)} Drucker gesendet, {failed} fehlgeschlagen")
+        return results
+        
+    def schedule_print(self, device_id: str, gcode_file: str) -> PrintJob:
+        """Plant einen Druckauftrag ein; die Datei wird im Hintergrund vorbereitet"""
         device = self.get_device(device_id)
         if not device:
             raise ValueError(f"Drucker {device_id} nicht gefunden")
         
-        self.scheduler.add_job(device, gcode_file)
+        job = self.scheduler.add_job(device.id, gcode_file, ready=False)
+        self.preprocessor.submit(self._prepare_job, job, device.arc_fitter is not None)
+        return job
+        
+    def schedule_pool_print(self, gcode_file: str, pool: str = "default",
+                            constraints: Optional[JobConstraints] = None,
+                            priority: int = 1) -> PrintJob:
+        """Plant einen Druckauftrag auf dem passenden Drucker eines Pools ein"""
+        job = self.scheduler.add_job(None, gcode_file, priority=priority, pool=pool,
+                                     constraints=constraints, ready=False)
+        # Drucker ohne Bögen erkennen die fremde Fassung und streamen Text
+        self.preprocessor.submit(self._prepare_job, job, self.arc_fitter is not None)
+        return job
+        
+    def _prepare_job(self, job: PrintJob, fit_arcs: bool):
+        """Bereitet einen Job im Hintergrund vor und gibt ihn dann zum Drucken frei"""
+        compiled_file = None
+        estimated_duration = 0.0
+        try:
+            # Kompiliert wird die Fassung, die der Drucker tatsächlich streamt
+            source = self._fit_arcs(job.gcode_file) if fit_arcs else job.gcode_file
+            compiled_file = self._compile_gcode(source)
+            estimated_duration = self._estimate_duration(job.gcode_file)
+        finally:
+            # Auch nach unerwarteten Fehlern drucken statt ewig zu warten
+            self.scheduler.job_ready(job.job_id, compiled_file, estimated_duration)
+        
+    def _compile_gcode(self, gcode_file: str) -> Optional[str]:
+        """Kompiliert einmal und verwendet das Ergebnis für jeden Nachdruck"""
+        try:
+            compiled = self.gcode_cache.compile(gcode_file)
+            compiled.close()
+            return compiled.path
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"G-Code konnte nicht kompiliert werden: {e}")
+            return None
+        
+    def _fit_arcs(self, gcode_file: str) -> str:
+        """Erzeugt die Fassung mit Bögen und ihren Layer-Index vorab für den Druckstart
+        
+        Gibt den Pfad der Datei zurück, die der Drucker streamen wird.
+        """
+        try:
+            fitted = self.arc_fitter.fit(gcode_file)
+            LayerIndex.for_file(fitted, self.estimator)
+            return fitted
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Arc-Fitting fehlgeschlagen, Original wird gedruckt: {e}")
+            return gcode_file
+        
+    def _load_printer_config(self) -> Dict:
+        """Druckerkonfiguration (Schritte/mm, Sicherheitsgrenzen) des PrinterManagers"""
+        try:
+            from system.printer.printer_manager import PrinterManager
+            return PrinterManager.get_current_printer()
+        except (ImportError, OSError, ValueError) as e:
+            self.logger.warning(f"Druckerkonfiguration nicht verfügbar, nutze Standardwerte: {e}")
+            return {}
+        
+    def _estimate_duration(self, gcode_file: str) -> float:
+        """Geschätzte Druckdauer in Sekunden (0 = unbekannt)
+        
+        Derselbe Durchlauf legt den Layer-Index neben der Datei ab, den der
+        Drucker beim Start für Fortschritt und Restzeit lädt.
+        """
+        try:
+            return LayerIndex.for_file(gcode_file, self.estimator).total_time
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Druckzeit konnte nicht geschätzt werden: {e}")
+            return 0.0
         
     def start(self):
         """Startet den Kernel"""
@@ -46,7 +249,31 @@ class InnovateKernel:
     def shutdown(self):
         """Fährt den Kernel sicher herunter"""
         self.logger.info("InnovateOS wird heruntergefahren...")
+        self.preprocessor.shutdown(wait=False, cancel_futures=True)
         for device in self.devices.values():
             device.safe_shutdown()
         self.scheduler.stop()
         self.hal.cleanup()
+
+def main():
+    """Startet den Kernel als langlebigen Dienst mit IPC-Endpunkt"""
+    from kernel.core.ipc import KernelIPCServer, socket_path
+    
+    kernel = InnovateKernel.instance()
+    kernel.start()
+    printers = kernel.register_detected_printers()
+    kernel.logger.info(f"{len(printers)} Drucker beim Start registriert")
+    server = KernelIPCServer(kernel, socket_path())
+    server.start()
+    kernel.logger.info(f"IPC-Endpunkt bereit: {server.path}")
+    
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    stopped.wait()
+    
+    server.stop()
+    kernel.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+DEFAULT_INTERVAL = 0.25   # Sekunden zwischen zwei Abfragen des Kernels
+DEFAULT_MAX_RATE = 4.0    # Nachrichten pro Sekunde und Client
+
+
+def diff_states(old: Dict[str, Dict], new: Dict[str, Dict]) -> Dict[str, Optional[Dict]]:
+    """Geänderte Felder je Drucker; neue Drucker vollständig, entfernte als None"""
+    changes: Dict[str, Optional[Dict]] = {}
+    for printer_id, state in new.items():
+        previous = old.get(printer_id)
+        if previous is None:
+            changes[printer_id] = dict(state)
+            continue
+        fields = {key: value for key, value in state.items() if previous.get(key) != value}
+        fields.update({key: None for key in previous.keys() - state.keys()})
+        if fields:
+            changes[printer_id] = fields
+    for printer_id in old.keys() - new.keys():
+        changes[printer_id] = None
+    return changes
+
+
+class StatusSubscription:
+    """Änderungen für einen Client; was er nicht abholt, wird zusammengefasst"""
+
+    def __init__(self, hub: "StatusHub", max_rate: float):
+        self.hub = hub
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.closed = False
+        self._pending: Dict[str, Optional[Dict]] = {}
+        self._event = asyncio.Event()
+        self._closed = asyncio.Event()
+        self._last_sent = 0.0
+
+    def _merge(self, changes: Dict[str, Optional[Dict]]):
+        pending = self._pending
+        for printer_id, fields in changes.items():
+            current = pending.get(printer_id)
+            if fields is None or current is None:
+                # Entfernt, neu oder erste Änderung seit dem letzten Senden
+                pending[printer_id] = None if fields is None else dict(fields)
+            else:
+                current.update(fields)
+        self._event.set()
+
+    async def snapshot(self) -> Optional[Dict[str, Dict]]:
+        """Vollständiger Zustand aller Drucker; wartet ggf. auf die erste Abfrage
+
+        None, wenn die Subscription vorher geschlossen wird (z.B. weil der
+        Client sich getrennt hat, während der Kernel nicht erreichbar war).
+        """
+        waiters = {asyncio.ensure_future(self.hub._ready.wait()),
+                   asyncio.ensure_future(self._closed.wait())}
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        if self.closed:
+            return None
+        return self.hub.snapshot()
+
+    async def next(self) -> Optional[Dict[str, Optional[Dict]]]:
+        """Wartet auf Änderungen seit dem letzten Aufruf; None, wenn geschlossen"""
+        while not self.closed:
+            delay = self._last_sent + self.min_interval - time.monotonic()
+            if delay > 0:
+                # Höchstrate: was in der Zwischenzeit kommt, geht in dieselbe Nachricht
+                await asyncio.sleep(delay)
+                continue
+            await self._event.wait()
+            self._event.clear()
+            if self._pending and not self.closed:
+                changes, self._pending = self._pending, {}
+                self._last_sent = time.monotonic()
+                return changes
+        return None
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._event.set()
+        self._closed.set()
+        self.hub._unsubscribe(self)
+
+
+class StatusHub:
+    """Verteilt den Druckerzustand an beliebig viele Clients.
+
+    Solange mindestens ein Client verbunden ist, fragt eine einzige Task den
+    Zustand alle ``interval`` Sekunden ab und berechnet die Änderungen einmal
+    für alle. Jeder Client sammelt sie in seiner Subscription und bekommt
+    höchstens ``max_rate`` Nachrichten pro Sekunde; ein langsamer Client
+    erhält die zusammengefassten Änderungen statt einer Warteschlange.
+    Ohne Clients wird nicht abgefragt.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[List[Dict[str, Any]]]],
+                 interval: float = DEFAULT_INTERVAL, key: str = "id"):
+        self.fetch = fetch
+        self.interval = interval
+        self.key = key
+        self.state: Optional[Dict[str, Dict]] = None
+        self.fetch_count = 0
+        self._subscribers: Set[StatusSubscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._last_error: Optional[str] = None
+
+    def subscribe(self, max_rate: float = DEFAULT_MAX_RATE) -> StatusSubscription:
+        """Meldet einen Client an und startet bei Bedarf die Abfrage"""
+        subscription = StatusSubscription(self, max_rate)
+        self._subscribers.add(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscription
+
+    def _unsubscribe(self, subscription: StatusSubscription):
+        self._subscribers.discard(subscription)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            # Ohne Abfrage veraltet der Zustand; der nächste Client wartet neu
+            self.state = None
+            self._ready.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Kopie des zuletzt abgefragten Zustands"""
+        return {printer_id: dict(state) for printer_id, state in self.state.items()}
+
+    async def _run(self):
+        while self._subscribers:
+            await self.poll()
+            await asyncio.sleep(self.interval)
+
+    async def poll(self):
+        """Fragt den Zustand einmal ab und verteilt die Änderungen"""
+        try:
+            printers = await self.fetch()
+        except Exception as e:
+            # Kernel kurz nicht erreichbar: letzten Zustand behalten
+            if str(e) != self._last_error:
+                print(f"Druckerstatus konnte nicht abgefragt werden: {e}")
+                self._last_error = str(e)
+            return
+        self._last_error = None
+        self.fetch_count += 1
+        state = {str(printer[self.key]): printer for printer in printers}
+        if self.state is None:
+            self.state = state
+            self._ready.set()
+            return
+        changes = diff_states(self.state, state)
+        self.state = state
+        if changes:
+            for subscription in self._subscribers:
+                subscription._merge(changes)
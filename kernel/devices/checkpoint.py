@@ -0,0 +1,177 @@
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+CHECKPOINT_DIR = Path("/var/lib/innovate/checkpoints")
+
+# Dateikopf: Magic, Länge des G-Code-Pfads, danach Pfad und CRC32
+MAGIC = b"ICP1"
+HEADER = struct.Struct("<4sH")
+# Datensatz: Zeit, Byte-Offset, Z, E, Hotend, Bett, Ziel Hotend, Ziel Bett
+RECORD = struct.Struct("<dQffffff")
+CRC = struct.Struct("<I")
+RECORD_SIZE = RECORD.size + CRC.size
+
+
+class Checkpoint(NamedTuple):
+    timestamp: float
+    file_offset: int
+    z: float
+    e: float
+    hotend: float
+    bed: float
+    target_hotend: float
+    target_bed: float
+
+    def resume_commands(self) -> List[str]:
+        """G-Code, um nach einem Stromausfall an diesem Punkt weiterzudrucken"""
+        return [
+            f"M140 S{self.target_bed:.0f}",
+            f"M104 S{self.target_hotend:.0f}",
+            f"M190 S{self.target_bed:.0f}",
+            f"M109 S{self.target_hotend:.0f}",
+            # Z nicht referenzieren: das Teil steht noch auf dem Bett
+            f"G92 Z{self.z:.3f}",
+            "G91",
+            "G1 Z2 F600",
+            "G90",
+            "G28 X Y",
+            f"G1 Z{self.z:.3f} F600",
+            f"G92 E{self.e:.5f}",
+        ]
+
+
+class CheckpointLog:
+    """Append-only-Protokoll von Druck-Checkpoints mit fester Datensatzgröße.
+
+    Jeder Datensatz wird mit einem einzigen ``write`` angehängt und trägt eine
+    CRC32, ein beim Stromausfall abgerissener Datensatz wird beim Laden also
+    erkannt und verworfen. ``fsync`` erfolgt gebündelt höchstens alle
+    ``fsync_interval`` Sekunden (bzw. sofort mit ``sync=True``, z.B. beim
+    Pausieren), sodass Checkpoints während des Drucks kaum Last erzeugen.
+    """
+
+    def __init__(self, path: Path, fsync_interval: float = 5.0):
+        self.path = Path(path)
+        self.fsync_interval = fsync_interval
+        self.gcode_file: Optional[str] = None
+        self.records = 0
+        self._fd: Optional[int] = None
+        self._last_sync = 0.0
+        self._dirty = False
+
+    @staticmethod
+    def _header(gcode_file: str) -> bytes:
+        path = gcode_file.encode()
+        data = HEADER.pack(MAGIC, len(path)) + path
+        return data + CRC.pack(zlib.crc32(data))
+
+    def begin(self, gcode_file: str):
+        """Legt das Protokoll für einen neuen Druck an"""
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, self._header(gcode_file))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, self.path)
+        self._open(gcode_file, 0)
+
+    def _open(self, gcode_file: str, records: int):
+        self.gcode_file = gcode_file
+        self.records = records
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        self._last_sync = time.monotonic()
+        self._dirty = False
+
+    def append(self, checkpoint: Checkpoint, sync: bool = False):
+        """Hängt einen Checkpoint an"""
+        if self._fd is None:
+            raise ValueError("Checkpoint-Protokoll ist nicht geöffnet")
+        data = RECORD.pack(*checkpoint)
+        os.write(self._fd, data + CRC.pack(zlib.crc32(data)))
+        self.records += 1
+        self._dirty = True
+        now = time.monotonic()
+        if sync or now - self._last_sync >= self.fsync_interval:
+            self._sync(now)
+
+    def sync(self):
+        """Schreibt ausstehende Checkpoints sofort auf den Datenträger"""
+        if self._fd is not None and self._dirty:
+            self._sync(time.monotonic())
+
+    def _sync(self, now: float):
+        os.fsync(self._fd)
+        self._last_sync = now
+        self._dirty = False
+
+    def close(self):
+        if self._fd is not None:
+            self.sync()
+            os.close(self._fd)
+            self._fd = None
+
+    def discard(self):
+        """Schließt und löscht das Protokoll, z.B. nach Druckende"""
+        self.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def load(path: Path) -> Optional[Tuple[str, Optional[Checkpoint], int, int]]:
+        """Liest Kopf und letzten gültigen Checkpoint.
+
+        Gibt (G-Code-Datei, Checkpoint, Anzahl gültiger Datensätze,
+        Länge des Kopfs) zurück oder None bei fehlendem/ungültigem Protokoll.
+        """
+        try:
+            with open(path, 'rb') as f:
+                head = f.read(HEADER.size)
+                if len(head) < HEADER.size:
+                    return None
+                magic, path_length = HEADER.unpack(head)
+                if magic != MAGIC:
+                    return None
+                gcode_path = f.read(path_length)
+                crc = f.read(CRC.size)
+                if len(crc) < CRC.size or CRC.unpack(crc)[0] != zlib.crc32(head + gcode_path):
+                    return None
+                header_size = f.tell()
+
+                # Von hinten suchen: nur das Ende kann abgerissen sein
+                size = os.fstat(f.fileno()).st_size
+                count = (size - header_size) // RECORD_SIZE
+                while count > 0:
+                    f.seek(header_size + (count - 1) * RECORD_SIZE)
+                    raw = f.read(RECORD_SIZE)
+                    data, crc = raw[:RECORD.size], raw[RECORD.size:]
+                    if CRC.unpack(crc)[0] == zlib.crc32(data):
+                        return gcode_path.decode(), Checkpoint(*RECORD.unpack(data)), count, header_size
+                    count -= 1
+                return gcode_path.decode(), None, 0, header_size
+        except OSError:
+            return None
+
+    def recover(self) -> Optional[Checkpoint]:
+        """Öffnet ein bestehendes Protokoll zum Weiterschreiben nach einem Neustart.
+
+        Abgerissene Datensätze am Ende werden abgeschnitten, damit neue
+        Checkpoints wieder an der Datensatzgrenze beginnen.
+        """
+        loaded = self.load(self.path)
+        if loaded is None:
+            return None
+        gcode_file, checkpoint, count, header_size = loaded
+        os.truncate(self.path, header_size + count * RECORD_SIZE)
+        self.close()
+        self._open(gcode_file, count)
+        return checkpoint
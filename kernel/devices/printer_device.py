@@ -1,7 +1,17 @@
+from collections import deque
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Iterable, Set, Tuple
 from enum import Enum
+from pathlib import Path
+import struct
+import threading
 import time
+from kernel.gcode.compiler import CompiledGCode
+from kernel.gcode.reader import GCodeFileReader
+from kernel.devices.telemetry import TelemetryHistory
+from kernel.devices.checkpoint import Checkpoint, CheckpointLog, CHECKPOINT_DIR
+from kernel.gcode.arc_fitter import ArcFitter
+from kernel.gcode.layer_index import LayerIndex
 
 class PrinterState(Enum):
     OFFLINE = "offline"
@@ -12,26 +22,86 @@ class PrinterState(Enum):
 
 @dataclass
 class Temperature:
+    __slots__ = ('hotend', 'bed', 'target_hotend', 'target_bed')
     hotend: float
     bed: float
     target_hotend: float
     target_bed: float
 
+@dataclass
+class Position:
+    __slots__ = ('x', 'y', 'z', 'e')
+    x: float
+    y: float
+    z: float
+    e: float
+
 class PrinterDevice:
-    def __init__(self, device_id: str, port: str):
+    # Feste Attribute statt __dict__: spart Speicher bei vielen Druckern
+    __slots__ = (
+        'id', 'port', 'pool', 'material', 'nozzle_diameter', 'bed_size',
+        'speed_factor', 'tags', 'state', 'temperature', 'position',
+        'current_file', '_progress', 'gcode_reader', 'compiled', 'connection', 'hal',
+        'history', 'temperature_listeners', 'print_listeners', 'checkpoints',
+        'checkpoint_interval', '_next_checkpoint', 'arc_fitter', 'layer_index',
+        '_print_thread', '_resume'
+    )
+
+    def __init__(self, device_id: str, port: str, pool: str = "default",
+                 material: Optional[str] = None, nozzle_diameter: float = 0.4,
+                 bed_size: Tuple[float, float, float] = (220.0, 220.0, 250.0),
+                 speed_factor: float = 1.0, tags: Iterable[str] = (),
+                 history: Optional[TelemetryHistory] = None,
+                 checkpoint_dir: Optional[Path] = CHECKPOINT_DIR,
+                 checkpoint_interval: float = 2.0,
+                 arc_fitter: Optional[ArcFitter] = None):
         self.id = device_id
         self.port = port
+        # Fähigkeiten für die Job-Platzierung in der Druckerfarm
+        self.pool = pool
+        self.material = material
+        self.nozzle_diameter = nozzle_diameter
+        self.bed_size = bed_size
+        self.speed_factor = speed_factor
+        self.tags: Set[str] = set(tags)
         self.state = PrinterState.OFFLINE
         self.temperature = Temperature(0.0, 0.0, 0.0, 0.0)
-        self.position = {"X": 0.0, "Y": 0.0, "Z": 0.0, "E": 0.0}
+        self.position = Position(0.0, 0.0, 0.0, 0.0)
         self.current_file: Optional[str] = None
-        self.progress: float = 0.0
+        self._progress: float = 0.0
+        self.gcode_reader: Optional[GCodeFileReader] = None
+        # Kompilierte Fassung der gestreamten Datei (None = Text streamen)
+        self.compiled: Optional[CompiledGCode] = None
+        self.connection = None
+        self.hal = None
+        # Verlauf für Dashboard und Thermal-Runaway-Prüfung, ohne Datenbank
+        self.history = history or TelemetryHistory()
+        # Werden nach jedem Temperaturwert aufgerufen, z.B. Thermal-Runaway-Schutz
+        self.temperature_listeners: List[Callable[['PrinterDevice'], None]] = []
+        # Werden am Ende jedes Drucks mit (Drucker, erfolgreich) aufgerufen, z.B. vom Scheduler
+        self.print_listeners: List[Callable[['PrinterDevice', bool], None]] = []
+        # Checkpoints für die Wiederaufnahme nach Stromausfall (None = aus)
+        self.checkpoints: Optional[CheckpointLog] = None
+        if checkpoint_dir is not None:
+            self.checkpoints = CheckpointLog(Path(checkpoint_dir) / f"{device_id}.ckpt")
+        self.checkpoint_interval = checkpoint_interval
+        self._next_checkpoint = 0.0
+        # Fasst Kurven zu G2/G3 zusammen; nur bei Firmware mit Cap:ARCS setzen
+        self.arc_fitter = arc_fitter
+        # Layer-Index der gestreamten Datei für Fortschritt und Restzeit
+        self.layer_index: Optional[LayerIndex] = None
+        self._print_thread: Optional[threading.Thread] = None
+        self._resume = threading.Event()
         
     def connect(self, hal) -> bool:
         """Verbindet den Drucker"""
         try:
             self.connection = hal.connect_printer(self.port)
             if self.connection:
+                self.hal = hal
+                # Temperatur und Position meldet die Firmware von selbst
+                hal.attach_telemetry(self.port, self)
+                hal.enable_auto_report(self.port)
                 self.state = PrinterState.IDLE
                 return True
             return False
@@ -39,37 +109,406 @@ class PrinterDevice:
             print(f"Verbindungsfehler: {e}")
             return False
             
-    def start_print(self, gcode_file: str) -> bool:
-        """Startet einen Druckauftrag"""
-        if self.state != PrinterState.IDLE:
+    def send_command(self, command: str, timeout: float = 10.0) -> Optional[str]:
+        """Sendet einen einzelnen G-Code-Befehl und gibt die Antwort bis zum ok zurück"""
+        connection = self.connection
+        if connection is None:
+            raise RuntimeError(f"Drucker {self.id} ist nicht verbunden")
+        if self.state == PrinterState.PRINTING and self._print_thread is not None:
+            # Die Antworten gehören gerade dem Streamer (ok, Resend)
+            raise RuntimeError(f"Drucker {self.id} druckt, Befehle erst nach Pause oder Ende")
+            
+        connection.write(f"{command}\n".encode())
+        response = []
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            line = connection.readline().decode(errors="replace").strip()
+            if not line:
+                continue
+            if line.startswith("ok"):
+                if len(line) > 2:
+                    response.append(line[2:].strip())
+                return "\n".join(response)
+            response.append(line)
+        raise TimeoutError(f"Keine Antwort von Drucker {self.id} auf {command}")
+        
+    def start_print(self, gcode_file: str, start_layer: Optional[int] = None,
+                    compiled_file: Optional[str] = None) -> bool:
+        """Startet einen Druckauftrag
+        
+        Mit ``start_layer`` beginnt der Druck direkt an diesem Layer; Heizen
+        und Referenzfahrt muss der Aufrufer dann selbst vorab senden.
+        ``compiled_file`` ist die vom Kernel kompilierte Fassung der
+        gestreamten Datei; passt sie nicht mehr zur Datei, wird Text gestreamt.
+        Ist der Drucker verbunden, läuft das Senden in einem eigenen Thread.
+        """
+        if self.state != PrinterState.IDLE or self._print_thread is not None:
+            return False
+            
+        source = gcode_file
+        if self.arc_fitter:
+            try:
+                # Zwischengespeichert: jeder Nachdruck streamt sofort die Fassung mit Bögen
+                source = self.arc_fitter.fit(gcode_file)
+            except (OSError, ValueError) as e:
+                print(f"Arc-Fitting für {gcode_file} fehlgeschlagen, drucke Original: {e}")
+                
+        try:
+            # Datei wird nur gemappt, nicht geladen
+            self.gcode_reader = GCodeFileReader(source)
+        except OSError as e:
+            print(f"G-Code-Datei kann nicht geöffnet werden: {e}")
             return False
             
+        # Für den Start an einem Layer wird der Index sofort gebraucht
+        self.layer_index = self._load_layer_index(source, wait=start_layer is not None)
+        if start_layer is not None:
+            if self.layer_index is None or not 0 <= start_layer < len(self.layer_index):
+                print(f"Layer {start_layer} in {gcode_file} nicht gefunden")
+                self._close_reader()
+                return False
+            self.gcode_reader.seek(self.layer_index.layer_range(start_layer)[0])
+        self.compiled = self._load_compiled(compiled_file, source) if compiled_file else None
+            
         self.current_file = gcode_file
         self.state = PrinterState.PRINTING
-        self.progress = 0.0
+        self.progress = self._progress_at(self.file_offset)
+        if self.checkpoints:
+            try:
+                # Byte-Offsets beziehen sich auf die tatsächlich gestreamte Datei
+                self.checkpoints.begin(source)
+            except OSError as e:
+                print(f"Checkpoints für {self.id} deaktiviert: {e}")
+                self.checkpoints = None
+        self._next_checkpoint = 0.0
+        if self.hal is not None:
+            self._start_streaming()
         return True
         
+    @staticmethod
+    def _load_compiled(compiled_file: str, source: str) -> Optional[CompiledGCode]:
+        try:
+            compiled = CompiledGCode(compiled_file)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Kompilierte Fassung {compiled_file} nicht lesbar, streame Text: {e}")
+            return None
+        if not compiled.matches(source):
+            # Datei wurde nach dem Einplanen geändert
+            compiled.close()
+            return None
+        return compiled
+        
+    def _start_streaming(self):
+        self._resume.clear()
+        self._print_thread = threading.Thread(
+            target=self._print_loop, name=f"Print-{self.id}", daemon=True
+        )
+        self._print_thread.start()
+        
+    def _print_loop(self):
+        """Sendeschleife: streamt den Druck, wartet bei Pause und meldet das Ende"""
+        success = False
+        try:
+            while True:
+                while self.state == PrinterState.PAUSED:
+                    self._resume.wait()
+                    self._resume.clear()
+                if self.state != PrinterState.PRINTING:
+                    return
+                # Endet bei Pause oder Abbruch vorzeitig, immer erst nach dem
+                # ok der letzten gesendeten Zeile
+                if not self._stream():
+                    if self.state == PrinterState.PRINTING:
+                        self.state = PrinterState.ERROR
+                    self._close_reader()
+                    return
+                if self.state == PrinterState.PRINTING:
+                    self._finish()
+                    success = True
+                    return
+                if self.state == PrinterState.PAUSED:
+                    # Alles Gesendete ist jetzt quittiert
+                    self.checkpoint(sync=True)
+        finally:
+            self._print_thread = None
+            for listener in self.print_listeners:
+                listener(self, success)
+            
+    def _stream(self) -> bool:
+        """Streamt ab ``file_offset``; Fortschritt und Checkpoints folgen den quittierten Zeilen"""
+        # Byte-Offset nach jedem gesendeten, noch nicht quittierten Befehl
+        sent: Deque[int] = deque()
+        acked = 0
+        
+        def on_progress(confirmed: int):
+            nonlocal acked
+            offset = None
+            while acked < confirmed and sent:
+                offset = sent.popleft()
+                acked += 1
+            if offset is not None:
+                self.update_progress(offset)
+                self.maybe_checkpoint(offset)
+                
+        return self.hal.stream_gcode(self.port, self._commands(sent), on_progress)
+            
+    def _commands(self, sent: Deque[int]) -> Iterator:
+        """Befehle ab ``file_offset``, solange gedruckt wird
+        
+        Aus der kompilierten Fassung kommen Befehl und Prüfsumme ohne Parsen;
+        die Leseposition des Readers wird über den Quellindex nachgeführt.
+        Nach jedem Befehl landet der Offset der Folgezeile in ``sent``.
+        """
+        reader = self.gcode_reader
+        compiled = self.compiled
+        if compiled is not None:
+            source_offsets = compiled.source_offsets
+            index = compiled.line_at(reader.tell())
+            commands = compiled.commands(index)
+            while self.state == PrinterState.PRINTING:
+                command = next(commands, None)
+                if command is None:
+                    return
+                index += 1
+                reader.offset = source_offsets[index]
+                sent.append(reader.offset)
+                yield command
+            return
+        lines = reader.lines()
+        while self.state == PrinterState.PRINTING:
+            line = next(lines, None)
+            if line is None:
+                return
+            sent.append(reader.tell())
+            yield line[1]
+        
     def pause_print(self):
         """Pausiert den aktuellen Druck"""
         if self.state == PrinterState.PRINTING:
             self.state = PrinterState.PAUSED
+            if self._print_thread is None:
+                # Pausenpunkt sofort dauerhaft sichern; mit Sendeschleife
+                # erst, wenn die gesendeten Zeilen quittiert sind
+                self.checkpoint(sync=True)
+            
+    def checkpoint(self, file_offset: Optional[int] = None, sync: bool = False):
+        """Sichert Byte-Offset, Z, E und Temperaturen des laufenden Drucks
+        
+        ``file_offset`` sollte der Anfang der ersten noch nicht quittierten
+        Zeile sein; ohne Angabe wird die Leseposition verwendet.
+        """
+        if not self.checkpoints or not self.gcode_reader:
+            return
+        temperature = self.temperature
+        try:
+            self.checkpoints.append(Checkpoint(
+                time.time(),
+                self.file_offset if file_offset is None else file_offset,
+                self.position.z, self.position.e,
+                temperature.hotend, temperature.bed,
+                temperature.target_hotend, temperature.target_bed
+            ), sync=sync)
+        except OSError as e:
+            print(f"Checkpoint für {self.id} fehlgeschlagen: {e}")
+        self._next_checkpoint = time.monotonic() + self.checkpoint_interval
+            
+    def update_progress(self, file_offset: Optional[int] = None):
+        """Fortschritt zum Byte-Offset nach der zuletzt quittierten Zeile (von der Sendeschleife)"""
+        self.progress = self._progress_at(self.file_offset if file_offset is None else file_offset)
+        
+    def _progress_at(self, file_offset: int) -> float:
+        if self.layer_index is not None:
+            return self.layer_index.progress(file_offset)
+        reader = self.gcode_reader
+        if reader is None:
+            return 0.0
+        return file_offset * 100.0 / reader.size if reader.size else 100.0
+        
+    def _load_layer_index(self, gcode_file: str, wait: bool = False) -> Optional[LayerIndex]:
+        """Lädt den Layer-Index; fehlt er, wird er im Hintergrund erstellt
+        
+        Meist hat ihn der Kernel schon beim Einplanen erstellt. Bis ein im
+        Hintergrund erstellter Index fertig ist, zählt der Fortschritt Bytes.
+        """
+        try:
+            if wait:
+                return LayerIndex.for_file(gcode_file)
+            index = LayerIndex.cached(gcode_file)
+        except (OSError, ValueError) as e:
+            print(f"Layer-Index für {gcode_file} nicht verfügbar: {e}")
+            return None
+        if index is None:
+            threading.Thread(target=self._build_layer_index, args=(gcode_file,),
+                             name=f"LayerIndex-{self.id}", daemon=True).start()
+        return index
+        
+    def _build_layer_index(self, gcode_file: str):
+        try:
+            index = LayerIndex.for_file(gcode_file)
+        except (OSError, ValueError) as e:
+            print(f"Layer-Index für {gcode_file} nicht verfügbar: {e}")
+            return
+        reader = self.gcode_reader
+        # Nur übernehmen, wenn noch dieselbe Datei gedruckt wird
+        if reader is not None and reader.path == gcode_file and self.layer_index is None:
+            self.layer_index = index
+            
+    @property
+    def current_layer(self) -> Optional[int]:
+        """Layer an der aktuellen Leseposition (None ohne Index)"""
+        if self.layer_index is None or self.gcode_reader is None:
+            return None
+        return max(self.layer_index.layer_at(self.file_offset), 0)
+        
+    @property
+    def remaining_time(self) -> Optional[float]:
+        """Geschätzte Restzeit in Sekunden (None ohne Index)"""
+        if self.layer_index is None or self.gcode_reader is None:
+            return None
+        return self.layer_index.remaining(self.file_offset) / max(self.speed_factor, 1e-6)
+            
+    def maybe_checkpoint(self, file_offset: Optional[int] = None):
+        """Schreibt höchstens alle ``checkpoint_interval`` Sekunden einen Checkpoint
+        
+        Die Sendeschleife übergibt den Offset nach der zuletzt quittierten Zeile.
+        """
+        if time.monotonic() >= self._next_checkpoint:
+            self.checkpoint(file_offset)
+            
+    def recover_print(self) -> Optional[Checkpoint]:
+        """Stellt einen durch Neustart oder Stromausfall unterbrochenen Druck wieder her
+        
+        Öffnet die G-Code-Datei direkt am gesicherten Byte-Offset, ohne sie
+        erneut zu durchsuchen, und lässt den Drucker pausiert. Vor
+        ``resume_print`` müssen die Befehle aus ``Checkpoint.resume_commands``
+        gesendet werden.
+        """
+        if not self.checkpoints or self.state not in (PrinterState.IDLE, PrinterState.OFFLINE):
+            return None
+        try:
+            checkpoint = self.checkpoints.recover()
+            if checkpoint is None:
+                return None
+            self.gcode_reader = GCodeFileReader(self.checkpoints.gcode_file)
+        except OSError as e:
+            print(f"Druck auf {self.id} kann nicht wiederhergestellt werden: {e}")
+            return None
+        self.gcode_reader.seek(checkpoint.file_offset)
+        self.layer_index = self._load_layer_index(self.checkpoints.gcode_file)
+        self.current_file = self.checkpoints.gcode_file
+        self.position.z = checkpoint.z
+        self.position.e = checkpoint.e
+        self.temperature.target_hotend = checkpoint.target_hotend
+        self.temperature.target_bed = checkpoint.target_bed
+        self._progress = self._progress_at(self.file_offset)
+        self.state = PrinterState.PAUSED
+        return checkpoint
             
     def resume_print(self):
         """Setzt den pausierten Druck fort"""
         if self.state == PrinterState.PAUSED:
             self.state = PrinterState.PRINTING
+            if self._print_thread is None and self.hal is not None:
+                # Z.B. nach recover_print: noch keine Sendeschleife
+                self._start_streaming()
+            else:
+                self._resume.set()
+            
+    def finish_print(self):
+        """Schließt einen vollständig gedruckten Auftrag ab (ohne Sendeschleife)"""
+        if self.state == PrinterState.PRINTING and self._print_thread is None:
+            self._finish()
+            
+    def _finish(self):
+        self.state = PrinterState.IDLE
+        self.progress = 100.0
+        self._close_reader()
+        if self.checkpoints:
+            self.checkpoints.discard()
             
     def cancel_print(self):
-        """Bricht den aktuellen Druck ab"""
+        """Bricht den aktuellen Druck ab
+        
+        Eine laufende Sendeschleife hört vor der nächsten Zeile auf; gewartet
+        wird nur auf das ok der bereits gesendeten Zeilen.
+        """
         if self.state in [PrinterState.PRINTING, PrinterState.PAUSED]:
             self.state = PrinterState.IDLE
+            self._stop_streaming()
             self.current_file = None
             self.progress = 0.0
+            self._close_reader()
+            if self.checkpoints:
+                self.checkpoints.discard()
+                
+    def _stop_streaming(self):
+        thread = self._print_thread
+        if thread is not None and thread is not threading.current_thread():
+            self._resume.set()
+            thread.join()
+            
+    @property
+    def progress(self) -> float:
+        return self._progress
+        
+    @progress.setter
+    def progress(self, value: float):
+        self._progress = value
+        self.history.progress.append((value,))
+        
+    def status_dict(self) -> Dict:
+        """Zustand als JSON-fähiges Dict, z.B. für API, CLI und IPC"""
+        temperature = self.temperature
+        return {
+            'id': self.id,
+            'name': self.id,
+            'port': self.port,
+            'status': self.state.value,
+            'temperature': {
+                'hotend': temperature.hotend,
+                'bed': temperature.bed,
+                'target_hotend': temperature.target_hotend,
+                'target_bed': temperature.target_bed,
+            },
+            'progress': self._progress,
+            'current_file': self.current_file,
+            'layer': self.current_layer,
+            'layer_count': len(self.layer_index) if self.layer_index is not None else None,
+            'remaining_time': self.remaining_time,
+            'pool': self.pool,
+            'tags': sorted(self.tags),
+        }
+        
+    @property
+    def file_offset(self) -> int:
+        """Byte-Offset der nächsten zu sendenden G-Code-Zeile"""
+        return self.gcode_reader.tell() if self.gcode_reader else 0
+        
+    def _close_reader(self):
+        if self.gcode_reader:
+            self.gcode_reader.close()
+            self.gcode_reader = None
+        if self.compiled:
+            self.compiled.close()
+            self.compiled = None
+        self.layer_index = None
             
-    def update_temperature(self, hotend: float, bed: float):
-        """Aktualisiert die Temperaturwerte"""
-        self.temperature.hotend = hotend
-        self.temperature.bed = bed
+    def update_temperature(self, hotend: float, bed: float,
+                           target_hotend: Optional[float] = None,
+                           target_bed: Optional[float] = None):
+        """Aktualisiert die Temperaturwerte, optional mit den Zielwerten der Firmware"""
+        temperature = self.temperature
+        temperature.hotend = hotend
+        temperature.bed = bed
+        if target_hotend is not None:
+            temperature.target_hotend = target_hotend
+        if target_bed is not None:
+            temperature.target_bed = target_bed
+        self.history.append_temperature(
+            (hotend, bed, temperature.target_hotend, temperature.target_bed)
+        )
+        for listener in self.temperature_listeners:
+            listener(self)
         
     def set_temperature(self, hotend: float, bed: float):
         """Setzt neue Zieltemperaturen"""
@@ -79,25 +518,46 @@ class PrinterDevice:
     def move(self, x: Optional[float] = None, y: Optional[float] = None, 
             z: Optional[float] = None, e: Optional[float] = None):
         """Bewegt den Druckkopf zu einer Position"""
+        position = self.position
         if x is not None:
-            self.position["X"] = x
+            position.x = x
         if y is not None:
-            self.position["Y"] = y
+            position.y = y
         if z is not None:
-            self.position["Z"] = z
+            position.z = z
         if e is not None:
-            self.position["E"] = e
+            position.e = e
+        self.history.position.append((position.x, position.y, position.z, position.e))
             
     def home(self):
         """Fährt alle Achsen in die Home-Position"""
-        self.position = {"X": 0.0, "Y": 0.0, "Z": 0.0, "E": 0.0}
+        self.move(0.0, 0.0, 0.0, 0.0)
         
     def safe_shutdown(self):
-        """Fährt den Drucker sicher herunter"""
-        if self.state == PrinterState.PRINTING:
-            self.pause_print()
+        """Fährt den Drucker sicher herunter
+        
+        Ein laufender Druck endet als fehlgeschlagen: die Sendeschleife hört
+        vor der nächsten Zeile auf, eine Pause wird geweckt. Der letzte
+        Checkpoint bleibt für eine spätere Wiederaufnahme erhalten.
+        """
+        printing = self.state in (PrinterState.PRINTING, PrinterState.PAUSED)
+        thread = self._print_thread
+        # Endzustand zuerst, damit keine weitere Zeile gesendet wird
+        self.state = PrinterState.OFFLINE
         # Kühle Hotend und Bett ab
         self.set_temperature(0, 0)
+        if self.connection is not None:
+            try:
+                self.connection.write(b"M104 S0\nM140 S0\n")
+            except OSError as e:
+                print(f"Heizungen von {self.id} konnten nicht abgeschaltet werden: {e}")
+        if printing:
+            if thread is not None:
+                # Die Sendeschleife meldet den Fehlschlag selbst
+                self._stop_streaming()
+            else:
+                for listener in self.print_listeners:
+                    listener(self, False)
+            self._close_reader()
         # Warte kurz auf Abkühlung
         time.sleep(1)
-        self.state = PrinterState.OFFLINE
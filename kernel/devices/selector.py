@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, List, Optional
+
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+
+
+@dataclass(frozen=True)
+class DeviceSelector:
+    """Wählt Drucker für Sammelbefehle aus; ohne Kriterien passen alle Drucker.
+
+    Mehrere Kriterien werden UND-verknüpft, z.B. alle freien Drucker mit
+    dem Tag ``halle-2``.
+    """
+    tag: Optional[str] = None
+    state: Optional[PrinterState] = None
+    pool: Optional[str] = None
+    device_ids: Optional[FrozenSet[str]] = None
+
+    @classmethod
+    def create(cls, tag: Optional[str] = None, state: Optional[str] = None,
+               pool: Optional[str] = None,
+               device_ids: Optional[Iterable[str]] = None) -> "DeviceSelector":
+        """Erzeugt einen Selektor aus einfachen Werten (z.B. aus einer API-Anfrage)"""
+        return cls(
+            tag=tag,
+            state=PrinterState(state) if state else None,
+            pool=pool,
+            device_ids=frozenset(device_ids) if device_ids else None
+        )
+
+    def matches(self, device: PrinterDevice) -> bool:
+        if self.device_ids is not None and device.id not in self.device_ids:
+            return False
+        if self.tag is not None and self.tag not in device.tags:
+            return False
+        if self.state is not None and device.state != self.state:
+            return False
+        if self.pool is not None and device.pool != self.pool:
+            return False
+        return True
+
+    def select(self, devices: Iterable[PrinterDevice]) -> List[PrinterDevice]:
+        return [device for device in devices if self.matches(device)]
@@ -0,0 +1,136 @@
+import time
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# Standardauflösung: ein Wert pro Sekunde für die letzte Stunde, darüber
+# hinaus ein Wert pro Minute über 24 Stunden (Verlaufsstufe)
+DEFAULT_INTERVAL = 1.0
+DEFAULT_DURATION = 3600
+TREND_INTERVAL = 60.0
+TREND_DURATION = 24 * 3600
+# Speicher je Drucker mit diesen Werten, Bytes je Eintrag 8 + 4 * Spalten:
+#   Temperatur  3600 x 24 B =  84 KiB     Position    3600 x 24 B = 84 KiB
+#   Verlauf     1440 x 24 B =  34 KiB     Fortschritt 1440 x 12 B = 17 KiB
+# zusammen rund 220 KiB, bei 100 Druckern rund 21 MiB.
+
+
+class RingBuffer:
+    """Vorab allokierter Ringpuffer für Messreihen eines Druckers.
+
+    Werte liegen als float32 in einem festen Array, Zeitstempel als float64.
+    Der Speicherbedarf beträgt ``capacity * (8 + 4 * Spalten)`` Bytes und
+    wächst nie. Kommen Werte schneller als ``interval``, wird der letzte
+    Eintrag überschrieben, sodass der Puffer immer ``capacity * interval``
+    Sekunden abdeckt.
+    """
+
+    __slots__ = ('fields', 'capacity', 'interval', '_times', '_values', '_head', '_count',
+                 '_slot_start')
+
+    def __init__(self, fields: Sequence[str], capacity: int, interval: float = DEFAULT_INTERVAL):
+        if capacity <= 0:
+            raise ValueError("Kapazität muss positiv sein")
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.interval = interval
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros((capacity, len(self.fields)), dtype=np.float32)
+        self._head = 0
+        self._count = 0
+        self._slot_start = 0.0
+
+    @classmethod
+    def for_duration(cls, fields: Sequence[str], duration: float = DEFAULT_DURATION,
+                     interval: float = DEFAULT_INTERVAL) -> "RingBuffer":
+        return cls(fields, max(1, int(duration / interval)), interval)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return self._times.nbytes + self._values.nbytes
+
+    def append(self, values: Sequence[float], timestamp: Optional[float] = None):
+        """Fügt einen Messwert hinzu"""
+        if timestamp is None:
+            timestamp = time.time()
+        if self._count and timestamp - self._slot_start < self.interval:
+            last = (self._head - 1) % self.capacity
+            self._times[last] = timestamp
+            self._values[last] = values
+            return
+        self._slot_start = timestamp
+        self._times[self._head] = timestamp
+        self._values[self._head] = values
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def latest(self) -> Optional[Tuple[float, np.ndarray]]:
+        """Letzter Messwert als (Zeitstempel, Werte)"""
+        if not self._count:
+            return None
+        last = (self._head - 1) % self.capacity
+        return float(self._times[last]), self._values[last].copy()
+
+    def last(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Die letzten ``n`` Messwerte in zeitlicher Reihenfolge (Kopien)"""
+        n = min(n, self._count)
+        indices = np.arange(self._head - n, self._head) % self.capacity
+        return self._times[indices], self._values[indices]
+
+    def since(self, timestamp: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Alle Messwerte ab ``timestamp``"""
+        times, values = self.last(self._count)
+        start = int(np.searchsorted(times, timestamp, side='left'))
+        return times[start:], values[start:]
+
+    def column(self, field: str, n: Optional[int] = None) -> np.ndarray:
+        """Eine einzelne Messreihe, z.B. ``column('hotend', 300)``"""
+        _, values = self.last(self._count if n is None else n)
+        return values[:, self.fields.index(field)]
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+
+class TelemetryHistory:
+    """Verlauf von Temperatur, Position und Fortschritt eines Druckers.
+
+    Temperaturen liegen zweistufig vor: ``temperature`` mit voller Auflösung
+    für die letzte Stunde, ``temperature_trend`` mit einem Wert pro Minute
+    über 24 Stunden. Mit den Standardwerten belegt ein Drucker rund 220 KiB
+    (Aufteilung siehe oben).
+    """
+
+    __slots__ = ('temperature', 'temperature_trend', 'position', 'progress')
+
+    TEMPERATURE_FIELDS = ('hotend', 'bed', 'target_hotend', 'target_bed')
+    POSITION_FIELDS = ('x', 'y', 'z', 'e')
+    PROGRESS_FIELDS = ('progress',)
+
+    def __init__(self, temperature_duration: float = DEFAULT_DURATION,
+                 position_duration: float = DEFAULT_DURATION,
+                 progress_duration: float = TREND_DURATION,
+                 interval: float = DEFAULT_INTERVAL, progress_interval: float = TREND_INTERVAL,
+                 trend_duration: float = TREND_DURATION, trend_interval: float = TREND_INTERVAL):
+        self.temperature = RingBuffer.for_duration(self.TEMPERATURE_FIELDS, temperature_duration, interval)
+        self.temperature_trend = RingBuffer.for_duration(self.TEMPERATURE_FIELDS, trend_duration,
+                                                         trend_interval)
+        self.position = RingBuffer.for_duration(self.POSITION_FIELDS, position_duration, interval)
+        self.progress = RingBuffer.for_duration(self.PROGRESS_FIELDS, progress_duration, progress_interval)
+
+    def append_temperature(self, values: Sequence[float], timestamp: Optional[float] = None):
+        """Schreibt einen Temperaturwert in beide Stufen"""
+        if timestamp is None:
+            timestamp = time.time()
+        self.temperature.append(values, timestamp)
+        self.temperature_trend.append(values, timestamp)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.temperature.nbytes + self.temperature_trend.nbytes +
+                self.position.nbytes + self.progress.nbytes)
@@ -0,0 +1,374 @@
+import hashlib
+import json
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from kernel.gcode.compiler import file_hash
+
+CACHE_DIR = Path("/var/lib/innovate/arc_cache")
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3
+
+DEFAULT_TOLERANCE = 0.05           # mm, maximale Abweichung vom Original-Pfad
+DEFAULT_MIN_SEGMENTS = 4           # kürzere Läufe bleiben G1
+DEFAULT_WINDOW = 512               # Segmente, die höchstens gepuffert werden
+DEFAULT_MIN_RADIUS = 0.5           # mm
+DEFAULT_MAX_RADIUS = 1000.0        # mm, darüber ist es praktisch eine Gerade
+DEFAULT_EXTRUSION_TOLERANCE = 0.1  # erlaubte Abweichung der Extrusion pro mm
+MAX_ARC_ANGLE = 1.75 * math.pi     # Vollkreise sind bei Marlin mehrdeutig
+
+
+class _Run:
+    """Gepufferte Folge von G1-Extrusionen in der XY-Ebene"""
+
+    __slots__ = ('points', 'e_deltas', 'raw', 'end_e', 'feedrate')
+
+    def __init__(self, x: float, y: float):
+        self.points: List[Tuple[float, float]] = [(x, y)]
+        self.e_deltas: List[float] = []
+        self.raw: List[bytes] = []
+        # Absoluter E-Wert nach jedem Segment (für M82)
+        self.end_e: List[float] = []
+        self.feedrate: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+
+class ArcFitter:
+    """Fasst feine G1-Segmente auf Kreisbahnen zu G2/G3-Bögen zusammen.
+
+    Slicer zerlegen Rundungen in viele kurze Geraden; jede kostet eine Zeile
+    auf der seriellen Leitung. Die Datei wird zeilenweise gelesen, Läufe von
+    Extrusionen in der XY-Ebene mit gleichem Vorschub werden in einem Fenster
+    von höchstens ``window`` Segmenten gepuffert. Pro Kandidat berechnet NumPy
+    den Kreis durch Anfang, Mitte und Ende und prüft alle Punkte und die
+    Bogenhöhe jeder Sehne gegen ``tolerance``; die Länge des Bogens wird
+    exponentiell gesucht und dann halbiert. Alle anderen Zeilen (Kommentare,
+    Layerwechsel, Fahrten) bleiben unverändert.
+
+    Das Ergebnis wird pro Dateihash und Parametersatz zwischengespeichert.
+    Die Firmware muss G2/G3 unterstützen (Marlin: ``Cap:ARCS:1``).
+    """
+
+    def __init__(self, tolerance: float = DEFAULT_TOLERANCE,
+                 min_segments: int = DEFAULT_MIN_SEGMENTS, window: int = DEFAULT_WINDOW,
+                 min_radius: float = DEFAULT_MIN_RADIUS, max_radius: float = DEFAULT_MAX_RADIUS,
+                 extrusion_tolerance: float = DEFAULT_EXTRUSION_TOLERANCE,
+                 cache_dir: Optional[Path] = CACHE_DIR, max_cache_size: int = DEFAULT_CACHE_SIZE):
+        self.tolerance = tolerance
+        self.min_segments = max(2, min_segments)
+        self.window = max(self.min_segments, window)
+        self.min_radius = min_radius
+        self.max_radius = max_radius
+        self.extrusion_tolerance = extrusion_tolerance
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_cache_size = max_cache_size
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_printer_config(cls, config: Dict, **kwargs) -> "ArcFitter":
+        """Übernimmt ``arc_fitting`` aus ``PrinterManager.load_config()``"""
+        settings = config.get('arc_fitting', {})
+        return cls(
+            tolerance=float(settings.get('tolerance', DEFAULT_TOLERANCE)),
+            min_segments=int(settings.get('min_segments', DEFAULT_MIN_SEGMENTS)),
+            **kwargs
+        )
+
+    def _parameter_key(self) -> str:
+        params = json.dumps([self.tolerance, self.min_segments, self.window, self.min_radius,
+                             self.max_radius, self.extrusion_tolerance])
+        return hashlib.sha256(params.encode()).hexdigest()[:16]
+
+    def fit(self, gcode_file: str) -> str:
+        """Gibt den Pfad der (ggf. zwischengespeicherten) Fassung mit Bögen zurück"""
+        if not self.cache_dir:
+            raise ValueError("ArcFitter ohne Cache-Verzeichnis: process() verwenden")
+        path = self.cache_dir / f"{file_hash(gcode_file)}-{self._parameter_key()}.gcode"
+        if path.exists():
+            os.utime(path)  # Als zuletzt benutzt markieren
+            return str(path)
+
+        with self._lock:
+            if not path.exists():
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                self.process(gcode_file, str(path))
+                self._evict(keep=path)
+        return str(path)
+
+    def _evict(self, keep: Optional[Path] = None):
+        """Entfernt die am längsten unbenutzten Dateien, bis das Limit passt"""
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*.gcode"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_cache_size:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+    def process(self, source: str, target: str) -> Tuple[int, int]:
+        """Schreibt ``source`` mit Bögen nach ``target``; gibt (Zeilen vorher, nachher) zurück"""
+        position = [0.0, 0.0, 0.0, 0.0]
+        relative = False
+        relative_e = False
+        feedrate: Optional[float] = None
+        run: Optional[_Run] = None
+        lines_in = 0
+        lines_out = 0
+
+        tmp_target = f"{target}.tmp"
+        with open(source, 'rb') as src, open(tmp_target, 'wb') as out:
+            for raw in src:
+                lines_in += 1
+                if not raw.endswith(b"\n"):
+                    # Letzte Zeile ohne Umbruch: sonst hinge ein Bogen an ihr
+                    raw += b"\n"
+                words = raw.split()
+                code = words[0].upper() if words else b""
+
+                if code == b"G1" and not relative and b";" not in raw:
+                    values = self._values(words)
+                    if values is not None:
+                        new_feedrate = values.get(b"F", feedrate)
+                        x = values.get(b"X", position[0])
+                        y = values.get(b"Y", position[1])
+                        e = values[b"E"]
+                        e_delta = e if relative_e else e - position[3]
+                        if (b"Z" not in values or values[b"Z"] == position[2]) and e_delta > 0 \
+                                and (x != position[0] or y != position[1]):
+                            if run is not None and (new_feedrate != run.feedrate
+                                                    or len(run) >= self.window):
+                                lines_out += self._flush(run, out, relative_e)
+                                run = None
+                            if run is None:
+                                run = _Run(position[0], position[1])
+                                run.feedrate = new_feedrate
+                            feedrate = new_feedrate
+                            position[0], position[1] = x, y
+                            position[3] = position[3] + e_delta
+                            run.points.append((x, y))
+                            run.e_deltas.append(e_delta)
+                            run.end_e.append(position[3])
+                            run.raw.append(raw)
+                            continue
+
+                if run is not None:
+                    lines_out += self._flush(run, out, relative_e)
+                    run = None
+                out.write(raw)
+                lines_out += 1
+
+                # Zustand für die Startpunkte der nächsten Bögen nachführen
+                if code in (b"G0", b"G1", b"G2", b"G3"):
+                    values = self._all_values(words)
+                    if b"F" in values:
+                        feedrate = values[b"F"]
+                    for index, axis in enumerate((b"X", b"Y", b"Z", b"E")):
+                        if axis in values:
+                            is_relative = relative_e if index == 3 else relative
+                            position[index] = position[index] + values[axis] if is_relative \
+                                else values[axis]
+                elif code == b"G90":
+                    relative = False
+                    relative_e = False
+                elif code == b"G91":
+                    relative = True
+                    relative_e = True
+                elif code == b"M82":
+                    relative_e = False
+                elif code == b"M83":
+                    relative_e = True
+                elif code == b"G92":
+                    values = self._all_values(words)
+                    if not values:
+                        position = [0.0, 0.0, 0.0, 0.0]
+                    for index, axis in enumerate((b"X", b"Y", b"Z", b"E")):
+                        if axis in values:
+                            position[index] = values[axis]
+                elif code == b"G28":
+                    position[0] = position[1] = position[2] = 0.0
+
+            if run is not None:
+                lines_out += self._flush(run, out, relative_e)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_target, target)
+        return lines_in, lines_out
+
+    @staticmethod
+    def _values(words) -> Optional[Dict[bytes, float]]:
+        """Parameter eines G1 mit Extrusion; None, wenn er sich nicht als Bogen eignet"""
+        values = {}
+        for word in words[1:]:
+            axis = word[:1].upper()
+            if axis not in (b"X", b"Y", b"Z", b"E", b"F"):
+                return None
+            try:
+                values[axis] = float(word[1:])
+            except ValueError:
+                return None
+        if b"E" not in values:
+            return None
+        return values
+
+    @staticmethod
+    def _all_values(words) -> Dict[bytes, float]:
+        values = {}
+        for word in words[1:]:
+            try:
+                values[word[:1].upper()] = float(word[1:])
+            except ValueError:
+                continue
+        return values
+
+    def _flush(self, run: _Run, out, relative_e: bool) -> int:
+        """Schreibt einen Lauf als Bögen und verbleibende G1; gibt die Zeilenzahl zurück"""
+        points = np.asarray(run.points, dtype=np.float64)
+        e_deltas = np.asarray(run.e_deltas, dtype=np.float64)
+        written = 0
+        index = 0
+        for start, end, center, clockwise in self._find_arcs(points, e_deltas):
+            for raw in run.raw[index:start]:
+                out.write(raw)
+                written += 1
+            x, y = points[end]
+            i, j = center - points[start]
+            e = e_deltas[start:end].sum() if relative_e else run.end_e[end - 1]
+            line = f"{'G2' if clockwise else 'G3'} X{x:.3f} Y{y:.3f} I{i:.3f} J{j:.3f} E{e:.5f}"
+            if run.feedrate is not None:
+                line += f" F{run.feedrate:g}"
+            out.write(line.encode() + b"\n")
+            written += 1
+            index = end
+        for raw in run.raw[index:]:
+            out.write(raw)
+            written += 1
+        return written
+
+    def _find_arcs(self, points: np.ndarray, e_deltas: np.ndarray):
+        """Sucht gierig die längsten Bögen: (Start, Ende, Mittelpunkt, im Uhrzeigersinn)"""
+        segments = len(points) - 1
+        if segments < self.min_segments:
+            return
+        window = _Window(points, e_deltas)
+        # Einmal für das ganze Fenster: wie weit die Drehrichtung ab jedem
+        # Segment gleich bleibt; kürzere Läufe (Geraden, Zickzack) scheiden aus
+        turn = np.sign(window.chords[:-1, 0] * window.chords[1:, 1]
+                       - window.chords[:-1, 1] * window.chords[1:, 0])
+        turning = turn != 0
+        same = turning[:-1] & turning[1:] & (turn[:-1] == turn[1:])
+        # Erstes Paar mit wechselnder Richtung ab jeder Position (kumulatives Minimum)
+        indices = np.arange(len(same))
+        next_break = np.minimum.accumulate(np.where(same, len(same), indices)[::-1])[::-1]
+        run = np.append(next_break - indices, 0)
+        reach = np.append(np.where(turning, np.arange(segments - 1) + 2 + run,
+                                   np.arange(segments - 1) + 1), segments)
+        reach = reach.tolist()
+
+        start = 0
+        while start + self.min_segments <= segments:
+            limit = reach[start]
+            end = start + self.min_segments
+            fit = self._fit(window, start, end) if end <= limit else None
+            if fit is None:
+                start += 1
+                continue
+
+            # Exponentiell verlängern, dann die Grenze halbierend suchen
+            step = self.min_segments
+            low = end
+            high = None
+            while True:
+                candidate = min(low + step, limit)
+                if candidate == low:
+                    break
+                result = self._fit(window, start, candidate)
+                if result is None:
+                    high = candidate
+                    break
+                low, fit = candidate, result
+                step *= 2
+            if high is not None:
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    result = self._fit(window, start, middle)
+                    if result is None:
+                        high = middle
+                    else:
+                        low, fit = middle, result
+
+            yield (start, low) + fit
+            start = low
+
+    def _fit(self, window: "_Window", start: int,
+             end: int) -> Optional[Tuple[np.ndarray, bool]]:
+        """Prüft, ob die Segmente ``start`` bis ``end`` ein Bogen sind"""
+        pts = window.points[start:end + 1]
+        a, b, c = pts[0], pts[(end - start) // 2], pts[-1]
+
+        # Umkreis durch Anfang, Mitte und Ende
+        d = 2.0 * (a[0] * (b[1] - c[1]) + b[0] * (c[1] - a[1]) + c[0] * (a[1] - b[1]))
+        if abs(d) < 1e-12:
+            return None
+        a2, b2, c2 = a @ a, b @ b, c @ c
+        center = np.array([
+            (a2 * (b[1] - c[1]) + b2 * (c[1] - a[1]) + c2 * (a[1] - b[1])) / d,
+            (a2 * (c[0] - b[0]) + b2 * (a[0] - c[0]) + c2 * (b[0] - a[0])) / d,
+        ])
+        radius = math.hypot(a[0] - center[0], a[1] - center[1])
+        if not self.min_radius <= radius <= self.max_radius:
+            return None
+
+        # Alle Punkte auf dem Kreis
+        offsets = pts - center
+        distances = np.sqrt(np.einsum('ij,ij->i', offsets, offsets))
+        if np.abs(distances - radius).max() > self.tolerance:
+            return None
+
+        # Bogenhöhe jeder Sehne: so weit weicht der Bogen zwischen den Punkten ab
+        half = np.minimum(window.lengths[start:end] / (2.0 * radius), 1.0)
+        if (radius * (1.0 - np.sqrt(1.0 - half * half))).max() > self.tolerance:
+            return None
+        if 2.0 * np.arcsin(half).sum() > MAX_ARC_ANGLE:
+            return None
+
+        # Gleichmäßige Extrusion, sonst würde der Bogen Material verschieben
+        flow = window.flow[start:end]
+        mean_flow = window.e_deltas[start:end].sum() / window.lengths[start:end].sum()
+        if np.abs(flow - mean_flow).max() > self.extrusion_tolerance * mean_flow:
+            return None
+
+        # Drehrichtung um den Mittelpunkt (die Sehnen drehen bereits gleichsinnig)
+        cross = offsets[0, 0] * offsets[1, 1] - offsets[0, 1] * offsets[1, 0]
+        return center, bool(cross < 0)
+
+
+class _Window:
+    """Einmal pro Fenster berechnete Größen aller Segmente"""
+
+    __slots__ = ('points', 'e_deltas', 'chords', 'lengths', 'flow')
+
+    def __init__(self, points: np.ndarray, e_deltas: np.ndarray):
+        self.points = points
+        self.e_deltas = e_deltas
+        self.chords = np.diff(points, axis=0)
+        self.lengths = np.sqrt(np.einsum('ij,ij->i', self.chords, self.chords))
+        self.flow = e_deltas / self.lengths
@@ -0,0 +1,404 @@
+import array
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from kernel.hal.gcode_streamer import gcode_checksum
+
+# Aufbau einer kompilierten Datei (Little Endian):
+#   Header      MAGIC, Version, Zeilen, Layer, Größe des Befehlsblocks,
+#               Größe und mtime der Quelldatei
+#   Befehle     normalisierte Befehle ohne Kommentare und Trennzeichen
+#   Füllbytes   bis zur nächsten durch 8 teilbaren Position
+#   Quellindex  uint64[Zeilen + 1]   Byte-Offset jeder Zeile in der Quelldatei
+#   Zeilenindex uint32[Zeilen + 1]   Offsets in den Befehlsblock
+#   Prüfsummen  uint8[Zeilen]        XOR-Prüfsumme jedes Befehls
+#   Layer       (uint32 Zeile, float32 Z)[Layer]
+# Über den Quellindex bleiben Checkpoints, Layer-Index und Fortschritt bei
+# Byte-Offsets der G-Code-Datei, auch wenn aus der kompilierten Datei
+# gestreamt wird. Die Befehle stehen vorn, damit der Compiler sie direkt
+# schreiben kann; die Indizes sammelt er in Zwischendateien und hängt sie
+# am Ende an.
+MAGIC = b"IGC1"
+VERSION = 3
+HEADER = struct.Struct("<4sHIIQQq")
+LAYER = struct.Struct("<If")
+MAX_BLOB_SIZE = 0xFFFFFFFF
+# Indexeinträge, die der Compiler puffert, bevor er sie auslagert
+SPILL_ENTRIES = 64 * 1024
+
+CACHE_DIR = Path("/var/lib/innovate/gcode_cache")
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_LAYER_MARKERS = (b";LAYER:", b";LAYER_CHANGE")
+
+# (Pfad, Größe, mtime, Inode) -> Hash, um unveränderte Dateien nicht neu zu hashen
+_hashes: Dict[Tuple[str, int, int, int], str] = {}
+_hashes_lock = threading.Lock()
+
+
+def file_hash(path: str) -> str:
+    """Berechnet den SHA-256 einer Datei (gemerkt, solange sie unverändert ist)"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    cached = _hashes.get(key)
+    if cached:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    with _hashes_lock:
+        _hashes[key] = digest.hexdigest()
+    return _hashes[key]
+
+
+def _z_value(command: bytes) -> Optional[float]:
+    """Liest den Z-Parameter eines G0/G1-Befehls"""
+    if not (command.startswith(b"G0 ") or command.startswith(b"G1 ")):
+        return None
+    for word in command.split():
+        if word[:1] == b"Z":
+            try:
+                return float(word[1:])
+            except ValueError:
+                return None
+    return None
+
+
+class LayerDetector:
+    """Erkennt Layerwechsel beim zeilenweisen Lesen einer G-Code-Datei.
+
+    Mit Slicer-Markierungen (``;LAYER:``) beginnt ein Layer beim ersten
+    Befehl nach der Markierung; seine Höhe ist die erste Z-Bewegung danach.
+    Ohne Markierungen beginnt ein Layer mit der ersten Extrusion auf einer
+    neuen Höhe (Z-Hops zählen nicht).
+    """
+
+    NEW_LAYER = 1   # Befehl beginnt einen Layer (Höhe: ``z``)
+    LAYER_Z = 2     # Höhe des aktuellen Layers steht jetzt fest (``z``)
+
+    __slots__ = ('has_markers', 'pending_layer', 'layer_has_z', 'current_z', 'layer_z',
+                 'layers', 'z')
+
+    def __init__(self):
+        self.has_markers = False
+        self.pending_layer = False
+        self.layer_has_z = False
+        self.current_z = 0.0
+        self.layer_z: Optional[float] = None
+        self.layers = 0
+        self.z = 0.0
+
+    def feed(self, raw: bytes, command: bytes) -> Optional[int]:
+        """Verarbeitet eine Zeile (``command``: normalisiert, ohne Kommentar)"""
+        if b";" in raw and raw.lstrip().startswith(_LAYER_MARKERS):
+            self.has_markers = True
+            self.pending_layer = True
+        if not command:
+            return None
+
+        z = _z_value(command)
+        if z is not None:
+            self.current_z = z
+        if self.pending_layer:
+            self.pending_layer = False
+            self.layer_has_z = z is not None
+            self.layers += 1
+            self.z = self.current_z
+            return self.NEW_LAYER
+        if self.has_markers:
+            if z is not None and not self.layer_has_z and self.layers:
+                self.layer_has_z = True
+                self.z = z
+                return self.LAYER_Z
+        elif b" E" in command and command.startswith(b"G1 ") and \
+                (self.layer_z is None or self.current_z > self.layer_z):
+            self.layer_z = self.current_z
+            self.layers += 1
+            self.z = self.current_z
+            return self.NEW_LAYER
+        return None
+
+
+class _SpilledArray:
+    """Typisiertes Array, das blockweise in eine temporäre Datei geschrieben wird"""
+
+    __slots__ = ('typecode', 'buffer', 'file', 'count')
+
+    def __init__(self, typecode: str, directory: str):
+        self.typecode = typecode
+        self.buffer = array.array(typecode)
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.count = 0
+
+    def append(self, value: int):
+        self.buffer.append(value)
+        if len(self.buffer) >= SPILL_ENTRIES:
+            self.flush()
+
+    def flush(self):
+        self.count += len(self.buffer)
+        self.file.write(self.buffer.tobytes())
+        del self.buffer[:]
+
+    def copy_to(self, target):
+        self.flush()
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, target, HASH_CHUNK_SIZE)
+
+    def close(self):
+        self.file.close()
+
+
+def compile_gcode(source: str, target: str):
+    """Übersetzt eine G-Code-Datei in das kompakte Binärformat
+
+    Die Befehle gehen direkt in die Zieldatei, die Indizes in Zwischendateien;
+    im Speicher liegen nur einige Puffer und die Layerliste.
+    """
+    stat = os.stat(source)
+    directory = os.path.dirname(os.path.abspath(target))
+    tmp_target = f"{target}.tmp"
+    offsets = _SpilledArray('I', directory)
+    source_offsets = _SpilledArray('Q', directory)
+    checksums = _SpilledArray('B', directory)
+    layers: List[Tuple[int, float]] = []
+    detector = LayerDetector()
+    position = 0
+    blob_size = 0
+    line_count = 0
+    offsets.append(0)
+
+    try:
+        with open(source, 'rb') as f, open(tmp_target, 'wb') as out:
+            out.write(b"\0" * HEADER.size)
+            for raw in f:
+                line_offset = position
+                position += len(raw)
+                command = b" ".join(raw.partition(b";")[0].split())
+                event = detector.feed(raw, command)
+                if not command:
+                    continue
+
+                if event == LayerDetector.NEW_LAYER:
+                    layers.append((line_count, detector.z))
+                elif event == LayerDetector.LAYER_Z:
+                    layers[-1] = (layers[-1][0], detector.z)
+
+                out.write(command)
+                blob_size += len(command)
+                if blob_size > MAX_BLOB_SIZE:
+                    raise ValueError(f"{source} ist zu groß für den G-Code-Cache")
+                line_count += 1
+                offsets.append(blob_size)
+                source_offsets.append(line_offset)
+                checksums.append(gcode_checksum(command))
+            source_offsets.append(position)
+
+            out.write(b"\0" * (-(HEADER.size + blob_size) % 8))
+            source_offsets.copy_to(out)
+            offsets.copy_to(out)
+            checksums.copy_to(out)
+            for line, z in layers:
+                out.write(LAYER.pack(line, z))
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, VERSION, line_count, len(layers), blob_size,
+                                  stat.st_size, stat.st_mtime_ns))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_target, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_target)
+        except OSError:
+            pass
+        raise
+    finally:
+        for spilled in (offsets, source_offsets, checksums):
+            spilled.close()
+
+
+class CompiledGCode:
+    """Lesezugriff auf eine kompilierte G-Code-Datei per mmap"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.line_count, self.layer_count, blob_size, \
+                self.source_size, self.source_mtime_ns = HEADER.unpack_from(self._mmap, 0)
+        except (ValueError, struct.error) as e:
+            if hasattr(self, '_mmap'):
+                self._mmap.close()
+            self._file.close()
+            raise ValueError(f"{path} ist keine kompilierte G-Code-Datei: {e}")
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} ist keine kompilierte G-Code-Datei")
+
+        lines = self.line_count + 1
+        index_pos = HEADER.size + blob_size + (-(HEADER.size + blob_size) % 8)
+        size = index_pos + 12 * lines + self.line_count + LAYER.size * self.layer_count
+        if len(self._mmap) != size:
+            # Abgeschnittene oder beschädigte Datei
+            self.close()
+            raise ValueError(f"{path} ist unvollständig ({len(self._mmap)} statt {size} Bytes)")
+
+        view = memoryview(self._mmap)
+        self.blob = view[HEADER.size:HEADER.size + blob_size]
+        pos = index_pos
+        self.source_offsets = view[pos:pos + 8 * lines].cast('Q')
+        pos += 8 * lines
+        self.offsets = view[pos:pos + 4 * lines].cast('I')
+        pos += 4 * lines
+        self.checksums = view[pos:pos + self.line_count]
+        pos += self.line_count
+        self.layers = []
+        for i in range(self.layer_count):
+            line, z = LAYER.unpack_from(self._mmap, pos + i * LAYER.size)
+            self.layers.append((line, round(z, 4)))
+
+    def __len__(self) -> int:
+        return self.line_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def command(self, index: int) -> memoryview:
+        """Gibt einen einzelnen Befehl zurück"""
+        return self.blob[self.offsets[index]:self.offsets[index + 1]]
+
+    def commands(self, start: int = 0) -> Iterator[Tuple[memoryview, int]]:
+        """Liefert (Befehl, Prüfsumme) ab Zeile ``start`` für den GCodeStreamer"""
+        blob = self.blob
+        offsets = self.offsets
+        checksums = self.checksums
+        begin = offsets[start]
+        for index in range(start, self.line_count):
+            end = offsets[index + 1]
+            yield blob[begin:end], checksums[index]
+            begin = end
+
+    def layer_start(self, layer: int) -> int:
+        """Zeilenindex, an dem ein Layer beginnt"""
+        return self.layers[layer][0]
+
+    def line_at(self, source_offset: int) -> int:
+        """Index des ersten Befehls ab einem Byte-Offset der Quelldatei"""
+        return bisect_left(self.source_offsets, source_offset, 0, self.line_count)
+
+    def matches(self, source: str) -> bool:
+        """True, wenn die Quelldatei seit dem Kompilieren unverändert ist"""
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return False
+        return stat.st_size == self.source_size and stat.st_mtime_ns == self.source_mtime_ns
+
+    def close(self):
+        """Gibt die Speicherabbildung frei"""
+        for name in ('offsets', 'source_offsets', 'checksums', 'blob'):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+
+class GCodeCache:
+    """Cache kompilierter G-Code-Dateien mit größenbasierter LRU-Verdrängung.
+
+    Schlüssel ist der SHA-256 der Quelldatei: solange sich der Inhalt nicht
+    ändert, wird die kompilierte Fassung wiederverwendet.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_size: int = DEFAULT_CACHE_SIZE):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def file_hash(self, path: str) -> str:
+        """Berechnet den SHA-256 einer Datei"""
+        return file_hash(path)
+
+    def _path_for(self, file_hash: str) -> Path:
+        return self.cache_dir / f"{file_hash}.igc"
+
+    def get(self, gcode_file: str) -> Optional[CompiledGCode]:
+        """Gibt die kompilierte Fassung zurück, falls vorhanden
+
+        Eine Fassung aus einer inhaltsgleichen Datei an anderem Pfad (andere
+        mtime) zählt nicht; der Drucker prüft beim Start gegen die Quelle.
+        """
+        path = self._path_for(self.file_hash(gcode_file))
+        try:
+            compiled = CompiledGCode(str(path))
+        except (OSError, ValueError, struct.error):
+            return None
+        if not compiled.matches(gcode_file):
+            compiled.close()
+            return None
+        os.utime(path)  # Als zuletzt benutzt markieren
+        return compiled
+
+    def compile(self, gcode_file: str) -> CompiledGCode:
+        """Gibt die kompilierte Fassung zurück und übersetzt sie bei Bedarf"""
+        compiled = self.get(gcode_file)
+        if compiled:
+            return compiled
+
+        path = self._path_for(self.file_hash(gcode_file))
+        with self._lock:
+            # Ein anderer Thread kann inzwischen übersetzt haben; ältere
+            # Formatversionen werden überschrieben
+            compiled = self.get(gcode_file)
+            if compiled:
+                return compiled
+            compile_gcode(gcode_file, str(path))
+            self._evict(keep=path)
+        return CompiledGCode(str(path))
+
+    def _evict(self, keep: Optional[Path] = None):
+        """Entfernt die am längsten unbenutzten Dateien, bis das Limit passt"""
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*.igc"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+    def cache_size(self) -> int:
+        """Gesamtgröße aller kompilierten Dateien in Bytes"""
+        return sum(p.stat().st_size for p in self.cache_dir.glob("*.igc"))
@@ -0,0 +1,392 @@
+import hashlib
+import json
+import math
+import os
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from kernel.gcode.compiler import LayerDetector, file_hash
+
+CACHE_DIR = Path("/var/lib/innovate/estimates")
+CHUNK_SIZE = 65536
+
+DEFAULT_STEPS_PER_MM = {'x': 80.0, 'y': 80.0, 'z': 400.0, 'e': 93.0}
+DEFAULT_MAX_SPEED = 300.0          # mm/s
+DEFAULT_ACCELERATION = 1000.0      # mm/s²
+DEFAULT_JUNCTION_DEVIATION = 0.013  # mm
+DEFAULT_MAX_STEP_RATE = 40000.0    # Schritte/s pro Achse
+MIN_SPEED = 0.05                   # mm/s, Untergrenze wie im Firmware-Planer
+ARC_SEGMENT_LENGTH = 1.0           # mm, wie MM_PER_ARC_SEGMENT in Marlin
+
+
+@dataclass
+class PrintEstimate:
+    print_time: float       # Sekunden
+    filament_length: float  # mm
+    moves: int
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class _MotionState:
+    """Zustand des Parsers und Planers über Chunk-Grenzen hinweg"""
+
+    def __init__(self):
+        self.position = [0.0, 0.0, 0.0, 0.0]
+        self.feedrate = 50.0  # mm/s
+        self.relative = False
+        self.relative_e = False
+        self.prev_unit: Optional[np.ndarray] = None
+        self.prev_nominal_sq = 0.0
+
+
+class PrintTimeEstimator:
+    """Schätzt Druckzeit und Filamentverbrauch in einem Durchlauf über die Datei.
+
+    Bewegungen werden zeilenweise geparst und in Chunks gesammelt; die
+    Planer-Rechnung (Junction Deviation, Vorwärts-/Rückwärtspass der
+    Beschleunigung, Trapezprofile) läuft vektorisiert mit NumPy über alle
+    Segmente eines Chunks. G2/G3-Bögen werden wie in der Firmware in kurze
+    Sehnen zerlegt. Die beiden Beschleunigungspässe sind Rekursionen
+    der Form ``w[i+1] = min(J[i+1], w[i] + 2aL)``; mit der kumulativen Summe
+    ``S`` gilt ``w = S + cummin(J - S)``, sie lassen sich also ohne
+    Python-Schleife berechnen.
+    """
+
+    def __init__(self, max_speed: float = DEFAULT_MAX_SPEED,
+                 acceleration: float = DEFAULT_ACCELERATION,
+                 junction_deviation: float = DEFAULT_JUNCTION_DEVIATION,
+                 steps_per_mm: Optional[Dict[str, float]] = None,
+                 max_step_rate: float = DEFAULT_MAX_STEP_RATE,
+                 cache_dir: Optional[Path] = CACHE_DIR,
+                 chunk_size: int = CHUNK_SIZE):
+        self.max_speed = max_speed
+        self.acceleration = acceleration
+        self.junction_deviation = junction_deviation
+        self.steps_per_mm = {**DEFAULT_STEPS_PER_MM, **(steps_per_mm or {})}
+        self.max_step_rate = max_step_rate
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.chunk_size = chunk_size
+        # Maximale Geschwindigkeit je Achse durch die Schrittrate
+        self._axis_limits = np.array([
+            max_step_rate / self.steps_per_mm[axis] for axis in ('x', 'y', 'z', 'e')
+        ])
+
+    @classmethod
+    def from_printer_config(cls, config: Dict, **kwargs) -> "PrintTimeEstimator":
+        """Erzeugt einen Schätzer aus ``PrinterManager.load_config()``"""
+        safety = config.get('safety', {})
+        return cls(
+            max_speed=float(safety.get('max_speed', DEFAULT_MAX_SPEED)),
+            acceleration=float(config.get('acceleration', DEFAULT_ACCELERATION)),
+            junction_deviation=float(config.get('junction_deviation', DEFAULT_JUNCTION_DEVIATION)),
+            steps_per_mm=config.get('steps_per_mm'),
+            **kwargs
+        )
+
+    def parameter_key(self) -> str:
+        """Kurzer Hash der Planer-Parameter, Teil der Cache-Schlüssel"""
+        params = json.dumps([self.max_speed, self.acceleration, self.junction_deviation,
+                             self.steps_per_mm, self.max_step_rate, ARC_SEGMENT_LENGTH],
+                            sort_keys=True)
+        return hashlib.sha256(params.encode()).hexdigest()[:16]
+
+    def estimate(self, gcode_file: str) -> PrintEstimate:
+        """Gibt die (ggf. zwischengespeicherte) Schätzung einer Datei zurück"""
+        cache_file = None
+        if self.cache_dir:
+            cache_file = self.cache_dir / f"{file_hash(gcode_file)}-{self.parameter_key()}.json"
+            try:
+                with open(cache_file, 'r') as f:
+                    return PrintEstimate(**json.load(f))
+            except (OSError, ValueError, TypeError):
+                pass
+
+        estimate = self.scan(gcode_file)
+
+        if cache_file:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_file = cache_file.with_suffix('.tmp')
+                with open(tmp_file, 'w') as f:
+                    json.dump(estimate.to_dict(), f)
+                os.replace(tmp_file, cache_file)
+            except OSError as e:
+                print(f"Fehler beim Speichern der Druckzeitschätzung: {e}")
+        return estimate
+
+    def scan(self, gcode_file: str, layers: Optional[List[List[float]]] = None) -> PrintEstimate:
+        """Liest die Datei in einem Durchlauf und berechnet die Schätzung
+
+        Mit ``layers`` wird zusätzlich pro Layer [Byte-Offset, Z, bisherige
+        Druckzeit, bisheriges Filament] angehängt, z.B. für den Layer-Index.
+        """
+        state = _MotionState()
+        segments: List[List[float]] = []
+        total_time = 0.0
+        filament = 0.0
+        moves = 0
+        detector = LayerDetector() if layers is not None else None
+        # Layer, deren Zeit erst nach der Berechnung ihres Chunks feststeht:
+        # (Eintrag, Index des ersten Segments, Wartezeit bis dahin)
+        pending: List[tuple] = []
+        segment_time = 0.0
+        dwell_time = 0.0
+        offset = 0
+
+        with open(gcode_file, 'rb') as f:
+            for raw in f:
+                line_offset = offset
+                offset += len(raw)
+                words = raw.split(b";", 1)[0].split()
+                if detector is not None:
+                    event = detector.feed(raw, b" ".join(words))
+                    if event == LayerDetector.NEW_LAYER:
+                        entry = [line_offset, detector.z, 0.0, filament]
+                        layers.append(entry)
+                        pending.append((entry, moves + len(segments), dwell_time))
+                    elif event == LayerDetector.LAYER_Z:
+                        layers[-1][1] = detector.z
+                if not words:
+                    continue
+                code = words[0].upper()
+
+                if code in (b"G1", b"G0", b"G2", b"G3"):
+                    if code in (b"G2", b"G3"):
+                        new_segments = self._parse_arc(words, state, clockwise=code == b"G2")
+                    else:
+                        segment = self._parse_move(words, state)
+                        new_segments = (segment,) if segment is not None else ()
+                    for segment in new_segments:
+                        segments.append(segment)
+                        filament += segment[3]
+                        if len(segments) >= self.chunk_size:
+                            times = self._segment_times(segments, state, final=False)
+                            segment_time = self._resolve_layers(pending, times, moves,
+                                                                segment_time)
+                            moves += len(segments)
+                            segments = []
+                elif code == b"G4":
+                    dwell = self._dwell(words)
+                    total_time += dwell
+                    dwell_time += dwell
+                elif code == b"G90":
+                    state.relative = False
+                    state.relative_e = False
+                elif code == b"G91":
+                    state.relative = True
+                    state.relative_e = True
+                elif code == b"M82":
+                    state.relative_e = False
+                elif code == b"M83":
+                    state.relative_e = True
+                elif code == b"G92":
+                    self._set_position(words, state)
+                elif code == b"G28":
+                    state.position[:3] = [0.0, 0.0, 0.0]
+
+        if segments:
+            times = self._segment_times(segments, state, final=True)
+            segment_time = self._resolve_layers(pending, times, moves, segment_time)
+            moves += len(segments)
+        for entry, _, dwell in pending:
+            # Layer ohne eigene Bewegungen am Dateiende
+            entry[2] = segment_time + dwell
+        total_time += segment_time
+        return PrintEstimate(round(total_time, 3), round(max(filament, 0.0), 3), moves)
+
+    @staticmethod
+    def _resolve_layers(pending: List[tuple], times: np.ndarray, first_segment: int,
+                        segment_time: float) -> float:
+        """Trägt die Startzeit der Layer dieses Chunks ein; gibt die Fahrzeit danach zurück"""
+        if pending:
+            cumulative = np.concatenate([[0.0], np.cumsum(times)])
+            end = first_segment + len(times)
+            while pending and pending[0][1] < end:
+                entry, segment, dwell = pending.pop(0)
+                entry[2] = segment_time + float(cumulative[segment - first_segment]) + dwell
+        return segment_time + float(times.sum())
+
+    @staticmethod
+    def _words(words) -> Dict[bytes, float]:
+        values = {}
+        for word in words[1:]:
+            try:
+                values[word[:1].upper()] = float(word[1:])
+            except ValueError:
+                continue
+        return values
+
+    @staticmethod
+    def _target(values: Dict[bytes, float], state: _MotionState) -> List[float]:
+        """Zielposition einer Bewegung unter Berücksichtigung von G91/M83"""
+        target = list(state.position)
+        for index, axis in enumerate((b"X", b"Y", b"Z", b"E")):
+            if axis in values:
+                relative = state.relative_e if index == 3 else state.relative
+                target[index] = state.position[index] + values[axis] if relative else values[axis]
+        return target
+
+    def _parse_move(self, words, state: _MotionState) -> Optional[List[float]]:
+        """Liefert [dx, dy, dz, de, Vorschub] einer Bewegung"""
+        values = self._words(words)
+        if b"F" in values and values[b"F"] > 0:
+            state.feedrate = values[b"F"] / 60.0
+
+        target = self._target(values, state)
+        deltas = [target[index] - state.position[index] for index in range(4)]
+        state.position = target
+
+        if not any(deltas):
+            return None
+        deltas.append(state.feedrate)
+        return deltas
+
+    def _parse_arc(self, words, state: _MotionState, clockwise: bool) -> List[List[float]]:
+        """Zerlegt einen G2/G3-Bogen (I/J- oder R-Form) in Segmente wie ``_parse_move``"""
+        values = self._words(words)
+        if b"F" in values and values[b"F"] > 0:
+            state.feedrate = values[b"F"] / 60.0
+
+        start = state.position
+        target = self._target(values, state)
+        state.position = target
+        x1, y1 = start[0], start[1]
+        x2, y2 = target[0], target[1]
+
+        radius_word = values.get(b"R")
+        if radius_word and (x1 != x2 or y1 != y2):
+            # Mittelpunkt aus dem Radius; negatives R wählt den großen Bogen
+            side = -1.0 if clockwise != (radius_word < 0) else 1.0
+            dx, dy = x2 - x1, y2 - y1
+            chord = math.hypot(dx, dy)
+            height = math.sqrt(max(radius_word * radius_word - chord * chord / 4.0, 0.0))
+            cx = (x1 + x2) / 2.0 - side * height * dy / chord
+            cy = (y1 + y2) / 2.0 + side * height * dx / chord
+        else:
+            cx = x1 + values.get(b"I", 0.0)
+            cy = y1 + values.get(b"J", 0.0)
+
+        rx, ry = x1 - cx, y1 - cy
+        tx, ty = x2 - cx, y2 - cy
+        radius = math.hypot(rx, ry)
+        travel = math.atan2(rx * ty - ry * tx, rx * tx + ry * ty)
+        if travel < 0:
+            travel += 2.0 * math.pi
+        if clockwise:
+            travel -= 2.0 * math.pi
+        if travel == 0 and x1 == x2 and y1 == y2:
+            travel = 2.0 * math.pi
+        if radius < 1e-9:
+            travel = 0.0
+
+        dz = target[2] - start[2]
+        de = target[3] - start[3]
+        length = math.hypot(travel * radius, dz)
+        count = max(1, int(length / ARC_SEGMENT_LENGTH))
+        start_angle = math.atan2(ry, rx)
+        segments = []
+        px, py = x1, y1
+        for step in range(1, count + 1):
+            if step == count:
+                nx, ny = x2, y2
+            else:
+                angle = start_angle + travel * step / count
+                nx, ny = cx + radius * math.cos(angle), cy + radius * math.sin(angle)
+            segment = [nx - px, ny - py, dz / count, de / count, state.feedrate]
+            if any(segment[:4]):
+                segments.append(segment)
+            px, py = nx, ny
+        return segments
+
+    @staticmethod
+    def _dwell(words) -> float:
+        for word in words[1:]:
+            try:
+                if word[:1] in (b"P", b"p"):
+                    return float(word[1:]) / 1000.0
+                if word[:1] in (b"S", b"s"):
+                    return float(word[1:])
+            except ValueError:
+                continue
+        return 0.0
+
+    def _set_position(self, words, state: _MotionState):
+        values = self._words(words)
+        if not values:
+            state.position = [0.0, 0.0, 0.0, 0.0]
+            return
+        for index, axis in enumerate((b"X", b"Y", b"Z", b"E")):
+            if axis in values:
+                state.position[index] = values[axis]
+
+    def _segment_times(self, segments: List[List[float]], state: _MotionState,
+                       final: bool) -> np.ndarray:
+        """Berechnet die Fahrzeit jedes Segments eines Chunks vektorisiert"""
+        data = np.asarray(segments, dtype=np.float64)
+        deltas = data[:, :4]
+        feedrate = data[:, 4]
+        accel = self.acceleration
+
+        xyz_length = np.sqrt(np.einsum('ij,ij->i', deltas[:, :3], deltas[:, :3]))
+        extrude_only = xyz_length <= 1e-9
+        length = np.where(extrude_only, np.abs(deltas[:, 3]), xyz_length)
+
+        # Sollgeschwindigkeit: Vorschub, Maximalgeschwindigkeit, Schrittrate je Achse
+        with np.errstate(divide='ignore', invalid='ignore'):
+            axis_share = np.abs(deltas) / length[:, None]
+            axis_limit = np.min(np.where(axis_share > 0, self._axis_limits / axis_share, np.inf), axis=1)
+        nominal = np.minimum(np.minimum(feedrate, self.max_speed), axis_limit)
+        nominal = np.maximum(nominal, MIN_SPEED)
+        nominal_sq = nominal * nominal
+
+        # Junction Deviation zwischen aufeinanderfolgenden Segmenten
+        unit = np.zeros((len(data), 3))
+        moving = ~extrude_only
+        unit[moving] = deltas[moving, :3] / xyz_length[moving, None]
+        if state.prev_unit is not None:
+            previous = np.vstack([state.prev_unit, unit[:-1]])
+        else:
+            previous = np.vstack([np.zeros(3), unit[:-1]])
+        cos_theta = np.clip(-np.einsum('ij,ij->i', previous, unit), -1.0, 1.0)
+        sin_theta_d2 = np.sqrt(0.5 * (1.0 - cos_theta))
+        with np.errstate(divide='ignore'):
+            junction_sq = accel * self.junction_deviation * sin_theta_d2 / (1.0 - sin_theta_d2)
+        junction_sq = np.where(cos_theta < -0.999999, np.inf, junction_sq)
+        junction_sq = np.where(cos_theta > 0.999999, 0.0, junction_sq)
+        previous_moving = np.concatenate([[state.prev_unit is not None], moving[:-1]])
+        junction_sq = np.where(previous_moving & moving, junction_sq, 0.0)
+
+        previous_nominal_sq = np.concatenate([[state.prev_nominal_sq], nominal_sq[:-1]])
+        limits = np.empty(len(data) + 1)
+        limits[:-1] = np.minimum(junction_sq, np.minimum(previous_nominal_sq, nominal_sq))
+        # Am Dateiende wird angehalten, an Chunk-Grenzen weitergefahren
+        limits[-1] = 0.0 if final else nominal_sq[-1]
+
+        # Vorwärtspass: w[i+1] = min(J[i+1], w[i] + 2aL[i])
+        reach = np.concatenate([[0.0], np.cumsum(2.0 * accel * length)])
+        forward = reach + np.minimum.accumulate(limits - reach)
+        # Rückwärtspass: b[i] = min(w[i], b[i+1] + 2aL[i])
+        remaining = reach[-1] - reach
+        backward = remaining + np.minimum.accumulate((forward - remaining)[::-1])[::-1]
+        backward = np.maximum(backward, 0.0)
+
+        entry = np.sqrt(backward[:-1])
+        exit_ = np.sqrt(backward[1:])
+        accel_distance = (nominal_sq - backward[:-1]) / (2.0 * accel)
+        decel_distance = (nominal_sq - backward[1:]) / (2.0 * accel)
+        cruise = length - accel_distance - decel_distance
+
+        trapezoid = ((nominal - entry) + (nominal - exit_)) / accel + \
+            np.maximum(cruise, 0.0) / nominal
+        peak = np.sqrt(np.maximum((2.0 * accel * length + backward[:-1] + backward[1:]) / 2.0, 0.0))
+        triangle = ((peak - entry) + (peak - exit_)) / accel
+        times = np.where(cruise >= 0.0, trapezoid, triangle)
+
+        state.prev_unit = unit[-1] if moving[-1] else None
+        state.prev_nominal_sq = float(nominal_sq[-1])
+        return times
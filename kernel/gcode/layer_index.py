@@ -0,0 +1,176 @@
+import array
+import os
+import struct
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from kernel.gcode.estimator import PrintTimeEstimator
+
+SUFFIX = ".lidx"
+
+# Aufbau der Index-Datei (Little Endian):
+#   Header  MAGIC, Version, Layer, Größe und mtime der G-Code-Datei,
+#           Parameter des Schätzers, Gesamtzeit, Gesamtfilament
+#   Layer   (uint64 Byte-Offset, float32 Z, float32 Zeit, float32 Filament)[Layer]
+# Zeit und Filament sind jeweils die Summe bis zum Beginn des Layers.
+MAGIC = b"ILX1"
+VERSION = 1
+HEADER = struct.Struct("<4sHIQq16sdd")
+RECORD = struct.Struct("<Qfff")
+
+
+def sidecar_path(gcode_file: str) -> str:
+    """Pfad des Index neben der G-Code-Datei"""
+    return gcode_file + SUFFIX
+
+
+class LayerIndex:
+    """Index einer G-Code-Datei: Layer -> Byte-Offset, Z, Zeit und Filament.
+
+    Wird in einem Durchlauf zusammen mit der Druckzeitschätzung erstellt und
+    als kompakte Binärdatei (20 Byte pro Layer) neben dem G-Code abgelegt.
+    Fortschritt, Restzeit und der Start ab einem Layer sind danach
+    Binärsuchen über die Offsets statt eines erneuten Durchlaufs; innerhalb
+    eines Layers wird nach Bytes interpoliert.
+    """
+
+    def __init__(self, offsets: List[int], z: List[float], times: List[float],
+                 filament: List[float], size: int, total_time: float,
+                 total_filament: float, mtime_ns: int = 0, parameters: str = ""):
+        self.offsets = array.array('Q', offsets)
+        self.z = array.array('f', z)
+        self.times = array.array('f', times)
+        self.filament = array.array('f', filament)
+        self.size = size
+        self.total_time = total_time
+        self.total_filament = total_filament
+        self.mtime_ns = mtime_ns
+        self.parameters = parameters
+        # Stützstellen für die Interpolation: Dateianfang, Layer, Dateiende
+        self._points = array.array('Q', [0, *offsets, size])
+        self._point_times = array.array('d', [0.0, *times, total_time])
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @classmethod
+    def build(cls, gcode_file: str,
+              estimator: Optional[PrintTimeEstimator] = None) -> "LayerIndex":
+        """Erstellt den Index in einem Durchlauf über die Datei"""
+        estimator = estimator or PrintTimeEstimator(cache_dir=None)
+        stat = os.stat(gcode_file)
+        layers: List[List[float]] = []
+        estimate = estimator.scan(gcode_file, layers=layers)
+        return cls(
+            [int(layer[0]) for layer in layers], [layer[1] for layer in layers],
+            [layer[2] for layer in layers], [layer[3] for layer in layers],
+            stat.st_size, estimate.print_time, estimate.filament_length,
+            stat.st_mtime_ns, estimator.parameter_key()
+        )
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LayerIndex"]:
+        """Liest eine Index-Datei; None, wenn sie fehlt oder ungültig ist"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        magic, version, count, size, mtime_ns, parameters, total_time, total_filament = \
+            HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or \
+                len(data) != HEADER.size + count * RECORD.size:
+            return None
+        records = list(RECORD.iter_unpack(data[HEADER.size:]))
+        return cls(
+            [r[0] for r in records], [r[1] for r in records], [r[2] for r in records],
+            [r[3] for r in records], size, total_time, total_filament, mtime_ns,
+            parameters.rstrip(b"\0").decode()
+        )
+
+    def save(self, path: str):
+        """Schreibt den Index atomar"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self), self.size, self.mtime_ns,
+                                self.parameters.encode(), self.total_time, self.total_filament))
+            f.write(b"".join(
+                RECORD.pack(*record)
+                for record in zip(self.offsets, self.z, self.times, self.filament)
+            ))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def cached(cls, gcode_file: str,
+               estimator: Optional[PrintTimeEstimator] = None) -> Optional["LayerIndex"]:
+        """Lädt den gültigen Index neben der Datei, ohne ihn zu erstellen
+
+        Ein Index gilt nur, solange Größe und mtime der Datei unverändert
+        sind; mit ``estimator`` müssen auch dessen Parameter übereinstimmen.
+        """
+        index = cls.load(sidecar_path(gcode_file))
+        stat = os.stat(gcode_file)
+        if index is not None and index.size == stat.st_size and \
+                index.mtime_ns == stat.st_mtime_ns and \
+                (estimator is None or index.parameters == estimator.parameter_key()):
+            return index
+        return None
+
+    @classmethod
+    def for_file(cls, gcode_file: str,
+                 estimator: Optional[PrintTimeEstimator] = None) -> "LayerIndex":
+        """Lädt den Index neben der Datei oder erstellt und speichert ihn"""
+        index = cls.cached(gcode_file, estimator)
+        if index is not None:
+            return index
+
+        index = cls.build(gcode_file, estimator)
+        try:
+            index.save(sidecar_path(gcode_file))
+        except OSError as e:
+            # Schreibgeschütztes Verzeichnis: Index nur im Speicher verwenden
+            print(f"Layer-Index für {gcode_file} kann nicht gespeichert werden: {e}")
+        return index
+
+    def layer_at(self, offset: int) -> int:
+        """Layer, in dem ein Byte-Offset liegt (-1 vor dem ersten Layer)"""
+        return bisect_right(self.offsets, offset) - 1
+
+    def layer_range(self, layer: int) -> Tuple[int, int]:
+        """Byte-Bereich [Anfang, Ende) eines Layers, z.B. für die Vorschau"""
+        if not 0 <= layer < len(self.offsets):
+            raise IndexError(f"Layer {layer} existiert nicht ({len(self.offsets)} Layer)")
+        end = self.offsets[layer + 1] if layer + 1 < len(self.offsets) else self.size
+        return self.offsets[layer], end
+
+    def read_layer(self, gcode_file: str, layer: int) -> bytes:
+        """Liest den G-Code eines einzelnen Layers"""
+        start, end = self.layer_range(layer)
+        with open(gcode_file, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def elapsed(self, offset: int) -> float:
+        """Geschätzte Druckzeit bis zu einem Byte-Offset"""
+        points = self._points
+        offset = max(0, min(offset, self.size))
+        i = max(bisect_right(points, offset) - 1, 0)
+        if i >= len(points) - 1:
+            return self.total_time
+        start, end = points[i], points[i + 1]
+        start_time = self._point_times[i]
+        if end <= start:
+            return start_time
+        return start_time + (self._point_times[i + 1] - start_time) * (offset - start) / (end - start)
+
+    def progress(self, offset: int) -> float:
+        """Fortschritt in Prozent nach geschätzter Druckzeit"""
+        if self.total_time <= 0:
+            return 100.0 * min(offset, self.size) / self.size if self.size else 100.0
+        return 100.0 * self.elapsed(offset) / self.total_time
+
+    def remaining(self, offset: int) -> float:
+        """Geschätzte Restzeit in Sekunden ab einem Byte-Offset"""
+        return max(self.total_time - self.elapsed(offset), 0.0)
@@ -0,0 +1,406 @@
+import hashlib
+import json
+import math
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from kernel.gcode.compiler import file_hash
+from kernel.gcode.layer_index import LayerIndex
+
+CACHE_DIR = Path("/var/lib/innovate/previews")
+DEFAULT_CACHE_SIZE = 256 * 1024 ** 2
+
+DEFAULT_TILE_SIZE = 512        # Pixel pro Kachel
+DEFAULT_THUMBNAIL_SIZE = 256   # Pixel
+DEFAULT_BED_SIZE = (200.0, 200.0)
+DEFAULT_LINE_WIDTH = 0.45      # mm
+MAX_ZOOM = 5                   # 2^5 x 2^5 Kacheln über das Druckbett
+MAX_LINE_RADIUS = 3            # Pixel, dickere Linien werden nicht gezeichnet
+ARC_SEGMENT_ANGLE = math.radians(10)
+FORMATS = {'png': 'image/png', 'webp': 'image/webp'}
+
+# Palette (Index -> RGB): Hintergrund, Bettraster, vorheriger Layer,
+# aktueller Layer, danach der Höhenverlauf des Thumbnails
+BACKGROUND, GRID, PREVIOUS, CURRENT = range(4)
+HEIGHT_COLORS = 64
+PALETTE = bytes([
+    0x20, 0x22, 0x26,
+    0x38, 0x3c, 0x44,
+    0x5a, 0x5f, 0x69,
+    0xff, 0x8c, 0x1a,
+]) + bytes(
+    channel
+    for level in np.linspace(0.0, 1.0, HEIGHT_COLORS)
+    for channel in (int(40 + 215 * level), int(110 + 60 * level), int(220 - 180 * level))
+)
+
+
+def encode_png(pixels: np.ndarray, palette: bytes = PALETTE) -> bytes:
+    """Kodiert ein Bild aus Palettenindizes (uint8, Zeilen x Spalten) als PNG"""
+    height, width = pixels.shape
+    # Jede Zeile beginnt mit dem Filtertyp 0 (keiner)
+    raw = np.zeros((height, width + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + \
+            struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)),
+        chunk(b"PLTE", palette),
+        chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)),
+        chunk(b"IEND", b""),
+    ))
+
+
+def encode_webp(pixels: np.ndarray, palette: bytes = PALETTE) -> bytes:
+    """Kodiert als WebP; benötigt Pillow"""
+    try:
+        from io import BytesIO
+        from PIL import Image
+    except ImportError:
+        raise ValueError("WebP-Vorschau benötigt Pillow (pip install Pillow)")
+    image = Image.fromarray(pixels, mode='P')
+    image.putpalette(palette)
+    buffer = BytesIO()
+    image.convert('RGB').save(buffer, format='WEBP', lossless=True)
+    return buffer.getvalue()
+
+
+class _ToolpathParser:
+    """Liest Extrusionen aus G-Code; der Zustand bleibt zwischen Aufrufen erhalten"""
+
+    __slots__ = ('position', 'position_known', 'relative', 'relative_e', 'last_e')
+
+    def __init__(self):
+        self.position = [0.0, 0.0, 0.0]
+        # False, wenn ab einer Stelle mitten in der Datei gelesen wird
+        self.position_known = True
+        self.relative = False
+        self.relative_e = False
+        self.last_e: Optional[float] = None
+
+    def segments(self, data: bytes) -> np.ndarray:
+        """Extrusionen als (x0, y0, x1, y1) in mm; Fahrten werden übersprungen"""
+        segments: List[Tuple[float, float, float, float]] = []
+        position = self.position
+        for raw in data.split(b"\n"):
+            words = raw.partition(b";")[0].split()
+            if not words:
+                continue
+            code = words[0].upper()
+            if code in (b"G0", b"G1", b"G2", b"G3"):
+                values = self._values(words)
+                x, y = position[0], position[1]
+                for index, axis in enumerate((b"X", b"Y", b"Z")):
+                    if axis in values:
+                        position[index] = position[index] + values[axis] if self.relative \
+                            else values[axis]
+                extruding = False
+                if b"E" in values:
+                    e = values[b"E"]
+                    if self.relative_e:
+                        extruding = e > 0
+                    else:
+                        extruding = self.last_e is None or e > self.last_e
+                        self.last_e = e
+                if not self.position_known:
+                    self.position_known = b"X" in values and b"Y" in values
+                    continue
+                if not extruding or code == b"G0":
+                    continue
+                if code == b"G1":
+                    if (x, y) != (position[0], position[1]):
+                        segments.append((x, y, position[0], position[1]))
+                else:
+                    self._arc(segments, x, y, position[0], position[1],
+                              x + values.get(b"I", 0.0), y + values.get(b"J", 0.0),
+                              clockwise=code == b"G2")
+            elif code == b"G90":
+                self.relative = self.relative_e = False
+            elif code == b"G91":
+                self.relative = self.relative_e = True
+            elif code == b"M82":
+                self.relative_e = False
+            elif code == b"M83":
+                self.relative_e = True
+            elif code == b"G92":
+                values = self._values(words)
+                for index, axis in enumerate((b"X", b"Y", b"Z")):
+                    if axis in values:
+                        position[index] = values[axis]
+                if b"E" in values or not values:
+                    self.last_e = values.get(b"E", 0.0)
+            elif code == b"G28":
+                position[0] = position[1] = position[2] = 0.0
+        if not segments:
+            return np.empty((0, 4))
+        return np.array(segments)
+
+    @staticmethod
+    def _values(words) -> Dict[bytes, float]:
+        values = {}
+        for word in words[1:]:
+            try:
+                values[word[:1].upper()] = float(word[1:])
+            except ValueError:
+                continue
+        return values
+
+    @staticmethod
+    def _arc(segments, x0: float, y0: float, x1: float, y1: float,
+             cx: float, cy: float, clockwise: bool):
+        """Zerlegt einen G2/G3-Bogen in Geraden"""
+        radius = math.hypot(x0 - cx, y0 - cy)
+        start = math.atan2(y0 - cy, x0 - cx)
+        sweep = math.atan2(y1 - cy, x1 - cx) - start
+        if clockwise and sweep >= 0:
+            sweep -= 2 * math.pi
+        elif not clockwise and sweep <= 0:
+            sweep += 2 * math.pi
+        steps = max(1, int(math.ceil(abs(sweep) / ARC_SEGMENT_ANGLE)))
+        px, py = x0, y0
+        for step in range(1, steps):
+            angle = start + sweep * step / steps
+            nx, ny = cx + radius * math.cos(angle), cy + radius * math.sin(angle)
+            segments.append((px, py, nx, ny))
+            px, py = nx, ny
+        segments.append((px, py, x1, y1))
+
+
+class PreviewRenderer:
+    """Rendert die Werkzeugpfade einer G-Code-Datei als Bilder für die Weboberfläche.
+
+    Ein Layer wird über seinen Byte-Bereich im Layer-Index gelesen,
+    statt die ganze Datei zu parsen, und als Draufsicht auf das Druckbett
+    gezeichnet; der vorherige Layer erscheint abgeblendet darunter. Bei
+    Zoomstufe ``z`` ist das Bett in 2^z x 2^z Kacheln zu je ``tile_size``
+    Pixeln geteilt. Die Rasterung läuft mit NumPy: jede Strecke wird in
+    Schritten von einem Pixel abgetastet und alle Punkte werden auf einmal
+    gesetzt. Das Thumbnail zeigt das ganze Modell, nach Höhe eingefärbt.
+
+    Bilder werden pro Dateihash, Layer, Zoom und Kachel auf der Platte
+    zwischengespeichert; die am längsten unbenutzten fallen zuerst heraus.
+    """
+
+    def __init__(self, bed_size: Tuple[float, float] = DEFAULT_BED_SIZE,
+                 tile_size: int = DEFAULT_TILE_SIZE, line_width: float = DEFAULT_LINE_WIDTH,
+                 cache_dir: Optional[Path] = CACHE_DIR, max_cache_size: int = DEFAULT_CACHE_SIZE):
+        self.bed_size = (float(bed_size[0]), float(bed_size[1]))
+        self.tile_size = tile_size
+        self.line_width = line_width
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_cache_size = max_cache_size
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_printer_config(cls, config: Dict, **kwargs) -> "PreviewRenderer":
+        """Übernimmt ``bed_size`` aus ``PrinterManager.load_config()``"""
+        bed = config.get('bed_size', {})
+        return cls(bed_size=(float(bed.get('x', DEFAULT_BED_SIZE[0])),
+                             float(bed.get('y', DEFAULT_BED_SIZE[1]))), **kwargs)
+
+    def _parameter_key(self) -> str:
+        params = json.dumps([self.bed_size, self.tile_size, self.line_width, PALETTE.hex()])
+        return hashlib.sha256(params.encode()).hexdigest()[:16]
+
+    def render_layer(self, gcode_file: str, layer: int, zoom: int = 0,
+                     tile: Tuple[int, int] = (0, 0), image_format: str = 'png') -> bytes:
+        """Gibt eine Kachel eines Layers zurück (``tile``: Spalte, Zeile von links oben)"""
+        tiles = 1 << zoom
+        if not 0 <= zoom <= MAX_ZOOM:
+            raise ValueError(f"Zoomstufe {zoom} außerhalb von 0..{MAX_ZOOM}")
+        if not (0 <= tile[0] < tiles and 0 <= tile[1] < tiles):
+            raise ValueError(f"Kachel {tile} existiert bei Zoomstufe {zoom} nicht")
+        self._check_format(image_format)
+        name = f"{file_hash(gcode_file)}-{self._parameter_key()}-" \
+               f"L{layer}-z{zoom}-{tile[0]}-{tile[1]}.{image_format}"
+        return self._cached(name, lambda: self._encode(
+            self._draw_layer(gcode_file, layer, zoom, tile), image_format))
+
+    def thumbnail(self, gcode_file: str, size: int = DEFAULT_THUMBNAIL_SIZE,
+                  image_format: str = 'png') -> bytes:
+        """Gibt ein Übersichtsbild des ganzen Modells zurück"""
+        self._check_format(image_format)
+        name = f"{file_hash(gcode_file)}-{self._parameter_key()}-thumb{size}.{image_format}"
+        return self._cached(name, lambda: self._encode(
+            self._draw_thumbnail(gcode_file, size), image_format))
+
+    @staticmethod
+    def _check_format(image_format: str):
+        if image_format not in FORMATS:
+            raise ValueError(f"Unbekanntes Bildformat: {image_format}")
+
+    @staticmethod
+    def _encode(pixels: np.ndarray, image_format: str) -> bytes:
+        return encode_webp(pixels) if image_format == 'webp' else encode_png(pixels)
+
+    def _cached(self, name: str, render) -> bytes:
+        if not self.cache_dir:
+            return render()
+        path = self.cache_dir / name
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # Als zuletzt benutzt markieren
+            return data
+        except OSError:
+            pass
+
+        data = render()
+        with self._lock:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f"{name}.tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+                self._evict(keep=path)
+            except OSError as e:
+                print(f"Vorschau {name} kann nicht gespeichert werden: {e}")
+        return data
+
+    def _evict(self, keep: Optional[Path] = None):
+        """Entfernt die am längsten unbenutzten Bilder, bis das Limit passt"""
+        entries = []
+        total = 0
+        for path in self.cache_dir.iterdir():
+            if path.suffix[1:] not in FORMATS:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_cache_size:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+    def _draw_layer(self, gcode_file: str, layer: int, zoom: int,
+                    tile: Tuple[int, int]) -> np.ndarray:
+        index = LayerIndex.for_file(gcode_file)
+        start, end = index.layer_range(layer)
+        previous = index.layer_range(layer - 1)[0] if layer > 0 else start
+        with open(gcode_file, 'rb') as f:
+            # Vorspann für G90/M83 usw., vorheriger Layer für die Startposition
+            preamble = f.read(index.offsets[0])
+            f.seek(previous)
+            data = f.read(end - previous)
+
+        parser = _ToolpathParser()
+        parser.segments(preamble)
+        parser.position_known = layer <= 1
+        below = parser.segments(data[:start - previous])
+        current = parser.segments(data[start - previous:])
+
+        size = self.tile_size
+        scale = size * (1 << zoom) / max(self.bed_size)
+        # Bett-Koordinaten (Y nach hinten) in Pixel der Kachel (Y nach unten)
+        origin = (-tile[0] * size, self.bed_size[1] * scale - tile[1] * size)
+        pixels = np.full((size, size), BACKGROUND, dtype=np.uint8)
+        self._draw_grid(pixels, scale, origin)
+        radius = min(MAX_LINE_RADIUS, int(self.line_width * scale / 2))
+        self._draw_segments(pixels, below, scale, origin, PREVIOUS, radius)
+        self._draw_segments(pixels, current, scale, origin, CURRENT, radius)
+        return pixels
+
+    def _draw_thumbnail(self, gcode_file: str, size: int) -> np.ndarray:
+        index = LayerIndex.for_file(gcode_file)
+        # Erst in einem feineren Raster über das ganze Bett zeichnen, dann auf
+        # das Modell zuschneiden: ein Durchlauf, Speicher unabhängig von der Datei
+        canvas_size = 4 * size
+        scale = canvas_size / max(self.bed_size)
+        origin = (0.0, self.bed_size[1] * scale)
+        canvas = np.zeros((canvas_size, canvas_size), dtype=np.uint8)
+        parser = _ToolpathParser()
+        top = max(index.z) if len(index) else 0.0
+        with open(gcode_file, 'rb') as f:
+            parser.segments(f.read(index.offsets[0]) if len(index) else b"")
+            for layer in range(len(index)):
+                start, end = index.layer_range(layer)
+                f.seek(start)
+                level = int((HEIGHT_COLORS - 1) * index.z[layer] / top) if top > 0 else 0
+                self._draw_segments(canvas, parser.segments(f.read(end - start)), scale,
+                                    origin, 1 + level, 0)
+
+        pixels = np.full((size, size), BACKGROUND, dtype=np.uint8)
+        rows = np.flatnonzero(canvas.any(axis=1))
+        cols = np.flatnonzero(canvas.any(axis=0))
+        if not len(rows):
+            return pixels
+        # Quadratischer Ausschnitt um das Modell mit etwas Rand
+        extent = max(rows[-1] - rows[0], cols[-1] - cols[0]) + 1
+        extent = int(extent * 1.1) + 2
+        top_row = max(0, (rows[0] + rows[-1] - extent) // 2)
+        left_col = max(0, (cols[0] + cols[-1] - extent) // 2)
+        crop = canvas[top_row:top_row + extent, left_col:left_col + extent]
+        # Maximum je Block, damit dünne Linien beim Verkleinern erhalten bleiben
+        row_edges = np.linspace(0, crop.shape[0], size, endpoint=False).astype(int)
+        col_edges = np.linspace(0, crop.shape[1], size, endpoint=False).astype(int)
+        reduced = np.maximum.reduceat(np.maximum.reduceat(crop, row_edges, axis=0),
+                                      col_edges, axis=1)
+        drawn = reduced > 0
+        pixels[drawn] = reduced[drawn] + CURRENT
+        return pixels
+
+    def _draw_grid(self, pixels: np.ndarray, scale: float, origin: Tuple[float, float]):
+        """Zeichnet alle 10 mm eine Rasterlinie des Druckbetts"""
+        height, width = pixels.shape
+        for axis, length in ((0, self.bed_size[0]), (1, self.bed_size[1])):
+            for mm in np.arange(0.0, length + 1e-6, 10.0):
+                if axis == 0:
+                    column = int(origin[0] + mm * scale)
+                    if 0 <= column < width:
+                        pixels[:, column] = GRID
+                else:
+                    row = int(origin[1] - mm * scale)
+                    if 0 <= row < height:
+                        pixels[row, :] = GRID
+
+    @staticmethod
+    def _draw_segments(pixels: np.ndarray, segments: np.ndarray, scale: float,
+                       origin: Tuple[float, float], color: int, radius: int):
+        """Setzt alle Pixel der Strecken (in mm) in einem Schritt"""
+        if not len(segments):
+            return
+        height, width = pixels.shape
+        x0 = origin[0] + segments[:, 0] * scale
+        y0 = origin[1] - segments[:, 1] * scale
+        x1 = origin[0] + segments[:, 2] * scale
+        y1 = origin[1] - segments[:, 3] * scale
+        # Strecken außerhalb der Kachel gar nicht erst abtasten
+        visible = (np.maximum(x0, x1) >= -radius) & (np.minimum(x0, x1) < width + radius) & \
+                  (np.maximum(y0, y1) >= -radius) & (np.minimum(y0, y1) < height + radius)
+        x0, y0, x1, y1 = x0[visible], y0[visible], x1[visible], y1[visible]
+        if not len(x0):
+            return
+
+        steps = np.ceil(np.maximum(np.abs(x1 - x0), np.abs(y1 - y0))).astype(np.int64) + 1
+        segment = np.repeat(np.arange(len(steps)), steps)
+        first = np.cumsum(steps) - steps
+        t = (np.arange(len(segment)) - first[segment]) / np.maximum(steps - 1, 1)[segment]
+        xs = np.floor(x0[segment] + (x1 - x0)[segment] * t).astype(np.int64)
+        ys = np.floor(y0[segment] + (y1 - y0)[segment] * t).astype(np.int64)
+
+        for dy in range(-radius, radius + 1):
+            for dx in range(-radius, radius + 1):
+                if dx * dx + dy * dy > radius * radius:
+                    continue
+                px, py = xs + dx, ys + dy
+                inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+                pixels[py[inside], px[inside]] = color
@@ -0,0 +1,107 @@
+import mmap
+import os
+from typing import Iterator, Optional, Tuple
+
+# Leerraum am Zeilenrand (als Bytewerte, da mmap-Indizes ints liefern)
+_WHITESPACE = frozenset(b" \t\r\x00")
+
+
+class GCodeFileReader:
+    """Liest G-Code-Dateien per mmap, ohne sie in den Speicher zu laden.
+
+    Liefert jede Befehlszeile als ``memoryview`` auf die gemappte Datei:
+    Kommentare (``;``), Leerzeilen und Leerraum werden beim Lesen entfernt,
+    ohne Zeilen zu dekodieren oder zu kopieren. Das Betriebssystem lädt nur
+    die gerade gelesenen Seiten; über ``seek`` kann an einem beliebigen
+    Byte-Offset weitergelesen werden (Fortsetzen nach Pause).
+
+    Die gelieferten Views sind nur gültig, bis der Reader geschlossen wird.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        if self.size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self._mmap, 'madvise'):
+                self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+            self._view = memoryview(self._mmap)
+        self.offset = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __iter__(self) -> Iterator[memoryview]:
+        for _, line in self.lines():
+            yield line
+
+    @property
+    def progress(self) -> float:
+        """Gelesener Anteil der Datei in Prozent"""
+        if not self.size:
+            return 100.0
+        return self.offset * 100.0 / self.size
+
+    def tell(self) -> int:
+        """Byte-Offset der nächsten zu lesenden Zeile"""
+        return self.offset
+
+    def seek(self, offset: int) -> int:
+        """Setzt das Lesen an einem Byte-Offset fort.
+
+        Liegt der Offset mitten in einer Zeile, wird am Anfang der nächsten
+        Zeile weitergelesen. Gibt den tatsächlichen Offset zurück.
+        """
+        offset = max(0, min(offset, self.size))
+        if 0 < offset < self.size and self._mmap[offset - 1] != 0x0A:
+            end = self._mmap.find(b"\n", offset)
+            offset = self.size if end < 0 else end + 1
+        self.offset = offset
+        return offset
+
+    def lines(self) -> Iterator[Tuple[int, memoryview]]:
+        """Liefert (Byte-Offset des Zeilenanfangs, Befehl) ab der aktuellen Position"""
+        mm = self._mmap
+        view = self._view
+        size = self.size
+        pos = self.offset
+
+        while pos < size:
+            end = mm.find(b"\n", pos)
+            if end < 0:
+                end = size
+            next_pos = end + 1
+
+            stop = mm.find(b";", pos, end)
+            if stop < 0:
+                stop = end
+            start = pos
+            while start < stop and mm[start] in _WHITESPACE:
+                start += 1
+            while stop > start and mm[stop - 1] in _WHITESPACE:
+                stop -= 1
+
+            self.offset = min(next_pos, size)
+            if start < stop:
+                yield pos, view[start:stop]
+            pos = next_pos
+
+    def close(self):
+        """Gibt die Speicherabbildung und die Datei frei"""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Noch referenzierte Zeilen-Views; die Abbildung wird mit ihnen freigegeben
+                pass
+            self._mmap = None
+        self._file.close()
@@ -0,0 +1,291 @@
+import array
+import asyncio
+import fcntl
+import os
+import termios
+import threading
+from typing import Callable, Dict, Optional, Union
+
+# Asynchroner Transport für alle seriellen Ports: eine Event-Loop in einem
+# Thread bedient sämtliche Drucker über nicht-blockierende Dateideskriptoren.
+
+READ_CHUNK_SIZE = 4096
+MAX_LINE_QUEUE = 1024
+
+
+# Linux-spezifisch: termios2 für Baudraten ohne B-Konstante (z.B. 250000)
+TCGETS2 = 0x802C542A
+TCSETS2 = 0x402C542B
+BOTHER = 0o010000
+
+
+def set_baudrate(fd: int, baudrate: int):
+    """Setzt die Baudrate eines geöffneten Ports, auch für Nicht-Standardwerte"""
+    speed = getattr(termios, f"B{baudrate}", None)
+    if speed is not None:
+        attrs = termios.tcgetattr(fd)
+        attrs[4] = attrs[5] = speed
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+        return
+
+    try:
+        buf = array.array('i', [0] * 64)
+        fcntl.ioctl(fd, TCGETS2, buf)
+        buf[2] &= ~termios.CBAUD
+        buf[2] |= BOTHER
+        buf[9] = buf[10] = baudrate
+        fcntl.ioctl(fd, TCSETS2, buf)
+    except (OSError, AttributeError):
+        raise ValueError(f"Baudrate {baudrate} wird nicht unterstützt")
+
+
+def open_serial_fd(port: str, baudrate: int) -> int:
+    """Öffnet einen seriellen Port nicht-blockierend im Raw-Modus"""
+    fd = os.open(port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    try:
+        iflag, oflag, cflag, lflag, ispeed, ospeed, cc = termios.tcgetattr(fd)
+        iflag &= ~(termios.IGNBRK | termios.BRKINT | termios.PARMRK | termios.ISTRIP
+                   | termios.INLCR | termios.IGNCR | termios.ICRNL | termios.IXON
+                   | termios.IXOFF)
+        oflag &= ~termios.OPOST
+        lflag &= ~(termios.ECHO | termios.ECHONL | termios.ICANON | termios.ISIG
+                   | termios.IEXTEN)
+        cflag &= ~(termios.CSIZE | termios.PARENB | termios.CSTOPB)
+        cflag |= termios.CS8 | termios.CREAD | termios.CLOCAL
+        cc[termios.VMIN] = 0
+        cc[termios.VTIME] = 0
+        termios.tcsetattr(fd, termios.TCSANOW,
+                          [iflag, oflag, cflag, lflag, ispeed, ospeed, cc])
+        set_baudrate(fd, baudrate)
+        termios.tcflush(fd, termios.TCIOFLUSH)
+    except termios.error:
+        # Pseudo-Terminals und Testgeräte kennen nicht alle Attribute
+        pass
+    except Exception:
+        os.close(fd)
+        raise
+    return fd
+
+
+class AsyncSerialTransport:
+    """Zeilenbasierter, nicht-blockierender Transport für einen seriellen Port"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, port: str, fd: int):
+        self.loop = loop
+        self.port = port
+        self.fd = fd
+        self.closed = False
+        self._rx_buffer = bytearray()
+        self._tx_buffer = bytearray()
+        self._lines: asyncio.Queue = asyncio.Queue(MAX_LINE_QUEUE)
+        # Gibt True zurück, wenn eine Zeile (z.B. Statusmeldung) verbraucht wurde
+        self.line_filter: Optional[Callable[[bytes], bool]] = None
+        self._drained = asyncio.Event()
+        self._drained.set()
+        loop.add_reader(fd, self._on_readable)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, READ_CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._fail()
+            return
+        if not data:
+            # EOF: Gerät getrennt (z.B. USB abgezogen). Bliebe der Deskriptor
+            # registriert, meldete die Loop ihn endlos als lesbar.
+            self._fail()
+            return
+
+        self._rx_buffer += data
+        while True:
+            end = self._rx_buffer.find(b"\n")
+            if end < 0:
+                break
+            line = bytes(self._rx_buffer[:end + 1])
+            del self._rx_buffer[:end + 1]
+            if self.line_filter is not None and self.line_filter(line):
+                continue
+            if self._lines.full():
+                # Älteste Zeile verwerfen statt die Loop zu blockieren
+                self._lines.get_nowait()
+            self._lines.put_nowait(line)
+
+    def _on_writable(self):
+        try:
+            written = os.write(self.fd, self._tx_buffer)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._fail()
+            return
+        del self._tx_buffer[:written]
+        if not self._tx_buffer:
+            self.loop.remove_writer(self.fd)
+            self._drained.set()
+
+    def _fail(self):
+        self.close()
+        self._drained.set()
+        if self._lines.full():
+            self._lines.get_nowait()
+        self._lines.put_nowait(b"")
+
+    async def send(self, data: Union[str, bytes]):
+        """Schreibt Daten; wartet nur, wenn der Kernel-Puffer voll ist"""
+        if self.closed:
+            raise OSError(f"Port {self.port} ist geschlossen")
+        if isinstance(data, str):
+            data = data.encode()
+
+        if not self._tx_buffer:
+            try:
+                written = os.write(self.fd, data)
+            except BlockingIOError:
+                written = 0
+            data = data[written:]
+            if not data:
+                return
+            self._drained.clear()
+            self.loop.add_writer(self.fd, self._on_writable)
+        self._tx_buffer += data
+        await self._drained.wait()
+        if self.closed:
+            raise OSError(f"Port {self.port} ist geschlossen")
+
+    async def receive(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Liefert die nächste vollständige Zeile oder None bei Timeout"""
+        try:
+            line = await asyncio.wait_for(self._lines.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if not line and self.closed:
+            raise OSError(f"Port {self.port} ist geschlossen")
+        return line
+
+    def close(self):
+        """Schließt den Port und meldet ihn bei der Event-Loop ab"""
+        if self.closed:
+            return
+        self.closed = True
+        self.loop.remove_reader(self.fd)
+        self.loop.remove_writer(self.fd)
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class TransportLoop:
+    """Eine Event-Loop in einem Hintergrund-Thread für alle seriellen Ports"""
+
+    _default: Optional["TransportLoop"] = None
+    _default_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.transports: Dict[str, AsyncSerialTransport] = {}
+        self._lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="TransportLoop", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def get_default(cls) -> "TransportLoop":
+        """Gibt die gemeinsame Transport-Loop des Prozesses zurück"""
+        with cls._default_lock:
+            if cls._default is None or not cls._default.thread.is_alive():
+                cls._default = cls()
+            return cls._default
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Führt eine Coroutine auf der Loop aus und wartet auf das Ergebnis"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def open(self, port: str, baudrate: int = 115200) -> AsyncSerialTransport:
+        """Öffnet einen Port oder gibt den bereits geöffneten Transport zurück"""
+        with self._lock:
+            transport = self.transports.get(port)
+            if transport and not transport.closed:
+                return transport
+
+            async def _open():
+                fd = open_serial_fd(port, baudrate)
+                return AsyncSerialTransport(self.loop, port, fd)
+
+            transport = self.run(_open())
+            self.transports[port] = transport
+            return transport
+
+    def adopt(self, port: str, fd: int) -> AsyncSerialTransport:
+        """Übernimmt einen bereits geöffneten Port (z.B. vom Port-Scanner)"""
+        with self._lock:
+            old = self.transports.get(port)
+            if old and not old.closed:
+                self.loop.call_soon_threadsafe(old.close)
+
+            async def _adopt():
+                return AsyncSerialTransport(self.loop, port, fd)
+
+            transport = self.run(_adopt())
+            self.transports[port] = transport
+            return transport
+
+    def close(self, port: str):
+        """Schließt einen einzelnen Port"""
+        with self._lock:
+            transport = self.transports.pop(port, None)
+        if transport:
+            self.loop.call_soon_threadsafe(transport.close)
+
+    def stop(self):
+        """Schließt alle Ports und beendet die Loop"""
+        with self._lock:
+            transports = list(self.transports.values())
+            self.transports.clear()
+        for transport in transports:
+            self.loop.call_soon_threadsafe(transport.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+class SyncSerialFacade:
+    """Synchrone, zu ``serial.Serial`` kompatible Sicht auf einen Async-Transport
+
+    Bietet ``write``, ``readline`` und ``close``, damit bestehender Code
+    (``GCodeStreamer``, ``PrinterDevice``, ``PrinterManager``) ohne Änderungen
+    über die gemeinsame Event-Loop kommunizieren kann.
+    """
+
+    def __init__(self, transport_loop: TransportLoop, transport: AsyncSerialTransport,
+                 timeout: Optional[float] = 2.0):
+        self.transport_loop = transport_loop
+        self.transport = transport
+        self.port = transport.port
+        self.timeout = timeout
+
+    @classmethod
+    def open(cls, port: str, baudrate: int = 115200, timeout: Optional[float] = 2.0,
+             transport_loop: Optional[TransportLoop] = None) -> "SyncSerialFacade":
+        """Öffnet einen Port auf der (gemeinsamen) Transport-Loop"""
+        transport_loop = transport_loop or TransportLoop.get_default()
+        return cls(transport_loop, transport_loop.open(port, baudrate), timeout)
+
+    @property
+    def is_open(self) -> bool:
+        return not self.transport.closed
+
+    def write(self, data: bytes) -> int:
+        self.transport_loop.run(self.transport.send(data))
+        return len(data)
+
+    def readline(self) -> bytes:
+        line = self.transport_loop.run(self.transport.receive(self.timeout))
+        return line or b""
+
+    def close(self):
+        self.transport_loop.close(self.port)
@@ -0,0 +1,257 @@
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Iterable, Iterator, Optional, Tuple, Union
+
+# Marlin-Standardwerte: RX_BUFFER_SIZE = 128 Bytes, BUFSIZE = 4 Befehle
+DEFAULT_RX_BUFFER_SIZE = 128
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_HISTORY_SIZE = 256
+
+
+class StreamError(Exception):
+    """Fehler beim Streamen von G-Code (Timeout, Firmware-Abbruch, ...)"""
+
+
+def gcode_checksum(data: bytes) -> int:
+    """Berechnet die XOR-Prüfsumme einer G-Code-Zeile"""
+    checksum = 0
+    for byte in data:
+        checksum ^= byte
+    return checksum
+
+
+class GCodeStreamer:
+    """Streamt G-Code mit mehreren Zeilen gleichzeitig im Empfangspuffer der Firmware.
+
+    Statt nach jeder Zeile auf das ``ok`` zu warten, werden so viele Zeilen
+    gesendet, wie in den RX-Puffer der Firmware passen (Zeichenzählung). Jedes
+    ``ok`` gibt den Platz der ältesten Zeile wieder frei. Optional werden
+    Zeilennummern und Prüfsummen angehängt, ``Resend:``-Anfragen werden aus der
+    Historie bedient.
+
+    ``connection`` muss ``write(bytes)`` und ``readline() -> bytes`` anbieten
+    (z.B. ``serial.Serial``); ``readline`` liefert bei Timeout ``b""``.
+    """
+
+    def __init__(self, connection, rx_buffer_size: int = DEFAULT_RX_BUFFER_SIZE,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 line_numbers: bool = True, checksums: bool = True,
+                 history_size: int = DEFAULT_HISTORY_SIZE,
+                 on_message: Optional[Callable[[str], None]] = None):
+        self.connection = connection
+        self.rx_buffer_size = rx_buffer_size
+        self.max_in_flight = max_in_flight
+        self.line_numbers = line_numbers
+        self.checksums = checksums and line_numbers
+        self.history_size = history_size
+        self.on_message = on_message
+
+        self._next_line = 1
+        # (Zeilennummer, Bytes) für jede gesendete, noch nicht quittierte Zeile
+        self._in_flight: Deque[Tuple[int, int]] = deque()
+        self._in_flight_bytes = 0
+        self._history: "OrderedDict[int, bytes]" = OrderedDict()
+        self._resend_queue: Deque[int] = deque()
+        self._resend_target: Optional[int] = None
+        self._stale_lines = 0
+        self._pending: Optional[Tuple[int, bytes]] = None
+        # Nummer der letzten von der Firmware angenommenen Zeile
+        self.acked_line = 0
+        # ok-Meldungen, die nach einem Resend keine Zeile bestätigen
+        self._unconfirmed_acks = 0
+
+        self.lines_sent = 0
+        self.lines_acked = 0
+        self.resends = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Anzahl gesendeter, noch nicht quittierter Zeilen"""
+        return len(self._in_flight)
+
+    @property
+    def idle(self) -> bool:
+        """True, wenn keine Zeile mehr auf ein ``ok`` wartet"""
+        return not self._in_flight and not self._resend_queue
+
+    def reset_line_numbers(self):
+        """Setzt die Zeilennummerierung der Firmware zurück (M110)"""
+        self._write(0, b"M110 N0\n")
+        self._next_line = 1
+        self._history.clear()
+        self._resend_queue.clear()
+        self._resend_target = None
+        self._stale_lines = 0
+        self._unconfirmed_acks = 0
+
+    def _encode(self, line_number: int, command: bytes,
+                command_checksum: Optional[int] = None) -> bytes:
+        """Baut die zu sendende Zeile inkl. Nummer und Prüfsumme"""
+        if not self.line_numbers:
+            return command + b"\n"
+        payload = b"N%d %s" % (line_number, command)
+        if not self.checksums:
+            return payload + b"\n"
+        if command_checksum is None:
+            checksum = gcode_checksum(payload)
+        else:
+            # XOR ist assoziativ: Präfix und Befehl getrennt verrechnen
+            checksum = gcode_checksum(b"N%d " % line_number) ^ command_checksum
+        return b"%s*%d\n" % (payload, checksum)
+
+    def _fits(self, size: int) -> bool:
+        if not self._in_flight:
+            return True
+        return (len(self._in_flight) < self.max_in_flight
+                and self._in_flight_bytes + size <= self.rx_buffer_size)
+
+    def _write(self, line_number: int, data: bytes):
+        self.connection.write(data)
+        self._in_flight.append((line_number, len(data)))
+        self._in_flight_bytes += len(data)
+        self.lines_sent += 1
+
+    def _remember(self, line_number: int, data: bytes):
+        self._history[line_number] = data
+        while len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+
+    def _pump_resends(self) -> bool:
+        """Sendet angeforderte Wiederholungen; False, wenn das Fenster voll ist"""
+        while self._resend_queue:
+            line_number = self._resend_queue[0]
+            data = self._history[line_number]
+            if not self._fits(len(data)):
+                return False
+            self._resend_queue.popleft()
+            self._write(line_number, data)
+        return True
+
+    def fill(self, commands: Iterator) -> bool:
+        """Füllt das Sendefenster aus ``commands``.
+
+        Gibt False zurück, sobald ``commands`` erschöpft ist.
+        """
+        if not self._pump_resends():
+            return True
+        while True:
+            pending = self._pending
+            if pending is None:
+                try:
+                    pending = self._prepare(next(commands))
+                except StopIteration:
+                    return False
+                if pending is None:
+                    continue
+                self._pending = pending
+            line_number, data = pending
+            if not self._fits(len(data)):
+                return True
+            self._pending = None
+            if self.line_numbers:
+                self._remember(line_number, data)
+            self._write(line_number, data)
+
+    def _prepare(self, item: Union[str, bytes, Tuple[bytes, int]]) -> Optional[Tuple[int, bytes]]:
+        """Normalisiert einen Befehl und vergibt die Zeilennummer"""
+        command_checksum = None
+        if isinstance(item, tuple):
+            command, command_checksum = item
+        elif isinstance(item, str):
+            command = item.split(";", 1)[0].strip().encode()
+        else:
+            command = bytes(item).split(b";", 1)[0].strip()
+        if not command:
+            return None
+        line_number = self._next_line
+        self._next_line += 1
+        return line_number, self._encode(line_number, command, command_checksum)
+
+    def handle_response(self, line: str):
+        """Verarbeitet eine Antwortzeile der Firmware"""
+        if line.startswith("ok"):
+            self._acknowledge()
+            if len(line) > 2 and self.on_message:
+                self.on_message(line)
+        elif line.startswith("Resend:") or line.startswith("rs ") or line == "rs":
+            self._handle_resend(line)
+        elif line.startswith("!!") or line.startswith("Error:Printer halted"):
+            raise StreamError(f"Firmware angehalten: {line}")
+        elif self.on_message:
+            self.on_message(line)
+
+    def _acknowledge(self):
+        if not self._in_flight:
+            return
+        line_number, size = self._in_flight.popleft()
+        self._in_flight_bytes -= size
+        self.lines_acked += 1
+        if self._unconfirmed_acks:
+            self._unconfirmed_acks -= 1
+        else:
+            self.acked_line = line_number
+
+    def _handle_resend(self, line: str):
+        tokens = line.split(":", 1)[-1].split()
+        digits = "".join(c for c in tokens[-1] if c.isdigit()) if tokens else ""
+        if not digits:
+            # Gestörte Zeile ohne Nummer: kein Grund, den Druck abzubrechen
+            print(f"Resend ohne Zeilennummer ignoriert: {line!r}")
+            return
+        if not self.line_numbers:
+            return
+        line_number = int(digits)
+
+        # Nach einem Fehler verwirft die Firmware alle bereits gepufferten
+        # Folgezeilen und fordert für jede erneut dieselbe Zeile an.
+        if line_number == self._resend_target and self._stale_lines > 0:
+            self._stale_lines -= 1
+            return
+        if line_number not in self._history:
+            raise StreamError(f"Zeile {line_number} nicht mehr in der Historie")
+
+        self.resends += 1
+        self._resend_target = line_number
+        self._stale_lines = max(len(self._in_flight) - 1, 0)
+        # Die oks aller bis hierher gesendeten Zeilen bestätigen nichts mehr
+        self._unconfirmed_acks = len(self._in_flight)
+        last_sent = next(reversed(self._history))
+        self._resend_queue = deque(range(line_number, last_sent + 1))
+
+    def stream(self, commands: Iterable, ack_timeout: float = 30.0,
+               on_progress: Optional[Callable[[int], None]] = None):
+        """Streamt alle Befehle und wartet, bis jede Zeile quittiert ist.
+
+        ``ack_timeout`` gilt ab der letzten empfangenen Zeile; ``busy:``-Meldungen
+        der Firmware verlängern ihn also automatisch. ``on_progress`` erhält die
+        Anzahl der Befehle aus ``commands``, die die Firmware angenommen hat.
+        """
+        commands = iter(commands)
+        self._pending = None
+        first_line = self._next_line
+        confirmed = 0
+        remaining = True
+        last_activity = time.monotonic()
+
+        while True:
+            if remaining:
+                remaining = self.fill(commands)
+            else:
+                self._pump_resends()
+            if not remaining and self.idle and self._pending is None:
+                return
+
+            raw = self.connection.readline()
+            if not raw:
+                if time.monotonic() - last_activity > ack_timeout:
+                    raise StreamError(
+                        f"Keine Antwort seit {ack_timeout}s "
+                        f"({len(self._in_flight)} Zeilen ausstehend)"
+                    )
+                continue
+
+            last_activity = time.monotonic()
+            self.handle_response(raw.decode(errors="replace").strip())
+            if on_progress and self.acked_line - first_line + 1 > confirmed:
+                confirmed = self.acked_line - first_line + 1
+                on_progress(confirmed)
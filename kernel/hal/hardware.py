@@ -1,13 +1,27 @@
+import os
 import serial
 import time
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterable, Callable
+from kernel.hal.async_transport import (
+    TransportLoop, SyncSerialFacade, AsyncSerialTransport
+)
+from kernel.hal.port_scanner import PortScanner, PortInfo
+from kernel.hal.gcode_streamer import (
+    GCodeStreamer, StreamError, DEFAULT_RX_BUFFER_SIZE, DEFAULT_MAX_IN_FLIGHT
+)
+from kernel.hal.telemetry_parser import TelemetryParser
 
 class HardwareAbstractionLayer:
     """Hardware Abstraction Layer für verschiedene Drucker-Typen"""
     
-    def __init__(self):
+    def __init__(self, transport_loop: Optional[TransportLoop] = None):
+        # Mit transport_loop laufen alle Ports über eine gemeinsame Event-Loop
+        self.transport_loop = transport_loop
         self.connected_ports: Dict[str, serial.Serial] = {}
         self.printer_configs: Dict[str, Dict] = {}
+        self.streamers: Dict[str, GCodeStreamer] = {}
+        self.detected_ports: Dict[str, PortInfo] = {}
+        self.telemetry: Dict[str, TelemetryParser] = {}
         
     def initialize(self):
         """Initialisiert die Hardware-Erkennung"""
@@ -16,25 +30,111 @@ class HardwareAbstractionLayer:
         
     def _scan_serial_ports(self):
         """Scannt nach verfügbaren seriellen Ports"""
-        # TODO: Implementiere Port-Scanning
-        pass
+        # Mit Transport-Loop bleiben erkannte Ports offen, damit
+        # connect_printer keinen zweiten Arduino-Reset auslöst
+        scanner = PortScanner()
+        self.detected_ports = scanner.scan(keep_open=self.transport_loop is not None)
+        for port, info in self.detected_ports.items():
+            self.printer_configs.setdefault(port, {}).update({
+                'baudrate': info.baudrate,
+                'firmware': info.firmware,
+                'usb_serial': info.usb_serial,
+                'capabilities': info.capabilities
+            })
         
     def _load_printer_configs(self):
         """Lädt Drucker-Konfigurationen"""
         # TODO: Lade Konfigurationen aus Dateisystem
         pass
         
-    def connect_printer(self, port: str, baudrate: int = 115200) -> Optional[serial.Serial]:
+    def connect_printer(self, port: str, baudrate: Optional[int] = None) -> Optional[serial.Serial]:
         """Verbindet einen Drucker über den seriellen Port"""
+        baudrate = baudrate or self.printer_configs.get(port, {}).get('baudrate', 115200)
+        info = self.detected_ports.get(port)
         try:
-            conn = serial.Serial(port, baudrate, timeout=2)
+            if self.transport_loop and info and info.fd is not None and info.baudrate == baudrate:
+                # Port ist vom Scan noch offen und die Firmware bereits bereit
+                transport = self.transport_loop.adopt(port, info.fd)
+                info.fd = None
+                conn = SyncSerialFacade(self.transport_loop, transport, timeout=2)
+                self.connected_ports[port] = conn
+                return conn
+            if self.transport_loop:
+                conn = SyncSerialFacade.open(
+                    port, baudrate, timeout=2, transport_loop=self.transport_loop
+                )
+            else:
+                conn = serial.Serial(port, baudrate, timeout=2)
             time.sleep(2)  # Warte auf Arduino Reset
             self.connected_ports[port] = conn
             return conn
-        except serial.SerialException as e:
+        except (serial.SerialException, OSError, ValueError) as e:
             print(f"Fehler beim Verbinden mit Port {port}: {e}")
             return None
             
+    def get_transport(self, port: str) -> Optional[AsyncSerialTransport]:
+        """Gibt den Async-Transport eines Ports für Coroutinen zurück"""
+        conn = self.connected_ports.get(port)
+        if isinstance(conn, SyncSerialFacade):
+            return conn.transport
+        return None
+            
+    def attach_telemetry(self, port: str, device) -> TelemetryParser:
+        """Leitet Statusmeldungen eines Ports an ein Drucker-Objekt weiter
+        
+        Beim Async-Transport werden die Meldungen direkt im Empfangspfad
+        herausgefiltert, auch wenn gerade kein Befehl auf eine Antwort wartet.
+        Beim Streamen laufen sie zusätzlich über ``on_message`` des Streamers.
+        """
+        parser = TelemetryParser(device)
+        self.telemetry[port] = parser
+        transport = self.get_transport(port)
+        if transport:
+            transport.line_filter = parser.feed
+        if port in self.streamers:
+            self.streamers[port].on_message = parser.feed
+        return parser
+        
+    def enable_auto_report(self, port: str, interval: int = 1, timeout: float = 2.0) -> bool:
+        """Schaltet die automatischen Temperatur- (M155) und Positionsmeldungen (M154) ein
+        
+        Muss vor dem Streamen aufgerufen werden, da die ``ok`` hier direkt
+        gelesen werden und nicht über den Streamer laufen.
+        """
+        conn = self.connected_ports.get(port)
+        if conn is None:
+            return False
+        capabilities = self.printer_configs.get(port, {}).get('capabilities') or {}
+        commands = []
+        # Ohne bekannte Fähigkeiten (kein Scan) einfach versuchen
+        if capabilities.get('AUTOREPORT_TEMP', not capabilities):
+            commands.append(f"M155 S{interval}")
+        if capabilities.get('AUTOREPORT_POS'):
+            commands.append(f"M154 S{interval}")
+        try:
+            for command in commands:
+                conn.write(f"{command}\n".encode())
+                if not self._wait_for_ok(port, conn, timeout):
+                    print(f"Keine Antwort auf {command} an Port {port}")
+                    return False
+            return bool(commands)
+        except (serial.SerialException, OSError) as e:
+            print(f"Fehler beim Aktivieren der Statusmeldungen an Port {port}: {e}")
+            return False
+            
+    def _wait_for_ok(self, port: str, conn, timeout: float) -> bool:
+        parser = self.telemetry.get(port)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            line = conn.readline()
+            if not line:
+                continue
+            if line.startswith(b"ok"):
+                return True
+            if parser:
+                parser.feed(line)
+        return False
+            
     def send_gcode(self, port: str, command: str) -> bool:
         """Sendet G-Code an einen Drucker"""
         if port not in self.connected_ports:
@@ -44,7 +144,7 @@ class HardwareAbstractionLayer:
         try:
             conn.write(f"{command}\n".encode())
             return True
-        except serial.SerialException:
+        except (serial.SerialException, OSError):
             return False
             
     def read_response(self, port: str) -> Optional[str]:
@@ -55,14 +155,55 @@ class HardwareAbstractionLayer:
         conn = self.connected_ports[port]
         try:
             return conn.readline().decode().strip()
-        except serial.SerialException:
+        except (serial.SerialException, OSError):
             return None
             
+    def get_streamer(self, port: str) -> Optional[GCodeStreamer]:
+        """Gibt den G-Code-Streamer eines verbundenen Ports zurück"""
+        if port not in self.connected_ports:
+            return None
+            
+        if port not in self.streamers:
+            config = self.printer_configs.get(port, {})
+            self.streamers[port] = GCodeStreamer(
+                self.connected_ports[port],
+                rx_buffer_size=config.get('rx_buffer_size', DEFAULT_RX_BUFFER_SIZE),
+                max_in_flight=config.get('max_in_flight', DEFAULT_MAX_IN_FLIGHT),
+                line_numbers=config.get('line_numbers', True),
+                checksums=config.get('checksums', True),
+                on_message=self.telemetry[port].feed if port in self.telemetry else None
+            )
+            self.streamers[port].reset_line_numbers()
+        return self.streamers[port]
+        
+    def stream_gcode(self, port: str, commands: Iterable,
+                     on_progress: Optional[Callable[[int], None]] = None) -> bool:
+        """Streamt G-Code mit mehreren Zeilen im Firmware-Puffer"""
+        streamer = self.get_streamer(port)
+        if not streamer:
+            return False
+            
+        try:
+            streamer.stream(commands, on_progress=on_progress)
+            return True
+        except (StreamError, serial.SerialException, OSError) as e:
+            print(f"Fehler beim Streamen an Port {port}: {e}")
+            return False
+            
     def cleanup(self):
         """Bereinigt alle Verbindungen"""
         for conn in self.connected_ports.values():
             try:
                 conn.close()
-            except serial.SerialException:
+            except (serial.SerialException, OSError):
                 pass
         self.connected_ports.clear()
+        self.streamers.clear()
+        self.telemetry.clear()
+        for info in self.detected_ports.values():
+            if info.fd is not None:
+                try:
+                    os.close(info.fd)
+                except OSError:
+                    pass
+                info.fd = None
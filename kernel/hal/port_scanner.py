@@ -0,0 +1,227 @@
+import glob
+import json
+import os
+import select
+import termios
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from kernel.hal.async_transport import open_serial_fd, set_baudrate
+
+DEFAULT_PORT_PATTERNS = ["/dev/ttyUSB*", "/dev/ttyACM*", "/dev/ttyAMA*"]
+# Häufigste Marlin/Klipper/RepRap-Baudraten zuerst
+BAUDRATE_ORDER = [115200, 250000, 230400, 57600, 38400, 19200, 9600]
+CACHE_FILE = Path("/var/lib/innovate/port_cache.json")
+
+
+@dataclass
+class PortInfo:
+    port: str
+    baudrate: int
+    firmware: str
+    usb_serial: Optional[str] = None
+    capabilities: Dict[str, bool] = field(default_factory=dict)
+    # Offener Deskriptor, falls der Port für connect_printer offen bleibt
+    fd: Optional[int] = field(default=None, repr=False, compare=False)
+
+
+class PortScanner:
+    """Erkennt Drucker an seriellen Ports parallel per M115.
+
+    Alle Ports werden gleichzeitig geprüft. Jeder Port wird nur einmal
+    geöffnet (ein Arduino-Reset); weitere Baudraten werden per termios
+    umgeschaltet. Das Ergebnis wird pro USB-Seriennummer zwischengespeichert,
+    sodass beim nächsten Start die bekannte Baudrate zuerst versucht wird.
+    """
+
+    def __init__(self, patterns: Optional[List[str]] = None,
+                 cache_file: Optional[Path] = CACHE_FILE,
+                 boot_timeout: float = 3.0, baud_timeout: float = 0.5,
+                 query_interval: float = 0.25, max_workers: int = 16):
+        self.patterns = patterns or DEFAULT_PORT_PATTERNS
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.boot_timeout = boot_timeout
+        self.baud_timeout = baud_timeout
+        self.query_interval = query_interval
+        self.max_workers = max_workers
+        self.cache: Dict[str, Dict] = self._load_cache()
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        """Lädt die Port-Erkennung des letzten Starts"""
+        if not self.cache_file:
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        """Speichert den Cache atomar"""
+        if not self.cache_file:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(self.cache, f, indent=4)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"Fehler beim Speichern des Port-Caches: {e}")
+
+    def candidate_ports(self) -> List[str]:
+        """Listet alle in Frage kommenden Ports"""
+        ports = set()
+        for pattern in self.patterns:
+            ports.update(glob.glob(pattern))
+        return sorted(ports)
+
+    @staticmethod
+    def usb_serial_number(port: str) -> Optional[str]:
+        """Liest die USB-Seriennummer eines Ports aus sysfs"""
+        device = Path("/sys/class/tty") / os.path.basename(port) / "device"
+        try:
+            path = device.resolve()
+        except OSError:
+            return None
+        # Vom Interface bis zum USB-Gerät aufsteigen
+        for parent in [path, *path.parents]:
+            serial_file = parent / "serial"
+            if (parent / "idVendor").exists() and serial_file.exists():
+                try:
+                    return serial_file.read_text().strip() or None
+                except OSError:
+                    return None
+        return None
+
+    def _baudrates_for(self, key: str) -> List[int]:
+        cached = self.cache.get(key, {}).get('baudrate')
+        if cached:
+            return [cached] + [b for b in BAUDRATE_ORDER if b != cached]
+        return list(BAUDRATE_ORDER)
+
+    def scan(self, ports: Optional[List[str]] = None,
+             keep_open: bool = False) -> Dict[str, PortInfo]:
+        """Prüft alle Ports parallel und gibt die erkannten Drucker zurück"""
+        ports = ports if ports is not None else self.candidate_ports()
+        if not ports:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(ports))) as pool:
+            results = list(pool.map(lambda p: self.probe(p, keep_open), ports))
+
+        detected = {}
+        changed = False
+        for info in results:
+            if info is None:
+                continue
+            detected[info.port] = info
+            entry = {
+                'port': info.port,
+                'baudrate': info.baudrate,
+                'firmware': info.firmware,
+                'capabilities': info.capabilities
+            }
+            key = info.usb_serial or info.port
+            if self.cache.get(key) != entry:
+                self.cache[key] = entry
+                changed = True
+        if changed:
+            self._save_cache()
+        return detected
+
+    def probe(self, port: str, keep_open: bool = False) -> Optional[PortInfo]:
+        """Erkennt Baudrate und Firmware an einem einzelnen Port"""
+        usb_serial = self.usb_serial_number(port)
+        baudrates = self._baudrates_for(usb_serial or port)
+        try:
+            fd = open_serial_fd(port, baudrates[0])
+        except (OSError, ValueError):
+            return None
+
+        try:
+            for index, baudrate in enumerate(baudrates):
+                if index:
+                    try:
+                        set_baudrate(fd, baudrate)
+                        termios.tcflush(fd, termios.TCIOFLUSH)
+                    except (ValueError, termios.error):
+                        continue
+                # Nur der erste Versuch muss den Reset des Boards abwarten
+                timeout = self.boot_timeout if index == 0 else self.baud_timeout
+                result = self._query_firmware(fd, timeout)
+                if result is None:
+                    continue
+
+                firmware, capabilities = result
+                self._drain(fd)
+                info = PortInfo(port, baudrate, firmware, usb_serial, capabilities)
+                if keep_open:
+                    info.fd = fd
+                    fd = None
+                return info
+            return None
+        except OSError:
+            return None
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _query_firmware(self, fd: int, timeout: float) -> Optional[Tuple[str, Dict[str, bool]]]:
+        """Sendet M115 wiederholt, bis eine gültige Antwort kommt"""
+        deadline = time.monotonic() + timeout
+        next_query = 0.0
+        buffer = bytearray()
+        firmware = None
+        capabilities: Dict[str, bool] = {}
+
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                return None
+            if firmware is None and now >= next_query:
+                os.write(fd, b"M115\n")
+                next_query = now + self.query_interval
+
+            wait = min(deadline, next_query) - now if firmware is None else deadline - now
+            readable, _, _ = select.select([fd], [], [], max(wait, 0))
+            if not readable:
+                continue
+            data = os.read(fd, 4096)
+            if not data:
+                continue
+            buffer += data
+
+            while True:
+                end = buffer.find(b"\n")
+                if end < 0:
+                    break
+                raw = bytes(buffer[:end])
+                del buffer[:end + 1]
+                try:
+                    line = raw.decode('ascii').strip()
+                except UnicodeDecodeError:
+                    continue  # Falsche Baudrate liefert Datenmüll
+
+                if line.startswith("FIRMWARE_NAME:"):
+                    firmware = line[len("FIRMWARE_NAME:"):].split(" SOURCE_CODE_URL:")[0].strip()
+                elif line.startswith("Cap:") and firmware is not None:
+                    name, _, value = line[4:].partition(":")
+                    capabilities[name] = value.strip() == "1"
+                elif line.startswith("ok") and firmware is not None:
+                    return firmware, capabilities
+
+    def _drain(self, fd: int, quiet: float = 0.1):
+        """Verwirft Antworten auf überzählige M115-Anfragen"""
+        deadline = time.monotonic() + self.boot_timeout
+        while time.monotonic() < deadline:
+            readable, _, _ = select.select([fd], [], [], quiet)
+            if not readable or not os.read(fd, 4096):
+                break
+        try:
+            termios.tcflush(fd, termios.TCIFLUSH)
+        except termios.error:
+            pass
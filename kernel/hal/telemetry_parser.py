@@ -0,0 +1,107 @@
+from typing import Optional, Tuple, Union
+
+# Temperatur: (Hotend, Ziel Hotend, Bett, Ziel Bett); fehlende Ziele sind None
+TemperatureReport = Tuple[float, Optional[float], float, Optional[float]]
+# Position: (X, Y, Z, E)
+PositionReport = Tuple[float, float, float, float]
+
+
+def _number(token: bytes) -> Optional[float]:
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def parse_temperature(line: bytes) -> Optional[TemperatureReport]:
+    """Liest eine Marlin-Temperaturmeldung wie ``T:210.1 /210.0 B:60.2 /60.0 @:127``.
+
+    Kommt ohne reguläre Ausdrücke aus: die Zeile wird einmal an Leerzeichen
+    zerlegt und jedes Token über sein Präfix zugeordnet. Bei mehreren
+    Extrudern zählt ``T:`` (aktiver Extruder), ``T0:``/``T1:`` werden ignoriert.
+    """
+    hotend = target_hotend = bed = target_bed = None
+    current = None
+    for token in line.split():
+        if token[:1] == b"/":
+            # Zielwert als eigenes Token: "T:210.1 /210.0"
+            if current == b"T" and target_hotend is None:
+                target_hotend = _number(token[1:])
+            elif current == b"B" and target_bed is None:
+                target_bed = _number(token[1:])
+            continue
+        key, sep, value = token.partition(b":")
+        current = key
+        if not sep or key not in (b"T", b"B"):
+            continue
+        actual, slash, target = value.partition(b"/")
+        if key == b"T" and hotend is None:
+            hotend = _number(actual)
+            if slash:
+                target_hotend = _number(target)
+        elif key == b"B" and bed is None:
+            bed = _number(actual)
+            if slash:
+                target_bed = _number(target)
+    if hotend is None and bed is None:
+        return None
+    return hotend or 0.0, target_hotend, bed or 0.0, target_bed
+
+
+def parse_position(line: bytes) -> Optional[PositionReport]:
+    """Liest eine Positionsmeldung wie ``X:10.00 Y:20.00 Z:0.30 E:0.00 Count X:800 ...``"""
+    values = {}
+    for token in line.split():
+        if token == b"Count":
+            # Danach folgen Schrittzähler, keine Koordinaten
+            break
+        key, sep, value = token.partition(b":")
+        if sep and key in (b"X", b"Y", b"Z", b"E"):
+            number = _number(value)
+            if number is not None:
+                values[key] = number
+    if len(values) < 3:
+        return None
+    return values.get(b"X", 0.0), values.get(b"Y", 0.0), values.get(b"Z", 0.0), values.get(b"E", 0.0)
+
+
+class TelemetryParser:
+    """Trennt unaufgeforderte Statusmeldungen (M155/M154) von den ``ok``-Quittungen.
+
+    ``feed`` wird im Empfangspfad mit jeder Zeile aufgerufen und aktualisiert
+    den Drucker. Reine Statusmeldungen werden verbraucht (``True``), damit sie
+    weder die Zeilen-Queue des Transports noch Befehlsantworten füllen;
+    ``ok``-Zeilen gehen immer an den Aufrufer zurück, auch wenn sie wie bei
+    ``M105`` Temperaturen enthalten.
+    """
+
+    def __init__(self, device):
+        self.device = device
+        self.temperature_reports = 0
+        self.position_reports = 0
+
+    def feed(self, line: Union[bytes, str]) -> bool:
+        """Verarbeitet eine Zeile; ``True``, wenn es eine reine Statusmeldung war"""
+        if isinstance(line, str):
+            line = line.encode()
+        line = line.strip()
+        is_ack = line[:2] == b"ok"
+        body = line[2:].lstrip() if is_ack else line
+
+        head = body[:2]
+        if head == b"T:" or head == b"B:" or body[:3] == b"T0:":
+            report = parse_temperature(body)
+            if report is None:
+                return False
+            hotend, target_hotend, bed, target_bed = report
+            self.device.update_temperature(hotend, bed, target_hotend, target_bed)
+            self.temperature_reports += 1
+            return not is_ack
+        if head == b"X:":
+            position = parse_position(body)
+            if position is None:
+                return False
+            self.device.move(*position)
+            self.position_reports += 1
+            return not is_ack
+        return False
@@ -0,0 +1,175 @@
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# Standardwerte wie in Marlin (Configuration_adv.h)
+HOTEND_PERIOD = 40.0        # s unterhalb des Hysteresebands bis zum Abbruch
+HOTEND_HYSTERESIS = 4.0     # °C
+HOTEND_WATCH_PERIOD = 20.0  # s, in denen die Temperatur beim Aufheizen ...
+HOTEND_WATCH_INCREASE = 2.0  # ... um mindestens so viel steigen muss
+BED_PERIOD = 20.0
+BED_HYSTERESIS = 2.0
+BED_WATCH_PERIOD = 60.0
+BED_WATCH_INCREASE = 2.0
+MIN_TEMP = 5.0              # darunter gilt der Sensor als defekt
+SMOOTHING_SAMPLES = 4       # gleitender Mittelwert, 1 s beim Auto-Report mit 4 Hz
+
+IDLE = 0
+HEATING = 1
+STABLE = 2
+
+
+class HeaterWatch:
+    """Überwacht eine Heizung (Hotend oder Bett) mit O(1) Aufwand pro Messwert.
+
+    Die Temperatur wird über eine gleitende Summe der letzten Werte geglättet.
+    Beim Aufheizen muss sie innerhalb von ``watch_period`` um
+    ``watch_increase`` steigen; nach Erreichen des Ziels darf sie höchstens
+    ``period`` Sekunden unter ``Ziel - hysteresis`` liegen.
+
+    Das Glättungsfenster gehört der Überwachung selbst statt
+    ``device.history``: der Ringpuffer behält je Sekunde nur den letzten
+    Wert, beim Auto-Report mit 4 Hz fielen drei von vier Messwerten weg.
+    """
+
+    __slots__ = ('period', 'hysteresis', 'watch_period', 'watch_increase', 'max_temp',
+                 'min_temp', 'state', 'target', '_window', '_window_sum', '_window_pos',
+                 '_window_count', '_watch_temp', '_watch_deadline', '_stall_deadline')
+
+    def __init__(self, period: float, hysteresis: float, watch_period: float,
+                 watch_increase: float, max_temp: float, min_temp: float = MIN_TEMP,
+                 smoothing: int = SMOOTHING_SAMPLES):
+        self.period = period
+        self.hysteresis = hysteresis
+        self.watch_period = watch_period
+        self.watch_increase = watch_increase
+        self.max_temp = max_temp
+        self.min_temp = min_temp
+        self._window = [0.0] * smoothing
+        self.reset(0.0)
+
+    def reset(self, target: float):
+        self.target = target
+        self.state = IDLE if target <= 0 else HEATING
+        self._window_sum = 0.0
+        self._window_pos = 0
+        self._window_count = 0
+        self._watch_temp = None
+        self._watch_deadline = 0.0
+        self._stall_deadline = 0.0
+
+    def update(self, temperature: float, target: float, now: float) -> Optional[str]:
+        """Verarbeitet einen Messwert; gibt bei einem Fehler den Grund zurück"""
+        if temperature >= self.max_temp:
+            return f"Maximaltemperatur überschritten ({temperature:.1f}°C)"
+        if target != self.target:
+            self.reset(target)
+        if self.state == IDLE:
+            return None
+        if temperature < self.min_temp:
+            return f"Sensorfehler ({temperature:.1f}°C)"
+
+        # Gleitende Summe: ältesten Wert abziehen, neuen addieren
+        window = self._window
+        pos = self._window_pos
+        if self._window_count == len(window):
+            self._window_sum -= window[pos]
+        else:
+            self._window_count += 1
+        window[pos] = temperature
+        self._window_sum += temperature
+        self._window_pos = (pos + 1) % len(window)
+        smoothed = self._window_sum / self._window_count
+
+        if self.state == HEATING:
+            if smoothed >= target - self.hysteresis:
+                self.state = STABLE
+                self._stall_deadline = now + self.period
+                return None
+            if self._watch_temp is None or smoothed >= self._watch_temp:
+                # Fortschritt erreicht: nächstes Etappenziel setzen
+                self._watch_temp = smoothed + self.watch_increase
+                self._watch_deadline = now + self.watch_period
+            elif now > self._watch_deadline:
+                return f"Aufheizen fehlgeschlagen ({smoothed:.1f}°C, Ziel {target:.1f}°C)"
+            return None
+
+        if smoothed >= target - self.hysteresis:
+            self._stall_deadline = now + self.period
+        elif now > self._stall_deadline:
+            return f"Thermal Runaway ({smoothed:.1f}°C, Ziel {target:.1f}°C)"
+        return None
+
+
+class ThermalRunawayDetector:
+    """Host-seitiger Thermal-Runaway-Schutz für alle Drucker.
+
+    Hängt sich an ``PrinterDevice.update_temperature`` und prüft jeden
+    Messwert sofort, sodass ein Fehler noch im selben Messintervall erkannt
+    wird. ``safe_shutdown`` läuft in einem eigenen Thread, damit der
+    Empfangspfad der seriellen Ports nicht blockiert.
+    """
+
+    def __init__(self, max_hotend_temp: float = 275.0, max_bed_temp: float = 120.0,
+                 on_runaway: Optional[Callable[[object, str, str], None]] = None):
+        self.max_hotend_temp = max_hotend_temp
+        self.max_bed_temp = max_bed_temp
+        self.on_runaway = on_runaway or self._shutdown
+        self.watches: Dict[str, Tuple[HeaterWatch, HeaterWatch]] = {}
+        self.tripped: Dict[str, str] = {}
+
+    @classmethod
+    def from_printer_config(cls, config: Dict, **kwargs) -> "ThermalRunawayDetector":
+        """Übernimmt die Maximaltemperatur aus ``PrinterManager.load_config()``"""
+        safety = config.get('safety', {})
+        return cls(max_hotend_temp=float(safety.get('max_temp', 275.0)), **kwargs)
+
+    def watch(self, device):
+        """Beginnt die Überwachung eines Druckers"""
+        self.watches[device.id] = (
+            HeaterWatch(HOTEND_PERIOD, HOTEND_HYSTERESIS, HOTEND_WATCH_PERIOD,
+                        HOTEND_WATCH_INCREASE, self.max_hotend_temp),
+            HeaterWatch(BED_PERIOD, BED_HYSTERESIS, BED_WATCH_PERIOD,
+                        BED_WATCH_INCREASE, self.max_bed_temp),
+        )
+        self.tripped.pop(device.id, None)
+        if self.check not in device.temperature_listeners:
+            device.temperature_listeners.append(self.check)
+
+    def unwatch(self, device):
+        """Beendet die Überwachung eines Druckers"""
+        self.watches.pop(device.id, None)
+        if self.check in device.temperature_listeners:
+            device.temperature_listeners.remove(self.check)
+
+    def check(self, device, now: Optional[float] = None) -> Optional[str]:
+        """Prüft den aktuellen Messwert eines Druckers"""
+        watches = self.watches.get(device.id)
+        if watches is None or device.id in self.tripped:
+            return None
+        if now is None:
+            now = time.monotonic()
+        temperature = device.temperature
+        hotend, bed = watches
+        reason = hotend.update(temperature.hotend, temperature.target_hotend, now)
+        heater = "hotend"
+        if reason is None:
+            reason = bed.update(temperature.bed, temperature.target_bed, now)
+            heater = "bed"
+        if reason is None:
+            return None
+        self.tripped[device.id] = reason
+        self.on_runaway(device, heater, reason)
+        return reason
+
+    def reset(self, device_id: str):
+        """Gibt einen ausgelösten Drucker nach manueller Prüfung wieder frei"""
+        self.tripped.pop(device_id, None)
+        for watch in self.watches.get(device_id, ()):
+            watch.reset(0.0)
+
+    @staticmethod
+    def _shutdown(device, heater: str, reason: str):
+        print(f"Thermal-Runaway-Schutz ausgelöst auf {device.id} ({heater}): {reason}")
+        threading.Thread(target=device.safe_shutdown, name=f"Shutdown-{device.id}",
+                         daemon=True).start()
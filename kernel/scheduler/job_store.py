@@ -0,0 +1,208 @@
+import json
+import sqlite3
+import threading
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from kernel.scheduler.placement import JobConstraints
+
+DB_PATH = Path("/var/lib/innovate/jobs.db")
+
+QUEUED = "queued"
+ACTIVE = "active"
+FAILED = "failed"
+
+
+class JobStore:
+    """Persistente Job-Queue auf Basis von SQLite im WAL-Modus.
+
+    Änderungen werden gesammelt und in einer Transaktion geschrieben, sobald
+    ``batch_size`` erreicht ist oder spätestens nach ``flush_interval``
+    Sekunden. So bleiben Massenimporte schnell, und nach einem Neustart des
+    Kernels gehen höchstens die Änderungen des letzten Intervalls verloren.
+    Wer sofortige Dauerhaftigkeit braucht, ruft ``flush()`` auf.
+    """
+
+    def __init__(self, db_path: Path = DB_PATH, batch_size: int = 500,
+                 flush_interval: float = 0.05):
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple[str, tuple]] = []
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.running = True
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._init_database()
+
+        self._thread = threading.Thread(target=self._flush_loop, name="JobStore", daemon=True)
+        self._thread.start()
+
+    def _init_database(self):
+        """Initialisiert die Datenbank"""
+        cursor = self._conn.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        # NORMAL genügt im WAL-Modus für Absturzsicherheit des Prozesses
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                device_id TEXT,
+                pool TEXT,
+                priority INTEGER NOT NULL,
+                sequence INTEGER NOT NULL,
+                gcode_file TEXT NOT NULL,
+                compiled_file TEXT,
+                constraints TEXT,
+                estimated_duration REAL,
+                created_at TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_jobs_device_priority
+            ON jobs (state, device_id, priority, sequence)
+        ''')
+        self._conn.commit()
+
+    def _queue(self, sql: str, params: tuple):
+        with self._lock:
+            self._pending.append((sql, params))
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+        else:
+            self._wakeup.set()
+
+    def enqueue(self, job, sequence: int):
+        """Speichert einen neuen, wartenden Job"""
+        self._queue(
+            'INSERT OR REPLACE INTO jobs (job_id, state, device_id, pool, priority, sequence, '
+            'gcode_file, compiled_file, constraints, estimated_duration, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (job.job_id, QUEUED, job.device_id, job.pool, job.priority, sequence,
+             job.gcode_file, job.compiled_file, json.dumps(asdict(job.constraints)),
+             job.estimated_duration, job.created_at.isoformat())
+        )
+
+    def update_prepared(self, job):
+        """Speichert die Ergebnisse der Vorbereitung und die Platzierung eines Jobs"""
+        self._queue('UPDATE jobs SET device_id = ?, compiled_file = ?, estimated_duration = ? '
+                    'WHERE job_id = ?',
+                    (job.device_id, job.compiled_file, job.estimated_duration, job.job_id))
+
+    def mark_active(self, job):
+        """Markiert einen Job als auf einem Drucker laufend"""
+        self._queue('UPDATE jobs SET state = ?, device_id = ? WHERE job_id = ?',
+                    (ACTIVE, job.device_id, job.job_id))
+
+    def mark_failed(self, job):
+        """Markiert einen Job als fehlgeschlagen; er bleibt zur Nachverfolgung erhalten"""
+        self._queue('UPDATE jobs SET state = ? WHERE job_id = ?', (FAILED, job.job_id))
+
+    def remove(self, job_id: str):
+        """Entfernt einen abgeschlossenen oder abgebrochenen Job"""
+        self._queue('DELETE FROM jobs WHERE job_id = ?', (job_id,))
+
+    def flush(self):
+        """Schreibt alle gesammelten Änderungen in einer Transaktion"""
+        # Reihenfolge der Batches wahren: Tauschen und Schreiben unter demselben Lock
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+            cursor = self._conn.cursor()
+            # Aufeinanderfolgende gleiche Statements gebündelt ausführen
+            start = 0
+            while start < len(pending):
+                sql = pending[start][0]
+                end = start
+                while end < len(pending) and pending[end][0] == sql:
+                    end += 1
+                cursor.executemany(sql, [params for _, params in pending[start:end]])
+                start = end
+            self._conn.commit()
+
+    def _flush_loop(self):
+        while self.running:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if not self.running:
+                break
+            threading.Event().wait(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Fehler beim Speichern der Job-Queue: {e}")
+
+    def _rows(self, sql: str, params: tuple = ()) -> List[tuple]:
+        self.flush()
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _to_job(row: tuple):
+        from kernel.scheduler.print_scheduler import PrintJob
+
+        (job_id, _, device_id, pool, priority, sequence, gcode_file, compiled_file,
+         constraints, estimated_duration, created_at) = row
+        constraints = json.loads(constraints) if constraints else {}
+        if constraints.get('min_bed_size'):
+            constraints['min_bed_size'] = tuple(constraints['min_bed_size'])
+        job = PrintJob(
+            device_id=device_id,
+            gcode_file=gcode_file,
+            priority=priority,
+            created_at=datetime.fromisoformat(created_at),
+            compiled_file=compiled_file,
+            pool=pool,
+            constraints=JobConstraints(**constraints),
+            estimated_duration=estimated_duration or 0.0,
+            job_id=job_id
+        )
+        return sequence, job
+
+    def load_queued(self) -> List[Tuple[int, object]]:
+        """Lädt alle wartenden Jobs als (Reihenfolge, Job), dringendste zuerst"""
+        rows = self._rows(
+            'SELECT * FROM jobs WHERE state = ? ORDER BY priority, sequence', (QUEUED,)
+        )
+        return [self._to_job(row) for row in rows]
+
+    def load_failed(self) -> List[object]:
+        """Lädt alle fehlgeschlagenen Jobs"""
+        rows = self._rows('SELECT * FROM jobs WHERE state = ? ORDER BY sequence', (FAILED,))
+        return [job for _, job in map(self._to_job, rows)]
+
+    def load_active(self) -> Dict[str, object]:
+        """Lädt die beim letzten Lauf aktiven Jobs je Drucker"""
+        rows = self._rows('SELECT * FROM jobs WHERE state = ?', (ACTIVE,))
+        return {job.device_id: job for _, job in map(self._to_job, rows)}
+
+    def jobs_for_device(self, device_id: str, limit: int = 100) -> List[object]:
+        """Wartende Jobs eines Druckers nach Priorität (über den Index)"""
+        rows = self._rows(
+            'SELECT * FROM jobs WHERE state = ? AND device_id = ? '
+            'ORDER BY priority, sequence LIMIT ?',
+            (QUEUED, device_id, limit)
+        )
+        return [job for _, job in map(self._to_job, rows)]
+
+    def max_sequence(self) -> int:
+        rows = self._rows('SELECT MAX(sequence) FROM jobs')
+        return rows[0][0] if rows and rows[0][0] is not None else 0
+
+    def close(self):
+        """Schreibt ausstehende Änderungen und schließt die Datenbank"""
+        self.running = False
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+DEFAULT_POOL = "default"
+
+# (Material, Düsendurchmesser); None steht für "beliebig"
+CapabilityKey = Tuple[Optional[str], Optional[float]]
+
+
+def normalize_material(material: Optional[str]) -> Optional[str]:
+    return material.strip().upper() if material else None
+
+
+def normalize_nozzle(diameter: Optional[float]) -> Optional[float]:
+    return round(float(diameter), 2) if diameter else None
+
+
+@dataclass(frozen=True)
+class JobConstraints:
+    """Anforderungen eines Jobs an den Drucker"""
+    material: Optional[str] = None
+    nozzle_diameter: Optional[float] = None
+    # Mindestgröße des Bauraums (X, Y, Z) in mm
+    min_bed_size: Optional[Tuple[float, float, float]] = None
+
+    def key(self) -> CapabilityKey:
+        return normalize_material(self.material), normalize_nozzle(self.nozzle_diameter)
+
+    def fits(self, device) -> bool:
+        """Prüft Material, Düse und Bauraum eines Druckers"""
+        material, nozzle = self.key()
+        if material is not None and normalize_material(device.material) != material:
+            return False
+        if nozzle is not None and normalize_nozzle(device.nozzle_diameter) != nozzle:
+            return False
+        if self.min_bed_size:
+            return all(have >= need for have, need in zip(device.bed_size, self.min_bed_size))
+        return True
+
+
+class CapabilityIndex:
+    """Index der Drucker nach Pool, Material und Düse.
+
+    Für einen Job werden nur die Drucker der passenden Schlüssel betrachtet,
+    statt alle Drucker der Farm zu durchsuchen.
+    """
+
+    def __init__(self):
+        self._pools: Dict[str, Dict[CapabilityKey, Set[str]]] = {}
+        self._keys: Dict[str, Tuple[str, CapabilityKey]] = {}
+
+    def add(self, device):
+        """Nimmt einen Drucker auf oder aktualisiert seine Fähigkeiten"""
+        self.remove(device.id)
+        key = (normalize_material(device.material), normalize_nozzle(device.nozzle_diameter))
+        pool = device.pool or DEFAULT_POOL
+        self._pools.setdefault(pool, {}).setdefault(key, set()).add(device.id)
+        self._keys[device.id] = (pool, key)
+
+    def remove(self, device_id: str):
+        """Entfernt einen Drucker aus dem Index"""
+        entry = self._keys.pop(device_id, None)
+        if not entry:
+            return
+        pool, key = entry
+        devices = self._pools[pool][key]
+        devices.discard(device_id)
+        if not devices:
+            del self._pools[pool][key]
+
+    def capability_key(self, device_id: str) -> Optional[Tuple[str, CapabilityKey]]:
+        return self._keys.get(device_id)
+
+    def candidates(self, pool: str, constraints: JobConstraints) -> Iterable[Set[str]]:
+        """Liefert die Drucker-Mengen, deren Material und Düse passen"""
+        material, nozzle = constraints.key()
+        for (have_material, have_nozzle), devices in self._pools.get(pool, {}).items():
+            if material is not None and have_material != material:
+                continue
+            if nozzle is not None and have_nozzle != nozzle:
+                continue
+            yield devices
@@ -1,66 +1,368 @@
+import heapq
+import itertools
 import threading
-from queue import PriorityQueue
-from typing import Dict, List
-from dataclasses import dataclass
+import time
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.scheduler.placement import (
+    CapabilityIndex, CapabilityKey, JobConstraints, DEFAULT_POOL
+)
+from kernel.scheduler.job_store import JobStore
+
+# Wie viele unpassende Jobs (Bauraum) beim Suchen übersprungen werden
+MAX_POOL_SCAN = 32
 
 @dataclass
 class PrintJob:
-    device_id: str
+    device_id: Optional[str]
     gcode_file: str
     priority: int
     created_at: datetime
-    
+    compiled_file: Optional[str] = None
+    pool: Optional[str] = None
+    constraints: JobConstraints = field(default_factory=JobConstraints)
+    # Geschätzte Druckdauer in Sekunden (0 = unbekannt)
+    estimated_duration: float = 0.0
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    # False, solange der Kernel die Datei noch vorbereitet (kompilieren, schätzen)
+    ready: bool = True
+
     def __lt__(self, other):
         return self.priority < other.priority
 
 class PrintScheduler:
-    def __init__(self):
-        self.job_queue = PriorityQueue()
+    """Ereignisgesteuerter Scheduler mit einer Warteschlange pro Drucker
+
+    Neue Jobs und abgeschlossene Drucke wecken den Dispatcher sofort über
+    eine Condition-Variable. Ein beschäftigter Drucker hält nur seine eigenen
+    Jobs zurück, nie die anderer Drucker.
+
+    Jobs ohne festen Drucker zielen auf einen Pool und werden auf dem
+    passenden freien Drucker mit der frühesten Fertigstellung platziert.
+    Findet sich keiner, warten sie in einer Pool-Queue, bis ein passender
+    Drucker frei wird.
+
+    Mit ``store`` wird die Queue in SQLite gespiegelt und beim Start
+    wiederhergestellt, sodass ein Neustart des Kernels keine Jobs verliert.
+    Beim Neustart laufende Jobs werden dem Drucker bei seiner Registrierung
+    über dessen Checkpoint zurückgegeben oder als fehlgeschlagen markiert.
+
+    Jobs mit ``ready=False`` warten, bis ``job_ready`` die Ergebnisse der
+    Vorbereitung meldet, und werden erst dann platziert und verteilt.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None):
+        # device_id -> Heap aus (Priorität, Reihenfolge, Job)
+        self.ready_queues: Dict[str, List[Tuple[int, int, PrintJob]]] = {}
+        # (Pool, Fähigkeitsschlüssel) -> Heap noch nicht platzierter Jobs
+        self.pool_queues: Dict[Tuple[str, CapabilityKey], List[Tuple[int, int, PrintJob]]] = {}
         self.active_jobs: Dict[str, PrintJob] = {}
+        # Beim letzten Lauf aktive Jobs, bis sich ihr Drucker wieder registriert
+        self.interrupted_jobs: Dict[str, PrintJob] = {}
+        # job_id -> (Reihenfolge, Job) für Jobs in Vorbereitung
+        self.preparing_jobs: Dict[str, Tuple[int, PrintJob]] = {}
+        self.devices: Dict[str, PrinterDevice] = {}
+        self.capabilities = CapabilityIndex()
+        self.idle_devices: Set[str] = set()
         self.running = False
         self.thread = None
-        
-    def add_job(self, device_id: str, gcode_file: str, priority: int = 1):
-        """Fügt einen neuen Druckauftrag zur Queue hinzu"""
+        self._condition = threading.Condition()
+        self._dispatchable: Set[str] = set()
+        self._sequence = itertools.count()
+        self.store = store
+        if store:
+            self._recover()
+
+    def _recover(self):
+        """Stellt wartende und unterbrochene Jobs aus dem Job-Store wieder her"""
+        self.interrupted_jobs.update(self.store.load_active())
+        for sequence, job in self.store.load_queued():
+            entry = (job.priority, sequence, job)
+            if job.device_id is None:
+                queue = self.pool_queues.setdefault((job.pool, job.constraints.key()), [])
+            else:
+                # Wird verteilt, sobald sich der Drucker registriert
+                queue = self.ready_queues.setdefault(job.device_id, [])
+            heapq.heappush(queue, entry)
+        self._sequence = itertools.count(self.store.max_sequence() + 1)
+
+    def register_device(self, device: PrinterDevice):
+        """Macht einen Drucker für die Pool-Platzierung bekannt"""
+        with self._condition:
+            self.devices[device.id] = device
+            self.capabilities.add(device)
+            if self._print_finished not in device.print_listeners:
+                device.print_listeners.append(self._print_finished)
+            job = self.interrupted_jobs.pop(device.id, None)
+            if job is not None:
+                self._resume_interrupted(device, job)
+            self._mark_ready(device.id)
+
+    def _resume_interrupted(self, device: PrinterDevice, job: PrintJob):
+        """Übernimmt einen beim Neustart laufenden Job (Lock wird gehalten)
+
+        Mit Checkpoint wartet der Drucker pausiert auf ``resume_print`` und der
+        Job bleibt aktiv; ohne ist der Druck verloren und der Drucker frei.
+        """
+        if device.recover_print() is not None:
+            self.active_jobs[device.id] = job
+            return
+        print(f"Unterbrochener Druck auf {device.id} nicht wiederherstellbar: {job.gcode_file}")
+        if self.store:
+            self.store.mark_failed(job)
+
+    def unregister_device(self, device_id: str):
+        """Entfernt einen Drucker aus der Platzierung"""
+        with self._condition:
+            device = self.devices.pop(device_id, None)
+            if device is not None and self._print_finished in device.print_listeners:
+                device.print_listeners.remove(self._print_finished)
+            self.capabilities.remove(device_id)
+            self.idle_devices.discard(device_id)
+
+    def _print_finished(self, device: PrinterDevice, success: bool):
+        """Vom Drucker am Ende der Sendeschleife aufgerufen"""
+        self.complete_job(device.id, success=success)
+
+    def notify_device_ready(self, device_id: str):
+        """Meldet, dass ein Drucker (wieder) bereit ist, z.B. nach dem Verbinden"""
+        with self._condition:
+            self._mark_ready(device_id)
+
+    def add_job(self, device_id: Optional[str], gcode_file: str, priority: int = 1,
+                compiled_file: Optional[str] = None, pool: Optional[str] = None,
+                constraints: Optional[JobConstraints] = None,
+                estimated_duration: float = 0.0, ready: bool = True) -> PrintJob:
+        """Fügt einen neuen Druckauftrag zur Queue hinzu
+
+        Ohne ``device_id`` wird der Job im Pool ``pool`` platziert.
+        Mit ``ready=False`` wird er erst nach ``job_ready`` verteilt.
+        """
         job = PrintJob(
             device_id=device_id,
             gcode_file=gcode_file,
             priority=priority,
-            created_at=datetime.now()
+            created_at=datetime.now(),
+            compiled_file=compiled_file,
+            pool=pool if device_id is None else None,
+            constraints=constraints or JobConstraints(),
+            estimated_duration=estimated_duration,
+            ready=ready
+        )
+        with self._condition:
+            if device_id is None:
+                job.pool = job.pool or DEFAULT_POOL
+                if ready:
+                    job.device_id = self._place(job)
+            sequence = next(self._sequence)
+            if self.store:
+                self.store.enqueue(job, sequence)
+            if not ready:
+                self.preparing_jobs[job.job_id] = (sequence, job)
+                return job
+            self._queue_job(job, sequence)
+        return job
+
+    def job_ready(self, job_id: str, compiled_file: Optional[str] = None,
+                  estimated_duration: float = 0.0) -> Optional[PrintJob]:
+        """Übernimmt die Ergebnisse der Vorbereitung und gibt den Job frei"""
+        with self._condition:
+            entry = self.preparing_jobs.pop(job_id, None)
+            if entry is None:
+                return None
+            sequence, job = entry
+            job.compiled_file = compiled_file
+            job.estimated_duration = estimated_duration
+            job.ready = True
+            if job.device_id is None:
+                job.device_id = self._place(job)
+            if self.store:
+                self.store.update_prepared(job)
+            self._queue_job(job, sequence)
+        return job
+
+    def _queue_job(self, job: PrintJob, sequence: int):
+        """Stellt einen fertigen Job in die Queue seines Druckers oder Pools (Lock wird gehalten)"""
+        if job.device_id is None:
+            heapq.heappush(
+                self.pool_queues.setdefault((job.pool, job.constraints.key()), []),
+                (job.priority, sequence, job)
+            )
+            return
+        self._enqueue(job.device_id, job, sequence)
+
+    def _enqueue(self, device_id: str, job: PrintJob, sequence: int):
+        """Stellt einen Job in die Queue eines Druckers (Lock wird gehalten)"""
+        heapq.heappush(
+            self.ready_queues.setdefault(device_id, []),
+            (job.priority, sequence, job)
         )
-        self.job_queue.put(job)
+        self.idle_devices.discard(device_id)
+        if device_id not in self.active_jobs:
+            self._dispatchable.add(device_id)
+            self._condition.notify()
+
+    def complete_job(self, device_id: str, success: bool = True) -> Optional[PrintJob]:
+        """Markiert den aktiven Job eines Druckers als beendet
         
+        Fehlgeschlagene Jobs bleiben als ``failed`` im Job-Store; der Drucker
+        wird in beiden Fällen wieder frei.
+        """
+        with self._condition:
+            job = self.active_jobs.pop(device_id, None)
+            if job and self.store:
+                if success:
+                    self.store.remove(job.job_id)
+                else:
+                    self.store.mark_failed(job)
+            self._mark_ready(device_id)
+        return job
+
+    def _mark_ready(self, device_id: str):
+        """Lässt den Dispatcher einen Drucker erneut prüfen (Lock wird gehalten)"""
+        if device_id in self.active_jobs:
+            return
+        self._dispatchable.add(device_id)
+        self._condition.notify()
+
+    def _is_free(self, device_id: str) -> bool:
+        """Drucker ohne aktiven Job; registrierte Drucker müssen IDLE sein"""
+        if device_id in self.active_jobs:
+            return False
+        device = self.devices.get(device_id)
+        return device is None or device.state == PrinterState.IDLE
+
+    def _completion_time(self, device: PrinterDevice, job: PrintJob) -> float:
+        """Voraussichtliche Fertigstellung eines Jobs auf einem freien Drucker"""
+        return time.time() + job.estimated_duration / max(device.speed_factor, 1e-6)
+
+    def _place(self, job: PrintJob) -> Optional[str]:
+        """Wählt den passenden freien Drucker mit der frühesten Fertigstellung"""
+        best = None
+        best_time = None
+        for devices in self.capabilities.candidates(job.pool, job.constraints):
+            for device_id in devices & self.idle_devices:
+                device = self.devices[device_id]
+                if not job.constraints.fits(device) or not self._is_free(device_id):
+                    continue
+                completion = self._completion_time(device, job)
+                if best_time is None or (completion, device_id) < (best_time, best):
+                    best, best_time = device_id, completion
+        return best
+
+    def _next_pool_job(self, device_id: str) -> Optional[PrintJob]:
+        """Holt den dringendsten wartenden Pool-Job, den ein Drucker übernehmen kann"""
+        device = self.devices.get(device_id)
+        entry = self.capabilities.capability_key(device_id)
+        if device is None or entry is None:
+            return None
+        pool, (material, nozzle) = entry
+
+        best = None
+        for key in {(material, nozzle), (None, nozzle), (material, None), (None, None)}:
+            queue = self.pool_queues.get((pool, key))
+            if not queue:
+                continue
+            skipped = []
+            found = None
+            while queue and len(skipped) < MAX_POOL_SCAN:
+                entry = heapq.heappop(queue)
+                if entry[2].constraints.fits(device):
+                    found = entry
+                    break
+                skipped.append(entry)
+            for item in skipped:
+                heapq.heappush(queue, item)
+            if found is None:
+                continue
+            if best is None or found[:2] < best[1][:2]:
+                if best is not None:
+                    heapq.heappush(self.pool_queues[best[0]], best[1])
+                best = ((pool, key), found)
+            else:
+                heapq.heappush(queue, found)
+
+        if best is None:
+            return None
+        queue_key, (_, _, job) = best
+        if not self.pool_queues[queue_key]:
+            del self.pool_queues[queue_key]
+        job.device_id = device_id
+        return job
+
     def start(self):
         """Startet den Scheduler"""
         self.running = True
-        self.thread = threading.Thread(target=self._process_queue)
+        self.thread = threading.Thread(target=self._process_queue, name="PrintScheduler")
         self.thread.start()
-        
+
     def stop(self):
         """Stoppt den Scheduler"""
-        self.running = False
+        with self._condition:
+            self.running = False
+            self._condition.notify_all()
         if self.thread:
             self.thread.join()
-            
+        if self.store:
+            self.store.flush()
+
     def _process_queue(self):
-        """Verarbeitet die Job-Queue"""
-        while self.running:
-            if not self.job_queue.empty():
-                job = self.job_queue.get()
-                if job.device_id not in self.active_jobs:
-                    self.active_jobs[job.device_id] = job
-                    self._start_print_job(job)
-                else:
-                    # Wenn der Drucker beschäftigt ist, Job wieder in Queue
-                    self.job_queue.put(job)
-            threading.Event().wait(1)  # Kleine Pause
-            
+        """Verteilt Jobs, sobald ein Drucker frei wird oder ein Job eintrifft"""
+        while True:
+            with self._condition:
+                while self.running and not self._dispatchable:
+                    self._condition.wait()
+                if not self.running:
+                    return
+                jobs = self._take_dispatchable()
+
+            for job in jobs:
+                self._start_print_job(job)
+
+    def _take_dispatchable(self) -> List[PrintJob]:
+        """Entnimmt für jeden freien Drucker den nächsten Job (Lock wird gehalten)"""
+        jobs = []
+        for device_id in self._dispatchable:
+            if not self._is_free(device_id):
+                continue
+            queue = self.ready_queues.get(device_id)
+            if queue:
+                _, _, job = heapq.heappop(queue)
+                if not queue:
+                    del self.ready_queues[device_id]
+            else:
+                job = self._next_pool_job(device_id)
+            if job is None:
+                if device_id in self.devices:
+                    self.idle_devices.add(device_id)
+                continue
+            self.idle_devices.discard(device_id)
+            self.active_jobs[device_id] = job
+            if self.store:
+                self.store.mark_active(job)
+            jobs.append(job)
+        self._dispatchable.clear()
+        return jobs
+
     def _start_print_job(self, job: PrintJob):
         """Startet einen Druckauftrag"""
-        # TODO: Implementiere tatsächlichen Druckstart
-        pass
-        
+        device = self.devices.get(job.device_id)
+        if device is None:
+            print(f"Drucker {job.device_id} ist nicht registriert: {job.gcode_file}")
+            self.complete_job(job.device_id, success=False)
+            return
+        if not device.start_print(job.gcode_file, compiled_file=job.compiled_file):
+            print(f"Druckstart auf {device.id} fehlgeschlagen: {job.gcode_file}")
+            self.complete_job(device.id, success=False)
+
     def get_queue_status(self) -> List[PrintJob]:
         """Gibt den aktuellen Status der Queue zurück"""
-        return list(self.job_queue.queue)
+        with self._condition:
+            entries = [entry for queue in self.ready_queues.values() for entry in queue]
+            entries += [entry for queue in self.pool_queues.values() for entry in queue]
+            entries += [(job.priority, sequence, job)
+                        for sequence, job in self.preparing_jobs.values()]
+        return [job for _, _, job in sorted(entries, key=lambda e: (e[0], e[1]))]
@@ -0,0 +1,469 @@
+import math
+import os
+import pty
+import random
+import select
+import threading
+import time
+import tty
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional
+
+from kernel.hal.gcode_streamer import gcode_checksum
+
+AMBIENT_TEMP = 25.0
+FIRMWARE_NAME = "Marlin 2.1.2 (InnovateOS Virtual)"
+
+
+class VirtualPrinter:
+    """Simulierter Marlin-Drucker hinter einem Pseudo-Terminal.
+
+    Der HAL verbindet sich über ``port`` wie mit einem echten Drucker. Die
+    Simulation bildet nach, was für Streaming-Messungen zählt:
+
+    - Übertragungsrate der Baudrate (10 Bit pro Byte) und ein begrenzter
+      RX-Puffer; was nicht hineinpasst, geht verloren wie bei Marlin
+    - Bearbeitungszeit pro Befehl und ein Planer-Puffer für Bewegungen (G0-G3),
+      dessen Leerlaufen während des Drucks als Starvation gezählt wird
+    - Temperaturverlauf erster Ordnung für Hotend und Bett, M109/M190
+      warten auf die Zieltemperatur, M155/M154 melden automatisch
+    - Fehlerinjektion: zufällige oder gezielte Prüfsummenfehler (Resend)
+      und beliebige Fehlermeldungen über ``inject``
+
+    ``time_scale`` beschleunigt Aufheizen und Bewegungen (0.01 = 100-fach).
+    """
+
+    def __init__(self, rx_buffer_size: int = 128, baudrate: int = 115200,
+                 command_latency: float = 0.0002, planner_size: int = 16,
+                 time_scale: float = 0.0, heat_time_constant: float = 8.0,
+                 bed_time_constant: float = 40.0, resend_rate: float = 0.0,
+                 fail_lines: Iterable[int] = (), seed: Optional[int] = None,
+                 boot_delay: float = 0.0):
+        self.rx_buffer_size = rx_buffer_size
+        self.baudrate = baudrate
+        self.command_latency = command_latency
+        self.planner_size = planner_size
+        self.time_scale = time_scale
+        self.heat_time_constant = heat_time_constant
+        self.bed_time_constant = bed_time_constant
+        self.resend_rate = resend_rate
+        self.fail_lines = set(fail_lines)
+        self.boot_delay = boot_delay
+        self._random = random.Random(seed)
+
+        # Zustand der Firmware
+        self.hotend = AMBIENT_TEMP
+        self.bed = AMBIENT_TEMP
+        self.target_hotend = 0.0
+        self.target_bed = 0.0
+        self.position = {"X": 0.0, "Y": 0.0, "Z": 0.0, "E": 0.0}
+        self.feedrate = 50.0
+        self.relative = False
+        self.last_line = 0
+        self.temp_interval = 0.0
+        self.position_interval = 0.0
+
+        # Statistik
+        self.lines_received = 0
+        self.commands_executed = 0
+        self.resends_requested = 0
+        self.rx_overflows = 0
+        self.max_rx_used = 0
+        self.starvation_events = 0
+        self.executed: Deque[str] = deque(maxlen=1000)
+
+        self._rx = bytearray()
+        self._out = bytearray()
+        self._planner: Deque[float] = deque()
+        self._planner_end = 0.0
+        self._moves_seen = False
+        self._pending_line: Optional[bytes] = None
+        self._busy_until = 0.0
+        self._wait_heater: Optional[str] = None
+        self._next_temp_report = 0.0
+        self._next_position_report = 0.0
+        self._last_tick = time.monotonic()
+        self._last_wait_report = 0.0
+        self._injected: Deque[bytes] = deque()
+
+        self.master, self.slave = pty.openpty()
+        # Kein Echo und keine Zeilenende-Umsetzung, wie bei einer echten Schnittstelle
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def byte_rate(self) -> float:
+        """Nutzbare Bytes pro Sekunde (8N1: 10 Bit pro Byte)"""
+        return self.baudrate / 10.0
+
+    @property
+    def _max_credit(self) -> float:
+        # Nach einer Pause höchstens ~5 ms Leitungszeit auf einmal übernehmen
+        return max(64.0, self.byte_rate * 0.005)
+
+    def start(self) -> "VirtualPrinter":
+        self.running = True
+        self._started = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name=f"VirtualPrinter-{self.port}",
+                                       daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def inject(self, line: str):
+        """Sendet eine beliebige Zeile, z.B. ``Error:Printer halted``"""
+        self._injected.append(line.encode() + b"\n")
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'lines_received': self.lines_received,
+            'commands_executed': self.commands_executed,
+            'resends_requested': self.resends_requested,
+            'rx_overflows': self.rx_overflows,
+            'max_rx_used': self.max_rx_used,
+            'starvation_events': self.starvation_events,
+        }
+
+    # Hauptschleife
+
+    def _run(self):
+        credit = 0.0
+        while self.running:
+            now = time.monotonic()
+            elapsed = now - self._last_tick
+            self._last_tick = now
+            self._update_temperatures(elapsed)
+            self._drain_planner(now)
+
+            # Leitung: höchstens so viele Bytes, wie die Baudrate erlaubt
+            credit = min(credit + elapsed * self.byte_rate, self._max_credit)
+            timeout = self._next_timeout(now, credit)
+            if credit < 1:
+                # Leitung ausgelastet: warten, bis das nächste Byte durch ist
+                time.sleep(timeout)
+            else:
+                try:
+                    select.select([self.master], [], [], timeout)
+                    data = os.read(self.master, int(credit))
+                except BlockingIOError:
+                    data = b""
+                except (OSError, ValueError):
+                    return
+                credit -= len(data)
+                if data:
+                    self._receive(data, time.monotonic())
+
+            now = time.monotonic()
+            self._process(now)
+            self._auto_report(now)
+            while self._injected:
+                self._out += self._injected.popleft()
+            if self._out:
+                try:
+                    written = os.write(self.master, self._out)
+                except BlockingIOError:
+                    # Host liest nicht: Ausgabe bleibt gepuffert
+                    continue
+                except OSError:
+                    return
+                del self._out[:written]
+
+    def _next_timeout(self, now: float, credit: float) -> float:
+        deadlines = [now + 0.05]
+        if credit < 1:
+            deadlines.append(now + (1 - credit) / self.byte_rate)
+        if self._busy_until > now:
+            deadlines.append(self._busy_until)
+        if self._planner:
+            deadlines.append(self._planner[0])
+        if self._pending_line is not None or self._wait_heater or b"\n" in self._rx:
+            deadlines.append(now + 0.001)
+        if self.temp_interval:
+            deadlines.append(self._next_temp_report)
+        if self.position_interval:
+            deadlines.append(self._next_position_report)
+        return max(0.0, min(deadlines) - now)
+
+    def _receive(self, data: bytes, now: float):
+        if now - self._started < self.boot_delay:
+            # Bootloader: alles vor dem Start der Firmware geht verloren
+            return
+        space = self.rx_buffer_size - len(self._rx)
+        if len(data) > space:
+            self.rx_overflows += len(data) - max(space, 0)
+            data = data[:max(space, 0)]
+        self._rx += data
+        self.max_rx_used = max(self.max_rx_used, len(self._rx))
+
+    def _process(self, now: float):
+        while now >= self._busy_until:
+            if self._wait_heater:
+                if not self._heater_reached(now):
+                    return
+                self._wait_heater = None
+                self._ok()
+                continue
+            if self._pending_line is None:
+                end = self._rx.find(b"\n")
+                if end < 0:
+                    return
+                line = bytes(self._rx[:end])
+                # Zeile verlässt den RX-Puffer erst, wenn Marlin sie übernimmt
+                del self._rx[:end + 1]
+                self._pending_line = line.strip()
+                if not self._pending_line:
+                    self._pending_line = None
+                    continue
+                self.lines_received += 1
+            if not self._execute(self._pending_line, now):
+                # Planer voll: Zeile bleibt hängen, RX-Puffer füllt sich weiter
+                return
+            self._pending_line = None
+            self._busy_until = now + self.command_latency
+
+    # Befehle
+
+    def _execute(self, line: bytes, now: float) -> bool:
+        text = line.decode(errors="replace")
+        if text.startswith("N"):
+            if "*" not in text:
+                self._resend("No Checksum with line number")
+                return True
+            payload, _, checksum = text.rpartition("*")
+            number_text, _, command = payload.partition(" ")
+            try:
+                number = int(number_text[1:])
+                valid = gcode_checksum(payload.encode()) == int(checksum)
+            except ValueError:
+                self._resend("checksum mismatch")
+                return True
+            if command.startswith("M110"):
+                self.last_line = number
+                self._ok()
+                return True
+            if number != self.last_line + 1:
+                self._resend("Line Number is not Last Line Number+1")
+                return True
+            if number in self.fail_lines or not valid or \
+                    (self.resend_rate and self._random.random() < self.resend_rate):
+                self.fail_lines.discard(number)
+                self._resend("checksum mismatch")
+                return True
+            if not self._command(command.strip(), now):
+                return False
+            self.last_line = number
+            return True
+        return self._command(text.split(";", 1)[0].strip(), now)
+
+    def _resend(self, reason: str):
+        self.resends_requested += 1
+        self._out += (f"Error:{reason}, Last Line: {self.last_line}\n"
+                      f"Resend: {self.last_line + 1}\nok\n").encode()
+
+    def _ok(self, extra: str = ""):
+        self._out += f"ok{extra}\n".encode()
+
+    def _command(self, command: str, now: float) -> bool:
+        """Führt einen Befehl aus; False, wenn er auf Platz im Planer warten muss"""
+        words = command.split()
+        if not words:
+            self._ok()
+            return True
+        code = words[0].upper()
+        values = {}
+        for word in words[1:]:
+            try:
+                values[word[0].upper()] = float(word[1:])
+            except (ValueError, IndexError):
+                continue
+
+        if code in ("G0", "G1", "G2", "G3"):
+            if len(self._planner) >= self.planner_size:
+                return False
+            self._queue_move(values, now, clockwise={"G2": True, "G3": False}.get(code))
+        elif code == "M110":
+            self.last_line = int(values.get("N", 0))
+        elif code == "G28":
+            for axis in ("X", "Y", "Z"):
+                self.position[axis] = 0.0
+        elif code == "G90":
+            self.relative = False
+        elif code == "G91":
+            self.relative = True
+        elif code == "G92":
+            for axis in self.position:
+                if axis in values:
+                    self.position[axis] = values[axis]
+        elif code in ("M104", "M109"):
+            self.target_hotend = values.get("S", 0.0)
+            if code == "M109":
+                self._wait_heater = "hotend"
+        elif code in ("M140", "M190"):
+            self.target_bed = values.get("S", 0.0)
+            if code == "M190":
+                self._wait_heater = "bed"
+        elif code == "M105":
+            self.commands_executed += 1
+            self.executed.append(command)
+            self._ok(" " + self._temperature_report())
+            return True
+        elif code == "M114":
+            self._out += (self._position_report() + "\n").encode()
+        elif code == "M115":
+            self._out += (f"FIRMWARE_NAME:{FIRMWARE_NAME} SOURCE_CODE_URL:github.com/MarlinFirmware "
+                          f"PROTOCOL_VERSION:1.0 MACHINE_TYPE:Virtual EXTRUDER_COUNT:1\n"
+                          f"Cap:AUTOREPORT_TEMP:1\nCap:AUTOREPORT_POS:1\nCap:ARCS:1\n"
+                          f"Cap:EEPROM:0\n").encode()
+        elif code == "M155":
+            self.temp_interval = values.get("S", 0.0)
+            self._next_temp_report = now
+        elif code == "M154":
+            self.position_interval = values.get("S", 0.0)
+            self._next_position_report = now
+        elif code == "M400":
+            if self._planner:
+                return False
+
+        self.commands_executed += 1
+        self.executed.append(command)
+        if not self._wait_heater:
+            self._ok()
+        return True
+
+    def _queue_move(self, values: Dict[str, float], now: float,
+                    clockwise: Optional[bool] = None):
+        if "F" in values and values["F"] > 0:
+            self.feedrate = values["F"] / 60.0
+        start_x, start_y = self.position["X"], self.position["Y"]
+        distance_sq = 0.0
+        for axis in ("X", "Y", "Z", "E"):
+            if axis not in values:
+                continue
+            target = self.position[axis] + values[axis] if self.relative else values[axis]
+            if axis != "E":
+                distance_sq += (target - self.position[axis]) ** 2
+            self.position[axis] = target
+        distance = math.sqrt(distance_sq)
+        if clockwise is not None:
+            # Bogenlänge um den Mittelpunkt (I, J relativ zum Start)
+            center_x = start_x + values.get("I", 0.0)
+            center_y = start_y + values.get("J", 0.0)
+            radius = math.hypot(start_x - center_x, start_y - center_y)
+            angle = (math.atan2(self.position["Y"] - center_y, self.position["X"] - center_x)
+                     - math.atan2(start_y - center_y, start_x - center_x))
+            if clockwise:
+                angle = -angle
+            angle %= 2 * math.pi
+            distance = radius * (angle or 2 * math.pi)
+        duration = distance / self.feedrate * self.time_scale
+        if self._moves_seen and not self._planner and duration > 0:
+            # Planer lief leer, obwohl gedruckt wird
+            self.starvation_events += 1
+        self._moves_seen = True
+        if duration <= 0:
+            return
+        start = max(now, self._planner_end)
+        self._planner_end = start + duration
+        self._planner.append(self._planner_end)
+
+    def _drain_planner(self, now: float):
+        planner = self._planner
+        while planner and planner[0] <= now:
+            planner.popleft()
+
+    # Temperatur
+
+    def _update_temperatures(self, elapsed: float):
+        if not self.time_scale:
+            # Ohne Zeitraffer sofort auf Zieltemperatur
+            self.hotend = self.target_hotend or AMBIENT_TEMP
+            self.bed = self.target_bed or AMBIENT_TEMP
+            return
+        scaled = elapsed / self.time_scale
+        hotend_goal = self.target_hotend or AMBIENT_TEMP
+        bed_goal = self.target_bed or AMBIENT_TEMP
+        self.hotend += (hotend_goal - self.hotend) * (1 - math.exp(-scaled / self.heat_time_constant))
+        self.bed += (bed_goal - self.bed) * (1 - math.exp(-scaled / self.bed_time_constant))
+
+    def _heater_reached(self, now: float) -> bool:
+        if self._wait_heater == "hotend":
+            reached = abs(self.hotend - self.target_hotend) < 1.0
+        else:
+            reached = abs(self.bed - self.target_bed) < 1.0
+        if not reached and now - self._last_wait_report >= 1.0:
+            # Marlin meldet beim Warten einmal pro Sekunde die Temperatur
+            self._last_wait_report = now
+            self._out += f" {self._temperature_report()} W:?\n".encode()
+        return reached
+
+    def _temperature_report(self) -> str:
+        return (f"T:{self.hotend:.2f} /{self.target_hotend:.2f} "
+                f"B:{self.bed:.2f} /{self.target_bed:.2f} @:0 B@:0")
+
+    def _position_report(self) -> str:
+        p = self.position
+        return (f"X:{p['X']:.2f} Y:{p['Y']:.2f} Z:{p['Z']:.2f} E:{p['E']:.2f} "
+                f"Count X:{int(p['X'] * 80)} Y:{int(p['Y'] * 80)} Z:{int(p['Z'] * 400)}")
+
+    def _auto_report(self, now: float):
+        if self.temp_interval and now >= self._next_temp_report:
+            self._out += f" {self._temperature_report()}\n".encode()
+            self._next_temp_report = now + self.temp_interval
+        if self.position_interval and now >= self._next_position_report:
+            self._out += (self._position_report() + "\n").encode()
+            self._next_position_report = now + self.position_interval
+
+
+class VirtualPrinterFarm:
+    """Startet viele virtuelle Drucker auf einmal, z.B. für Last-Tests in der CI"""
+
+    def __init__(self, count: int, **printer_options):
+        self.printers: List[VirtualPrinter] = [
+            VirtualPrinter(**printer_options) for _ in range(count)
+        ]
+
+    @property
+    def ports(self) -> List[str]:
+        return [printer.port for printer in self.printers]
+
+    def start(self) -> "VirtualPrinterFarm":
+        for printer in self.printers:
+            printer.start()
+        return self
+
+    def stop(self):
+        for printer in self.printers:
+            printer.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict[str, float]:
+        """Summierte Statistik aller Drucker"""
+        totals: Dict[str, float] = {}
+        for printer in self.printers:
+            for key, value in printer.stats().items():
+                totals[key] = max(totals.get(key, 0), value) if key == 'max_rx_used' \
+                    else totals.get(key, 0) + value
+        return totals
@@ -67,8 +67,8 @@ class BackupManager:
                 sha256_hash.update(byte_block)
         return sha256_hash.hexdigest()
         
-    def create_backup(self, name: str = None) -> bool:
-        """Erstellt ein neues Backup"""
+    def create_backup(self, name: str = None, progress_callback=None) -> bool:
+        """Erstellt ein neues Backup; ``progress_callback(progress, status)`` je Datei"""
         try:
             if name is None:
                 name = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -77,8 +77,11 @@ class BackupManager:
             manifest_path = self.backup_dir / f"{name}_manifest.json"
             
             # Erstelle Backup-Archiv
+            files = self._get_backup_files()
             with tarfile.open(backup_path, "w:gz") as tar:
-                for file_path in self._get_backup_files():
+                for index, file_path in enumerate(files):
+                    if progress_callback:
+                        progress_callback(int(index * 100 / len(files)), f"Sichere {file_path}")
                     tar.add(file_path)
                     
             # Erstelle und speichere Manifest
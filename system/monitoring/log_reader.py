@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+import asyncio
+import ctypes
+import os
+import select
+import time
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Tuple
+
+LOG_FILES = {
+    'system': '/var/log/innovate_init.log',
+    'network': '/var/log/innovate_network.log',
+    'update': '/var/log/innovate_update.log'
+}
+
+BLOCK_SIZE = 64 * 1024
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+# inotify(7); ohne libc-Unterstützung wird gepollt
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_MOVE_SELF = 0x800
+IN_DELETE_SELF = 0x400
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+
+class LogFilter:
+    """Filtert Zeilen im Format ``asctime - name - levelname - message``.
+
+    Zeilen ohne eigenen Kopf (z.B. Tracebacks) gehören zum Eintrag davor
+    und werden mit ihm zusammen angezeigt oder verworfen. Zeitpunkte werden
+    als Text verglichen; ``asctime`` sortiert lexikografisch richtig und
+    muss so nicht für jede Zeile geparst werden.
+    """
+
+    def __init__(self, level: Optional[str] = None, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None):
+        if level is not None and level.upper() not in LEVELS:
+            raise ValueError(f"Unbekanntes Log-Level: {level}")
+        self.min_level = LEVELS.index(level.upper()) if level else None
+        self.since = self._asctime(since) if since else None
+        self.until = self._asctime(until) if until else None
+
+    @staticmethod
+    def _asctime(value: datetime) -> str:
+        return value.strftime('%Y-%m-%d %H:%M:%S,%f')[:23]
+
+    @property
+    def active(self) -> bool:
+        return self.min_level is not None or self.since is not None or self.until is not None
+
+    @staticmethod
+    def _split(line: str) -> Optional[List[str]]:
+        parts = line.split(' - ', 3)
+        if len(parts) < 4:
+            return None
+        stamp = parts[0]
+        if len(stamp) != 23 or stamp[4] != '-' or stamp[10] != ' ' or stamp[19] != ',':
+            return None
+        return parts
+
+    def check(self, line: str) -> Optional[Tuple[str, bool]]:
+        """(Zeitpunkt, passt) für eine Zeile mit Kopf, None für Folgezeilen"""
+        parts = self._split(line)
+        if parts is None:
+            return None
+        stamp = parts[0]
+        if self.min_level is not None:
+            level = parts[2].strip()
+            if level not in LEVELS or LEVELS.index(level) < self.min_level:
+                return stamp, False
+        if self.since is not None and stamp < self.since:
+            return stamp, False
+        if self.until is not None and stamp > self.until:
+            return stamp, False
+        return stamp, True
+
+
+def _reverse_lines(f, size: int, block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """Liefert die Zeilen einer Datei vom Ende her, blockweise rückwärts gelesen"""
+    position = size
+    remainder = b""
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        block = f.read(read_size) + remainder
+        lines = block.split(b"\n")
+        # Die erste Zeile des Blocks kann vorne noch weitergehen
+        remainder = lines.pop(0)
+        for line in reversed(lines):
+            yield line
+    yield remainder
+
+
+def _end_offset(f, size: int, until: str) -> int:
+    """Zeilenanfang, ab dem alle Einträge nach ``until`` liegen (Binärsuche)"""
+    low, high = 0, size
+    while high - low > BLOCK_SIZE:
+        middle = (low + high) // 2
+        f.seek(middle)
+        f.readline()  # Angeschnittene Zeile überspringen
+        start, stamp = f.tell(), None
+        while start < high:
+            parts = LogFilter._split(f.readline().decode('utf-8', errors='replace'))
+            if parts is not None:
+                stamp = parts[0]
+                break
+            start = f.tell()
+        if stamp is not None and stamp > until:
+            high = start
+        else:
+            low = middle
+    return high
+
+
+def tail(path: str, lines: int = 100, log_filter: Optional[LogFilter] = None,
+         block_size: int = BLOCK_SIZE, end: Optional[int] = None) -> List[str]:
+    """Die letzten ``lines`` (passenden) Zeilen einer Datei.
+
+    Liest vom Dateiende rückwärts nur so viele Blöcke wie nötig, statt die
+    ganze Datei zu laden. Da Logs zeitlich sortiert sind, beginnt die Suche
+    mit ``until`` per Binärsuche an der passenden Stelle, und mit ``since``
+    endet sie beim ersten älteren Eintrag.
+    """
+    if lines <= 0:
+        return []
+    log_filter = log_filter if log_filter is not None and log_filter.active else None
+    result: List[str] = []
+    continuation: List[str] = []
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END) if end is None else end
+        if log_filter is not None and log_filter.until is not None:
+            # Alles danach ist zu neu und muss nicht rückwärts gelesen werden
+            size = _end_offset(f, size, log_filter.until)
+        reverse = _reverse_lines(f, size, block_size)
+        # Ein abschließender Zeilenumbruch erzeugt keine eigene Zeile
+        first = next(reverse, None)
+        if first:
+            reverse = _prepend(first, reverse)
+        for raw in reverse:
+            line = raw.decode('utf-8', errors='replace').rstrip('\r')
+            if log_filter is None:
+                result.append(line)
+                if len(result) >= lines:
+                    break
+                continue
+
+            header = log_filter.check(line)
+            if header is None:
+                continuation.append(line)
+                continue
+            record, continuation = [line] + continuation[::-1], []
+            stamp, matches = header
+            if matches:
+                result.extend(reversed(record))
+                if len(result) >= lines:
+                    break
+            elif log_filter.since is not None and stamp < log_filter.since:
+                break
+    result.reverse()
+    return result[-lines:]
+
+
+def _prepend(first: bytes, rest: Iterator[bytes]) -> Iterator[bytes]:
+    yield first
+    yield from rest
+
+
+class LogFollower:
+    """Liest neue Zeilen einer wachsenden Logdatei (wie ``tail -F``).
+
+    Gewartet wird mit inotify auf Änderungen der Datei, ohne inotify mit
+    kurzem Polling. Rotation (neue Datei unter dem Pfad) und Kürzen werden
+    erkannt; danach wird die Datei von vorne gelesen.
+    """
+
+    def __init__(self, path: str, from_end: bool = True, poll_interval: float = 1.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._file = None
+        self._inode = None
+        self._partial = b""
+        self._inotify_fd: Optional[int] = None
+        self._open(from_end)
+
+    def _open(self, from_end: bool) -> bool:
+        try:
+            f = open(self.path, 'rb')
+        except OSError:
+            return False
+        if self._file:
+            self._file.close()
+        self._file = f
+        self._inode = os.fstat(f.fileno()).st_ino
+        self._partial = b""
+        if from_end:
+            f.seek(0, os.SEEK_END)
+        self._watch()
+        return True
+
+    def _watch(self):
+        """Richtet inotify für die aktuelle Datei ein (falls verfügbar)"""
+        self._unwatch()
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return
+            if libc.inotify_add_watch(fd, self.path.encode(),
+                                      IN_MODIFY | IN_ATTRIB | IN_MOVE_SELF | IN_DELETE_SELF) < 0:
+                os.close(fd)
+                return
+            self._inotify_fd = fd
+        except (OSError, AttributeError):
+            # Kein Linux bzw. keine inotify-Funktionen in der libc
+            self._inotify_fd = None
+
+    def _unwatch(self):
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+    def read(self) -> List[str]:
+        """Alle seit dem letzten Aufruf vollständig geschriebenen Zeilen"""
+        if self._file is None and not self._open(from_end=False):
+            return []
+        lines = self._read_available()
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return lines
+        if stat.st_ino != self._inode or stat.st_size < self._file.tell():
+            # Rotiert oder gekürzt: Rest der alten Datei ist gelesen, neue von vorne
+            if self._open(from_end=False):
+                lines += self._read_available()
+        return lines
+
+    @property
+    def offset(self) -> int:
+        """Bis hierhin ist die aktuelle Datei gelesen"""
+        return self._file.tell() - len(self._partial) if self._file else 0
+
+    def _read_available(self) -> List[str]:
+        data = self._partial + self._file.read()
+        lines = data.split(b"\n")
+        self._partial = lines.pop()
+        return [line.decode('utf-8', errors='replace').rstrip('\r') for line in lines]
+
+    def wait(self, timeout: float) -> bool:
+        """Wartet auf eine Änderung; False nach Ablauf von ``timeout``"""
+        if self._inotify_fd is None:
+            time.sleep(min(timeout, self.poll_interval))
+            return True
+        # Rotation meldet inotify für die neue Datei nicht: spätestens nach
+        # ``poll_interval`` prüft read() den Pfad erneut
+        ready, _, _ = select.select([self._inotify_fd], [], [], min(timeout, self.poll_interval))
+        if not ready:
+            return False
+        self._drain()
+        return True
+
+    async def wait_async(self, timeout: float) -> bool:
+        """Wie ``wait``, aber in der Event-Loop statt in einem Thread"""
+        fd = self._inotify_fd
+        if fd is None:
+            await asyncio.sleep(min(timeout, self.poll_interval))
+            return True
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        loop.add_reader(fd, changed.set)
+        try:
+            await asyncio.wait_for(changed.wait(), min(timeout, self.poll_interval))
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            loop.remove_reader(fd)
+        self._drain()
+        return True
+
+    def _drain(self):
+        try:
+            while os.read(self._inotify_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        self._unwatch()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def _line_filter(log_filter: Optional[LogFilter]) -> Callable[[List[str]], List[str]]:
+    """Filtert verfolgte Zeilen; Folgezeilen (z.B. Tracebacks) erben ihren Eintrag"""
+    if log_filter is None or not log_filter.active:
+        return lambda lines: lines
+    show = True
+
+    def visible(lines: List[str]) -> List[str]:
+        nonlocal show
+        result = []
+        for line in lines:
+            header = log_filter.check(line)
+            if header is not None:
+                show = header[1]
+            if show:
+                result.append(line)
+        return result
+
+    return visible
+
+
+def follow(path: str, log_filter: Optional[LogFilter] = None, backlog: int = 0,
+           heartbeat: float = 15.0) -> Iterator[Optional[str]]:
+    """Liefert neue Zeilen, sobald sie geschrieben werden; None als Lebenszeichen
+
+    Vorweg kommen die letzten ``backlog`` passenden Zeilen, lückenlos bis zu
+    der Stelle, ab der verfolgt wird. Das Lebenszeichen alle ``heartbeat``
+    Sekunden lässt Aufrufer (z.B. einen HTTP-Stream) bemerken, dass der
+    Client weg ist, auch wenn nichts geloggt wird.
+    """
+    follower = LogFollower(path)
+    visible = _line_filter(log_filter)
+    try:
+        if backlog > 0 and follower.offset:
+            yield from tail(path, backlog, log_filter, end=follower.offset)
+        while True:
+            deadline = time.monotonic() + heartbeat
+            lines = follower.read()
+            while not lines:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                follower.wait(remaining)
+                lines = follower.read()
+            if not lines:
+                yield None
+                continue
+            yield from visible(lines)
+    finally:
+        follower.close()
+
+
+async def follow_async(path: str, log_filter: Optional[LogFilter] = None, backlog: int = 0,
+                       heartbeat: float = 15.0) -> AsyncIterator[Optional[str]]:
+    """Wie ``follow`` für die Event-Loop, ohne einen Thread zu belegen
+
+    Gewartet wird per ``add_reader`` auf den inotify-Deskriptor. Wird der
+    Generator geschlossen oder abgebrochen, schließt er Datei und inotify
+    sofort statt erst beim nächsten Schreiben.
+    """
+    follower = LogFollower(path)
+    visible = _line_filter(log_filter)
+    try:
+        if backlog > 0 and follower.offset:
+            loop = asyncio.get_running_loop()
+            for line in await loop.run_in_executor(None, tail, path, backlog, log_filter,
+                                                   BLOCK_SIZE, follower.offset):
+                yield line
+        while True:
+            deadline = time.monotonic() + heartbeat
+            lines = follower.read()
+            while not lines:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                await follower.wait_async(remaining)
+                lines = follower.read()
+            if not lines:
+                yield None
+                continue
+            for line in visible(lines):
+                yield line
+    finally:
+        follower.close()
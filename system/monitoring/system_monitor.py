@@ -5,11 +5,133 @@ import json
 import psutil
 import logging
 import sqlite3
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional
 import threading
 
+@dataclass(frozen=True)
+class MetricsSnapshot:
+    """Unveränderlicher Messwertsatz; wird als Ganzes ersetzt, nie geändert"""
+    cpu_percent: float
+    memory_percent: float
+    disk_percent: float
+    temperature: Optional[float]
+    uptime: float
+    bytes_sent: int
+    bytes_recv: int
+    processes: int
+    timestamp: float      # Unix-Zeit der Messung
+    sampled_at: float     # time.monotonic() der Messung
+    etag: str
+
+    def to_dict(self) -> Dict:
+        """Format von ``SystemMonitor.metrics``"""
+        return {
+            'cpu_percent': self.cpu_percent,
+            'memory_percent': self.memory_percent,
+            'disk_percent': self.disk_percent,
+            'network': {
+                'bytes_sent': self.bytes_sent,
+                'bytes_recv': self.bytes_recv
+            },
+            'temperature': self.temperature,
+            'processes': self.processes,
+            'uptime': self.uptime,
+            'timestamp': datetime.fromtimestamp(self.timestamp).isoformat()
+        }
+
+class SystemSampler:
+    """Misst die Systemwerte im Hintergrund und stellt den letzten Stand bereit.
+
+    Ein Thread pro Prozess misst alle ``interval`` Sekunden und ersetzt den
+    Snapshot in einem Schritt; Leser (API, Weboberfläche, SystemMonitor)
+    bekommen ohne Sperre und ohne Wartezeit den letzten Stand. Die
+    CPU-Auslastung ist der Mittelwert seit der vorherigen Messung, statt
+    bei jeder Anfrage eine Sekunde zu blockieren.
+    """
+
+    _shared: Optional['SystemSampler'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.logger = logging.getLogger('SystemMonitor')
+        self._snapshot: Optional[MetricsSnapshot] = None
+        self._sequence = 0
+        # Teil des ETags, damit ein Neustart keine alten ETags wieder trifft
+        self._epoch = format(time.time_ns(), 'x')
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'SystemSampler':
+        """Der gemeinsame Sampler dieses Prozesses (läuft nach dem ersten Aufruf)"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                cls._shared.start()
+            return cls._shared
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            # Erster Aufruf legt nur den Bezugspunkt für die CPU-Auslastung fest
+            psutil.cpu_percent(interval=None)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="SystemSampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Letzter Messwertsatz; misst einmal selbst, falls es noch keinen gibt"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.sample()
+        return snapshot
+
+    def sample(self) -> MetricsSnapshot:
+        """Misst einmal und veröffentlicht das Ergebnis"""
+        with self._lock:
+            network = psutil.net_io_counters()
+            now = time.time()
+            self._sequence += 1
+            snapshot = MetricsSnapshot(
+                cpu_percent=psutil.cpu_percent(interval=None),
+                memory_percent=psutil.virtual_memory().percent,
+                disk_percent=psutil.disk_usage('/').percent,
+                temperature=SystemMonitor._get_temperature(),
+                uptime=now - psutil.boot_time(),
+                bytes_sent=network.bytes_sent,
+                bytes_recv=network.bytes_recv,
+                processes=len(psutil.pids()),
+                timestamp=now,
+                sampled_at=time.monotonic(),
+                etag=f"{self._epoch}-{self._sequence}"
+            )
+            self._snapshot = snapshot
+        return snapshot
+
+    def max_age(self, snapshot: MetricsSnapshot) -> int:
+        """Sekunden, bis ein neuer Snapshot fällig ist (für Cache-Control)"""
+        return max(0, int(snapshot.sampled_at + self.interval - time.monotonic()))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                self.logger.error(f"Fehler beim Messen der Systemwerte: {e}")
+            self._stop.wait(self.interval)
+
 class SystemMonitor:
     def __init__(self):
         self.db_path = Path("/var/lib/innovate/monitoring.db")
@@ -81,18 +203,7 @@ class SystemMonitor:
     def collect_metrics(self):
         """Sammelt Systemmetriken"""
         try:
-            self.metrics = {
-                'cpu_percent': psutil.cpu_percent(interval=1),
-                'memory_percent': psutil.virtual_memory().percent,
-                'disk_percent': psutil.disk_usage('/').percent,
-                'network': {
-                    'bytes_sent': psutil.net_io_counters().bytes_sent,
-                    'bytes_recv': psutil.net_io_counters().bytes_recv
-                },
-                'temperature': self._get_temperature(),
-                'processes': len(psutil.pids()),
-                'timestamp': datetime.now().isoformat()
-            }
+            self.metrics = SystemSampler.shared().snapshot().to_dict()
             
             # Speichere in Datenbank
             self._store_metrics(self.metrics)
@@ -103,7 +214,8 @@ class SystemMonitor:
         except Exception as e:
             self.logger.error(f"Fehler beim Sammeln der Metriken: {e}")
             
-    def _get_temperature(self) -> Optional[float]:
+    @staticmethod
+    def _get_temperature() -> Optional[float]:
         """Liest CPU-Temperatur"""
         try:
             temps = psutil.sensors_temperatures()
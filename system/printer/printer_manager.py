@@ -4,6 +4,8 @@ import logging
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from datetime import datetime
+from kernel.core.ipc import KernelIPCError, get_client, socket_path
+from kernel.hal.async_transport import SyncSerialFacade
 
 @dataclass
 class TempProfile:
@@ -49,7 +51,13 @@ class PrinterManager:
             'name': 'My 3D Printer',
             'model': 'Generic Printer',
             'firmware_version': '1.0.0',
+            'port': '/dev/ttyUSB0',
+            'baudrate': 115200,
             'z_offset': 0.0,
+            'bed_size': {
+                'x': 200,
+                'y': 200
+            },
             'steps_per_mm': {
                 'x': 80.0,
                 'y': 80.0,
@@ -78,6 +86,11 @@ class PrinterManager:
                 'endstop_check': True,
                 'max_temp': 260,
                 'max_speed': 300
+            },
+            'arc_fitting': {
+                'enabled': False,
+                'tolerance': 0.05,
+                'min_segments': 4
             }
         }
         
@@ -176,12 +189,46 @@ class PrinterManager:
         manager._send_gcode(f"M143 S{settings['max_temp']}")  # Set max temp
         manager._send_gcode("M500")  # Save to EEPROM
 
-    def _send_gcode(self, command: str):
-        """Send G-code command to printer"""
-        # TODO: Implement actual printer communication
+    def _send_gcode(self, command: str, timeout: float = 10.0) -> Optional[str]:
+        """Send G-code command to printer
+
+        While the kernel service runs it owns the serial port, so the command
+        goes through its socket; the port is only opened here without it.
+        """
         self.logger.info(f"Sending G-code: {command}")
+        if socket_path().exists():
+            return self._send_via_kernel(command, timeout)
+        try:
+            # Shared transport loop: the port stays open across manager instances
+            conn = SyncSerialFacade.open(self.config['port'], self.config['baudrate'])
+            conn.write(f"{command}\n".encode())
+
+            response = []
+            for _ in range(max(int(timeout / conn.timeout), 1)):
+                line = conn.readline().decode(errors="replace").strip()
+                if line.startswith("ok"):
+                    return "\n".join(response)
+                if line:
+                    response.append(line)
+            self.logger.warning(f"No acknowledgement for G-code: {command}")
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Error sending G-code {command}: {e}")
+        return None
+
+    def _send_via_kernel(self, command: str, timeout: float) -> Optional[str]:
+        """Send G-code to the kernel's printer on the configured port"""
+        port = self.config['port']
+        client = get_client()
+        try:
+            printer = next((p for p in client.list_printers() if p.get('port') == port), None)
+            if printer is None:
+                self.logger.error(f"Kernel has no printer on {port}, G-code not sent: {command}")
+                return None
+            return client.send_command(printer['id'], command, timeout=timeout)
+        except (KernelIPCError, OSError) as e:
+            self.logger.error(f"Error sending G-code {command} via kernel: {e}")
+        return None
 
     def _get_bed_size(self) -> Dict[str, float]:
         """Get printer bed size"""
-        # TODO: Get actual bed size from printer
-        return {'x': 200, 'y': 200}  # Default size
+        return self.config.get('bed_size', {'x': 200, 'y': 200})
@@ -98,8 +98,8 @@ class SystemUpdater:
             self.logger.error(f"Failed to check for updates: {str(e)}")
             return None
 
-    def download_update(self, update_info: UpdateInfo) -> bool:
-        """Download system update"""
+    def download_update(self, update_info: UpdateInfo, progress_callback=None) -> bool:
+        """Download system update; ``progress_callback(progress)`` on every new percent"""
         if self.update_status != "idle":
             return False
         
@@ -125,7 +125,10 @@ class SystemUpdater:
                     if chunk:
                         f.write(chunk)
                         downloaded += len(chunk)
-                        self.update_progress = int((downloaded / total_size) * 100)
+                        progress = int((downloaded / total_size) * 100) if total_size else 0
+                        if progress_callback and progress != self.update_progress:
+                            progress_callback(progress)
+                        self.update_progress = progress
             
             # Verify checksum
             if not self._verify_checksum(file_path, update_info.checksum):
@@ -370,7 +373,7 @@ class SystemUpdater:
                 progress_callback(100, f"Fehler bei der Update-Suche: {str(e)}")
 
     @classmethod
-    def install_update(cls, progress_callback=None):
+    def install_available_update(cls, progress_callback=None):
         """Install available update with progress callback"""
         try:
             updater = cls("/etc/innovate/update")
@@ -0,0 +1,88 @@
+import math
+import pytest
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.gcode.arc_fitter import ArcFitter
+
+def circle(steps, radius=40.0, step_angle=0.05, e="E0.04157"):
+    return [f"G1 X{110 + radius * math.cos(k * step_angle):.3f} "
+            f"Y{110 + radius * math.sin(k * step_angle):.3f} {e}" for k in range(1, steps + 1)]
+
+def fit(tmp_path, lines, **kwargs):
+    source = tmp_path / "part.gcode"
+    source.write_text("\n".join(lines) + "\n")
+    target = tmp_path / "arcs.gcode"
+    counts = ArcFitter(cache_dir=None, **kwargs).process(str(source), str(target))
+    return counts, target.read_text().splitlines()
+
+def arc_words(line):
+    return {word[0]: float(word[1:]) for word in line.split()[1:]}
+
+def test_circle_becomes_few_arcs(tmp_path):
+    """Test that a finely segmented circle collapses into G3 arcs on the same circle"""
+    lines = ["G90", "M83", "G1 X150 Y110 F3000"] + circle(600)
+    (lines_in, lines_out), output = fit(tmp_path, lines)
+
+    assert lines_in == 603
+    assert lines_out < 20
+    x, y = 150.0, 110.0
+    extruded = 0.0
+    for line in output[3:]:
+        assert line.startswith("G3 ")
+        words = arc_words(line)
+        assert x + words["I"] == pytest.approx(110.0, abs=0.05)
+        assert y + words["J"] == pytest.approx(110.0, abs=0.05)
+        x, y = words["X"], words["Y"]
+        extruded += words["E"]
+    assert (x, y) == (float(lines[-1].split()[1][1:]), float(lines[-1].split()[2][1:]))
+    assert extruded == pytest.approx(600 * 0.04157, rel=1e-6)
+
+def test_clockwise_and_absolute_extrusion(tmp_path):
+    """Test G2 output and that absolute E keeps the final extruder position"""
+    lines = ["G90", "M82", "G92 E0", "G1 X150 Y110 F1800"]
+    for k in range(1, 101):
+        angle = -k * 0.05
+        lines.append(f"G1 X{110 + 40 * math.cos(angle):.3f} Y{110 + 40 * math.sin(angle):.3f} "
+                     f"E{k * 0.05:.5f}")
+    _, output = fit(tmp_path, lines)
+
+    arcs = [line for line in output if line.startswith(("G2", "G3"))]
+    assert arcs and all(line.startswith("G2 ") for line in arcs)
+    assert arc_words(output[-1])["E"] == pytest.approx(5.0)
+
+def test_lines_that_are_no_arcs_stay_untouched(tmp_path):
+    """Test that straight lines, zigzags, travel moves and comments are kept verbatim"""
+    lines = ["G90", "M83", ";LAYER:0", "G1 Z0.2 F600", "G0 X10 Y10"]
+    lines += [f"G1 X{10 + i * 2} Y10 E0.1" for i in range(20)]
+    lines += [f"G1 X{50 + i} Y{10 + (i % 2) * 5} E0.1" for i in range(20)]
+    lines += ["G1 X80 Y80 E0.1 ; Kommentar", "G1 E-1 F2400", "M107"]
+    (lines_in, lines_out), output = fit(tmp_path, lines)
+
+    assert output == lines
+    assert lines_in == lines_out
+
+def test_flow_change_breaks_arc(tmp_path):
+    """Test that segments with different extrusion per mm are not merged"""
+    lines = ["G90", "M83", "G1 X150 Y110 F3000"] + circle(50) + circle(100, e="E0.2")[50:]
+    _, output = fit(tmp_path, lines)
+
+    arcs = [arc_words(line) for line in output if line.startswith("G3")]
+    assert len(arcs) >= 2
+    assert sum(arc["E"] for arc in arcs) == pytest.approx(50 * 0.04157 + 50 * 0.2, rel=1e-3)
+
+def test_fit_is_cached_and_used_for_printing(tmp_path):
+    """Test the per-hash cache and that start_print streams the arc version"""
+    source = tmp_path / "part.gcode"
+    source.write_text("\n".join(["G90", "M83", "G1 X150 Y110 F3000"] + circle(200)) + "\n")
+    fitter = ArcFitter(cache_dir=tmp_path / "cache")
+
+    path = fitter.fit(str(source))
+    assert fitter.fit(str(source)) == path
+
+    device = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=tmp_path / "ckpt",
+                           arc_fitter=fitter)
+    device.state = PrinterState.IDLE
+    assert device.start_print(str(source))
+    assert device.current_file == str(source)
+    assert device.gcode_reader.path == path
+    assert device.checkpoints.gcode_file == path
+    device.cancel_print()
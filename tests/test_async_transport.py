@@ -0,0 +1,43 @@
+import os
+import pty
+import time
+import pytest
+from kernel.hal.async_transport import TransportLoop, SyncSerialFacade
+
+@pytest.fixture
+def transport_loop():
+    loop = TransportLoop()
+    yield loop
+    loop.stop()
+
+def test_lines_are_received(transport_loop):
+    """Test that complete lines arrive and partial lines wait for the newline"""
+    master, slave = pty.openpty()
+    try:
+        conn = SyncSerialFacade.open(os.ttyname(slave), timeout=1, transport_loop=transport_loop)
+        os.write(master, b"ok T:21.0\nec")
+        assert conn.readline() == b"ok T:21.0\n"
+        os.write(master, b"ho\n")
+        assert conn.readline() == b"echo\n"
+        conn.write(b"M105\n")
+        assert os.read(master, 100) == b"M105\n"
+    finally:
+        os.close(master)
+        os.close(slave)
+
+def test_hangup_closes_transport(transport_loop):
+    """Test that EOF on an unplugged port closes the transport instead of spinning"""
+    master, slave = pty.openpty()
+    conn = SyncSerialFacade.open(os.ttyname(slave), timeout=1, transport_loop=transport_loop)
+    os.close(slave)
+    # Closing the master is what the slave sees when a USB adapter disappears
+    os.close(master)
+
+    deadline = time.monotonic() + 2.0
+    while conn.is_open and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not conn.is_open
+    with pytest.raises(OSError):
+        conn.readline()
+    with pytest.raises(OSError):
+        conn.write(b"M105\n")
@@ -0,0 +1,31 @@
+import pytest
+from benchmarks import bench_parse, bench_scheduler
+from benchmarks.common import compare, percentiles, report
+
+def test_percentiles_in_milliseconds():
+    """Test latency percentiles of a sample series"""
+    result = percentiles([0.001 * i for i in range(1, 101)])
+    assert result["p50_ms"] == pytest.approx(51.0)
+    assert result["p99_ms"] == pytest.approx(99.0)
+    assert result["max_ms"] == pytest.approx(100.0)
+
+def test_compare_flags_only_regressions():
+    """Test that slower throughput and higher latency count as regressions"""
+    baseline = report({"bench": {"lines_per_second": 1000.0, "p99_ms": 2.0, "events": 5}})
+    current = report({"bench": {"lines_per_second": 700.0, "p99_ms": 1.0, "events": 50}})
+
+    regressions = compare(current, baseline, tolerance=0.1)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("bench.lines_per_second")
+    assert compare(baseline, baseline) == []
+
+def test_small_benchmarks_run(tmp_path):
+    """Test that parse and scheduler benchmarks produce JSON-ready numbers"""
+    parse = bench_parse.run([2000], str(tmp_path), repeat=1)["2000"]
+    assert parse["commands"] > 1900
+    assert parse["read_lines_per_second"] > 0
+
+    scheduler = bench_scheduler.run(printers=4, jobs=50, repeat=1)
+    assert scheduler["completed"]
+    assert scheduler["dispatch_jobs_per_second"] > 0
@@ -0,0 +1,172 @@
+import threading
+import time
+import pytest
+from kernel.core import kernel as kernel_module
+from kernel.core.kernel import InnovateKernel
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.devices.selector import DeviceSelector
+
+class StubPrinter(PrinterDevice):
+    """Printer whose send_command answers, fails or stalls without hardware"""
+    def __init__(self, device_id, behaviour="ok", delay=0.0, tracker=None, **options):
+        super().__init__(device_id, f"/dev/tty{device_id}", checkpoint_dir=None, **options)
+        self.state = PrinterState.IDLE
+        self.behaviour = behaviour
+        self.delay = delay
+        self.tracker = tracker
+        self.commands = []
+
+    def send_command(self, command, timeout=10.0):
+        if self.tracker:
+            self.tracker.enter()
+        try:
+            time.sleep(self.delay)
+            self.commands.append((command, timeout))
+            if self.behaviour == "timeout":
+                raise TimeoutError(f"Keine Antwort von Drucker {self.id} auf {command}")
+            if self.behaviour == "error":
+                raise OSError("Port geschlossen")
+            return f"{self.id}: {command}"
+        finally:
+            if self.tracker:
+                self.tracker.leave()
+
+class ConcurrencyTracker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+@pytest.fixture
+def kernel(monkeypatch):
+    # Keep the job queue and G-code cache out of /var/lib
+    monkeypatch.setattr(kernel_module, "JobStore", lambda: None)
+    monkeypatch.setattr(kernel_module, "GCodeCache", lambda: None)
+    kernel = InnovateKernel()
+    yield kernel
+    kernel.preprocessor.shutdown()
+
+def add(kernel, *printers):
+    for printer in printers:
+        kernel.devices[printer.id] = printer
+
+def test_selector_criteria_are_combined():
+    """Test tag, state, pool and id selection, each alone and combined"""
+    printers = [
+        StubPrinter("a", tags=["hall-1"], pool="farm"),
+        StubPrinter("b", tags=["hall-1", "pla"], pool="lab"),
+        StubPrinter("c", tags=["hall-2"], pool="farm"),
+    ]
+    printers[1].state = PrinterState.PRINTING
+
+    def ids(selector):
+        return [printer.id for printer in selector.select(printers)]
+
+    assert ids(DeviceSelector()) == ["a", "b", "c"]
+    assert ids(DeviceSelector.create(tag="hall-1")) == ["a", "b"]
+    assert ids(DeviceSelector.create(state="printing")) == ["b"]
+    assert ids(DeviceSelector.create(pool="farm")) == ["a", "c"]
+    assert ids(DeviceSelector.create(device_ids=["c", "missing"])) == ["c"]
+    assert ids(DeviceSelector.create(tag="hall-1", state="idle", pool="farm")) == ["a"]
+    assert ids(DeviceSelector.create(tag="hall-2", device_ids=["a"])) == []
+    with pytest.raises(ValueError):
+        DeviceSelector.create(state="sleeping")
+
+def test_broadcast_reaches_selected_printers_only(kernel):
+    """Test that only matching printers receive the command"""
+    add(kernel, StubPrinter("a", tags=["hall-1"]), StubPrinter("b", tags=["hall-2"]),
+        StubPrinter("c", tags=["hall-1"]))
+
+    results = kernel.broadcast_command(DeviceSelector.create(tag="hall-1"), "M105", timeout=3.0)
+
+    assert sorted(results) == ["a", "c"]
+    assert results["a"] == {"status": "success", "result": "a: M105",
+                            "duration": results["a"]["duration"]}
+    assert kernel.devices["a"].commands == [("M105", 3.0)]
+    assert kernel.devices["b"].commands == []
+    assert kernel.broadcast_command(DeviceSelector.create(tag="none"), "M105") == {}
+
+def test_broadcast_respects_max_concurrency(kernel):
+    """Test that no more than max_concurrency printers are addressed at once"""
+    tracker = ConcurrencyTracker()
+    add(kernel, *[StubPrinter(f"p{i}", delay=0.05, tracker=tracker) for i in range(10)])
+
+    started = time.monotonic()
+    results = kernel.broadcast_command(None, "M105", max_concurrency=3)
+    elapsed = time.monotonic() - started
+
+    assert len(results) == 10
+    assert tracker.peak == 3
+    # Four rounds of 50 ms instead of one round per printer
+    assert 0.2 <= elapsed < 1.0
+
+def test_broadcast_reports_partial_failures(kernel):
+    """Test that timeouts and errors are reported per printer without failing the rest"""
+    # A real printer without a connection
+    offline = PrinterDevice("offline", "/dev/ttyoffline", checkpoint_dir=None)
+    add(kernel, StubPrinter("ok-1"), StubPrinter("slow", behaviour="timeout"),
+        StubPrinter("broken", behaviour="error"), offline, StubPrinter("ok-2", delay=0.02))
+
+    results = kernel.broadcast_command(None, "G28")
+
+    assert {device_id: result["status"] for device_id, result in results.items()} == {
+        "ok-1": "success", "ok-2": "success", "slow": "timeout",
+        "broken": "error", "offline": "error",
+    }
+    assert "Keine Antwort" in results["slow"]["error"]
+    assert results["broken"]["error"] == "Port geschlossen"
+    assert "nicht verbunden" in results["offline"]["error"]
+    assert results["ok-2"]["duration"] >= 0.02
+    assert all("duration" in result for result in results.values())
+
+def test_printing_devices_only_take_print_control(kernel):
+    """Test that printing devices reject raw G-code but follow pause and cancel"""
+    idle, printing = StubPrinter("idle"), StubPrinter("busy")
+    printing.state = PrinterState.PRINTING
+    add(kernel, idle, printing)
+
+    results = kernel.broadcast_command(None, "M105")
+    assert results["idle"]["status"] == "success"
+    assert results["busy"]["status"] == "rejected"
+    assert printing.commands == []
+
+    results = kernel.broadcast_command(None, "pause")
+    assert results["busy"] == {"status": "success", "result": "paused",
+                               "duration": results["busy"]["duration"]}
+    assert results["idle"]["result"] == "idle"
+    assert kernel.broadcast_command(None, "M24")["busy"]["result"] == "printing"
+    assert kernel.broadcast_command(None, "CANCEL ; stop all")["busy"]["result"] == "idle"
+    # Control commands never reach the serial line
+    assert printing.commands == []
+    assert idle.commands == [("M105", 10.0)]
+
+def test_client_limits_are_clamped(kernel):
+    """Test that oversized concurrency and timeout values from clients are capped"""
+    tracker = ConcurrencyTracker()
+    add(kernel, *[StubPrinter(f"p{i}", delay=0.05, tracker=tracker)
+                  for i in range(kernel_module.MAX_BROADCAST_CONCURRENCY + 8)])
+
+    results = kernel.broadcast_command(None, "M105", max_concurrency=10 ** 6, timeout=10 ** 6)
+
+    assert tracker.peak == kernel_module.MAX_BROADCAST_CONCURRENCY
+    assert {printer_timeout for device in kernel.devices.values()
+            for _, printer_timeout in device.commands} == {kernel_module.MAX_COMMAND_TIMEOUT}
+    assert all(result["status"] == "success" for result in results.values())
+
+def test_send_command_refuses_while_streaming():
+    """Test that raw commands cannot interleave with a running send loop"""
+    printer = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=None)
+    printer.connection = object()
+    printer.state = PrinterState.PRINTING
+    printer._print_thread = threading.current_thread()
+    with pytest.raises(RuntimeError, match="druckt"):
+        printer.send_command("M105")
@@ -0,0 +1,93 @@
+from collections import defaultdict
+from web.admin.broadcast import BroadcastHub, split_printers
+
+class FakeManager:
+    def __init__(self):
+        self.rooms = {'/': defaultdict(set)}
+
+class FakeServer:
+    def __init__(self):
+        self.manager = FakeManager()
+
+    def enter_room(self, sid, room, namespace='/'):
+        self.manager.rooms[namespace][room].add(sid)
+
+    def leave_room(self, sid, room, namespace='/'):
+        self.manager.rooms[namespace][room].discard(sid)
+
+class FakeSocketIO:
+    def __init__(self):
+        self.server = FakeServer()
+        self.emitted = []
+        self.tasks = []
+
+    def emit(self, event, data, to=None, namespace='/'):
+        self.emitted.append((event, data, to))
+
+    def start_background_task(self, target):
+        self.tasks.append(target)
+        return target
+
+def make_hub(samples):
+    socketio = FakeSocketIO()
+    hub = BroadcastHub(socketio)
+    hub.add_source('system_stats', 'system_stats', lambda: samples['stats'], interval=2.0)
+    hub.add_source('printers', 'printer_status_update', lambda: samples['printers'],
+                   interval=1.0, split=split_printers, split_prefix='printer:',
+                   split_event='printer_status')
+    return hub, socketio
+
+def test_one_sample_per_interval_for_all_clients():
+    """Test that a source is sampled once per tick and emitted once per room"""
+    samples = {'stats': {'cpu': 10}, 'printers': {'printers': []}}
+    hub, socketio = make_hub(samples)
+    for sid in range(50):
+        assert hub.join(f"sid{sid}", 'system_stats')
+    assert len(socketio.tasks) == 1
+
+    hub.tick(now=0.0)
+    assert hub.sample_count == 1
+    assert socketio.emitted == [('system_stats', {'cpu': 10}, 'system_stats')]
+
+    hub.tick(now=1.0)
+    assert hub.sample_count == 1
+    hub.tick(now=2.0)
+    assert hub.sample_count == 2
+    # Unverändert: nichts senden
+    assert len(socketio.emitted) == 1
+
+def test_late_joiner_gets_last_state():
+    """Test that a new client gets the cached payload without a new sample"""
+    samples = {'stats': {'cpu': 10}, 'printers': {'printers': []}}
+    hub, socketio = make_hub(samples)
+    hub.join('a', 'system_stats')
+    hub.tick(now=0.0)
+    hub.join('b', 'system_stats')
+    assert socketio.emitted[-1] == ('system_stats', {'cpu': 10}, 'b')
+    assert hub.sample_count == 1
+    assert not hub.join('b', 'unknown')
+
+def test_printer_rooms_get_only_their_changes():
+    """Test that per-printer rooms receive only updates of their printer"""
+    p1 = {'id': 'p1', 'progress': 1.0}
+    p2 = {'id': 'p2', 'progress': 5.0}
+    samples = {'stats': {}, 'printers': {'printers': [p1, p2]}}
+    hub, socketio = make_hub(samples)
+    hub.join('a', 'printer:p1')
+    hub.tick(now=0.0)
+    assert ('printer_status', p1, 'printer:p1') in socketio.emitted
+
+    socketio.emitted.clear()
+    samples['printers'] = {'printers': [p1, {'id': 'p2', 'progress': 6.0}]}
+    hub.tick(now=1.0)
+    assert [emit[2] for emit in socketio.emitted] == ['printers', 'printer:p2']
+
+def test_no_sampling_without_listeners():
+    """Test that sources without subscribers are not sampled"""
+    samples = {'stats': {'cpu': 10}, 'printers': {'printers': []}}
+    hub, socketio = make_hub(samples)
+    hub.join('a', 'system_stats')
+    hub.leave('a', 'system_stats')
+    hub.tick(now=0.0)
+    assert hub.sample_count == 0
+    assert socketio.emitted == []
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+import pytest
+from kernel.devices.checkpoint import CheckpointLog, RECORD_SIZE
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.gcode.layer_index import LayerIndex
+from kernel.hal.gcode_streamer import GCodeStreamer
+
+def make_gcode(tmp_path, count=100):
+    path = tmp_path / "part.gcode"
+    path.write_text("".join(f"G1 X{i} Y{i} E{i * 0.1:.1f}\n" for i in range(count)))
+    return str(path)
+
+def start_printer(tmp_path, gcode):
+    printer = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=tmp_path / "ckpt")
+    printer.state = PrinterState.IDLE
+    assert printer.start_print(gcode)
+    return printer
+
+def test_recover_seeks_to_checkpoint_offset(tmp_path):
+    """Test that a restarted device resumes at the checkpointed line"""
+    gcode = make_gcode(tmp_path)
+    printer = start_printer(tmp_path, gcode)
+    lines = printer.gcode_reader.lines()
+    for _ in range(42):
+        next(lines)
+    printer.move(z=0.6, e=4.1)
+    printer.set_temperature(210.0, 60.0)
+    printer.pause_print()
+
+    restarted = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=tmp_path / "ckpt")
+    restarted.state = PrinterState.IDLE
+    checkpoint = restarted.recover_print()
+
+    assert restarted.state == PrinterState.PAUSED
+    assert checkpoint.z == pytest.approx(0.6)
+    assert checkpoint.target_hotend == 210.0
+    assert "M109 S210" in checkpoint.resume_commands()
+    assert bytes(next(iter(restarted.gcode_reader))) == b"G1 X42 Y42 E4.2"
+
+def test_torn_record_is_ignored_and_truncated(tmp_path):
+    """Test that a partially written record does not hide earlier checkpoints"""
+    gcode = make_gcode(tmp_path)
+    printer = start_printer(tmp_path, gcode)
+    printer.checkpoint(file_offset=100)
+    printer.checkpoint(file_offset=200, sync=True)
+    path = printer.checkpoints.path
+    with open(path, "ab") as f:
+        f.write(b"\x00" * (RECORD_SIZE // 2))
+
+    log = CheckpointLog(path)
+    checkpoint = log.recover()
+    assert checkpoint.file_offset == 200
+    assert log.records == 2
+    header_size = CheckpointLog.load(path)[3]
+    assert os.path.getsize(path) == header_size + 2 * RECORD_SIZE
+    log.close()
+
+def test_finished_print_discards_log(tmp_path):
+    """Test that completed prints leave no checkpoint behind"""
+    printer = start_printer(tmp_path, make_gcode(tmp_path))
+    printer.checkpoint()
+    printer.finish_print()
+
+    assert not printer.checkpoints.path.exists()
+    assert CheckpointLog.load(printer.checkpoints.path) is None
+
+class StreamingHal:
+    """HAL whose firmware acknowledges one buffered line per readline"""
+    def __init__(self, on_line=None):
+        self.pending = []
+        self.executed = []
+        self.on_line = on_line
+        self.streamer = GCodeStreamer(self)
+
+    def write(self, data):
+        self.pending.append(data)
+        return len(data)
+
+    def readline(self):
+        if not self.pending:
+            return b""
+        line = self.pending.pop(0).decode().strip()
+        if line.startswith("N"):
+            self.executed.append(line.split(" ", 1)[1].rsplit("*", 1)[0])
+            if self.on_line:
+                self.on_line(len(self.executed))
+        return b"ok\n"
+
+    def stream_gcode(self, port, commands, on_progress=None):
+        self.streamer.stream(commands, on_progress=on_progress)
+        return True
+
+class RecordingPrinter(PrinterDevice):
+    """Printer that records the offsets passed to periodic checkpoints"""
+    def maybe_checkpoint(self, file_offset=None):
+        self.recorded.append((file_offset, len(self.hal.executed), self.gcode_reader.tell()))
+        self.reported.append(self.progress)
+        super().maybe_checkpoint(file_offset)
+
+def line_end(gcode, count):
+    """Byte offset after the first ``count`` lines"""
+    with open(gcode, "rb") as f:
+        return sum(len(f.readline()) for _ in range(count))
+
+def test_send_loop_tracks_acknowledged_lines(tmp_path):
+    """Test that checkpoints and progress never run past the last acknowledged line"""
+    gcode = make_gcode(tmp_path)
+    printer = RecordingPrinter("printer-1", "/dev/null", checkpoint_dir=tmp_path / "ckpt",
+                               checkpoint_interval=0.0)
+    printer.recorded = []
+    printer.reported = []
+    printer.hal = StreamingHal()
+    printer.state = PrinterState.IDLE
+    # Built by the kernel when the job is scheduled
+    LayerIndex.for_file(gcode)
+    finished = threading.Event()
+    printer.print_listeners.append(lambda device, success: finished.set())
+
+    assert printer.start_print(gcode)
+    assert finished.wait(5)
+
+    assert len(printer.recorded) == 100
+    for offset, executed, _ in printer.recorded:
+        assert offset == line_end(gcode, executed)
+    # The reader runs ahead by the lines still in the firmware buffer
+    assert any(offset < read for offset, _, read in printer.recorded)
+    assert printer.reported == sorted(printer.reported)
+    assert 0.0 < printer.reported[0] < printer.reported[50] < printer.reported[-1]
+    assert printer.reported[-1] == pytest.approx(100.0)
+
+def test_pause_checkpoint_waits_for_buffered_lines(tmp_path):
+    """Test that pausing a stream checkpoints after the lines already sent"""
+    gcode = make_gcode(tmp_path)
+    printer = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=tmp_path / "ckpt",
+                            checkpoint_interval=3600.0)
+    printer.hal = StreamingHal(on_line=lambda executed: executed == 42 and printer.pause_print())
+    printer.state = PrinterState.IDLE
+    assert printer.start_print(gcode)
+
+    path = printer.checkpoints.path
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        # Skip the periodic checkpoint written after the first line
+        loaded = CheckpointLog.load(path)
+        if loaded and loaded[1] is not None and loaded[1].file_offset > line_end(gcode, 1):
+            break
+        time.sleep(0.01)
+    executed = len(printer.hal.executed)
+    assert executed > 42
+    assert loaded[1].file_offset == line_end(gcode, executed)
+
+    restarted = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=tmp_path / "ckpt")
+    restarted.state = PrinterState.IDLE
+    restarted.recover_print()
+    expected = f"G1 X{executed} Y{executed} E{executed * 0.1:.1f}".encode()
+    assert bytes(next(iter(restarted.gcode_reader))) == expected
+    printer.cancel_print()
@@ -0,0 +1,229 @@
+import os
+import threading
+import pytest
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.gcode import compiler
+from kernel.gcode.compiler import CompiledGCode, GCodeCache, compile_gcode
+from kernel.hal.gcode_streamer import GCodeStreamer, gcode_checksum
+
+SOURCE = (
+    b"; header\n"
+    b"G28 ; home\n"
+    b"\n"
+    b";LAYER:0\n"
+    b"G1 Z0.2 F600\n"
+    b"G1  X10 Y10\tE0.5\n"
+    b";LAYER:1\n"
+    b"G1 Z0.4\n"
+    b"G1 X0 Y0 E1.0"
+)
+
+def write(tmp_path, data=SOURCE, name="part.gcode"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+class AckingFirmware:
+    """Firmware that acknowledges every line and records what it executed"""
+    def __init__(self):
+        self.pending = []
+        self.executed = []
+
+    def write(self, data):
+        self.pending.append(data)
+        return len(data)
+
+    def readline(self):
+        if not self.pending:
+            return b""
+        line = self.pending.pop(0).decode().strip()
+        if line.startswith("N"):
+            self.executed.append(line.split(" ", 1)[1].rsplit("*", 1)[0])
+        return b"ok\n"
+
+class FakeHal:
+    def __init__(self):
+        self.firmware = AckingFirmware()
+        self.streamer = GCodeStreamer(self.firmware)
+        self.items = []
+
+    def stream_gcode(self, port, commands, on_progress=None):
+        def record():
+            for item in commands:
+                self.items.append(item)
+                yield item
+        self.streamer.stream(record(), on_progress=on_progress)
+        return True
+
+def test_compile_round_trip(tmp_path):
+    """Test commands, checksums, layers and source offsets of a compiled file"""
+    source = write(tmp_path)
+    target = str(tmp_path / "part.igc")
+    compile_gcode(source, target)
+
+    expected = [b"G28", b"G1 Z0.2 F600", b"G1 X10 Y10 E0.5", b"G1 Z0.4", b"G1 X0 Y0 E1.0"]
+    with CompiledGCode(target) as compiled:
+        assert len(compiled) == len(expected)
+        commands = [(bytes(command), checksum) for command, checksum in compiled.commands()]
+        assert commands == [(command, gcode_checksum(command)) for command in expected]
+        assert [bytes(command) for command, _ in compiled.commands(3)] == expected[3:]
+        assert compiled.layers == [(1, 0.2), (3, 0.4)]
+
+        # Every command maps back to the start of its line in the source
+        for index in range(len(expected)):
+            offset = compiled.source_offsets[index]
+            line = SOURCE[offset:].split(b"\n")[0]
+            assert line.split(b";")[0].split() == expected[index].split()
+            assert compiled.line_at(offset) == index
+        assert compiled.source_offsets[len(expected)] == len(SOURCE)
+        # Offsets of comments and blank lines resume at the next command
+        assert compiled.line_at(SOURCE.index(b";LAYER:1")) == 3
+        assert compiled.line_at(len(SOURCE)) == len(expected)
+        assert compiled.matches(source)
+
+def test_index_spills_in_small_blocks(tmp_path, monkeypatch):
+    """Test that indexes written in several spill blocks match a single-block compile"""
+    source = write(tmp_path, SOURCE * 50)
+    compile_gcode(source, str(tmp_path / "single.igc"))
+    monkeypatch.setattr(compiler, "SPILL_ENTRIES", 3)
+    compile_gcode(source, str(tmp_path / "spilled.igc"))
+
+    assert (tmp_path / "single.igc").read_bytes() == (tmp_path / "spilled.igc").read_bytes()
+    with CompiledGCode(str(tmp_path / "spilled.igc")) as compiled:
+        assert len(compiled) == 250
+        assert bytes(compiled.command(249)) == b"G1 X0 Y0 E1.0"
+        assert compiled.source_offsets[250] == len(SOURCE) * 50
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+def test_truncated_file_is_rejected(tmp_path):
+    """Test that short or cut-off compiled files raise ValueError instead of struct.error"""
+    source = write(tmp_path)
+    target = tmp_path / "part.igc"
+    compile_gcode(source, str(target))
+    data = target.read_bytes()
+
+    for size in (0, 10, len(data) - 1):
+        target.write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            CompiledGCode(str(target))
+
+def test_cache_reuses_unchanged_file(tmp_path, monkeypatch):
+    """Test that an unchanged file is compiled only once"""
+    calls = []
+    original = compiler.compile_gcode
+    monkeypatch.setattr(compiler, "compile_gcode",
+                        lambda source, target: calls.append(source) or original(source, target))
+    cache = GCodeCache(cache_dir=tmp_path / "cache")
+    source = write(tmp_path)
+
+    first = cache.compile(source)
+    first.close()
+    second = cache.compile(source)
+    second.close()
+
+    assert calls == [source]
+    assert first.path == second.path
+
+def test_cache_invalidates_changed_file(tmp_path):
+    """Test that edited files are recompiled instead of served stale"""
+    cache = GCodeCache(cache_dir=tmp_path / "cache")
+    source = write(tmp_path)
+    cache.compile(source).close()
+
+    write(tmp_path, SOURCE.replace(b"X10", b"X20"))
+    assert cache.get(source) is None
+    with cache.compile(source) as compiled:
+        assert bytes(compiled.command(2)) == b"G1 X20 Y10 E0.5"
+
+    # Same content, new mtime: the stamp no longer matches the source
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    compiler._hashes.clear()
+    assert cache.get(source) is None
+    with cache.compile(source) as compiled:
+        assert compiled.matches(source)
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test that eviction removes the file that was used longest ago"""
+    cache = GCodeCache(cache_dir=tmp_path / "cache")
+    sources = [write(tmp_path, b"G1 X%d\n" % i * 20, f"{i}.gcode") for i in range(3)]
+    paths = []
+    for source in sources[:2]:
+        with cache.compile(source) as compiled:
+            paths.append(compiled.path)
+    os.utime(paths[0], (1000, 1000))
+    os.utime(paths[1], (2000, 2000))
+    cache.max_size = cache.cache_size()
+
+    # Touch the first file so the second becomes the oldest
+    cache.get(sources[0]).close()
+    with cache.compile(sources[2]) as compiled:
+        paths.append(compiled.path)
+
+    assert os.path.exists(paths[0])
+    assert not os.path.exists(paths[1])
+    assert os.path.exists(paths[2])
+    assert cache.cache_size() <= cache.max_size
+
+def test_print_streams_compiled_commands(tmp_path):
+    """Test that a print streams the compiled form and keeps source offsets"""
+    source = write(tmp_path)
+    with GCodeCache(cache_dir=tmp_path / "cache").compile(source) as compiled:
+        compiled_file = compiled.path
+
+    device = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=None)
+    device.hal = FakeHal()
+    device.state = PrinterState.IDLE
+    finished = threading.Event()
+    results = []
+    device.print_listeners.append(lambda d, success: (results.append(success), finished.set()))
+
+    assert device.start_print(source, compiled_file=compiled_file)
+    assert finished.wait(5)
+
+    assert results == [True]
+    assert device.state == PrinterState.IDLE
+    assert device.progress == 100.0
+    assert device.hal.firmware.executed == [
+        "G28", "G1 Z0.2 F600", "G1 X10 Y10 E0.5", "G1 Z0.4", "G1 X0 Y0 E1.0"
+    ]
+    # (command, checksum) pairs come straight from the compiled file
+    assert all(isinstance(item, tuple) for item in device.hal.items)
+
+def test_print_falls_back_to_text_for_stale_compiled_file(tmp_path):
+    """Test that a compiled file from an older version of the source is ignored"""
+    source = write(tmp_path)
+    compiled_file = str(tmp_path / "old.igc")
+    compile_gcode(source, compiled_file)
+    write(tmp_path, SOURCE + b"\nM84\n")
+
+    device = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=None)
+    device.hal = FakeHal()
+    device.state = PrinterState.IDLE
+    finished = threading.Event()
+    device.print_listeners.append(lambda d, success: finished.set())
+
+    assert device.start_print(source, compiled_file=compiled_file)
+    assert finished.wait(5)
+    assert device.hal.firmware.executed[-1] == "M84"
+    assert not any(isinstance(item, tuple) for item in device.hal.items)
+
+def test_print_falls_back_to_text_for_truncated_compiled_file(tmp_path):
+    """Test that a corrupt cache file is streamed as text instead of failing the print"""
+    source = write(tmp_path)
+    compiled_file = tmp_path / "part.igc"
+    compile_gcode(source, str(compiled_file))
+    compiled_file.write_bytes(compiled_file.read_bytes()[:20])
+
+    device = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=None)
+    device.hal = FakeHal()
+    device.state = PrinterState.IDLE
+    finished = threading.Event()
+    results = []
+    device.print_listeners.append(lambda d, success: (results.append(success), finished.set()))
+
+    assert device.start_print(source, compiled_file=str(compiled_file))
+    assert finished.wait(5)
+    assert results == [True]
+    assert device.hal.firmware.executed[0] == "G28"
+    assert not any(isinstance(item, tuple) for item in device.hal.items)
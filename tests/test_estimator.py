@@ -0,0 +1,95 @@
+import math
+import pytest
+from kernel.gcode.arc_fitter import ArcFitter
+from kernel.gcode.estimator import PrintTimeEstimator
+
+def write_gcode(tmp_path, lines):
+    path = tmp_path / "part.gcode"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+def test_straight_move_trapezoid(tmp_path):
+    """Test a single move against the analytic trapezoid time"""
+    gcode = write_gcode(tmp_path, ["G28", "G1 X100 F6000"])
+    estimate = PrintTimeEstimator(acceleration=1000, cache_dir=None).scan(gcode)
+
+    # 0.1 s beschleunigen, 0.9 s konstant, 0.1 s bremsen
+    assert estimate.print_time == pytest.approx(1.1, abs=1e-3)
+    assert estimate.moves == 1
+
+def test_filament_and_relative_extrusion(tmp_path):
+    """Test that absolute and relative E moves and G92 resets add up"""
+    gcode = write_gcode(tmp_path, [
+        "G92 E0", "G1 X10 E2 F1200", "G1 X20 E4", "G92 E0",
+        "M83", "G1 X30 E1.5", "G1 E-0.5 F2400", "G1 E0.5",
+        "G4 P250",
+    ])
+    estimate = PrintTimeEstimator(cache_dir=None).scan(gcode)
+
+    assert estimate.filament_length == pytest.approx(5.5)
+    assert estimate.print_time > 0.25
+
+def test_chunking_matches_single_pass(tmp_path):
+    """Test that the estimate barely depends on the chunk size"""
+    lines = ["G90", "G1 F3000"]
+    for i in range(200):
+        lines.append(f"G1 X{(i % 2) * 50} Y{i * 0.5:.1f} E{i * 0.1:.1f}")
+    gcode = write_gcode(tmp_path, lines)
+
+    whole = PrintTimeEstimator(cache_dir=None).scan(gcode)
+    chunked = PrintTimeEstimator(cache_dir=None, chunk_size=16).scan(gcode)
+
+    assert chunked.print_time == pytest.approx(whole.print_time, rel=0.01)
+
+def test_estimate_is_cached(tmp_path):
+    """Test that estimates are stored per file hash and parameters"""
+    gcode = write_gcode(tmp_path, ["G1 X10 F600"])
+    estimator = PrintTimeEstimator(cache_dir=tmp_path / "cache")
+
+    first = estimator.estimate(gcode)
+    assert len(list((tmp_path / "cache").glob("*.json"))) == 1
+    assert estimator.estimate(gcode) == first
+
+def circle_layers(layers=3, steps=120, radius=20.0):
+    lines = ["G28", "G90", "M83", "G1 F1800"]
+    for layer in range(layers):
+        lines += [f";LAYER:{layer}", f"G1 Z{0.2 * (layer + 1):.1f}", f"G1 X{110 + radius} Y110"]
+        lines += [f"G1 X{110 + radius * math.cos(2 * math.pi * k / steps):.3f} "
+                  f"Y{110 + radius * math.sin(2 * math.pi * k / steps):.3f} E0.04"
+                  for k in range(1, steps + 1)]
+    return lines
+
+def test_arc_fitted_file_matches_original(tmp_path):
+    """Test that G2/G3 arcs count with their full length and time"""
+    source = write_gcode(tmp_path, circle_layers())
+    fitted = str(tmp_path / "arcs.gcode")
+    ArcFitter(cache_dir=None).process(source, fitted)
+    with open(fitted) as f:
+        assert any(line.startswith("G3 ") for line in f)
+
+    estimator = PrintTimeEstimator(cache_dir=None)
+    original = estimator.scan(source)
+    arcs = estimator.scan(fitted)
+
+    assert arcs.filament_length == pytest.approx(original.filament_length, rel=1e-3)
+    assert arcs.print_time == pytest.approx(original.print_time, rel=0.05)
+
+def test_arc_forms_and_directions(tmp_path):
+    """Test I/J and R arcs in both directions against the analytic length"""
+    estimator = PrintTimeEstimator(max_speed=1000, acceleration=1e9, cache_dir=None)
+    for arc in ("G2 X20 Y0 I10 J0 E1", "G3 X20 Y0 I10 J0 E1", "G2 X20 Y0 R10 E1",
+                "G3 X20 Y0 R-10 E1"):
+        gcode = write_gcode(tmp_path, ["G28", "G1 F600", arc])
+        estimate = estimator.scan(gcode)
+        # Half circle of radius 10 at 10 mm/s; chords are slightly shorter
+        assert estimate.print_time == pytest.approx(math.pi, rel=0.01)
+        assert estimate.filament_length == pytest.approx(1.0)
+
+    gcode = write_gcode(tmp_path, ["G28", "G1 X10 F600", "G2 X10 Y0 I-10 J0"])
+    assert estimator.scan(gcode).print_time == pytest.approx(1.0 + 2 * math.pi, rel=0.01)
+
+    # A negative radius selects the long way round
+    short = estimator.scan(write_gcode(tmp_path, ["G28", "G1 F600", "G2 X10 Y10 R10"]))
+    long = estimator.scan(write_gcode(tmp_path, ["G28", "G1 F600", "G2 X10 Y10 R-10"]))
+    assert short.print_time == pytest.approx(math.pi / 2, rel=0.01)
+    assert long.print_time == pytest.approx(3 * math.pi / 2, rel=0.01)
@@ -0,0 +1,153 @@
+import pytest
+from collections import deque
+from kernel.hal.gcode_streamer import GCodeStreamer, StreamError, gcode_checksum
+
+class FakeFirmware:
+    """Minimal Marlin-like firmware with a bounded RX buffer"""
+    def __init__(self, rx_buffer_size=128, corrupt_lines=(), noise=None):
+        self.rx_buffer_size = rx_buffer_size
+        self.corrupt_lines = set(corrupt_lines)
+        # line number -> garbled response sent before its ok
+        self.noise = dict(noise or {})
+        self.rx = deque()
+        self.rx_bytes = 0
+        self.max_rx_bytes = 0
+        self.responses = deque()
+        self.executed = []
+        self.last_line = 0
+
+    def write(self, data):
+        self.rx.append(data)
+        self.rx_bytes += len(data)
+        self.max_rx_bytes = max(self.max_rx_bytes, self.rx_bytes)
+        return len(data)
+
+    def readline(self):
+        if not self.responses and self.rx:
+            self._process(self.rx.popleft())
+        return self.responses.popleft() if self.responses else b""
+
+    def _process(self, data):
+        self.rx_bytes -= len(data)
+        line = data.decode().strip()
+        if not line.startswith("N"):
+            if line.startswith("M110"):
+                self.last_line = 0
+            self.responses.append(b"ok\n")
+            return
+
+        payload, checksum = line.rsplit("*", 1)
+        number = int(payload.split(" ", 1)[0][1:])
+        if number != self.last_line + 1:
+            self._resend("Line Number is not Last Line Number+1")
+        elif number in self.corrupt_lines or gcode_checksum(payload.encode()) != int(checksum):
+            self.corrupt_lines.discard(number)
+            self._resend("checksum mismatch")
+        else:
+            self.last_line = number
+            self.executed.append(payload.split(" ", 1)[1])
+            if number in self.noise:
+                self.responses.append(self.noise.pop(number))
+            self.responses.append(b"ok\n")
+
+    def _resend(self, reason):
+        self.responses.append(f"Error:{reason}, Last Line: {self.last_line}\n".encode())
+        self.responses.append(f"Resend: {self.last_line + 1}\n".encode())
+        self.responses.append(b"ok\n")
+
+def make_commands(count):
+    return [f"G1 X{i}.123 Y{i}.456 E{i}.78901" for i in range(count)]
+
+def test_window_respects_rx_buffer():
+    """Test that in-flight bytes never exceed the firmware RX buffer"""
+    firmware = FakeFirmware(rx_buffer_size=128)
+    streamer = GCodeStreamer(firmware, rx_buffer_size=128, max_in_flight=4)
+    streamer.reset_line_numbers()
+    commands = make_commands(200)
+
+    streamer.stream(commands, ack_timeout=1)
+
+    assert firmware.executed == commands
+    assert firmware.max_rx_bytes <= 128
+    assert streamer.idle
+
+def test_multiple_lines_in_flight():
+    """Test that the streamer keeps more than one line in flight"""
+    firmware = FakeFirmware()
+    streamer = GCodeStreamer(firmware, rx_buffer_size=128, max_in_flight=4)
+    commands = iter(["G1 X1", "G1 X2", "G1 X3", "G1 X4", "G1 X5"])
+
+    assert streamer.fill(commands)
+    assert streamer.in_flight == 4
+
+def test_comments_and_blank_lines_are_skipped():
+    """Test that comments and blank lines are not sent"""
+    firmware = FakeFirmware()
+    streamer = GCodeStreamer(firmware)
+    streamer.reset_line_numbers()
+
+    streamer.stream(["; header", "", "G28 ; home", "  M105  "], ack_timeout=1)
+
+    assert firmware.executed == ["G28", "M105"]
+
+def test_resend_recovers_order():
+    """Test that Resend requests replay lines in the original order"""
+    firmware = FakeFirmware(corrupt_lines={5, 17, 40})
+    streamer = GCodeStreamer(firmware)
+    streamer.reset_line_numbers()
+    commands = make_commands(60)
+
+    streamer.stream(commands, ack_timeout=1)
+
+    assert firmware.executed == commands
+    assert streamer.resends == 3
+
+def test_resend_without_number_is_ignored(capsys):
+    """Test that a bare or garbled Resend line does not abort the stream"""
+    firmware = FakeFirmware(corrupt_lines={30}, noise={
+        3: b"Resend:\n", 8: b"Resend: \n", 12: b"rs \n", 20: b"Resend: abc\n",
+    })
+    streamer = GCodeStreamer(firmware)
+    streamer.reset_line_numbers()
+    commands = make_commands(40)
+
+    streamer.stream(commands, ack_timeout=1)
+
+    assert firmware.executed == commands
+    # Only the real resend for line 30 was replayed
+    assert streamer.resends == 1
+    assert capsys.readouterr().out.count("Resend ohne Zeilennummer") == 4
+
+def test_progress_counts_only_accepted_lines():
+    """Test that oks answering a Resend never count as confirmed lines"""
+    firmware = FakeFirmware(corrupt_lines={5, 17, 40})
+    streamer = GCodeStreamer(firmware)
+    streamer.reset_line_numbers()
+    commands = make_commands(60)
+    reports = []
+
+    streamer.stream(commands, ack_timeout=1,
+                    on_progress=lambda confirmed: reports.append((confirmed, len(firmware.executed))))
+
+    assert all(confirmed <= executed for confirmed, executed in reports)
+    assert [confirmed for confirmed, _ in reports] == sorted({c for c, _ in reports})
+    assert reports[-1][0] == 60
+
+def test_precomputed_checksum_matches():
+    """Test that precomputed command checksums produce identical lines"""
+    streamer = GCodeStreamer(FakeFirmware())
+    command = b"G1 X10 Y20"
+    assert streamer._encode(7, command) == streamer._encode(7, command, gcode_checksum(command))
+
+def test_timeout_raises():
+    """Test that a silent firmware raises a StreamError"""
+    class SilentConnection:
+        def write(self, data):
+            return len(data)
+
+        def readline(self):
+            return b""
+
+    streamer = GCodeStreamer(SilentConnection())
+    with pytest.raises(StreamError):
+        streamer.stream(["G28"], ack_timeout=0.05)
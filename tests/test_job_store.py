@@ -0,0 +1,118 @@
+import time
+import pytest
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.scheduler.job_store import JobStore
+from kernel.scheduler.placement import JobConstraints
+from kernel.scheduler.print_scheduler import PrintScheduler
+
+def make_printer(device_id, **options):
+    printer = PrinterDevice(device_id, f"/dev/tty{device_id}", **options)
+    printer.state = PrinterState.IDLE
+    return printer
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "jobs.db"
+
+def test_queue_survives_restart(db_path):
+    """Test that queued jobs are restored in priority and submission order"""
+    scheduler = PrintScheduler(store=JobStore(db_path))
+    scheduler.add_job("printer-1", "b.gcode", priority=2)
+    scheduler.add_job("printer-1", "a.gcode", priority=1)
+    scheduler.add_job(None, "pool.gcode", pool="farm",
+                      constraints=JobConstraints(material="PLA", min_bed_size=(200, 200, 200)))
+    scheduler.store.close()
+
+    restored = PrintScheduler(store=JobStore(db_path))
+    queued = restored.get_queue_status()
+
+    assert [job.gcode_file for job in queued] == ["a.gcode", "pool.gcode", "b.gcode"]
+    assert queued[1].constraints.min_bed_size == (200, 200, 200)
+    assert queued[1].pool == "farm"
+    restored.store.close()
+
+def interrupt_running_job(db_path, *gcode_files):
+    """Dispatch the first job and stop the kernel while it is running"""
+    scheduler = PrintScheduler(store=JobStore(db_path))
+    jobs = [scheduler.add_job("printer-1", gcode_file) for gcode_file in gcode_files]
+    with scheduler._condition:
+        scheduler._take_dispatchable()
+    scheduler.store.close()
+    return jobs
+
+def test_active_jobs_are_recovered(db_path, tmp_path):
+    """Test that a job running at shutdown resumes from the printer's checkpoint"""
+    gcode = tmp_path / "running.gcode"
+    gcode.write_text("G1 X1\nG1 X2\nG1 X3\n")
+    job, = interrupt_running_job(db_path, str(gcode))
+    printer = make_printer("printer-1", checkpoint_dir=tmp_path / "ckpt")
+    assert printer.start_print(str(gcode))
+    printer.pause_print()
+
+    restored = PrintScheduler(store=JobStore(db_path))
+    assert restored.interrupted_jobs["printer-1"].job_id == job.job_id
+    assert restored.get_queue_status() == []
+
+    restarted = make_printer("printer-1", checkpoint_dir=tmp_path / "ckpt")
+    restored.register_device(restarted)
+    assert restarted.state == PrinterState.PAUSED
+    assert restored.active_jobs["printer-1"].job_id == job.job_id
+
+    restored.complete_job("printer-1")
+    restored.store.close()
+    assert PrintScheduler(store=JobStore(db_path)).interrupted_jobs == {}
+
+def test_next_job_dispatches_after_restart_during_print(db_path, tmp_path):
+    """Test that an unrecoverable interrupted job does not block its printer"""
+    running, queued = interrupt_running_job(db_path, "running.gcode", "next.gcode")
+
+    restored = PrintScheduler(store=JobStore(db_path))
+    restored.register_device(make_printer("printer-1", checkpoint_dir=tmp_path / "ckpt"))
+    with restored._condition:
+        jobs = restored._take_dispatchable()
+
+    assert [job.job_id for job in jobs] == [queued.job_id]
+    assert [job.job_id for job in restored.store.load_failed()] == [running.job_id]
+    restored.store.close()
+
+def test_lookup_by_device_and_priority(db_path):
+    """Test the indexed lookup of queued jobs per printer"""
+    store = JobStore(db_path)
+    scheduler = PrintScheduler(store=store)
+    for priority in (3, 1, 2):
+        scheduler.add_job("printer-1", f"p{priority}.gcode", priority=priority)
+    scheduler.add_job("printer-2", "other.gcode")
+
+    jobs = store.jobs_for_device("printer-1")
+    assert [job.gcode_file for job in jobs] == ["p1.gcode", "p2.gcode", "p3.gcode"]
+    store.close()
+
+def test_enqueue_throughput(db_path):
+    """Test that bulk imports stay well above 1k jobs/s"""
+    store = JobStore(db_path)
+    scheduler = PrintScheduler(store=store)
+    count = 5000
+
+    started = time.perf_counter()
+    for i in range(count):
+        scheduler.add_job(f"printer-{i % 30}", f"job-{i}.gcode")
+    store.flush()
+    elapsed = time.perf_counter() - started
+
+    assert count / elapsed > 1000
+    store.close()
+
+def test_job_for_unregistered_printer_fails(db_path):
+    """Test that a job for an unknown printer is marked failed and frees the printer"""
+    scheduler = PrintScheduler(store=JobStore(db_path))
+    job = scheduler.add_job("printer-1", "orphan.gcode")
+    with scheduler._condition:
+        jobs = scheduler._take_dispatchable()
+    assert jobs == [job]
+
+    scheduler._start_print_job(job)
+
+    assert scheduler.active_jobs == {}
+    assert [failed.job_id for failed in scheduler.store.load_failed()] == [job.job_id]
+    assert scheduler.store.load_active() == {}
+    scheduler.store.close()
@@ -0,0 +1,192 @@
+import inspect
+import threading
+import time
+from datetime import datetime
+import pytest
+from api import jobs
+from api.jobs import JOB_CONFLICTS, JobRejected, JobRunner, run_update
+from system.update import system_updater
+from system.update.system_updater import SystemUpdater, UpdateInfo
+
+def wait_for(runner, job_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = runner.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not reach {status}: {runner.get(job_id)}")
+
+def test_submit_returns_before_work_finishes():
+    """Test that submit returns at once and progress is visible while the job runs"""
+    runner = JobRunner(workers=1)
+    release = threading.Event()
+
+    def work(report, name):
+        report(40, f"archiving {name}")
+        release.wait(5)
+        return {"name": name}
+
+    job = runner.submit("backup", work, "nightly")
+    running = wait_for(runner, job.id, "running")
+    while running["progress"] != 40:
+        running = runner.get(job.id)
+    assert running["message"] == "archiving nightly"
+
+    release.set()
+    done = wait_for(runner, job.id, "succeeded")
+    assert done["progress"] == 100
+    assert done["result"] == {"name": "nightly"}
+    assert done["finished"] >= done["started"] >= done["created"]
+    runner.shutdown()
+
+def test_failed_job_keeps_error():
+    """Test that an exception in the job marks it failed with the message"""
+    runner = JobRunner(workers=1)
+
+    def work(report):
+        raise RuntimeError("Update download failed")
+
+    job = runner.submit("update", work)
+    failed = wait_for(runner, job.id, "failed")
+    assert failed["error"] == "Update download failed"
+    assert failed["result"] is None
+    runner.shutdown()
+
+def test_concurrency_and_queue_are_bounded():
+    """Test that workers, pending jobs and conflicting kinds are all limited"""
+    runner = JobRunner(workers=2, max_pending=3)
+    release = threading.Event()
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def work(report):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait(5)
+        with lock:
+            running[0] -= 1
+
+    first = runner.submit("backup", work, conflicts=["backup"])
+    with pytest.raises(JobRejected) as rejected:
+        runner.submit("backup", work, conflicts=["backup"])
+    assert rejected.value.job.id == first.id
+
+    others = [runner.submit("cleanup", work) for _ in range(2)]
+    with pytest.raises(JobRejected) as rejected:
+        runner.submit("cleanup", work)
+    assert rejected.value.job is None
+
+    release.set()
+    for job in [first] + others:
+        wait_for(runner, job.id, "succeeded")
+    assert peak[0] == 2
+    # Finished jobs no longer count against the limits
+    runner.submit("backup", work, conflicts=["backup"])
+    runner.shutdown()
+
+def test_restore_conflicts_with_backup():
+    """Test that restores are their own kind but never run next to a backup"""
+    runner = JobRunner(workers=2)
+    release = threading.Event()
+
+    def work(report):
+        release.wait(5)
+
+    def submit(kind):
+        return runner.submit(kind, work, conflicts=JOB_CONFLICTS[kind])
+
+    backup = submit("backup")
+    with pytest.raises(JobRejected) as rejected:
+        submit("restore")
+    assert rejected.value.job.id == backup.id
+    assert str(rejected.value) == "backup läuft bereits"
+    # Updates do not touch the backups
+    update = submit("update")
+
+    release.set()
+    wait_for(runner, backup.id, "succeeded")
+    wait_for(runner, update.id, "succeeded")
+    release.clear()
+    restore = submit("restore")
+    with pytest.raises(JobRejected):
+        submit("backup")
+    assert runner.get(restore.id)["kind"] == "restore"
+    release.set()
+    wait_for(runner, restore.id, "succeeded")
+    runner.shutdown()
+
+def test_history_is_trimmed():
+    """Test that only the newest finished jobs are kept"""
+    runner = JobRunner(workers=1, max_history=3)
+    jobs = []
+    for index in range(6):
+        jobs.append(runner.submit("backup", lambda report, i=index: i))
+        wait_for(runner, jobs[-1].id, "succeeded")
+    # Trimming runs on submit, so the last job comes on top of the three kept
+    assert [job["result"] for job in runner.list()] == [2, 3, 4, 5]
+    assert runner.get(jobs[0].id) is None
+    runner.shutdown()
+
+class StubUpdater:
+    """SystemUpdater without network, filesystem or installer"""
+    available = UpdateInfo("2.1.0", datetime(2026, 1, 1), "", [], 1024, "", "", True)
+    download_ok = True
+    instances = []
+
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+        self.installed = []
+        StubUpdater.instances.append(self)
+
+    def check_for_updates(self):
+        return self.available
+
+    def download_update(self, update_info, progress_callback=None):
+        for progress in (50, 100):
+            progress_callback(progress)
+        return self.download_ok
+
+    def install_update(self, update_info):
+        self.installed.append(update_info)
+        return True
+
+@pytest.fixture
+def stub_updater(monkeypatch):
+    StubUpdater.instances = []
+    monkeypatch.setattr(system_updater, "SystemUpdater", StubUpdater)
+    return StubUpdater
+
+def test_run_update_installs_available_update(stub_updater):
+    """Test that run_update downloads, installs and reports the new version"""
+    reports = []
+
+    result = run_update(lambda progress, message="": reports.append((progress, message)))
+
+    assert result == {"version": "2.1.0", "requires_restart": True}
+    updater, = stub_updater.instances
+    assert updater.config_dir == jobs.UPDATE_CONFIG_DIR
+    assert updater.installed == [stub_updater.available]
+    # The download covers the first 90 percent
+    assert [progress for progress, _ in reports] == [0, 0, 45, 90, 90]
+    assert reports[-1] == (90, "Installiere Update...")
+
+def test_run_update_fails_without_download(stub_updater, monkeypatch):
+    """Test that a failed download fails the job before anything is installed"""
+    monkeypatch.setattr(stub_updater, "download_ok", False)
+    runner = JobRunner(workers=1)
+
+    job = runner.submit("update", run_update)
+    failed = wait_for(runner, job.id, "failed")
+
+    assert failed["error"] == "Update download failed"
+    assert stub_updater.instances[0].installed == []
+    runner.shutdown()
+
+def test_install_update_is_not_shadowed():
+    """Test that the instance method install_update is not hidden by a classmethod"""
+    assert not isinstance(inspect.getattr_static(SystemUpdater, "install_update"), classmethod)
+    assert isinstance(inspect.getattr_static(SystemUpdater, "install_available_update"),
+                      classmethod)
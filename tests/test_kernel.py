@@ -0,0 +1,61 @@
+import pytest
+from kernel.core import kernel as kernel_module
+from kernel.core.kernel import InnovateKernel
+from kernel.devices.printer_device import PrinterState
+from kernel.hal.port_scanner import PortInfo
+
+class FakeConnection:
+    def write(self, data):
+        return len(data)
+
+    def readline(self):
+        return b"ok\n"
+
+class ScannedHal:
+    """HAL with a fixed port scan result; ``offline`` ports fail to connect"""
+    def __init__(self, detected_ports, offline=()):
+        self.detected_ports = detected_ports
+        self.offline = set(offline)
+        self.printer_configs = {}
+        self.connected = []
+
+    def connect_printer(self, port):
+        if port in self.offline:
+            return None
+        self.connected.append(port)
+        return FakeConnection()
+
+    def attach_telemetry(self, port, device):
+        pass
+
+    def enable_auto_report(self, port):
+        pass
+
+@pytest.fixture
+def kernel(monkeypatch):
+    # Keep the job queue and G-code cache out of /var/lib
+    monkeypatch.setattr(kernel_module, "JobStore", lambda: None)
+    monkeypatch.setattr(kernel_module, "GCodeCache", lambda: None)
+    kernel = InnovateKernel()
+    yield kernel
+    kernel.preprocessor.shutdown()
+
+def test_detected_printers_are_registered(kernel):
+    """Test that every printer found by the port scan is connected and registered"""
+    kernel.hal = ScannedHal({
+        "/dev/ttyUSB0": PortInfo("/dev/ttyUSB0", 250000, "Marlin", usb_serial="A1B2"),
+        "/dev/ttyACM0": PortInfo("/dev/ttyACM0", 115200, "Klipper"),
+        "/dev/ttyACM1": PortInfo("/dev/ttyACM1", 115200, "Marlin"),
+    }, offline={"/dev/ttyACM1"})
+
+    registered = kernel.register_detected_printers()
+
+    assert sorted(device.id for device in registered) == ["A1B2", "ttyACM0"]
+    assert sorted(kernel.devices) == ["A1B2", "ttyACM0"]
+    assert sorted(kernel.scheduler.devices) == ["A1B2", "ttyACM0"]
+    assert kernel.devices["A1B2"].port == "/dev/ttyUSB0"
+    assert all(device.state == PrinterState.IDLE for device in registered)
+
+    # A second call leaves known ports alone
+    assert kernel.register_detected_printers() == []
+    assert kernel.hal.connected == ["/dev/ttyUSB0", "/dev/ttyACM0"]
@@ -0,0 +1,112 @@
+import threading
+import time
+import pytest
+from kernel.core import ipc
+from kernel.core.ipc import KernelClient, KernelIPCError, KernelIPCServer
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.scheduler.print_scheduler import PrintScheduler
+from system.printer import printer_manager
+from system.printer.printer_manager import PrinterManager
+
+class FakeConnection:
+    def write(self, data):
+        self.last = data
+
+    def readline(self):
+        return b"ok\n"
+
+class FakeKernel:
+    """Just enough kernel for the IPC server"""
+    def __init__(self):
+        self.devices = {}
+        self.scheduler = PrintScheduler()
+        for i in range(3):
+            device = PrinterDevice(f"printer-{i}", f"/dev/tty{i}", tags=["farm"], checkpoint_dir=None)
+            device.state = PrinterState.IDLE
+            device.connection = FakeConnection()
+            self.devices[device.id] = device
+
+    def get_device(self, device_id):
+        return self.devices.get(device_id)
+
+@pytest.fixture
+def client(tmp_path):
+    server = KernelIPCServer(FakeKernel(), tmp_path / "kernel.sock")
+    server.start()
+    client = KernelClient(tmp_path / "kernel.sock", pool_size=2, timeout=2.0)
+    yield client
+    client.close()
+    server.stop()
+
+def test_list_and_send(client):
+    """Test printer listing and a single command over the socket"""
+    printers = client.list_printers()
+    assert [p["id"] for p in printers] == ["printer-0", "printer-1", "printer-2"]
+    assert printers[0]["status"] == "idle"
+    assert client.send_command("printer-1", "M105") == ""
+
+def test_errors_carry_kind(client):
+    """Test that kernel errors map to typed client errors"""
+    with pytest.raises(KernelIPCError) as error:
+        client.get_printer("missing")
+    assert error.value.kind == "not_found"
+    with pytest.raises(KernelIPCError) as error:
+        client.call("no_such_method")
+    assert error.value.kind == "bad_request"
+
+def test_pooled_connections_are_reused_across_threads(client):
+    """Test that concurrent callers share a bounded pool of connections"""
+    results = []
+
+    def worker():
+        for _ in range(50):
+            results.append(client.ping())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 200 and all(results)
+    assert len(client._idle) <= 2
+
+def test_round_trip_is_cheap(client):
+    """Test that a request costs a socket round trip, not a kernel construction"""
+    client.ping()
+    started = time.perf_counter()
+    for _ in range(200):
+        client.list_printers()
+    assert (time.perf_counter() - started) / 200 < 0.005
+
+@pytest.fixture
+def kernel_service(tmp_path, monkeypatch):
+    """Kernel IPC server on the socket that get_client() connects to"""
+    kernel = FakeKernel()
+    server = KernelIPCServer(kernel, tmp_path / "kernel.sock")
+    server.start()
+    monkeypatch.setenv(ipc.SOCKET_ENV, str(tmp_path / "kernel.sock"))
+    monkeypatch.setattr(ipc, "_default_client", None)
+    yield kernel
+    if ipc._default_client is not None:
+        ipc._default_client.close()
+    server.stop()
+
+def make_manager(tmp_path, port, monkeypatch):
+    def open_port(*args):
+        raise AssertionError("port opened outside the kernel")
+    monkeypatch.setattr(printer_manager.SyncSerialFacade, "open", open_port)
+    manager = PrinterManager(str(tmp_path / "printer"))
+    manager.config['port'] = port
+    return manager
+
+def test_printer_manager_sends_through_kernel(kernel_service, tmp_path, monkeypatch):
+    """Test that the admin's G-code reaches the kernel's printer instead of the tty"""
+    manager = make_manager(tmp_path, "/dev/tty1", monkeypatch)
+    assert manager._send_gcode("M503") == ""
+    assert kernel_service.devices["printer-1"].connection.last == b"M503\n"
+
+def test_printer_manager_without_kernel_printer(kernel_service, tmp_path, monkeypatch):
+    """Test that a port the kernel does not know is not opened behind its back"""
+    manager = make_manager(tmp_path, "/dev/ttyUSB9", monkeypatch)
+    assert manager._send_gcode("M503") is None
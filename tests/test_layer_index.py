@@ -0,0 +1,107 @@
+import os
+import time
+import pytest
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.gcode.estimator import PrintTimeEstimator
+from kernel.gcode.layer_index import HEADER, RECORD, LayerIndex, sidecar_path
+
+def write_layers(tmp_path, layers=5, moves=40):
+    lines = ["G28", "G90", "M83", "M109 S200"]
+    for layer in range(layers):
+        lines += [f";LAYER:{layer}", f"G1 Z{0.2 * (layer + 1):.1f} F600"]
+        lines += [f"G1 X{(i % 2) * 50} Y{i} E0.5 F3000" for i in range(moves)]
+    path = tmp_path / "part.gcode"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+def test_build_matches_file_layout(tmp_path):
+    """Test layer offsets, heights, times and extrusion from one pass"""
+    gcode = write_layers(tmp_path)
+    index = LayerIndex.build(gcode, PrintTimeEstimator(cache_dir=None))
+    estimate = PrintTimeEstimator(cache_dir=None).scan(gcode)
+
+    assert len(index) == 5
+    assert list(index.z) == pytest.approx([0.2, 0.4, 0.6, 0.8, 1.0])
+    assert index.total_time == pytest.approx(estimate.print_time)
+    assert list(index.filament) == pytest.approx([0, 20, 40, 60, 80])
+    assert all(a < b for a, b in zip(index.times, index.times[1:]))
+    with open(gcode, 'rb') as f:
+        data = f.read()
+    for layer in range(5):
+        start, end = index.layer_range(layer)
+        assert data[start:].startswith(f"G1 Z{0.2 * (layer + 1):.1f}".encode())
+        assert index.read_layer(gcode, layer) == data[start:end]
+
+def test_layer_times_do_not_depend_on_chunking(tmp_path):
+    """Test that layer start times resolve correctly across chunk boundaries"""
+    gcode = write_layers(tmp_path, layers=8, moves=30)
+    whole = LayerIndex.build(gcode, PrintTimeEstimator(cache_dir=None))
+    chunked = LayerIndex.build(gcode, PrintTimeEstimator(cache_dir=None, chunk_size=7))
+
+    assert list(chunked.times) == pytest.approx(list(whole.times), rel=0.01)
+    assert chunked.total_time == pytest.approx(whole.total_time, rel=0.01)
+
+def test_sidecar_roundtrip_and_invalidation(tmp_path):
+    """Test that the sidecar is reused until the G-code file changes"""
+    gcode = write_layers(tmp_path)
+    index = LayerIndex.for_file(gcode)
+    assert os.path.getsize(sidecar_path(gcode)) == HEADER.size + RECORD.size * len(index)
+
+    loaded = LayerIndex.load(sidecar_path(gcode))
+    assert list(loaded.offsets) == list(index.offsets)
+    assert loaded.total_time == index.total_time
+
+    with open(gcode, 'a') as f:
+        f.write(";LAYER:5\nG1 Z1.2\nG1 X10 E1\n")
+    assert len(LayerIndex.for_file(gcode)) == 6
+
+def test_missing_sidecar_is_built_in_background(tmp_path):
+    """Test that starting a print does not wait for a missing layer index"""
+    gcode = write_layers(tmp_path)
+    device = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=None)
+    device.state = PrinterState.IDLE
+
+    assert device.start_print(gcode)
+    deadline = time.monotonic() + 5
+    while device.layer_index is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(device.layer_index) == 5
+    assert os.path.exists(sidecar_path(gcode))
+    device.cancel_print()
+
+def test_progress_lookups(tmp_path):
+    """Test progress, remaining time and layer lookup by byte offset"""
+    gcode = write_layers(tmp_path)
+    index = LayerIndex.for_file(gcode)
+
+    assert index.layer_at(0) == -1
+    assert index.layer_at(index.offsets[2] + 1) == 2
+    assert index.progress(0) == 0.0
+    assert index.progress(index.size) == pytest.approx(100.0)
+    assert index.remaining(index.size) == 0.0
+    samples = [index.progress(offset) for offset in range(0, index.size, 97)]
+    assert samples == sorted(samples)
+    assert index.elapsed(index.offsets[3]) == pytest.approx(index.times[3])
+
+def test_device_progress_and_start_layer(tmp_path):
+    """Test that a print reports layer progress and can start at a layer"""
+    gcode = write_layers(tmp_path)
+    device = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=None)
+    device.state = PrinterState.IDLE
+
+    assert device.start_print(gcode, start_layer=3)
+    index = device.layer_index
+    assert device.file_offset == index.offsets[3]
+    assert device.current_layer == 3
+    assert device.progress == pytest.approx(index.progress(index.offsets[3]))
+
+    device.update_progress(index.offsets[4])
+    status = device.status_dict()
+    assert status['layer'] == 3
+    assert status['layer_count'] == 5
+    assert status['progress'] == pytest.approx(100.0 * index.times[4] / index.total_time)
+    assert status['remaining_time'] > 0
+
+    device.cancel_print()
+    assert not device.start_print(gcode, start_layer=9)
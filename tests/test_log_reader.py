@@ -0,0 +1,139 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+import pytest
+from system.monitoring.log_reader import LogFilter, follow, follow_async, tail
+
+def write_log(path, count=500):
+    lines = []
+    for i in range(count):
+        level = 'ERROR' if i % 50 == 0 else 'INFO'
+        lines.append(f"2026-10-01 12:{i // 60:02d}:{i % 60:02d},000 - Test - {level} - message {i}")
+        if level == 'ERROR':
+            lines.append("Traceback (most recent call last):")
+            lines.append(f"  ValueError: {i}")
+    path.write_text("\n".join(lines) + "\n")
+    return lines
+
+@pytest.mark.parametrize("block_size", [7, 64, 4096])
+def test_tail_matches_readlines(tmp_path, block_size):
+    """Test that reading backwards in blocks returns the same lines as readlines"""
+    path = tmp_path / "test.log"
+    lines = write_log(path)
+    for count in (1, 10, 100, len(lines) + 5):
+        assert tail(str(path), count, block_size=block_size) == lines[-count:]
+
+def test_tail_without_trailing_newline(tmp_path):
+    """Test that an unterminated last line is returned and empty files work"""
+    path = tmp_path / "test.log"
+    path.write_text("a\nb\nc")
+    assert tail(str(path), 2) == ["b", "c"]
+    path.write_text("")
+    assert tail(str(path), 5) == []
+
+def test_level_filter_keeps_tracebacks(tmp_path):
+    """Test level filtering with continuation lines kept with their entry"""
+    path = tmp_path / "test.log"
+    write_log(path)
+    result = tail(str(path), 6, LogFilter(level='error'))
+    assert len(result) == 6
+    assert result[0].endswith("ERROR - message 400")
+    assert result[3].endswith("ERROR - message 450")
+    assert result[5] == "  ValueError: 450"
+
+def test_time_range(tmp_path):
+    """Test since/until filtering including the binary search for until"""
+    path = tmp_path / "test.log"
+    write_log(path, count=5000)
+    log_filter = LogFilter(since=datetime(2026, 10, 1, 12, 10, 0),
+                           until=datetime(2026, 10, 1, 12, 10, 5))
+    result = tail(str(path), 100, log_filter)
+    assert len(result) == 8  # six entries, one of them with a traceback
+    assert result[0].startswith("2026-10-01 12:10:00,000")
+    assert result[-1].startswith("2026-10-01 12:10:05,000")
+
+def test_follow_streams_new_lines_and_rotation(tmp_path):
+    """Test that follow yields the backlog, appended lines and lines after rotation"""
+    path = tmp_path / "test.log"
+    path.write_text("old 1\nold 2\n")
+    received = []
+    stream = follow(str(path), backlog=1, heartbeat=0.2)
+
+    def consume():
+        for line in stream:
+            if line is not None:
+                received.append(line)
+            if len(received) >= 4:
+                return
+
+    reader = threading.Thread(target=consume)
+    reader.start()
+    time.sleep(0.1)
+    with open(path, 'a') as f:
+        f.write("new 1\n")
+    time.sleep(0.3)
+    os.rename(path, tmp_path / "test.log.1")
+    path.write_text("rotated 1\nrotated 2\n")
+    reader.join(timeout=5)
+    stream.close()
+
+    assert received == ["old 2", "new 1", "rotated 1", "rotated 2"]
+
+def test_follow_heartbeat(tmp_path):
+    """Test that follow yields None while nothing is written"""
+    path = tmp_path / "test.log"
+    path.write_text("")
+    stream = follow(str(path), heartbeat=0.05)
+    assert next(stream) is None
+    stream.close()
+
+def test_follow_async_streams_without_threads(tmp_path):
+    """Test that the async follower yields backlog and new lines from the event loop"""
+    path = tmp_path / "test.log"
+    path.write_text("old 1\nold 2\n")
+
+    async def run():
+        received = []
+        stream = follow_async(str(path), backlog=1, heartbeat=5.0)
+        received.append(await stream.__anext__())
+        threads = threading.active_count()
+        def append():
+            with open(path, "a") as f:
+                f.write("new 1\nnew 2\n")
+
+        asyncio.get_running_loop().call_later(0.05, append)
+        received.append(await stream.__anext__())
+        received.append(await stream.__anext__())
+        await stream.aclose()
+        return received, threads == threading.active_count()
+
+    received, no_new_threads = asyncio.run(run())
+    assert received == ["old 2", "new 1", "new 2"]
+    assert no_new_threads
+
+def test_follow_async_releases_watch_on_cancel(tmp_path):
+    """Test that cancelling an idle follower closes its file and inotify at once"""
+    path = tmp_path / "test.log"
+    path.write_text("")
+    open_fds = lambda: len(os.listdir("/proc/self/fd"))
+
+    async def run():
+        before = open_fds()
+
+        async def consume():
+            async for _ in follow_async(str(path), heartbeat=60.0):
+                pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.1)
+        during = open_fds()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return before, during, open_fds()
+
+    before, during, after = asyncio.run(run())
+    assert during > before
+    assert after == before
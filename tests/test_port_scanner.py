@@ -0,0 +1,132 @@
+import os
+import pty
+import select
+import termios
+import threading
+import time
+import pytest
+from kernel.hal.port_scanner import PortScanner
+
+class PtyFirmware:
+    """Fake firmware on a pty pair that only answers at its own baud rate"""
+    def __init__(self, baudrate, boot_delay=0.0, silent=False):
+        self.baudrate = baudrate
+        self.boot_delay = boot_delay
+        self.silent = silent
+        self.master, self.slave = pty.openpty()
+        self.port = os.ttyname(self.slave)
+        self.wrong_baud_queries = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _baud_matches(self):
+        return termios.tcgetattr(self.slave)[4] == getattr(termios, f"B{self.baudrate}")
+
+    def _run(self):
+        started = time.monotonic()
+        buffer = b""
+        while self.running:
+            readable, _, _ = select.select([self.master], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                buffer += os.read(self.master, 1024)
+            except OSError:
+                return
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                if self.silent or time.monotonic() - started < self.boot_delay:
+                    continue
+                if not self._baud_matches():
+                    self.wrong_baud_queries += 1
+                    os.write(self.master, b"\xfe\x80\xff\x13\n")
+                elif line.strip() == b"M115":
+                    os.write(self.master,
+                             b"FIRMWARE_NAME:Marlin 2.1.2 SOURCE_CODE_URL:github.com/MarlinFirmware\n"
+                             b"Cap:AUTOREPORT_TEMP:1\n"
+                             b"Cap:AUTOREPORT_POS:0\n"
+                             b"ok\n")
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+@pytest.fixture
+def firmwares():
+    created = []
+
+    def factory(*args, **kwargs):
+        firmware = PtyFirmware(*args, **kwargs)
+        created.append(firmware)
+        return firmware
+
+    yield factory
+    for firmware in created:
+        firmware.close()
+
+@pytest.fixture
+def scanner(tmp_path):
+    return PortScanner(cache_file=tmp_path / "port_cache.json",
+                       boot_timeout=1.0, baud_timeout=0.3, query_interval=0.1)
+
+def test_detects_baudrate_and_firmware(scanner, firmwares):
+    """Test baud rate autodetection and M115 parsing"""
+    fast = firmwares(115200)
+    slow = firmwares(57600)
+
+    detected = scanner.scan([fast.port, slow.port])
+
+    assert detected[fast.port].baudrate == 115200
+    assert detected[slow.port].baudrate == 57600
+    assert detected[slow.port].firmware.startswith("Marlin 2.1.2")
+    assert detected[slow.port].capabilities == {
+        "AUTOREPORT_TEMP": True,
+        "AUTOREPORT_POS": False
+    }
+
+def test_silent_port_is_skipped(scanner, firmwares):
+    """Test that ports without firmware are not reported"""
+    silent = firmwares(115200, silent=True)
+    assert scanner.scan([silent.port]) == {}
+
+def test_ports_are_probed_concurrently(scanner, firmwares):
+    """Test that probing many ports takes about as long as one port"""
+    ports = [firmwares(115200, boot_delay=0.4).port for _ in range(8)]
+
+    started = time.monotonic()
+    detected = scanner.scan(ports)
+    elapsed = time.monotonic() - started
+
+    assert set(detected) == set(ports)
+    assert elapsed < 8 * 0.4
+
+def test_cached_baudrate_is_tried_first(tmp_path, firmwares):
+    """Test that a second scan starts with the cached baud rate"""
+    firmware = firmwares(38400)
+    cache_file = tmp_path / "port_cache.json"
+    PortScanner(cache_file=cache_file, boot_timeout=1.0, baud_timeout=0.3,
+                query_interval=0.1).scan([firmware.port])
+    assert cache_file.exists()
+
+    firmware.wrong_baud_queries = 0
+    rescanner = PortScanner(cache_file=cache_file, boot_timeout=1.0,
+                            baud_timeout=0.3, query_interval=0.1)
+    detected = rescanner.scan([firmware.port])
+
+    assert detected[firmware.port].baudrate == 38400
+    assert firmware.wrong_baud_queries == 0
+
+def test_keep_open_returns_descriptor(scanner, firmwares):
+    """Test that keep_open hands the open descriptor to the caller"""
+    firmware = firmwares(115200)
+    info = scanner.scan([firmware.port], keep_open=True)[firmware.port]
+    try:
+        assert info.fd is not None
+        os.write(info.fd, b"M115\n")
+        readable, _, _ = select.select([info.fd], [], [], 1.0)
+        assert readable
+    finally:
+        os.close(info.fd)
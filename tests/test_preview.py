@@ -0,0 +1,99 @@
+import struct
+import zlib
+import numpy as np
+import pytest
+from kernel.gcode.preview import (BACKGROUND, CURRENT, PREVIOUS, PreviewRenderer,
+                                  _ToolpathParser, encode_png)
+
+def write_squares(tmp_path):
+    """Two layers: a 50 mm square at 50..100 mm, then one at 100..150 mm"""
+    lines = ["G90", "M83", "G28"]
+    for layer, (low, high) in enumerate(((50, 100), (100, 150))):
+        lines += [f";LAYER:{layer}", f"G1 Z{0.2 * (layer + 1):.1f}", f"G0 X{low} Y{low}",
+                  f"G1 X{high} Y{low} E2", f"G1 X{high} Y{high} E2",
+                  f"G1 X{low} Y{high} E2", f"G1 X{low} Y{low} E2"]
+    path = tmp_path / "squares.gcode"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+def decode_png(data):
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos, chunks = 8, {}
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        assert struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])[0] == \
+            zlib.crc32(kind + body)
+        chunks[kind] = chunks.get(kind, b"") + body
+        pos += 12 + length
+    width, height = struct.unpack(">II", chunks[b"IHDR"][:8])
+    raw = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8)
+    return raw.reshape(height, width + 1)[:, 1:]
+
+def test_encode_png_roundtrip():
+    """Test that palette PNGs decode back to the same indices"""
+    pixels = np.arange(48, dtype=np.uint8).reshape(6, 8)
+    assert np.array_equal(decode_png(encode_png(pixels)), pixels)
+
+def test_render_layer_draws_current_and_previous(tmp_path):
+    """Test that a layer is drawn over a dimmed copy of the layer below"""
+    gcode = write_squares(tmp_path)
+    renderer = PreviewRenderer(bed_size=(200, 200), tile_size=200, line_width=0.1,
+                               cache_dir=None)
+    pixels = decode_png(renderer.render_layer(gcode, 1))
+
+    # 1 px pro mm, Y zeigt im Bild nach unten
+    assert pixels[200 - 125, 150] == CURRENT
+    assert pixels[200 - 75, 50] == PREVIOUS
+    assert pixels[200 - 75, 75] == BACKGROUND
+    # Die Fahrt zum Layerstart wird nicht gezeichnet
+    assert pixels[200 - 75, 75] != CURRENT
+
+def test_zoom_tiles(tmp_path):
+    """Test that zoomed tiles show only their part of the bed"""
+    gcode = write_squares(tmp_path)
+    renderer = PreviewRenderer(bed_size=(200, 200), tile_size=100, line_width=0.1,
+                               cache_dir=None)
+    # Zoom 1: 2x2 Kacheln zu je 100 mm, Zeile 0 ist die Betthälfte hinten
+    front_left = decode_png(renderer.render_layer(gcode, 0, zoom=1, tile=(0, 1)))
+    back_right = decode_png(renderer.render_layer(gcode, 0, zoom=1, tile=(1, 0)))
+    assert (front_left == CURRENT).any()
+    assert not (back_right == CURRENT).any()
+    with pytest.raises(ValueError):
+        renderer.render_layer(gcode, 0, zoom=1, tile=(2, 0))
+    with pytest.raises(IndexError):
+        renderer.render_layer(gcode, 5)
+
+def test_cache_and_eviction(tmp_path):
+    """Test that rendered images are cached and evicted least recently used first"""
+    gcode = write_squares(tmp_path)
+    cache = tmp_path / "previews"
+    renderer = PreviewRenderer(tile_size=64, cache_dir=cache)
+    first = renderer.render_layer(gcode, 0)
+    assert renderer.render_layer(gcode, 0) == first
+    assert len(list(cache.glob("*.png"))) == 1
+
+    renderer.max_cache_size = len(first) + 1
+    renderer.render_layer(gcode, 1)
+    names = [path.name for path in cache.glob("*.png")]
+    assert len(names) == 1 and "-L1-" in names[0]
+
+def test_thumbnail_colours_by_height(tmp_path):
+    """Test that the thumbnail crops to the model and shades higher layers"""
+    gcode = write_squares(tmp_path)
+    pixels = decode_png(PreviewRenderer(cache_dir=None).thumbnail(gcode, size=64))
+    levels = np.unique(pixels[pixels > CURRENT])
+    assert len(levels) == 2
+    # Das Modell füllt den Ausschnitt fast ganz aus
+    assert (pixels != BACKGROUND).any(axis=0).sum() > 48
+
+def test_parser_handles_arcs_and_absolute_extrusion():
+    """Test that arcs are linearised and retractions are not drawn"""
+    parser = _ToolpathParser()
+    segments = parser.segments(b"G90\nM82\nG92 E0\nG1 X10 Y0 E1\nG1 E0.2\nG0 X20\n"
+                               b"G1 E1\nG3 X0 Y0 I-10 J0 E2\n")
+    assert tuple(segments[0]) == (0, 0, 10, 0)
+    arc = segments[1:]
+    assert len(arc) == 18
+    assert np.allclose(np.hypot(arc[:, 2] - 10, arc[:, 3]), 10)
+    assert tuple(arc[-1, 2:]) == (0, 0)
@@ -0,0 +1,151 @@
+import threading
+import time
+import pytest
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.scheduler.placement import JobConstraints
+from kernel.scheduler.print_scheduler import PrintScheduler
+
+class RecordingScheduler(PrintScheduler):
+    """Scheduler that records dispatched jobs instead of printing"""
+    def __init__(self):
+        super().__init__()
+        self.started = []
+        self.dispatched = threading.Event()
+
+    def _start_print_job(self, job):
+        self.started.append((job, time.monotonic()))
+        self.dispatched.set()
+
+@pytest.fixture
+def scheduler():
+    scheduler = RecordingScheduler()
+    scheduler.start()
+    yield scheduler
+    scheduler.stop()
+
+def wait_for(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.001)
+    return False
+
+def test_dispatch_is_immediate(scheduler):
+    """Test that a submitted job is dispatched without polling delay"""
+    submitted = time.monotonic()
+    scheduler.add_job("printer-1", "part.gcode")
+
+    assert scheduler.dispatched.wait(1.0)
+    _, started = scheduler.started[0]
+    assert started - submitted < 0.1
+
+def test_busy_printer_does_not_block_others(scheduler):
+    """Test that jobs for idle printers bypass a busy printer's queue"""
+    scheduler.add_job("printer-1", "first.gcode")
+    assert wait_for(lambda: len(scheduler.started) == 1)
+
+    scheduler.add_job("printer-1", "second.gcode")
+    scheduler.add_job("printer-2", "other.gcode")
+
+    assert wait_for(lambda: len(scheduler.started) == 2)
+    assert scheduler.started[1][0].device_id == "printer-2"
+    assert [job.gcode_file for job in scheduler.get_queue_status()] == ["second.gcode"]
+
+def test_completion_dispatches_next_job(scheduler):
+    """Test that completing a job wakes the scheduler for the next one"""
+    scheduler.add_job("printer-1", "first.gcode")
+    scheduler.add_job("printer-1", "second.gcode")
+    assert wait_for(lambda: len(scheduler.started) == 1)
+
+    scheduler.complete_job("printer-1")
+
+    assert wait_for(lambda: len(scheduler.started) == 2)
+    assert scheduler.started[1][0].gcode_file == "second.gcode"
+
+def test_priority_then_submission_order():
+    """Test that lower priority values run first, FIFO within a priority"""
+    scheduler = RecordingScheduler()
+    scheduler.add_job("printer-1", "low.gcode", priority=5)
+    scheduler.add_job("printer-1", "urgent-a.gcode", priority=0)
+    scheduler.add_job("printer-1", "urgent-b.gcode", priority=0)
+
+    assert [job.gcode_file for job in scheduler.get_queue_status()] == [
+        "urgent-a.gcode", "urgent-b.gcode", "low.gcode"
+    ]
+
+def make_printer(device_id, **capabilities):
+    printer = PrinterDevice(device_id, f"/dev/tty{device_id}", **capabilities)
+    printer.state = PrinterState.IDLE
+    return printer
+
+def test_pool_job_matches_material_and_nozzle(scheduler):
+    """Test that pool jobs only land on printers with matching capabilities"""
+    scheduler.register_device(make_printer("pla-04", material="PLA", nozzle_diameter=0.4))
+    scheduler.register_device(make_printer("petg-04", material="PETG", nozzle_diameter=0.4))
+    scheduler.register_device(make_printer("petg-06", material="PETG", nozzle_diameter=0.6))
+    assert wait_for(lambda: len(scheduler.idle_devices) == 3)
+
+    job = scheduler.add_job(None, "part.gcode",
+                            constraints=JobConstraints(material="petg", nozzle_diameter=0.6))
+
+    assert wait_for(lambda: len(scheduler.started) == 1)
+    assert job.device_id == "petg-06"
+
+def test_pool_job_prefers_earliest_completion(scheduler):
+    """Test that the fastest eligible idle printer is chosen"""
+    scheduler.register_device(make_printer("slow", speed_factor=0.8))
+    scheduler.register_device(make_printer("fast", speed_factor=1.5))
+    scheduler.register_device(make_printer("small", speed_factor=3.0, bed_size=(120, 120, 120)))
+    assert wait_for(lambda: len(scheduler.idle_devices) == 3)
+
+    job = scheduler.add_job(None, "plate.gcode", estimated_duration=3600,
+                            constraints=JobConstraints(min_bed_size=(200, 200, 100)))
+
+    assert wait_for(lambda: len(scheduler.started) == 1)
+    assert job.device_id == "fast"
+
+def test_pool_job_waits_for_matching_printer(scheduler):
+    """Test that queued pool jobs are pulled by the next matching idle printer"""
+    scheduler.register_device(make_printer("pla", material="PLA"))
+    scheduler.register_device(make_printer("abs", material="ABS"))
+    scheduler.add_job("pla", "busy.gcode")
+    scheduler.add_job("abs", "busy.gcode")
+    assert wait_for(lambda: len(scheduler.started) == 2)
+
+    job = scheduler.add_job(None, "pla-part.gcode", constraints=JobConstraints(material="PLA"))
+    assert job.device_id is None
+    assert [j.gcode_file for j in scheduler.get_queue_status()] == ["pla-part.gcode"]
+
+    scheduler.complete_job("abs")
+    time.sleep(0.05)
+    assert len(scheduler.started) == 2
+
+    scheduler.complete_job("pla")
+    assert wait_for(lambda: len(scheduler.started) == 3)
+    assert job.device_id == "pla"
+
+def test_jobs_wait_until_prepared(scheduler):
+    """Test that jobs are dispatched and placed only after preparation finished"""
+    scheduler.register_device(make_printer("slow", speed_factor=0.5))
+    scheduler.register_device(make_printer("fast", speed_factor=2.0))
+    assert wait_for(lambda: len(scheduler.idle_devices) == 2)
+
+    direct = scheduler.add_job("slow", "direct.gcode", ready=False)
+    pooled = scheduler.add_job(None, "pooled.gcode", ready=False)
+    time.sleep(0.05)
+    assert scheduler.started == []
+    assert pooled.device_id is None
+    assert {job.gcode_file for job in scheduler.get_queue_status()} == {
+        "direct.gcode", "pooled.gcode"
+    }
+
+    scheduler.job_ready(pooled.job_id, "pooled.igc", 600.0)
+    assert wait_for(lambda: len(scheduler.started) == 1)
+    assert pooled.device_id == "fast"
+    assert pooled.compiled_file == "pooled.igc"
+
+    scheduler.job_ready(direct.job_id)
+    assert wait_for(lambda: len(scheduler.started) == 2)
+    assert scheduler.started[1][0] is direct
+    assert scheduler.job_ready(direct.job_id) is None
@@ -0,0 +1,62 @@
+import pytest
+from kernel.gcode.reader import GCodeFileReader
+
+def write(tmp_path, data):
+    path = tmp_path / "part.gcode"
+    path.write_bytes(data)
+    return str(path)
+
+def test_lines_strip_comments_and_whitespace(tmp_path):
+    """Test that lines() yields commands with the offset of their line"""
+    data = b"; header\nG28 ; home\n\n  G1 X1 Y2\t\r\n;LAYER:1\nM105"
+    with GCodeFileReader(write(tmp_path, data)) as reader:
+        lines = [(offset, bytes(command)) for offset, command in reader.lines()]
+        assert reader.tell() == len(data)
+
+    assert lines == [
+        (data.index(b"G28"), b"G28"),
+        (data.index(b"  G1"), b"G1 X1 Y2"),
+        # Last line without a trailing newline
+        (data.index(b"M105"), b"M105"),
+    ]
+
+def test_seek_and_tell_round_trip(tmp_path):
+    """Test that every offset from tell() resumes at the following line"""
+    data = b"".join(b"G1 X%d ; move %d\n" % (i, i) for i in range(50))
+    with GCodeFileReader(write(tmp_path, data)) as reader:
+        expected = []
+        positions = []
+        for _, command in reader.lines():
+            positions.append(reader.tell())
+            expected.append(bytes(command))
+
+        for index, position in enumerate(positions[:-1]):
+            assert reader.seek(position) == position
+            assert bytes(next(iter(reader))) == expected[index + 1]
+
+        # Offsets inside a line move to the start of the next one
+        middle = data.index(b"G1 X7") + 3
+        assert reader.seek(middle) == data.index(b"G1 X8")
+        assert reader.seek(-5) == 0
+        assert reader.seek(len(data) + 10) == len(data)
+        assert list(reader.lines()) == []
+
+def test_progress_follows_offset(tmp_path):
+    """Test that progress is the share of bytes already read"""
+    data = b"G1 X1\n" * 10
+    with GCodeFileReader(write(tmp_path, data)) as reader:
+        assert reader.progress == 0.0
+        lines = reader.lines()
+        for _ in range(5):
+            next(lines)
+        assert reader.progress == pytest.approx(50.0)
+        reader.seek(len(data))
+        assert reader.progress == pytest.approx(100.0)
+
+def test_empty_file(tmp_path):
+    """Test that an empty file yields nothing and counts as complete"""
+    with GCodeFileReader(write(tmp_path, b"")) as reader:
+        assert list(reader) == []
+        assert reader.tell() == 0
+        assert reader.seek(10) == 0
+        assert reader.progress == 100.0
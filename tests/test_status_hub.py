@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from kernel.core.status_hub import StatusHub, diff_states
+
+class FakeKernel:
+    def __init__(self):
+        self.printers = {
+            "p1": {"id": "p1", "status": "idle", "progress": 0.0, "temperature": {"bed": 20}},
+            "p2": {"id": "p2", "status": "printing", "progress": 10.0, "temperature": {"bed": 60}},
+        }
+
+    async def list_printers(self):
+        return [dict(printer) for printer in self.printers.values()]
+
+def test_diff_states():
+    """Test that diffs contain changed fields, new printers and removals"""
+    old = {"p1": {"status": "idle", "progress": 0}, "p2": {"status": "idle"}}
+    new = {"p1": {"status": "printing", "progress": 0}, "p3": {"status": "idle"}}
+    assert diff_states(old, new) == {
+        "p1": {"status": "printing"}, "p2": None, "p3": {"status": "idle"}
+    }
+    assert diff_states(new, new) == {}
+
+@pytest.mark.asyncio
+async def test_subscribers_share_one_fetch_per_tick():
+    """Test that many clients cost one kernel read per poll and get only changes"""
+    kernel = FakeKernel()
+    hub = StatusHub(kernel.list_printers, interval=3600)
+    subscriptions = [hub.subscribe(max_rate=0) for _ in range(50)]
+    snapshot = await subscriptions[0].snapshot()
+    assert snapshot["p2"]["progress"] == 10.0
+
+    kernel.printers["p2"]["progress"] = 11.0
+    await hub.poll()
+    assert hub.fetch_count == 2
+    for subscription in subscriptions:
+        assert await subscription.next() == {"p2": {"progress": 11.0}}
+
+    for subscription in subscriptions:
+        subscription.close()
+    assert hub._task is None
+
+@pytest.mark.asyncio
+async def test_slow_client_gets_coalesced_changes():
+    """Test that changes between two sends are merged into one message"""
+    kernel = FakeKernel()
+    hub = StatusHub(kernel.list_printers, interval=3600)
+    subscription = hub.subscribe(max_rate=0)
+    await subscription.snapshot()
+
+    kernel.printers["p1"]["status"] = "printing"
+    await hub.poll()
+    kernel.printers["p1"]["progress"] = 5.0
+    del kernel.printers["p2"]
+    await hub.poll()
+    kernel.printers["p1"]["progress"] = 6.0
+    await hub.poll()
+
+    assert await subscription.next() == {
+        "p1": {"status": "printing", "progress": 6.0}, "p2": None
+    }
+    subscription.close()
+
+@pytest.mark.asyncio
+async def test_max_rate_limits_messages():
+    """Test that a client receives at most max_rate messages per second"""
+    kernel = FakeKernel()
+    hub = StatusHub(kernel.list_printers, interval=0.01)
+    subscription = hub.subscribe(max_rate=5)
+    await subscription.snapshot()
+
+    async def printing():
+        for step in range(40):
+            kernel.printers["p2"]["progress"] = 20.0 + step
+            await asyncio.sleep(0.01)
+
+    feeder = asyncio.create_task(printing())
+    messages = []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    while loop.time() - started < 0.5:
+        try:
+            messages.append(await asyncio.wait_for(subscription.next(), 0.3))
+        except asyncio.TimeoutError:
+            break
+    await feeder
+    subscription.close()
+
+    assert 1 <= len(messages) <= 4
+    assert hub.fetch_count > len(messages)
+
+@pytest.mark.asyncio
+async def test_close_releases_waiting_client():
+    """Test that closing wakes a client still waiting for the first state"""
+    async def unreachable():
+        raise OSError("Kernel nicht erreichbar")
+
+    hub = StatusHub(unreachable, interval=0.01)
+    subscription = hub.subscribe()
+    waiting = asyncio.create_task(subscription.snapshot())
+    await asyncio.sleep(0.05)
+    subscription.close()
+    assert await waiting is None
+    assert await subscription.next() is None
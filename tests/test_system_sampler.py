@@ -0,0 +1,40 @@
+import dataclasses
+import time
+import pytest
+from system.monitoring.system_monitor import SystemSampler
+
+def test_snapshot_is_immediate_and_immutable():
+    """Test that the first snapshot does not block and cannot be modified"""
+    sampler = SystemSampler(interval=60)
+    started = time.monotonic()
+    snapshot = sampler.snapshot()
+    assert time.monotonic() - started < 0.5
+    assert sampler.snapshot() is snapshot
+    assert 0 <= snapshot.memory_percent <= 100
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot.cpu_percent = 0.0
+
+def test_background_sampling_replaces_snapshot():
+    """Test that the sampler thread publishes new snapshots with new ETags"""
+    sampler = SystemSampler(interval=0.05)
+    sampler.start()
+    try:
+        first = sampler.snapshot()
+        deadline = time.monotonic() + 5
+        while sampler.snapshot() is first and time.monotonic() < deadline:
+            time.sleep(0.01)
+        second = sampler.snapshot()
+    finally:
+        sampler.stop()
+    assert second is not first
+    assert second.etag != first.etag
+    assert second.sampled_at > first.sampled_at
+
+def test_max_age_and_metrics_format():
+    """Test cache lifetime and the SystemMonitor.metrics compatible dict"""
+    sampler = SystemSampler(interval=30)
+    snapshot = sampler.sample()
+    assert 28 <= sampler.max_age(snapshot) <= 30
+    metrics = snapshot.to_dict()
+    assert {'cpu_percent', 'memory_percent', 'disk_percent', 'network', 'temperature',
+            'processes', 'uptime', 'timestamp'} <= metrics.keys()
@@ -0,0 +1,55 @@
+from kernel.devices.printer_device import PrinterDevice
+from kernel.devices import telemetry
+from kernel.devices.telemetry import RingBuffer, TelemetryHistory
+
+def test_ring_buffer_wraps_in_order():
+    """Test that the buffer keeps the newest samples in time order"""
+    buffer = RingBuffer(("value",), capacity=4)
+    for second in range(10):
+        buffer.append((second,), timestamp=float(second))
+
+    times, values = buffer.last(10)
+    assert len(buffer) == 4
+    assert list(times) == [6.0, 7.0, 8.0, 9.0]
+    assert list(values[:, 0]) == [6.0, 7.0, 8.0, 9.0]
+    assert list(buffer.since(8.0)[0]) == [8.0, 9.0]
+
+def test_fast_samples_share_one_slot():
+    """Test that samples faster than the interval overwrite the current slot"""
+    buffer = RingBuffer(("value",), capacity=10, interval=1.0)
+    for tick in range(25):
+        buffer.append((tick,), timestamp=tick * 0.1)
+
+    assert len(buffer) == 3
+    assert buffer.latest()[1][0] == 24.0
+
+def test_device_records_history_with_bounded_memory():
+    """Test that device updates land in preallocated buffers"""
+    printer = PrinterDevice("printer-1", "/dev/null")
+    printer.update_temperature(205.0, 60.0)
+    printer.move(x=10.0, y=20.0)
+
+    assert printer.history.temperature.column("hotend")[-1] == 205.0
+    assert printer.history.position.latest()[1][1] == 20.0
+    assert printer.history.temperature_trend.column("hotend")[-1] == 205.0
+    # Small enough for 100 printers on a 1 GB controller
+    assert printer.history.nbytes < 256 * 1024
+    assert not hasattr(printer, "__dict__")
+
+def test_temperature_trend_covers_longer_span():
+    """Test that the downsampled tier keeps samples the full-rate tier has dropped"""
+    history = TelemetryHistory(temperature_duration=10, trend_duration=100, trend_interval=10)
+    for second in range(100):
+        history.append_temperature((second, 0.0, 0.0, 0.0), timestamp=float(second))
+
+    assert list(history.temperature.column("hotend")) == list(range(90, 100))
+    # One sample per 10 s slot, each the last one of its slot
+    assert list(history.temperature_trend.column("hotend")) == list(range(9, 100, 10))
+    assert history.temperature_trend.last(10)[0][0] == 9.0
+
+def test_default_footprint_matches_documented_budget():
+    """Test the per-printer footprint documented next to the constants"""
+    history = TelemetryHistory()
+    assert history.temperature.capacity == telemetry.DEFAULT_DURATION
+    assert history.temperature_trend.capacity == telemetry.TREND_DURATION // 60
+    assert 200 * 1024 < history.nbytes < 230 * 1024
@@ -0,0 +1,90 @@
+import os
+import pty
+import select
+import threading
+import time
+from kernel.devices.printer_device import PrinterDevice
+from kernel.hal.async_transport import TransportLoop, SyncSerialFacade
+from kernel.hal.hardware import HardwareAbstractionLayer
+from kernel.hal.telemetry_parser import TelemetryParser, parse_position, parse_temperature
+
+def test_parse_temperature_variants():
+    """Test Marlin temperature reports with and without separate targets"""
+    assert parse_temperature(b"T:210.12 /210.00 B:60.31 /60.00 @:127 B@:0") == (210.12, 210.0, 60.31, 60.0)
+    assert parse_temperature(b"T:25.0/0.0 B:24.5/0.0") == (25.0, 0.0, 24.5, 0.0)
+    assert parse_temperature(b"T:200.0 /205.0 B:60.0 /60.0 T0:200.0 /205.0 T1:30.0 /0.0 @:90") == \
+        (200.0, 205.0, 60.0, 60.0)
+    assert parse_temperature(b"echo:busy: processing") is None
+
+def test_parse_position_stops_at_step_counts():
+    """Test that step counts after Count are not read as coordinates"""
+    assert parse_position(b"X:10.00 Y:20.50 Z:0.30 E:1.25 Count X:800 Y:1640 Z:120") == (10.0, 20.5, 0.3, 1.25)
+
+def test_reports_are_consumed_but_acks_pass_through():
+    """Test that unsolicited reports are swallowed while ok lines are kept"""
+    printer = PrinterDevice("printer-1", "/dev/null")
+    parser = TelemetryParser(printer)
+
+    assert parser.feed(b" T:201.5 /210.0 B:58.0 /60.0 @:127 B@:30\n")
+    assert printer.temperature.hotend == 201.5
+    assert printer.temperature.target_bed == 60.0
+    assert not parser.feed("ok T:205.0 /210.0 B:59.0 /60.0")
+    assert printer.temperature.hotend == 205.0
+    assert parser.feed(b"X:1.00 Y:2.00 Z:3.00 E:4.00 Count X:80 Y:160 Z:1200\n")
+    assert printer.position.z == 3.0
+    assert not parser.feed(b"ok\n")
+
+class AutoReportFirmware:
+    """Pty firmware that starts temperature reports after M155"""
+    def __init__(self):
+        self.master, self.slave = pty.openpty()
+        self.port = os.ttyname(self.slave)
+        self.reporting = False
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        buffer = b""
+        while self.running:
+            readable, _, _ = select.select([self.master], [], [], 0.01)
+            if self.reporting:
+                os.write(self.master, b" T:210.50 /210.00 B:60.00 /60.00 @:64 B@:0\n")
+            if not readable:
+                continue
+            buffer += os.read(self.master, 1024)
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                if line.strip().startswith(b"M155"):
+                    self.reporting = True
+                os.write(self.master, b"ok\n")
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+def test_auto_report_updates_device_without_polling():
+    """Test that M155 reports reach the device and never the line queue"""
+    firmware = AutoReportFirmware()
+    loop = TransportLoop()
+    try:
+        hal = HardwareAbstractionLayer(transport_loop=loop)
+        conn = SyncSerialFacade.open(firmware.port, 115200, timeout=0.2, transport_loop=loop)
+        hal.connected_ports[firmware.port] = conn
+        printer = PrinterDevice("printer-1", firmware.port)
+
+        hal.attach_telemetry(firmware.port, printer)
+        assert hal.enable_auto_report(firmware.port)
+
+        deadline = time.monotonic() + 2.0
+        while printer.temperature.hotend != 210.5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert printer.temperature.hotend == 210.5
+        assert printer.temperature.target_hotend == 210.0
+        assert conn.readline() == b""
+        assert len(printer.history.temperature) >= 1
+    finally:
+        loop.stop()
+        firmware.close()
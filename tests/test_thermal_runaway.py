@@ -0,0 +1,133 @@
+import threading
+from kernel.devices.printer_device import PrinterDevice, PrinterState
+from kernel.hal.gcode_streamer import GCodeStreamer
+from kernel.safety.thermal_runaway import ThermalRunawayDetector
+
+def make_detector():
+    events = []
+    detector = ThermalRunawayDetector(
+        max_hotend_temp=260.0,
+        on_runaway=lambda device, heater, reason: events.append((device.id, heater, reason))
+    )
+    printer = PrinterDevice("printer-1", "/dev/null")
+    detector.watch(printer)
+    return detector, printer, events
+
+def feed(detector, printer, samples, start=0.0, rate=4.0, bed=None):
+    for i, hotend in enumerate(samples):
+        printer.temperature.hotend = hotend
+        printer.temperature.bed = bed if bed is not None else 25.0
+        detector.check(printer, now=start + i / rate)
+
+def test_normal_heatup_and_hold_does_not_trip():
+    """Test that heating to target and holding within hysteresis is accepted"""
+    detector, printer, events = make_detector()
+    printer.set_temperature(210.0, 0.0)
+    heatup = [min(210.0, 25.0 + 2.0 * i / 4) for i in range(500)]
+    feed(detector, printer, heatup + [208.5, 211.0] * 200)
+    assert events == []
+
+def test_stalled_heating_trips():
+    """Test that a heater that stops rising fails the watch period"""
+    detector, printer, events = make_detector()
+    printer.set_temperature(210.0, 0.0)
+    feed(detector, printer, [25.0 + i / 4 for i in range(40)] + [35.0] * 120)
+    assert events and events[0][1] == "hotend"
+    assert "Aufheizen" in events[0][2]
+
+def test_temperature_drop_after_stable_trips_within_period():
+    """Test that falling out of the hysteresis band trips after the period"""
+    detector, printer, events = make_detector()
+    printer.set_temperature(210.0, 0.0)
+    feed(detector, printer, [210.0] * 20)
+    feed(detector, printer, [150.0] * (41 * 4), start=5.0)
+    assert len(events) == 1
+    assert "Thermal Runaway" in events[0][2]
+
+def test_max_temp_trips_on_the_same_sample():
+    """Test that over-temperature is detected without waiting for a window"""
+    detector, printer, events = make_detector()
+    printer.update_temperature(265.0, 25.0)
+    assert events and "Maximaltemperatur" in events[0][2]
+
+def test_listener_runs_on_update_temperature():
+    """Test that the detector is driven by device temperature updates"""
+    detector, printer, events = make_detector()
+    printer.set_temperature(210.0, 60.0)
+    printer.update_temperature(2.0, 25.0)
+    assert events and "Sensorfehler" in events[0][2]
+
+def test_smoothing_sees_every_auto_report_sample():
+    """Test that the detector smooths all 4 Hz samples, not the 1 Hz history slots"""
+    detector, printer, events = make_detector()
+    printer.set_temperature(210.0, 0.0)
+    feed(detector, printer, [210.0] * 20)
+    # Out of band for three of every four reports, in band on the last one
+    samples = [150.0, 150.0, 150.0, 212.0] * 4 * 45
+    for i, hotend in enumerate(samples):
+        now = 5.0 + i / 4.0
+        printer.temperature.hotend = hotend
+        printer.history.append_temperature((hotend, 25.0, 210.0, 0.0), timestamp=now)
+        detector.check(printer, now=now)
+
+    # The history keeps only the last sample of each second ...
+    assert set(printer.history.temperature.column("hotend")) == {212.0}
+    # ... while the detector averages all four and trips after the period
+    assert len(events) == 1
+    assert "Thermal Runaway" in events[0][2]
+
+class OverheatingHal:
+    """HAL whose firmware acknowledges every line and overheats after ``after`` lines"""
+    def __init__(self, printer, after):
+        self.printer = printer
+        self.after = after
+        self.pending = []
+        self.executed = 0
+        self.streamer = GCodeStreamer(self)
+
+    def write(self, data):
+        self.pending.append(data)
+        return len(data)
+
+    def readline(self):
+        if not self.pending:
+            return b""
+        if self.pending.pop(0).startswith(b"N"):
+            self.executed += 1
+            if self.executed == self.after:
+                self.printer.update_temperature(300.0, 25.0)
+        return b"ok\n"
+
+    def stream_gcode(self, port, commands, on_progress=None):
+        self.streamer.stream(commands, on_progress=on_progress)
+        return True
+
+def test_runaway_during_stream_ends_the_print(tmp_path):
+    """Test that a runaway shutdown stops the send loop and reports the job as failed"""
+    gcode = tmp_path / "part.gcode"
+    gcode.write_text("".join(f"G1 X{i} Y{i}\n" for i in range(1000)))
+    detector = ThermalRunawayDetector(max_hotend_temp=260.0)
+    printer = PrinterDevice("printer-1", "/dev/null", checkpoint_dir=tmp_path / "ckpt")
+    printer.hal = OverheatingHal(printer, after=20)
+    printer.state = PrinterState.IDLE
+    detector.watch(printer)
+    finished = threading.Event()
+    results = []
+    printer.print_listeners.append(lambda device, success: (results.append(success),
+                                                            finished.set()))
+
+    assert printer.start_print(str(gcode))
+    assert finished.wait(5)
+    for thread in threading.enumerate():
+        if thread.name in ("Print-printer-1", "Shutdown-printer-1"):
+            thread.join(5)
+            assert not thread.is_alive()
+
+    assert results == [False]
+    assert printer.state == PrinterState.OFFLINE
+    assert printer.temperature.target_hotend == 0
+    assert printer.gcode_reader is None
+    # The stream stopped shortly after the runaway instead of running to the end
+    assert printer.hal.executed < 1000
+    # The last checkpoint is kept for a later recovery
+    assert printer.checkpoints.path.exists()
@@ -0,0 +1,76 @@
+import time
+import pytest
+from kernel.devices.printer_device import PrinterDevice
+from kernel.hal.async_transport import TransportLoop, SyncSerialFacade
+from kernel.hal.gcode_streamer import GCodeStreamer
+from kernel.hal.hardware import HardwareAbstractionLayer
+from kernel.hal.port_scanner import PortScanner
+from kernel.sim.virtual_printer import VirtualPrinter, VirtualPrinterFarm
+
+@pytest.fixture
+def transport_loop():
+    loop = TransportLoop()
+    yield loop
+    loop.stop()
+
+def open_streamer(printer, transport_loop):
+    conn = SyncSerialFacade.open(printer.port, 250000, timeout=1, transport_loop=transport_loop)
+    streamer = GCodeStreamer(conn)
+    streamer.reset_line_numbers()
+    return conn, streamer
+
+def test_scanner_detects_virtual_printer(tmp_path):
+    """Test that the port scanner sees a virtual printer like real hardware"""
+    with VirtualPrinter() as printer:
+        scanner = PortScanner(cache_file=tmp_path / "cache.json", boot_timeout=1.0,
+                              baud_timeout=0.3, query_interval=0.1)
+        info = scanner.scan([printer.port])[printer.port]
+
+    assert "Marlin" in info.firmware
+    assert info.capabilities["AUTOREPORT_POS"]
+
+def test_streaming_survives_injected_resends(transport_loop):
+    """Test that random checksum faults are recovered without losing lines"""
+    with VirtualPrinter(baudrate=250000, resend_rate=0.02, seed=7) as printer:
+        conn, streamer = open_streamer(printer, transport_loop)
+        commands = [f"G1 X{i % 50} Y{i % 30} F6000" for i in range(500)]
+        streamer.stream(commands, ack_timeout=5)
+        conn.close()
+
+    assert printer.resends_requested > 0
+    assert list(printer.executed)[-500:] == commands
+    assert printer.rx_overflows == 0
+
+def test_heating_waits_and_reports(transport_loop):
+    """Test M109 blocking and M155 auto-reports through the HAL"""
+    with VirtualPrinter(time_scale=0.002) as printer:
+        hal = HardwareAbstractionLayer(transport_loop=transport_loop)
+        hal.connected_ports[printer.port] = SyncSerialFacade.open(
+            printer.port, 115200, timeout=1, transport_loop=transport_loop)
+        device = PrinterDevice("virtual", printer.port, checkpoint_dir=None)
+        hal.attach_telemetry(printer.port, device)
+        assert hal.enable_auto_report(printer.port)
+
+        started = time.monotonic()
+        assert hal.stream_gcode(printer.port, ["M109 S200"])
+        assert time.monotonic() - started > 0.01
+        assert abs(printer.hotend - 200.0) < 1.0
+
+        deadline = time.monotonic() + 3
+        while device.temperature.target_hotend != 200.0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert device.temperature.target_hotend == 200.0
+
+def test_farm_streams_in_parallel(transport_loop):
+    """Test that a farm of virtual printers can be driven concurrently"""
+    with VirtualPrinterFarm(12, baudrate=250000) as farm:
+        streams = [open_streamer(printer, transport_loop) for printer in farm.printers]
+        commands = [f"G1 X{i} Y{i}" for i in range(100)]
+        for _, streamer in streams:
+            streamer.stream(commands)
+        for conn, _ in streams:
+            conn.close()
+        stats = farm.stats()
+
+    assert stats["commands_executed"] >= 12 * 100
+    assert stats["resends_requested"] == 0
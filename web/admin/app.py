@@ -7,6 +7,7 @@ import os
 from models.user import User
 from models.printer import Printer, PrintJob
 from events import init_socket_events
+from routes.preview import preview
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev')
@@ -113,6 +114,9 @@ def remove_printer(printer_id):
         return '', 204
     return jsonify({'error': 'Printer not found'}), 404
 
+# G-Code-Vorschau
+app.register_blueprint(preview, url_prefix='/api/preview')
+
 # Initialize WebSocket events
 init_socket_events(socketio)
 
@@ -0,0 +1,170 @@
+import time
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_INTERVAL = 1.0
+
+class _Source:
+    """Eine Datenquelle, die für einen Raum einmal pro Intervall abgefragt wird"""
+
+    def __init__(self, room: str, event: str, sample: Callable[[], Any], interval: float,
+                 split: Optional[Callable[[Any], Dict[str, Any]]], split_prefix: Optional[str],
+                 split_event: Optional[str]):
+        self.room = room
+        self.event = event
+        self.sample = sample
+        self.interval = interval
+        self.split = split
+        self.split_prefix = split_prefix
+        self.split_event = split_event
+        self.next_due = 0.0
+        self.last: Any = None
+        self.last_parts: Dict[str, Any] = {}
+
+class BroadcastHub:
+    """Verteilt Live-Daten an Socket.IO-Räume statt pro Anfrage zu messen.
+
+    Jede Quelle (z.B. Systemwerte, Druckerstatus) wird von einer einzigen
+    Hintergrund-Task einmal pro Intervall abgefragt, solange jemand ihren
+    Raum abonniert hat. Geänderte Daten gehen mit einem ``emit`` an den
+    ganzen Raum; python-socketio kodiert das Paket dabei einmal und schickt
+    dieselben Bytes an alle Clients. Mit ``split`` lässt sich eine Quelle
+    zusätzlich in Unterräume ``<split_prefix><id>`` aufteilen, z.B. einen
+    Raum ``printer:<id>`` je Drucker. Wer neu beitritt, bekommt sofort den
+    letzten Stand.
+    """
+
+    def __init__(self, socketio, interval: float = DEFAULT_INTERVAL, namespace: str = '/'):
+        self.socketio = socketio
+        self.interval = interval
+        self.namespace = namespace
+        self.sources: Dict[str, _Source] = {}
+        self.sample_count = 0
+        self._task = None
+
+    def add_source(self, room: str, event: str, sample: Callable[[], Any],
+                   interval: Optional[float] = None,
+                   split: Optional[Callable[[Any], Dict[str, Any]]] = None,
+                   split_prefix: Optional[str] = None, split_event: Optional[str] = None):
+        """Registriert eine Quelle für ``room``; ``split`` liefert {Unterraum: Daten}"""
+        self.sources[room] = _Source(room, event, sample, interval or self.interval,
+                                     split, split_prefix, split_event or event)
+
+    def _source_for(self, room: str) -> Optional[_Source]:
+        for source in self.sources.values():
+            if room == source.room or (source.split_prefix and room.startswith(source.split_prefix)):
+                return source
+        return None
+
+    def join(self, sid: str, room: str) -> bool:
+        """Nimmt einen Client in einen Raum auf und schickt ihm den letzten Stand"""
+        source = self._source_for(room)
+        if source is None:
+            return False
+        self.socketio.server.enter_room(sid, room, namespace=self.namespace)
+        if room == source.room:
+            if source.last is not None:
+                self.socketio.emit(source.event, source.last, to=sid, namespace=self.namespace)
+        elif room in source.last_parts:
+            self.socketio.emit(source.split_event, source.last_parts[room], to=sid,
+                               namespace=self.namespace)
+        if self._task is None:
+            self._task = self.socketio.start_background_task(self._run)
+        return True
+
+    def leave(self, sid: str, room: str):
+        self.socketio.server.leave_room(sid, room, namespace=self.namespace)
+
+    def _members(self) -> set:
+        """Räume, in denen gerade mindestens ein Client ist"""
+        rooms = self.socketio.server.manager.rooms.get(self.namespace, {})
+        return {room for room, members in rooms.items() if members}
+
+    def _run(self):
+        while True:
+            self.tick()
+            self.socketio.sleep(min(source.interval for source in self.sources.values()))
+
+    def tick(self, now: Optional[float] = None):
+        """Fragt alle fälligen Quellen ab, deren Räume Mitglieder haben"""
+        now = time.monotonic() if now is None else now
+        members = self._members()
+        for source in self.sources.values():
+            if now < source.next_due:
+                continue
+            wanted = source.room in members or (
+                source.split_prefix is not None and
+                any(room.startswith(source.split_prefix) for room in members)
+            )
+            if not wanted:
+                # Ohne Zuhörer nicht messen; der nächste Client bekommt frische Daten
+                source.last = None
+                source.last_parts = {}
+                continue
+            source.next_due = now + source.interval
+            try:
+                payload = source.sample()
+            except Exception as e:
+                print(f"Quelle {source.room} konnte nicht abgefragt werden: {e}")
+                continue
+            self.sample_count += 1
+            self._publish(source, payload)
+
+    def _publish(self, source: _Source, payload: Any):
+        if payload != source.last:
+            source.last = payload
+            self.socketio.emit(source.event, payload, to=source.room, namespace=self.namespace)
+        if source.split is None:
+            return
+        parts = source.split(payload)
+        for room, part in parts.items():
+            if source.last_parts.get(room) != part:
+                self.socketio.emit(source.split_event, part, to=room, namespace=self.namespace)
+        source.last_parts = parts
+
+def system_stats() -> Dict:
+    """Systemwerte für das Dashboard aus dem gemeinsamen Sampler"""
+    from system.monitoring.system_monitor import SystemSampler
+    snapshot = SystemSampler.shared().snapshot()
+    return {
+        'cpu': snapshot.cpu_percent,
+        'memory': snapshot.memory_percent,
+        'disk': snapshot.disk_percent,
+        'uptime': int(snapshot.uptime)
+    }
+
+def printer_status() -> Dict:
+    """Status aller Drucker vom Kernel-Dienst"""
+    from kernel.core.ipc import get_client
+    printers = []
+    for status in get_client().list_printers():
+        temperature = status['temperature']
+        printers.append({
+            'id': status['id'],
+            'name': status['name'],
+            'status': status['status'],
+            'progress': round(status['progress'] or 0.0, 1),
+            'temperature': {
+                'nozzle': round(temperature['hotend'], 1),
+                'bed': round(temperature['bed'], 1)
+            },
+            'layer': status.get('layer'),
+            'remaining_time': round(status['remaining_time']) if status.get('remaining_time') else None
+        })
+    return {'printers': printers}
+
+def split_printers(payload: Dict) -> Dict[str, Dict]:
+    return {f"printer:{printer['id']}": printer for printer in payload['printers']}
+
+_hubs: Dict[int, BroadcastHub] = {}
+
+def get_hub(socketio) -> BroadcastHub:
+    """Der gemeinsame Hub einer SocketIO-Instanz mit den Standardquellen"""
+    hub = _hubs.get(id(socketio))
+    if hub is None:
+        hub = BroadcastHub(socketio)
+        hub.add_source('system_stats', 'system_stats', system_stats, interval=2.0)
+        hub.add_source('printers', 'printer_status_update', printer_status, interval=1.0,
+                       split=split_printers, split_prefix='printer:',
+                       split_event='printer_status')
+        _hubs[id(socketio)] = hub
+    return hub
@@ -1,8 +1,11 @@
+from flask import request
 from flask_socketio import emit
 from flask_login import current_user
-from datetime import datetime
+from broadcast import get_hub
 
 def init_socket_events(socketio):
+    hub = get_hub(socketio)
+
     @socketio.on('connect')
     def handle_connect():
         if not current_user.is_authenticated:
@@ -13,20 +16,21 @@ def init_socket_events(socketio):
     def handle_printer_status_request():
         if not current_user.is_authenticated:
             return
-        # TODO: Implement actual printer status retrieval
-        printer_status = {
-            'printers': [
-                {
-                    'id': 1,
-                    'name': 'Printer 1',
-                    'status': 'printing',
-                    'progress': 45,
-                    'temperature': {'bed': 60, 'nozzle': 200},
-                    'last_update': datetime.now().isoformat()
-                }
-            ]
-        }
-        emit('printer_status_update', printer_status)
+        # Kein eigener Abruf: der Client bekommt den letzten Stand und danach jede Änderung
+        hub.join(request.sid, 'printers')
+
+    @socketio.on('subscribe')
+    def handle_subscribe(data):
+        if not current_user.is_authenticated:
+            return
+        if not hub.join(request.sid, data.get('room', '')):
+            emit('subscribe_error', {'room': data.get('room'), 'error': 'Unknown room'})
+
+    @socketio.on('unsubscribe')
+    def handle_unsubscribe(data):
+        if not current_user.is_authenticated:
+            return
+        hub.leave(request.sid, data.get('room', ''))
 
     @socketio.on('start_print')
     def handle_start_print(data):
@@ -0,0 +1,70 @@
+import hashlib
+import os
+from pathlib import Path
+from flask import Blueprint, Response, abort, jsonify, request
+from flask_login import login_required
+from kernel.gcode.layer_index import LayerIndex
+from kernel.gcode.preview import FORMATS, PreviewRenderer
+from system.printer.printer_manager import PrinterManager
+
+preview = Blueprint('preview', __name__)
+GCODE_DIR = Path(os.environ.get('INNOVATE_GCODE_DIR', '/var/lib/innovate/gcode'))
+renderer = None
+
+def get_renderer() -> PreviewRenderer:
+    global renderer
+    if renderer is None:
+        renderer = PreviewRenderer.from_printer_config(PrinterManager.get_current_printer())
+    return renderer
+
+def _gcode_path(filename: str) -> str:
+    """Nur Dateien im G-Code-Verzeichnis, keine Pfade nach außerhalb"""
+    path = (GCODE_DIR / filename).resolve()
+    if GCODE_DIR.resolve() not in path.parents or not path.is_file():
+        abort(404)
+    return str(path)
+
+def _image(data: bytes, image_format: str) -> Response:
+    response = Response(data, mimetype=FORMATS[image_format])
+    # Die URL enthält den Dateinamen, nicht den Inhalt: kurz cachen und per ETag prüfen
+    response.set_etag(hashlib.sha1(data).hexdigest())
+    response.cache_control.private = True
+    response.cache_control.max_age = 60
+    return response.make_conditional(request)
+
+@preview.route('/<path:filename>/layers')
+@login_required
+def get_layers(filename):
+    index = LayerIndex.for_file(_gcode_path(filename))
+    return jsonify({
+        'layers': [{'z': round(z, 3), 'time': round(t, 1)} for z, t in zip(index.z, index.times)],
+        'total_time': index.total_time,
+        'total_filament': index.total_filament
+    })
+
+@preview.route('/<path:filename>/layer/<int:layer>')
+@login_required
+def get_layer(filename, layer):
+    image_format = request.args.get('format', 'png')
+    try:
+        data = get_renderer().render_layer(
+            _gcode_path(filename), layer,
+            zoom=request.args.get('zoom', 0, type=int),
+            tile=(request.args.get('x', 0, type=int), request.args.get('y', 0, type=int)),
+            image_format=image_format
+        )
+    except IndexError:
+        abort(404)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return _image(data, image_format)
+
+@preview.route('/<path:filename>/thumbnail')
+@login_required
+def get_thumbnail(filename):
+    image_format = request.args.get('format', 'png')
+    try:
+        data = get_renderer().thumbnail(_gcode_path(filename), image_format=image_format)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return _image(data, image_format)
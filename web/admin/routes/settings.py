@@ -1,7 +1,6 @@
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, request
 from flask_socketio import emit
-import psutil
-import time
+from broadcast import get_hub
 from system.update.system_updater import SystemUpdater
 from system.plugins.plugin_manager import PluginManager
 from system.backup.backup_manager import BackupManager
@@ -56,22 +55,12 @@ def handle_install_update():
             'available_update': SystemUpdater.is_update_available()
         })
 
-    SystemUpdater.install_update(progress_callback=update_progress)
+    SystemUpdater.install_available_update(progress_callback=update_progress)
 
 @socketio.on('get_system_stats')
 def handle_system_stats():
-    cpu_percent = psutil.cpu_percent()
-    memory = psutil.virtual_memory()
-    disk = psutil.disk_usage('/')
-    boot_time = psutil.boot_time()
-    uptime = time.time() - boot_time
-
-    emit('system_stats', {
-        'cpu': cpu_percent,
-        'memory': memory.percent,
-        'disk': disk.percent,
-        'uptime': uptime
-    })
+    # Einmal pro Intervall für alle Clients gemessen statt bei jeder Anfrage
+    get_hub(socketio).join(request.sid, 'system_stats')
 
 @socketio.on('set_auto_backup')
 def handle_auto_backup(data):